@@ -38,6 +38,18 @@ class CSJSONClient(TornadoClient):
             retVal["Value"]["data"] = b64decode(retVal["Value"]["data"])
         return retVal
 
+    def getDeltaIfNewer(self, sClientVersion):
+        """
+        Transmit request to service and get the configuration modifications,
+        or the configuration data in base64, which is decoded before returning.
+
+        :returns: Configuration modifications or data, if changed
+        """
+        retVal = self.executeRPC("getDeltaIfNewer", sClientVersion)
+        if retVal["OK"] and "data" in retVal["Value"]:
+            retVal["Value"]["data"] = b64decode(retVal["Value"]["data"])
+        return retVal
+
     def commitNewData(self, sData):
         """
         Transmit request to service by encoding data in base64.
@@ -33,13 +33,12 @@
     but this works iff the object is instantiated by a proxy (and not, e.g., using a server certificate)
 
 """
-import _thread
-
 from diraccfg import CFG
 
 from DIRAC import S_ERROR, S_OK
 from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
 from DIRAC.ConfigurationSystem.Client.Helpers import CSGlobals, Registry
+from DIRAC.ConfigurationSystem.private.ConfigurationSnapshot import ConfigurationSnapshot
 from DIRAC.Core.Security.ProxyInfo import getVOfromProxyGroup
 from DIRAC.Core.Utilities import LockRing
 from DIRAC.Core.Utilities.DErrno import ESECTION
@@ -48,11 +47,13 @@ from DIRAC.Core.Utilities.DErrno import ESECTION
 class Operations:
     """Operations class
 
-    The /Operations CFG section is maintained in a cache by an Operations object
+    The /Operations CFG section is maintained in a cache by an Operations object: for each VO,
+    the sections of the search paths are merged and compiled in a ConfigurationSnapshot
     """
 
     __cache = {}
-    __cacheVersion = 0
+    # Snapshot of the configuration the cache has been built from
+    __cacheSnapshot = None
     __cacheLock = LockRing.LockRing().getLock()
 
     def __init__(self, vo=False, group=False, setup=False):
@@ -83,32 +84,27 @@ class Operations:
                 self.__vo = result["Value"]
 
     def __getCache(self):
-        Operations.__cacheLock.acquire()
-        try:
-            currentVersion = gConfigurationData.getVersion()
-            if currentVersion != Operations.__cacheVersion:
+        configSnapshot = gConfigurationData.getSnapshot()
+        cacheKey = (self.__vo,)
+        if Operations.__cacheSnapshot is configSnapshot:
+            cached = Operations.__cache.get(cacheKey)
+            if cached:
+                return cached
+
+        with Operations.__cacheLock:
+            if Operations.__cacheSnapshot is not configSnapshot:
                 Operations.__cache = {}
-                Operations.__cacheVersion = currentVersion
-
-            cacheKey = (self.__vo,)
-            if cacheKey in Operations.__cache:
-                return Operations.__cache[cacheKey]
+                Operations.__cacheSnapshot = configSnapshot
 
-            mergedCFG = CFG()
-
-            for path in self.__getSearchPaths():
-                pathCFG = gConfigurationData.mergedCFG[path]
-                if pathCFG:
-                    mergedCFG = mergedCFG.mergeWith(pathCFG)
-
-            Operations.__cache[cacheKey] = mergedCFG
+            if cacheKey not in Operations.__cache:
+                mergedCFG = CFG()
+                for path in self.__getSearchPaths():
+                    pathCFG = configSnapshot.cfg[path]
+                    if pathCFG:
+                        mergedCFG = mergedCFG.mergeWith(pathCFG)
+                Operations.__cache[cacheKey] = ConfigurationSnapshot(mergedCFG)
 
             return Operations.__cache[cacheKey]
-        finally:
-            try:
-                Operations.__cacheLock.release()
-            except _thread.error:
-                pass
 
     def __getSearchPaths(self):
         paths = ["/Operations/Defaults"]
@@ -121,41 +117,49 @@ class Operations:
         return paths
 
     def getValue(self, optionPath, defaultValue=None):
-        return self.__getCache().getOption(optionPath, defaultValue)
-
-    def __getCFG(self, sectionPath):
-        cacheCFG = self.__getCache()
-        section = cacheCFG.getRecursive(sectionPath)
-        if not section:
-            return S_ERROR(ESECTION, f"{sectionPath} in Operations does not exist")
-        sectionCFG = section["value"]
-        if isinstance(sectionCFG, str):
+        """Get an option value, cast to the type of the default value (same as CFG.getOption)"""
+        cache = self.__getCache()
+        optionValue = cache.getOptionValue(optionPath)
+        if optionValue is None:
+            return defaultValue
+        if defaultValue is None:
+            return optionValue
+
+        defaultType = defaultValue if isinstance(defaultValue, type) else type(defaultValue)
+        if defaultType == list:
+            return list(cache.getListValue(optionPath))
+        if defaultType == bool:
+            return optionValue.lower() in ("y", "yes", "true", "1")
+        try:
+            return defaultType(optionValue)
+        except Exception:
+            return defaultValue
+
+    def __checkSection(self, sectionPath):
+        cache = self.__getCache()
+        if cache.isSection(sectionPath):
+            return S_OK(cache)
+        if cache.getOptionValue(sectionPath) is not None:
             return S_ERROR(f"{sectionPath} in Operations is not a section")
-        return S_OK(sectionCFG)
+        return S_ERROR(ESECTION, f"{sectionPath} in Operations does not exist")
 
     def getSections(self, sectionPath, listOrdered=False):
-        result = self.__getCFG(sectionPath)
+        result = self.__checkSection(sectionPath)
         if not result["OK"]:
             return result
-        sectionCFG = result["Value"]
-        return S_OK(sectionCFG.listSections(listOrdered))
+        return S_OK(result["Value"].getSections(sectionPath))
 
     def getOptions(self, sectionPath, listOrdered=False):
-        result = self.__getCFG(sectionPath)
+        result = self.__checkSection(sectionPath)
         if not result["OK"]:
             return result
-        sectionCFG = result["Value"]
-        return S_OK(sectionCFG.listOptions(listOrdered))
+        return S_OK(result["Value"].getOptions(sectionPath))
 
     def getOptionsDict(self, sectionPath):
-        result = self.__getCFG(sectionPath)
+        result = self.__checkSection(sectionPath)
         if not result["OK"]:
             return result
-        sectionCFG = result["Value"]
-        data = {}
-        for opName in sectionCFG.listOptions():
-            data[opName] = sectionCFG[opName]
-        return S_OK(data)
+        return S_OK(result["Value"].getOptionsDict(sectionPath))
 
     def getMonitoringBackends(self, monitoringType=None):
         """
@@ -1,10 +1,18 @@
 """ Helper for /Registry section
+
+The lookups by value (DN -> user, user -> groups, property -> groups...) are answered from
+a RegistryIndex, built once per snapshot of the configuration.
 """
 import errno
+import threading
+from collections import defaultdict
 
 from DIRAC import S_OK, S_ERROR
 from DIRAC.ConfigurationSystem.Client.Config import gConfig
+from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
 from DIRAC.ConfigurationSystem.Client.Helpers.CSGlobals import getVO
+from DIRAC.ConfigurationSystem.private.Refresher import gRefresher
+from DIRAC.Core.Utilities import List
 
 ID_DN_PREFIX = "/O=DIRAC/CN="
 
@@ -13,6 +21,93 @@ ID_DN_PREFIX = "/O=DIRAC/CN="
 gBaseRegistrySection = "/Registry"
 
 
+class RegistryIndex:
+    """Reverse indexes of the /Registry section
+
+    The values are parsed as gConfig.getValue( path, [] ) does, and the lists keep the order of the sections,
+    so that the lookups give the same answers as scanning the sections.
+    """
+
+    # Group options indexed by value
+    indexedGroupOptions = ("Users", "VO", "Properties")
+
+    def __init__(self):
+        # { DN : [ usernames ] }, { ID : [ usernames ] }, { DN : [ hostnames ] }
+        self.usersForDN = defaultdict(list)
+        self.usersForID = defaultdict(list)
+        self.hostsForDN = defaultdict(list)
+        # { group : [ properties ] }, for the groups having the Properties option
+        self.groupProperties = {}
+        # { option : { value : [ groups ] } } for the indexedGroupOptions
+        self.groupsWithOption = {option: defaultdict(list) for option in self.indexedGroupOptions}
+        # { VOMSRole : [ groups ] }
+        self.groupsForVOMSRole = defaultdict(list)
+
+        self.__load()
+
+    @staticmethod
+    def __getSectionOptions(section):
+        """Get the options of the sub-sections of a section
+
+        :return: list of (sub-section name, options dict)
+        """
+        result = gConfig.getSections(section)
+        if not result["OK"]:
+            return []
+        subSections = []
+        for name in result["Value"]:
+            result = gConfig.getOptionsDict(f"{section}/{name}")
+            subSections.append((name, result["Value"] if result["OK"] else {}))
+        return subSections
+
+    def __load(self):
+        for username, options in self.__getSectionOptions(f"{gBaseRegistrySection}/Users"):
+            for dn in List.fromChar(options.get("DN", ""), ","):
+                self.usersForDN[dn].append(username)
+            for userID in List.fromChar(options.get("ID", ""), ","):
+                self.usersForID[userID].append(username)
+
+        for hostname, options in self.__getSectionOptions(f"{gBaseRegistrySection}/Hosts"):
+            for dn in List.fromChar(options.get("DN", ""), ","):
+                self.hostsForDN[dn].append(hostname)
+
+        for group, options in self.__getSectionOptions(f"{gBaseRegistrySection}/Groups"):
+            for option in self.indexedGroupOptions:
+                for value in List.fromChar(options.get(option, ""), ","):
+                    self.groupsWithOption[option][value].append(group)
+            if "Properties" in options:
+                self.groupProperties[group] = List.fromChar(options["Properties"], ",")
+            if options.get("VOMSRole"):
+                self.groupsForVOMSRole[options["VOMSRole"]].append(group)
+
+
+gRegistryIndexLock = threading.Lock()
+# ( configuration snapshot, RegistryIndex built from it )
+gRegistryIndex = None
+
+
+def getRegistryIndex():
+    """Get the index of the Registry for the current configuration, building it if needed
+
+    The index is rebuilt when the configuration changes, i.e. when a new snapshot of it is compiled
+
+    :return: RegistryIndex
+    """
+    global gRegistryIndex  # pylint: disable=global-statement
+    gRefresher.refreshConfigurationIfNeeded()
+    # Taken before reading the configuration: a change during the build triggers a new one
+    snapshot = gConfigurationData.getSnapshot()
+    current = gRegistryIndex
+    if current and current[0] is snapshot:
+        return current[1]
+    with gRegistryIndexLock:
+        current = gRegistryIndex
+        if not (current and current[0] is snapshot):
+            current = (snapshot, RegistryIndex())
+            gRegistryIndex = current
+    return current[1]
+
+
 def getUsernameForDN(dn, usersList=None):
     """Find DIRAC user for DN
 
@@ -22,13 +117,8 @@ def getUsernameForDN(dn, usersList=None):
     :return: S_OK(str)/S_ERROR()
     """
     dn = dn.strip()
-    if not usersList:
-        result = gConfig.getSections(f"{gBaseRegistrySection}/Users")
-        if not result["OK"]:
-            return result
-        usersList = result["Value"]
-    for username in usersList:
-        if dn in gConfig.getValue(f"{gBaseRegistrySection}/Users/{username}/DN", []):
+    for username in getRegistryIndex().usersForDN.get(dn, []):
+        if not usersList or username in usersList:
             return S_OK(username)
     return S_ERROR(f"No username found for dn {dn}")
 
@@ -77,15 +167,7 @@ def __getGroupsWithAttr(attrName, value):
 
     :return: S_OK(list)/S_ERROR() -- contain list of groups
     """
-    result = gConfig.getSections(f"{gBaseRegistrySection}/Groups")
-    if not result["OK"]:
-        return result
-    groupsList = result["Value"]
-    groups = []
-    for group in groupsList:
-        if value in gConfig.getValue(f"{gBaseRegistrySection}/Groups/{group}/{attrName}", []):
-            groups.append(group)
-    groups.sort()
+    groups = sorted(getRegistryIndex().groupsWithOption[attrName].get(value, []))
     return S_OK(groups) if groups else S_ERROR(f"No groups found for {attrName}={value}")
 
 
@@ -131,14 +213,8 @@ def getHostnameForDN(dn):
     :return: S_OK()/S_ERROR()
     """
     dn = dn.strip()
-    result = gConfig.getSections(f"{gBaseRegistrySection}/Hosts")
-    if not result["OK"]:
-        return result
-    hostList = result["Value"]
-    for hostname in hostList:
-        if dn in gConfig.getValue(f"{gBaseRegistrySection}/Hosts/{hostname}/DN", []):
-            return S_OK(hostname)
-    return S_ERROR(f"No hostname found for dn {dn}")
+    hostnames = getRegistryIndex().hostsForDN.get(dn)
+    return S_OK(hostnames[0]) if hostnames else S_ERROR(f"No hostname found for dn {dn}")
 
 
 def getDefaultUserGroup():
@@ -269,8 +345,10 @@ def getPropertiesForGroup(groupName, defaultValue=None):
 
     :return: defaultValue or list
     """
-    option = f"{gBaseRegistrySection}/Groups/{groupName}/Properties"
-    return gConfig.getValue(option, [] if defaultValue is None else defaultValue)
+    properties = getRegistryIndex().groupProperties.get(groupName)
+    if properties is None:
+        return [] if defaultValue is None else defaultValue
+    return list(properties)
 
 
 def getPropertiesForHost(hostName, defaultValue=None):
@@ -480,11 +558,7 @@ def getGroupsWithVOMSAttribute(vomsAttr):
 
     :return: list
     """
-    groups = []
-    for group in gConfig.getSections(f"{gBaseRegistrySection}/Groups").get("Value", []):
-        if vomsAttr == gConfig.getValue(f"{gBaseRegistrySection}/Groups/{group}/VOMSRole", ""):
-            groups.append(group)
-    return groups
+    return list(getRegistryIndex().groupsForVOMSRole.get(vomsAttr, []))
 
 
 def getVOs():
@@ -585,13 +659,8 @@ def getUsernameForID(ID, usersList=None):
 
     :return: S_OK(str)/S_ERROR()
     """
-    if not usersList:
-        result = gConfig.getSections(f"{gBaseRegistrySection}/Users")
-        if not result["OK"]:
-            return result
-        usersList = result["Value"]
-    for username in usersList:
-        if ID in gConfig.getValue(f"{gBaseRegistrySection}/Users/{username}/ID", []):
+    for username in getRegistryIndex().usersForID.get(ID, []):
+        if not usersList or username in usersList:
             return S_OK(username)
     return S_ERROR(f"No username found for ID {ID}")
 
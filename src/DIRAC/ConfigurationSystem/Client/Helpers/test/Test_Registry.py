@@ -0,0 +1,96 @@
+""" Test the lookups of the Registry helper
+"""
+from diraccfg import CFG
+
+from DIRAC import gConfig
+from DIRAC.ConfigurationSystem.Client.Helpers import Registry
+
+registryCFG = """
+Registry
+{
+  Users
+  {
+    alice
+    {
+      DN = /C=ch/O=DIRAC/CN=alice, /C=ch/O=DIRAC/CN=alice2
+      ID = 1234-alice
+    }
+    bob
+    {
+      DN = /C=ch/O=DIRAC/CN=bob
+    }
+  }
+  Groups
+  {
+    dirac_user
+    {
+      Users = alice, bob
+      Properties = NormalUser
+      VO = testVO
+      VOMSRole = /testVO
+    }
+    dirac_prod
+    {
+      Users = alice
+      Properties = NormalUser, ProductionManagement
+      VO = testVO
+      VOMSRole = /testVO/Role=production
+    }
+    no_props
+    {
+      Users = bob
+    }
+  }
+  Hosts
+  {
+    host.cern.ch
+    {
+      DN = /C=ch/O=DIRAC/CN=host.cern.ch
+      Properties = TrustedHost
+    }
+  }
+}
+"""
+
+
+def test_lookups():
+    cfg = CFG()
+    cfg.loadFromBuffer(registryCFG)
+    gConfig.loadCFG(cfg)
+
+    assert Registry.getUsernameForDN("/C=ch/O=DIRAC/CN=alice2")["Value"] == "alice"
+    assert Registry.getUsernameForDN(" /C=ch/O=DIRAC/CN=bob ")["Value"] == "bob"
+    assert not Registry.getUsernameForDN("/C=ch/O=DIRAC/CN=bob", usersList=["alice"])["OK"]
+    assert not Registry.getUsernameForDN("/C=ch/O=DIRAC/CN=nobody")["OK"]
+    assert Registry.getUsernameForID("1234-alice")["Value"] == "alice"
+
+    assert Registry.getGroupsForDN("/C=ch/O=DIRAC/CN=alice")["Value"] == ["dirac_prod", "dirac_user"]
+    assert Registry.getGroupsForUser("bob")["Value"] == ["dirac_user", "no_props"]
+    assert Registry.getGroupsWithProperty("ProductionManagement")["Value"] == ["dirac_prod"]
+    assert not Registry.getGroupsWithProperty("NoSuchProperty")["OK"]
+    assert Registry.getGroupsWithVOMSAttribute("/testVO/Role=production") == ["dirac_prod"]
+
+    assert Registry.getPropertiesForGroup("dirac_prod") == ["NormalUser", "ProductionManagement"]
+    assert Registry.getPropertiesForGroup("no_props") == []
+    assert Registry.getPropertiesForGroup("no_props", None) == []
+    assert Registry.getPropertiesForGroup("unknown", ["default"]) == ["default"]
+    # The values returned can be modified by the caller
+    Registry.getPropertiesForGroup("dirac_user").append("Modified")
+    assert Registry.getPropertiesForGroup("dirac_user") == ["NormalUser"]
+
+    assert Registry.getHostnameForDN("/C=ch/O=DIRAC/CN=host.cern.ch")["Value"] == "host.cern.ch"
+
+
+def test_indexIsRebuilt():
+    """The index follows the changes of the configuration"""
+    cfg = CFG()
+    cfg.loadFromBuffer(registryCFG)
+    gConfig.loadCFG(cfg)
+    index = Registry.getRegistryIndex()
+    assert Registry.getRegistryIndex() is index
+
+    newUserCFG = CFG()
+    newUserCFG.loadFromBuffer("Registry\n{\nUsers\n{\ncarol\n{\nDN = /C=ch/O=DIRAC/CN=carol\n}\n}\n}\n")
+    gConfig.loadCFG(newUserCFG)
+    assert Registry.getRegistryIndex() is not index
+    assert Registry.getUsernameForDN("/C=ch/O=DIRAC/CN=carol")["Value"] == "carol"
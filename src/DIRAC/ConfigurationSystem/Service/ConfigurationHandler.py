@@ -51,6 +51,12 @@ class ConfigurationHandler(RequestHandler):
             retDict["data"] = gServiceInterface.getCompressedConfigurationData()
         return S_OK(retDict)
 
+    types_getDeltaIfNewer = [str]
+
+    @classmethod
+    def export_getDeltaIfNewer(cls, sClientVersion):
+        return S_OK(gServiceInterface.getDeltaIfNewer(sClientVersion))
+
     types_publishSlaveServer = [str]
 
     @classmethod
@@ -57,6 +57,18 @@ class TornadoConfigurationHandler(TornadoService):
             retDict["data"] = b64encode(self.ServiceInterface.getCompressedConfigurationData()).decode()
         return S_OK(retDict)
 
+    def export_getDeltaIfNewer(self, sClientVersion):
+        """
+        Returns the modifications since the version of the client, or the configuration
+        if they are not known anymore
+
+        :param sClientVersion: Version used by client
+        """
+        retDict = self.ServiceInterface.getDeltaIfNewer(sClientVersion)
+        if "data" in retDict:
+            retDict["data"] = b64encode(retDict["data"]).decode()
+        return S_OK(retDict)
+
     def export_publishSlaveServer(self, sURL):
         """
         Used by slave server to register as a slave server.
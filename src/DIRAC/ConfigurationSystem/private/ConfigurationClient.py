@@ -132,7 +132,8 @@ class ConfigurationClient:
         :return: S_OK()/S_ERROR()
         """
         gRefresher.refreshConfigurationIfNeeded()
-        optionValue = gConfigurationData.extractOptionFromCFG(optionPath)
+        snapshot = gConfigurationData.getSnapshot()
+        optionValue = snapshot.getOptionValue(optionPath)
 
         if optionValue is None:
             return S_ERROR(
@@ -153,7 +154,7 @@ class ConfigurationClient:
 
         if requestedType in (list, tuple, set):
             try:
-                return S_OK(requestedType(List.fromChar(optionValue, ",")))
+                return S_OK(requestedType(snapshot.getListValue(optionPath)))
             except Exception as e:
                 return S_ERROR(f"Can't convert value ({str(optionValue)}) to comma separated list \n{repr(e)}")
         elif requestedType == bool:
@@ -220,11 +221,8 @@ class ConfigurationClient:
         :return: S_OK(dict)/S_ERROR()
         """
         gRefresher.refreshConfigurationIfNeeded()
-        optionsDict = {}
-        optionList = gConfigurationData.getOptionsFromCFG(sectionPath)
-        if isinstance(optionList, list):
-            for option in optionList:
-                optionsDict[option] = gConfigurationData.extractOptionFromCFG(f"{sectionPath}/{option}")
+        optionsDict = gConfigurationData.getSnapshot().getOptionsDict(sectionPath)
+        if isinstance(optionsDict, dict):
             return S_OK(optionsDict)
         else:
             return S_ERROR(f"Path {sectionPath} does not exist or it's not a section")
@@ -7,6 +7,7 @@ import zipfile
 import _thread
 import time
 import datetime
+from collections import deque
 
 from diraccfg import CFG
 
@@ -15,6 +16,7 @@ from DIRAC.Core.Utilities.File import mkDir
 from DIRAC.Core.Utilities import List
 from DIRAC.Core.Utilities.ReturnValues import S_OK, S_ERROR
 from DIRAC.Core.Utilities.LockRing import LockRing
+from DIRAC.ConfigurationSystem.private.ConfigurationSnapshot import ConfigurationSnapshot
 from DIRAC.FrameworkSystem.Client.Logger import gLogger
 
 
@@ -36,6 +38,14 @@ class ConfigurationData:
         self.localCFG = CFG()
         self.remoteCFG = CFG()
         self.mergedCFG = CFG()
+        # Compiled from the mergedCFG on the first lookup following a change
+        self.__snapshot = None
+        self.__snapshotLock = LockRing().getLock()
+        # For the services: modifications between the recent versions of the remoteCFG,
+        # as ( fromVersion, toVersion, modList ), and the remoteCFG of the last version recorded
+        self.__versionsRing = deque()
+        self.__versionsRingLock = LockRing().getLock()
+        self.__lastRecordedCFG = None
         self.remoteServerList = []
         if loadDefaultCFG:
             defaultCFGFile = os.path.join(DIRAC.rootPath, "etc", "dirac.cfg")
@@ -64,6 +74,58 @@ class ConfigurationData:
             self.remoteServerList.extend(List.fromChar(remoteServers, ","))
         self.remoteServerList = List.uniqueElements(self.remoteServerList)
         self.__compressedConfigurationData = None
+        self.__snapshot = None
+        if self._isService:
+            self.__recordVersion()
+
+    def __recordVersion(self):
+        """Record the modifications to the remoteCFG if its version changed since the last call"""
+        with self.__versionsRingLock:
+            newVersion = self.getVersion()
+            if self.__lastRecordedCFG is not None:
+                lastVersion = self.getVersion(self.__lastRecordedCFG)
+                if lastVersion == newVersion:
+                    return
+                modList = self.__lastRecordedCFG.getModifications(self.remoteCFG)
+                self.__versionsRing.append((lastVersion, newVersion, modList))
+                while len(self.__versionsRing) > self.getVersionsRingSize():
+                    self.__versionsRing.popleft()
+            self.__lastRecordedCFG = self.remoteCFG.clone()
+
+    def getModificationsSince(self, fromVersion):
+        """Get the modifications to apply to the remoteCFG of a given version to bring it to the current one
+
+        :param str fromVersion: version of the configuration to update
+        :return: ( current version, [ modList ] ) where the modList have to be applied in order,
+                 or None if the version is not in the ring of the recent versions
+        """
+        with self.__versionsRingLock:
+            if not self.__versionsRing or self.__versionsRing[-1][1] != self.getVersion():
+                return None
+            for index, (version, _toVersion, _modList) in enumerate(self.__versionsRing):
+                if version == fromVersion:
+                    modLists = [modList for _fromVersion, _toVersion, modList in list(self.__versionsRing)[index:]]
+                    return self.__versionsRing[-1][1], modLists
+        return None
+
+    def getSnapshot(self):
+        """Get the snapshot of the merged configuration, compiling it if the configuration changed
+
+        The mergedCFG is replaced, never modified, when the configuration changes: the snapshot is valid
+        as long as it has been compiled from the current mergedCFG, and can be read without locking.
+
+        :return: ConfigurationSnapshot
+        """
+        snapshot = self.__snapshot
+        mergedCFG = self.mergedCFG
+        if snapshot is not None and snapshot.cfg is mergedCFG:
+            return snapshot
+        with self.__snapshotLock:
+            snapshot = self.__snapshot
+            if snapshot is None or snapshot.cfg is not mergedCFG:
+                snapshot = ConfigurationSnapshot(mergedCFG)
+                self.__snapshot = snapshot
+        return snapshot
 
     def loadFile(self, fileName):
         try:
@@ -98,6 +160,27 @@ class ConfigurationData:
         self.unlock()
         self.sync()
 
+    def loadRemoteModifications(self, modLists, newestVersion):
+        """Update the remoteCFG with the modifications received from a configuration server
+
+        :param list modLists: modification lists, as returned by getModificationsSince
+        :param str newestVersion: version of the configuration once the modifications are applied
+
+        :return: S_OK()/S_ERROR() -- the remoteCFG is left untouched in case of error
+        """
+        newCFG = self.remoteCFG.clone()
+        for modList in modLists:
+            result = newCFG.applyModifications(modList)
+            if not result["OK"]:
+                return S_ERROR(f"Cannot apply the configuration modifications: {result['Message']}")
+        if self.getVersion(newCFG) != newestVersion:
+            return S_ERROR(f"Configuration modifications led to version {self.getVersion(newCFG)}, not {newestVersion}")
+        self.lock()
+        self.remoteCFG = newCFG
+        self.unlock()
+        self.sync()
+        return S_OK()
+
     def loadConfigurationData(self, fileName=False):
         name = self.getName()
         self.lock()
@@ -127,7 +210,7 @@ class ConfigurationData:
 
     def getSectionsFromCFG(self, path, cfg=False, ordered=False):
         if not cfg:
-            cfg = self.mergedCFG
+            return self.getSnapshot().getSections(path)
         self.dangerZoneStart()
         try:
             levelList = [level.strip() for level in path.split("/") if level.strip() != ""]
@@ -140,7 +223,7 @@ class ConfigurationData:
 
     def getOptionsFromCFG(self, path, cfg=False, ordered=False):
         if not cfg:
-            cfg = self.mergedCFG
+            return self.getSnapshot().getOptions(path)
         self.dangerZoneStart()
         try:
             levelList = [level.strip() for level in path.split("/") if level.strip() != ""]
@@ -153,7 +236,7 @@ class ConfigurationData:
 
     def extractOptionFromCFG(self, path, cfg=False, disableDangerZones=False):
         if not cfg:
-            cfg = self.mergedCFG
+            return self.getSnapshot().getOptionValue(path)
         if not disableDangerZones:
             self.dangerZoneStart()
         try:
@@ -241,6 +324,12 @@ class ConfigurationData:
         except Exception:
             return 600
 
+    def getVersionsRingSize(self):
+        try:
+            return int(self.extractOptionFromCFG(f"{self.configurationPath}/VersionsRingSize", self.mergedCFG))
+        except Exception:
+            return 20
+
     def mergingEnabled(self):
         try:
             val = self.extractOptionFromCFG(f"{self.configurationPath}/EnableAutoMerge", self.mergedCFG)
@@ -0,0 +1,122 @@
+""" Immutable, flattened view of a configuration
+
+A ConfigurationSnapshot is compiled once from a CFG object: each option is stored in a flat
+dictionary keyed by its full path, and each section with the listing of its sub-sections and options.
+Looking up a value is then a single dictionary access instead of a walk of the CFG tree, and as the
+snapshot is never modified after being built, it can be read by many threads without locking.
+
+A new snapshot is compiled for each new configuration, and replaces the previous one atomically.
+"""
+from diraccfg import CFG
+
+from DIRAC.Core.Utilities import List
+
+
+def normalisePath(path):
+    """Get the canonical form of a configuration path: "/" separated, without empty or padded levels
+
+    :param str path: configuration path, e.g. "Systems/WorkloadManagement/ "
+    :return: str, e.g. "/Systems/WorkloadManagement"
+    """
+    return "/" + "/".join(level.strip() for level in path.split("/") if level.strip())
+
+
+class ConfigurationSnapshot:
+    """Flat, read-only lookup tables of a CFG
+
+    The snapshot keeps a reference to the CFG it was compiled from, which must not be modified afterwards.
+    """
+
+    def __init__(self, cfg):
+        """C'tor
+
+        :param CFG cfg: configuration to compile
+        """
+        self.cfg = cfg
+        # { option path : value }
+        self.__options = {}
+        # { section path : ( [ sub-sections ], { option : value } ) }, in the order of the CFG
+        self.__sections = {}
+        # { option path : tuple of the comma separated values }, filled on the first request
+        self.__lists = {}
+        self.__compile(cfg, "")
+
+    def __compile(self, cfg, sectionPath):
+        sections = []
+        options = {}
+        for key in cfg.listAll():
+            value = cfg[key]
+            if isinstance(value, str):
+                options[key] = value
+                self.__options[f"{sectionPath}/{key}"] = value
+            elif isinstance(value, CFG):
+                sections.append(key)
+                self.__compile(value, f"{sectionPath}/{key}")
+        self.__sections[sectionPath or "/"] = (sections, options)
+
+    def __lookup(self, table, path):
+        """Look a path up, trying the path as given before its canonical form"""
+        try:
+            return table[path]
+        except KeyError:
+            return table.get(normalisePath(path))
+
+    def getOptionValue(self, path):
+        """Get the raw value of an option
+
+        :param str path: option path
+        :return: str, or None if the path does not exist or is a section
+        """
+        return self.__lookup(self.__options, path)
+
+    def getListValue(self, path):
+        """Get the value of an option split as a comma separated list
+
+        :param str path: option path
+        :return: tuple of str, or None if the path does not exist or is a section
+        """
+        try:
+            return self.__lists[path]
+        except KeyError:
+            pass
+        value = self.getOptionValue(path)
+        if value is None:
+            return None
+        # Concurrent readers may compute it twice, to the same result
+        self.__lists[path] = values = tuple(List.fromChar(value, ","))
+        return values
+
+    def isSection(self, path):
+        """Check if a path is a section
+
+        :param str path: section path
+        :return: bool
+        """
+        return self.__lookup(self.__sections, path) is not None
+
+    def getSections(self, path):
+        """Get the sub-sections of a section
+
+        :param str path: section path
+        :return: list of str, or None if the path is not a section
+        """
+        section = self.__lookup(self.__sections, path)
+        return None if section is None else list(section[0])
+
+    def getOptions(self, path):
+        """Get the options of a section
+
+        :param str path: section path
+        :return: list of str, or None if the path is not a section
+        """
+        section = self.__lookup(self.__sections, path)
+        return None if section is None else list(section[1])
+
+    def getOptionsDict(self, path):
+        """Get the options of a section with their values
+
+        :param str path: section path
+        :return: dict, or None if the path is not a section
+        """
+        section = self.__lookup(self.__sections, path)
+        return None if section is None else dict(section[1])
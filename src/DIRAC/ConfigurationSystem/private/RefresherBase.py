@@ -1,3 +1,4 @@
+import errno
 import time
 import random
 
@@ -10,19 +11,47 @@ from DIRAC.Core.Utilities.EventDispatcher import gEventDispatcher
 from DIRAC.Core.Utilities.ReturnValues import S_OK, S_ERROR
 
 
+# URLs of the configuration servers not able to send the modifications between versions
+_serversWithoutDelta = set()
+
+
+def _getUpdate(serviceClient, localVersion):
+    """
+    Get the modifications since the local version, or the whole configuration
+    from the servers which can't send the modifications
+    """
+    if serviceClient.serverURL not in _serversWithoutDelta:
+        retVal = serviceClient.getDeltaIfNewer(localVersion)
+        if retVal["OK"] or not (retVal.get("Errno") == errno.ENOSYS or "Unknown method" in retVal["Message"]):
+            return retVal
+        gLogger.debug("Server can't send configuration modifications", serviceClient.serverURL)
+        _serversWithoutDelta.add(serviceClient.serverURL)
+    return serviceClient.getCompressedDataIfNewer(localVersion)
+
+
 def _updateFromRemoteLocation(serviceClient):
     """
     Refresh the configuration
     """
     gLogger.debug("", f"Trying to refresh from {serviceClient.serverURL}")
     localVersion = gConfigurationData.getVersion()
-    retVal = serviceClient.getCompressedDataIfNewer(localVersion)
+    retVal = _getUpdate(serviceClient, localVersion)
     if retVal["OK"]:
         dataDict = retVal["Value"]
         newestVersion = dataDict["newestVersion"]
         if localVersion < newestVersion:
             gLogger.debug("New version available", f"Updating to version {newestVersion}...")
-            gConfigurationData.loadRemoteCFGFromCompressedMem(dataDict["data"])
+            if "delta" in dataDict:
+                result = gConfigurationData.loadRemoteModifications(dataDict["delta"], newestVersion)
+                if not result["OK"]:
+                    gLogger.warn("Downloading the whole configuration", result["Message"])
+                    retVal = serviceClient.getCompressedDataIfNewer(localVersion)
+                    if not retVal["OK"]:
+                        return retVal
+                    dataDict = retVal["Value"]
+                    newestVersion = dataDict["newestVersion"]
+            if "data" in dataDict:
+                gConfigurationData.loadRemoteCFGFromCompressedMem(dataDict["data"])
             gLogger.debug(f"Updated to version {gConfigurationData.getVersion()}")
             gEventDispatcher.triggerEvent("CSNewVersion", newestVersion, threaded=True)
         return S_OK()
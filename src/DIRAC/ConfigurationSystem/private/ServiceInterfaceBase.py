@@ -249,6 +249,24 @@ class ServiceInterfaceBase:
     def getVersion(self):
         return gConfigurationData.getVersion()
 
+    def getDeltaIfNewer(self, sClientVersion):
+        """
+        Get what a client needs to update its configuration: the modifications since its version,
+        or the whole compressed configuration if its version is not in the ring of the recent versions
+
+        :param str sClientVersion: version of the configuration of the client
+        :return: dict with the newestVersion, and the list of modification lists as "delta" or the data as "data"
+        """
+        sVersion = gConfigurationData.getVersion()
+        retDict = {"newestVersion": sVersion}
+        if sClientVersion < sVersion:
+            modifications = gConfigurationData.getModificationsSince(sClientVersion)
+            if modifications:
+                retDict["newestVersion"], retDict["delta"] = modifications
+            else:
+                retDict["data"] = gConfigurationData.getCompressedData()
+        return retDict
+
     def getCommitHistory(self):
         files = self.__getCfgBackups(gConfigurationData.getBackupDir())
         backups = [".".join(fileName.split(".")[1:-1]).split("@") for fileName in files]
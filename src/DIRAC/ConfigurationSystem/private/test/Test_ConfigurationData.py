@@ -0,0 +1,79 @@
+""" Test the propagation of the configuration modifications between versions
+"""
+import json
+
+from DIRAC.ConfigurationSystem.private.ConfigurationData import ConfigurationData
+
+cfgData = """
+DIRAC
+{
+  Configuration
+  {
+    Version = 2023-01-01 00:00:00
+    VersionsRingSize = 2
+  }
+}
+Systems
+{
+  WorkloadManagement
+  {
+    Agents
+    {
+      JobAgent
+      {
+        PollingTime = 120
+      }
+    }
+  }
+}
+"""
+pollingTime = "/Systems/WorkloadManagement/Agents/JobAgent/PollingTime"
+
+
+def newVersion(configurationData, version):
+    configurationData.setOptionInCFG(pollingTime, version[-2:], configurationData.remoteCFG)
+    configurationData.setVersion(version)
+
+
+def test_modificationsSince():
+    server = ConfigurationData(loadDefaultCFG=False)
+    server.setAsService()
+    server.loadRemoteCFGFromMem(cfgData)
+    assert server.getModificationsSince("2023-01-01 00:00:00") is None
+
+    newVersion(server, "2023-01-01 00:00:01")
+    client = ConfigurationData(loadDefaultCFG=False)
+    client.loadRemoteCFGFromMem(str(server.getRemoteCFG()))
+    newVersion(server, "2023-01-01 00:00:02")
+    newVersion(server, "2023-01-01 00:00:03")
+    # The oldest version dropped out of the ring
+    assert server.getModificationsSince("2023-01-01 00:00:00") is None
+    assert server.getModificationsSince("2023-01-01 00:00:03") is None
+
+    version, modLists = server.getModificationsSince("2023-01-01 00:00:01")
+    assert version == "2023-01-01 00:00:03"
+    assert len(modLists) == 2
+
+    # As sent by the Tornado service
+    modLists = json.loads(json.dumps(modLists))
+    result = client.loadRemoteModifications(modLists, version)
+    assert result["OK"], result
+    assert client.getVersion() == version
+    assert client.extractOptionFromCFG(pollingTime) == "03"
+    assert client.getRemoteCFG() == server.getRemoteCFG()
+
+
+def test_wrongModifications():
+    """A client not having the expected configuration is left untouched"""
+    server = ConfigurationData(loadDefaultCFG=False)
+    server.setAsService()
+    server.loadRemoteCFGFromMem(cfgData)
+    newVersion(server, "2023-01-01 00:00:01")
+    version, modLists = server.getModificationsSince("2023-01-01 00:00:00")
+
+    client = ConfigurationData(loadDefaultCFG=False)
+    client.loadRemoteCFGFromMem(cfgData)
+    client.deleteOptionInCFG(pollingTime, client.remoteCFG)
+    result = client.loadRemoteModifications(modLists, version)
+    assert not result["OK"]
+    assert client.getVersion() == "2023-01-01 00:00:00"
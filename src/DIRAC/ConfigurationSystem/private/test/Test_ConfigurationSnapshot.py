@@ -0,0 +1,72 @@
+""" Test the compiled snapshots of the configuration
+"""
+from diraccfg import CFG
+
+from DIRAC.ConfigurationSystem.private.ConfigurationData import ConfigurationData
+from DIRAC.ConfigurationSystem.private.ConfigurationSnapshot import ConfigurationSnapshot
+
+cfgData = """
+Systems
+{
+  WorkloadManagement
+  {
+    Agents
+    {
+      JobAgent
+      {
+        CEs = CE1, CE2 ,CE3
+        PollingTime = 120
+      }
+      StalledJobAgent
+      {
+      }
+    }
+  }
+}
+"""
+
+
+def test_lookups():
+    cfg = CFG()
+    cfg.loadFromBuffer(cfgData)
+    snapshot = ConfigurationSnapshot(cfg)
+
+    path = "/Systems/WorkloadManagement/Agents/JobAgent"
+    assert snapshot.getOptionValue(f"{path}/PollingTime") == "120"
+    # Same normalisation of the paths as when walking the CFG
+    assert snapshot.getOptionValue("Systems/WorkloadManagement//Agents/ JobAgent /PollingTime") == "120"
+    assert snapshot.getOptionValue(path) is None
+    assert snapshot.getOptionValue(f"{path}/Missing") is None
+    assert snapshot.getListValue(f"{path}/CEs") == ("CE1", "CE2", "CE3")
+    assert snapshot.getListValue(f"{path}/CEs") is snapshot.getListValue(f"{path}/CEs")
+
+    assert snapshot.isSection("/Systems/WorkloadManagement/Agents/StalledJobAgent")
+    assert not snapshot.isSection(f"{path}/PollingTime")
+    assert snapshot.getSections("/") == ["Systems"]
+    assert snapshot.getSections("/Systems/WorkloadManagement/Agents") == ["JobAgent", "StalledJobAgent"]
+    assert snapshot.getOptions(path) == ["CEs", "PollingTime"]
+    assert snapshot.getOptionsDict(path) == {"CEs": "CE1, CE2 ,CE3", "PollingTime": "120"}
+    assert snapshot.getSections(f"{path}/PollingTime") is None
+
+    # The caller can modify what it gets
+    snapshot.getOptionsDict(path)["PollingTime"] = "0"
+    assert snapshot.getOptionValue(f"{path}/PollingTime") == "120"
+
+
+def test_snapshotFollowsTheConfiguration():
+    """A new snapshot is compiled when the configuration changes"""
+    configurationData = ConfigurationData(loadDefaultCFG=False)
+    cfg = CFG()
+    cfg.loadFromBuffer(cfgData)
+    configurationData.mergeWithLocal(cfg)
+
+    snapshot = configurationData.getSnapshot()
+    assert configurationData.getSnapshot() is snapshot
+    pollingTime = "/Systems/WorkloadManagement/Agents/JobAgent/PollingTime"
+    assert configurationData.extractOptionFromCFG(pollingTime) == "120"
+
+    configurationData.setOptionInCFG(pollingTime, "60")
+    assert configurationData.getSnapshot() is not snapshot
+    assert configurationData.extractOptionFromCFG(pollingTime) == "60"
+    # The previous snapshot is left untouched
+    assert snapshot.getOptionValue(pollingTime) == "120"
@@ -3,7 +3,9 @@
     This class exposes possible RPC calls, given a url of a service.
 """
 import ast
+import threading
 import importlib_resources
+from contextlib import contextmanager
 from functools import partial, partialmethod
 
 from DIRAC.Core.Tornado.Client.ClientSelector import RPCClientSelector
@@ -22,6 +24,12 @@ class partialmethodWithDoc(partialmethod):
         return func
 
 
+class BatchState(threading.local):
+    """RPC client of the batch in progress in the current thread, see :py:meth:`Client.batch`"""
+
+    rpc = None
+
+
 class Client:
     """Simple class to redirect unknown actions directly to the server. Arguments
     to the constructor are passed to the RPCClient constructor as they are.
@@ -42,6 +50,8 @@ class Client:
         self.serverURL = kwargs.pop("url", None)
         self.__kwargs = kwargs
         self.timeout = DEFAULT_RPC_TIMEOUT
+        # The batches are per thread, so that the calls made by other threads are not added to them
+        self.__batchState = BatchState()
 
     def __getattr__(self, name):
         """Store the attribute asked and call executeRPC.
@@ -90,10 +100,44 @@ class Client:
         # Check whether the 'url' keyword is specified
         url = kws.pop("url", "")
         # Create the RPCClient
+        if not rpc and not url and self.__batchState.rpc:
+            rpc = self.__batchState.rpc
         rpcClient = self._getRPC(rpc=rpc, url=url, timeout=timeout)
         # Execute the method
         return getattr(rpcClient, toExecute)(*parms)
 
+    @contextmanager
+    def batch(self, url="", timeout=None):
+        """Send the calls made in the block in a single request, when the service supports it
+
+        With an https service, see :py:meth:`~DIRAC.Core.Tornado.Client.TornadoClient.TornadoClient.batch`:
+        the results of the calls are only filled when leaving the block.
+        Otherwise, the calls are simply executed one after the other. ::
+
+          with jobStateUpdate.batch():
+              res1 = jobStateUpdate.setJobStatus(jobID, status, minorStatus, source)
+              res2 = jobStateUpdate.setJobParameter(jobID, name, value)
+          if not res1["OK"]:
+              ...
+
+        :param url: url of the service. If not set, use self.serverURL
+        :param timeout: timeout of the request. If not given, self.timeout will be used
+        """
+        if self.__batchState.rpc:
+            # Nested batch: use the current one
+            yield
+            return
+        rpcClient = self._getRPC(url=url, timeout=timeout)
+        if not isinstance(rpcClient, TornadoClient):
+            yield
+            return
+        self.__batchState.rpc = rpcClient
+        try:
+            with rpcClient.batch():
+                yield
+        finally:
+            self.__batchState.rpc = None
+
     def _getRPC(self, rpc=None, url="", timeout=None):
         """Return an RPCClient object constructed following the attributes.
 
@@ -1,6 +1,7 @@
 """ Base class for all services
 """
 import os
+import sys
 import time, datetime
 import psutil
 
@@ -127,6 +128,10 @@ class RequestHandler:
         except ConnectionError as excp:
             gLogger.error("ConnectionError", str(excp))
             return S_ERROR(excp)
+        finally:
+            # Give back the DB connections pinned to the thread during the action, if any DB is used
+            if mySQL := sys.modules.get("DIRAC.Core.Utilities.MySQL"):
+                mySQL.MySQL.releaseThreadConnections()
         if not isReturnStructure(retVal):
             message = f"Method {actionTuple[1]} for action {actionTuple[0]} does not return a S_OK/S_ERROR!"
             gLogger.error(message)
@@ -168,11 +173,16 @@ class RequestHandler:
 
         # Reconvert to tuple
         fileInfo = tuple(retVal["Value"])
+        # Clients which propose it send the data in raw stream mode (see FileHelper)
+        rawStream = retVal.get("RawStream", False)
         sDirection = f"{sDirection[0].lower()}{sDirection[1:]}"
         if f"transfer_{sDirection}" not in dir(self):
             self.__trPool.send(self.__trid, S_ERROR(f"Service can't transfer files {sDirection}"))
             return
-        retVal = self.__trPool.send(self.__trid, S_OK("Accepted"))
+        acceptedMsg = S_OK("Accepted")
+        if rawStream:
+            acceptedMsg["RawStream"] = True
+        retVal = self.__trPool.send(self.__trid, acceptedMsg)
         if not retVal["OK"]:
             return retVal
         self.__logRemoteQuery(f"FileTransfer/{sDirection}", fileInfo)
@@ -181,6 +191,8 @@ class RequestHandler:
         try:
             try:
                 fileHelper = FileHelper(self.__trPool.get(self.__trid))
+                if rawStream:
+                    fileHelper.enableRawStream()
                 if sDirection == "fromClient":
                     fileHelper.setDirection("fromClient")
                     uRetVal = self.transfer_fromClient(fileInfo[0], fileInfo[1], fileInfo[2], fileHelper)
@@ -9,7 +9,7 @@ from DIRAC.Core.DISET.private.FileHelper import FileHelper
 
 
 class TransferClient(BaseClient):
-    def _sendTransferHeader(self, actionName, fileInfo):
+    def _sendTransferHeader(self, actionName, fileInfo, rawStream=False):
         """
         Send the header of the transfer
 
@@ -17,7 +17,10 @@ class TransferClient(BaseClient):
         :param actionName: Action to execute
         :type fileInfo: tuple
         :param fileInfo: Information of the target file/bulk
-        :return: S_OK/S_ERROR
+        :type rawStream: boolean
+        :param rawStream: Propose to transfer the data in raw stream mode (see FileHelper)
+        :return: S_OK( ( trid, transport ) ), with a "RawStream" key telling whether the service accepted it
+                 / S_ERROR
         """
         retVal = self._connect()
         if not retVal["OK"]:
@@ -29,13 +32,19 @@ class TransferClient(BaseClient):
             if not retVal["OK"]:
                 return retVal
             # We need to convert to list
-            retVal = transport.sendData(S_OK(list(fileInfo)))
+            fileInfoMsg = S_OK(list(fileInfo))
+            if rawStream:
+                # Services which do not know about it ignore the key
+                fileInfoMsg["RawStream"] = True
+            retVal = transport.sendData(fileInfoMsg)
             if not retVal["OK"]:
                 return retVal
             retVal = transport.receiveData()
             if not retVal["OK"]:
                 return retVal
-            return S_OK((trid, transport))
+            result = S_OK((trid, transport))
+            result["RawStream"] = rawStream and retVal.get("RawStream", False)
+            return result
         except Exception as e:
             self._disconnect(trid)
             return S_ERROR(f"Cound not request transfer: {str(e)}")
@@ -59,12 +68,15 @@ class TransferClient(BaseClient):
         if not retVal["OK"]:
             return retVal
         fd = retVal["Value"]
-        retVal = self._sendTransferHeader("FromClient", (fileId, token, File.getSize(filename)))
+        retVal = self._sendTransferHeader("FromClient", (fileId, token, File.getSize(filename)), rawStream=True)
         if not retVal["OK"]:
             return retVal
         trid, transport = retVal["Value"]
+        rawStream = retVal["RawStream"]
         try:
             fileHelper.setTransport(transport)
+            if rawStream:
+                fileHelper.enableRawStream()
             retVal = fileHelper.FDToNetwork(fd)
             if not retVal["OK"]:
                 return retVal
@@ -94,12 +106,15 @@ class TransferClient(BaseClient):
             return retVal
         dS = retVal["Value"]
         closeAfterUse = retVal["closeAfterUse"]
-        retVal = self._sendTransferHeader("ToClient", (fileId, token))
+        retVal = self._sendTransferHeader("ToClient", (fileId, token), rawStream=True)
         if not retVal["OK"]:
             return retVal
         trid, transport = retVal["Value"]
+        rawStream = retVal["RawStream"]
         try:
             fileHelper.setTransport(transport)
+            if rawStream:
+                fileHelper.enableRawStream()
             retVal = fileHelper.networkToDataSink(dS)
             if not retVal["OK"]:
                 return retVal
@@ -140,12 +155,15 @@ class TransferClient(BaseClient):
             bulkId = f"{bulkId}.tar.bz2"
         else:
             bulkId = f"{bulkId}.tar"
-        retVal = self._sendTransferHeader("BulkFromClient", (bulkId, token, bulkSize))
+        retVal = self._sendTransferHeader("BulkFromClient", (bulkId, token, bulkSize), rawStream=True)
         if not retVal["OK"]:
             return retVal
         trid, transport = retVal["Value"]
+        rawStream = retVal["RawStream"]
         try:
             fileHelper = FileHelper(transport)
+            if rawStream:
+                fileHelper.enableRawStream()
             retVal = fileHelper.bulkToNetwork(fileList, compress, onthefly)
             if not retVal["OK"]:
                 return retVal
@@ -174,12 +192,15 @@ class TransferClient(BaseClient):
             bulkId = f"{bulkId}.tar.bz2"
         else:
             bulkId = f"{bulkId}.tar"
-        retVal = self._sendTransferHeader("BulkToClient", (bulkId, token))
+        retVal = self._sendTransferHeader("BulkToClient", (bulkId, token), rawStream=True)
         if not retVal["OK"]:
             return retVal
         trid, transport = retVal["Value"]
+        rawStream = retVal["RawStream"]
         try:
             fileHelper = FileHelper(transport)
+            if rawStream:
+                fileHelper.enableRawStream()
             retVal = fileHelper.networkToBulk(destDir, compress)
             if not retVal["OK"]:
                 return retVal
@@ -1,6 +1,8 @@
 """ This module exposes the BaseClient class,
     which serves as base for InnerRPCClient and TransferClient.
 """
+import hashlib
+import os
 import time
 
 import _thread
@@ -15,6 +17,7 @@ from DIRAC.ConfigurationSystem.Client.PathFinder import getServiceURL, getServic
 from DIRAC.ConfigurationSystem.Client.Helpers import Registry
 from DIRAC.ConfigurationSystem.Client.Helpers.CSGlobals import skipCACheck
 from DIRAC.Core.DISET.private.TransportPool import getGlobalTransportPool
+from DIRAC.Core.DISET.private.IdleTransportPool import getGlobalIdleTransportPool
 from DIRAC.Core.DISET.ThreadConfig import ThreadConfig
 
 
@@ -38,6 +41,7 @@ class BaseClient:
     KW_PROXY_CHAIN = "proxyChain"
     KW_SKIP_CA_CHECK = "skipCACheck"
     KW_KEEP_ALIVE_LAPSE = "keepAliveLapse"
+    KW_PERSISTENT_CONNECTION = "persistentConnection"
 
     __threadConfig = ThreadConfig()
 
@@ -58,6 +62,8 @@ class BaseClient:
         :param proxyChain: Specify the proxy chain
         :param skipCACheck: Do not check the CA
         :param keepAliveLapse: Duration for keepAliveLapse (heartbeat like)
+        :param persistentConnection: Keep the connections open between RPC calls, if the service agrees.
+                                     It can also be set in /DIRAC/ConnConf/<host>:<port>
         """
 
         if not isinstance(serviceName, str):
@@ -83,6 +89,7 @@ class BaseClient:
         self.__nbOfRetry = 3  # by default we try try times
         self.__retryCounter = 1
         self.__bannedUrls = []
+        self.__persistentConnection = False
         for initFunc in (
             self.__discoverSetup,
             self.__discoverVO,
@@ -91,6 +98,7 @@ class BaseClient:
             self.__discoverCredentialsToUse,
             self.__checkTransportSanity,
             self.__setKeepAliveLapse,
+            self.__setPersistentConnection,
         ):
             result = initFunc()
             if not result["OK"] and self.__initStatus["OK"]:
@@ -465,6 +473,13 @@ and this is thread {cThID}
         if self.__enableThreadCheck:
             self.__checkThreadID()
 
+        # Reuse a connection kept open by a previous call
+        if self.__persistentConnection:
+            transport = getGlobalIdleTransportPool().get(self.__getIdleTransportKey())
+            if transport:
+                gLogger.debug(f"Reusing connection to: {self.serviceURL}")
+                return S_OK((getGlobalTransportPool().add(transport), transport))
+
         gLogger.debug(f"Trying to connect to: {self.serviceURL}")
         try:
             # Calls the transport method of the apropriate protocol.
@@ -524,13 +539,40 @@ and this is thread {cThID}
 
         return S_OK((trid, transport))
 
-    def _disconnect(self, trid):
+    def _disconnect(self, trid, keepAliveTime=0):
         """Disconnect the connection.
 
         :param str trid: Transport ID in the transportPool
+        :param int keepAliveTime: if the service keeps the connection open for that many seconds,
+                                  the connection is kept for the next call instead of being closed
         """
+        if keepAliveTime and self.__persistentConnection:
+            transport = getGlobalTransportPool().get(trid)
+            if transport:
+                getGlobalTransportPool().remove(trid)
+                getGlobalIdleTransportPool().put(self.__getIdleTransportKey(), transport, keepAliveTime)
+                return
         getGlobalTransportPool().close(trid)
 
+    def __getIdleTransportKey(self):
+        """Connections are only reused for the same service, with the same credentials
+
+        :return: tuple
+        """
+        proxyString = self.kwargs.get(self.KW_PROXY_STRING)
+        if proxyString:
+            if isinstance(proxyString, str):
+                proxyString = proxyString.encode()
+            proxyString = hashlib.sha256(proxyString).hexdigest()
+        return (
+            self.serviceURL,
+            bool(self.__useCertificates),
+            self.kwargs.get(self.KW_PROXY_LOCATION) or os.environ.get("X509_USER_PROXY"),
+            proxyString,
+            bool(self.kwargs.get(self.KW_SKIP_CA_CHECK)),
+            str(self.__extraCredentials),
+        )
+
     @staticmethod
     def _serializeStConnectionInfo(stConnectionInfo):
         """We want to send tuple but we need to convert
@@ -565,6 +607,9 @@ and this is thread {cThID}
         if not self.__initStatus["OK"]:
             return self.__initStatus
         stConnectionInfo = ((self.__URLTuple[3], self.setup, self.vo), action, self.__extraCredentials, DIRAC.version)
+        # Connection options, only understood by the services which can keep the connection open
+        if self.__persistentConnection and action[0] == "RPC":
+            stConnectionInfo += ({"keepAlive": True},)
 
         # Send the connection info and get the answer back
         retVal = transport.sendData(S_OK(BaseClient._serializeStConnectionInfo(stConnectionInfo)))
@@ -635,6 +680,18 @@ and this is thread {cThID}
         self.kwargs[self.KW_KEEP_ALIVE_LAPSE] = kaa
         return S_OK()
 
+    def __setPersistentConnection(self):
+        """Set whether to keep the connections open between RPC calls (see KW_PERSISTENT_CONNECTION).
+        The option may come from the CS, as a string.
+
+        :return: S_OK()/S_ERROR()
+        """
+        persistent = self.kwargs.get(self.KW_PERSISTENT_CONNECTION, False)
+        if isinstance(persistent, str):
+            persistent = persistent.lower() in ("y", "yes", "true", "1")
+        self.__persistentConnection = bool(persistent)
+        return S_OK()
+
     def _getBaseStub(self):
         """Returns a list with [self._destinationSrv, newKwargs]
         self._destinationSrv is what was given as first parameter of the init serviceName
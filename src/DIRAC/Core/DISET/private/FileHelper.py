@@ -1,17 +1,52 @@
+""" Transfer of files and data between DISET clients and services
+
+The data is sent in chunks, each of them being a DISET message acknowledged by the receiver.
+
+When both peers agree on it (see :py:meth:`FileHelper.enableRawStream`), the chunks are sent in raw stream mode:
+each chunk is announced by a small message with its size, followed by the bytes themselves, neither encoded
+nor acknowledged. The size of the chunks adapts to the speed of the transfer, and the data is written to its
+destination as it arrives, so that the memory used does not depend on the size of the file.
+
+In both modes, the MD5 checksum, and optionally others (see :py:meth:`FileHelper.addChecksum`),
+are computed during the transfer.
+"""
 import hashlib
 import io
 import os
+import stat
 import tarfile
 import tempfile
 import threading
+import time
+import zlib
 
 from io import StringIO, BytesIO
 
+from DIRAC.Core.Utilities.Adler import intAdlerToHex
 from DIRAC.Core.Utilities.ReturnValues import S_OK, S_ERROR
 from DIRAC.FrameworkSystem.Client.Logger import gLogger
 
 file_types = (io.IOBase,)
 
+#: Bounds of the size of the chunks in raw stream mode
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+#: Time to send a chunk the size of the chunks adapts to, in seconds
+CHUNK_TARGET_TIME = 0.5
+
+
+class Adler32:
+    """Adler32 checksum, with the interface of the hashlib objects"""
+
+    def __init__(self):
+        self.__value = 1
+
+    def update(self, data):
+        self.__value = zlib.adler32(data, self.__value)
+
+    def hexdigest(self):
+        return intAdlerToHex(self.__value)
+
 
 class FileHelper:
     __validDirections = ("toClient", "fromClient", "receive", "send")
@@ -26,6 +61,10 @@ class FileHelper:
         self.direction = False
         self.packetSize = 1048576
         self.__fileBytes = 0
+        self.__rawStream = False
+        self.__chunkSize = self.packetSize
+        # { algorithm : checksum object }
+        self.__checksums = {}
         self.__log = gLogger.getSubLogger(self.__class__.__name__)
 
     def disableCheckSum(self):
@@ -34,6 +73,30 @@ class FileHelper:
     def enableCheckSum(self):
         self.__checkMD5 = True
 
+    def addChecksum(self, algorithm):
+        """Compute another checksum of the transferred data, in the same pass as the transfer
+
+        :param str algorithm: "adler32", or any algorithm of hashlib
+        """
+        self.__checksums[algorithm] = Adler32() if algorithm.lower() == "adler32" else hashlib.new(algorithm)
+
+    def getChecksum(self, algorithm):
+        """Get a checksum added with :py:meth:`addChecksum`
+
+        :param str algorithm: name of the algorithm
+        :return: hexadecimal checksum
+        """
+        return self.__checksums[algorithm].hexdigest()
+
+    def enableRawStream(self):
+        """Send the chunks as raw bytes, without encoding nor acknowledgement.
+        Both peers must have agreed on it before the transfer starts.
+        """
+        self.__rawStream = True
+
+    def rawStreamEnabled(self):
+        return self.__rawStream
+
     def setTransport(self, oTransport):
         self.oTransport = oTransport
 
@@ -50,11 +113,44 @@ class FileHelper:
     def getTransferedBytes(self):
         return self.__fileBytes
 
+    def __resetChecksums(self):
+        """Start the checksums of a new transfer"""
+        self.__oMD5 = hashlib.md5()
+        for algorithm in self.__checksums:
+            self.addChecksum(algorithm)
+
+    def __updateChecksums(self, data):
+        if self.__checkMD5:
+            self.__oMD5.update(data)
+        for checksum in self.__checksums.values():
+            checksum.update(data)
+
+    def __adaptChunkSize(self, sentBytes, elapsed):
+        """Size of the next chunk in raw stream mode, for each chunk to take about CHUNK_TARGET_TIME to send
+
+        :param int sentBytes: size of the last chunk
+        :param float elapsed: time taken to send it
+        :return: int
+        """
+        if sentBytes < self.__chunkSize:
+            # The data source did not fill the chunk: its size says nothing about the transfer speed
+            return self.__chunkSize
+        if elapsed < CHUNK_TARGET_TIME / 2:
+            self.__chunkSize *= 2
+        elif elapsed > CHUNK_TARGET_TIME * 2:
+            self.__chunkSize //= 2
+        self.__chunkSize = min(MAX_CHUNK_SIZE, max(MIN_CHUNK_SIZE, self.__chunkSize))
+        return self.__chunkSize
+
     def sendData(self, sBuffer):
         if isinstance(sBuffer, str):
             sBuffer = sBuffer.encode(errors="surrogateescape")
-        if self.__checkMD5:
-            self.__oMD5.update(sBuffer)
+        self.__updateChecksums(sBuffer)
+        if self.__rawStream:
+            retVal = self.oTransport.sendData(S_OK([True, len(sBuffer)]))
+            if not retVal["OK"]:
+                return retVal
+            return self.oTransport.sendRawData(sBuffer)
         retVal = self.oTransport.sendData(S_OK([True, sBuffer]))
         if not retVal["OK"]:
             return retVal
@@ -76,6 +172,12 @@ class FileHelper:
         return S_OK()
 
     def receiveData(self, maxBufferSize=0):
+        if self.__rawStream:
+            chunks = []
+            retVal = self.__receiveRawChunk(chunks.append, maxBufferSize)
+            if not retVal["OK"]:
+                return retVal
+            return S_OK(b"".join(chunks))
         retVal = self.oTransport.receiveData(maxBufferSize=maxBufferSize)
         if "AbortTransfer" in retVal and retVal["AbortTransfer"]:
             self.oTransport.sendData(S_OK())
@@ -88,22 +190,70 @@ class FileHelper:
         if stBuffer[0]:
             if isinstance(stBuffer[1], str):
                 stBuffer[1] = stBuffer[1].encode(errors="surrogateescape")
-            if self.__checkMD5:
-                self.__oMD5.update(stBuffer[1])
+            self.__updateChecksums(stBuffer[1])
             self.oTransport.sendData(S_OK())
         else:
-            self.bReceivedEOF = True
-            if self.__checkMD5 and not self.__oMD5.hexdigest() == stBuffer[1]:
-                self.bErrorInMD5 = True
-            self.__finishedTransmission()
+            self.__receivedEOF(stBuffer[1])
             return S_OK("")
         return S_OK(stBuffer[1])
 
+    def __receivedEOF(self, md5):
+        """Check the MD5 checksum sent by the peer at the end of the transfer"""
+        self.bReceivedEOF = True
+        if self.__checkMD5 and not self.__oMD5.hexdigest() == md5:
+            self.bErrorInMD5 = True
+        self.__finishedTransmission()
+
+    def __receiveRawChunk(self, dataCallback, maxBufferSize=0):
+        """Receive a chunk in raw stream mode, handing its data over as it arrives
+
+        :param callable dataCallback: called with each piece of data, or None to discard the data
+        :param int maxBufferSize: maximum size of the chunk (0 for no limit)
+        :return: S_OK(number of bytes received), 0 at the end of the transfer
+        """
+        retVal = self.oTransport.receiveData(maxBufferSize=1024)
+        if retVal.get("AbortTransfer"):
+            self.__finishedTransmission()
+            self.bReceivedEOF = True
+            return S_OK(0)
+        if not retVal["OK"]:
+            return retVal
+        hasData, value = retVal["Value"]
+        if not hasData:
+            self.__receivedEOF(value)
+            return S_OK(0)
+        if maxBufferSize > 0 and value > maxBufferSize:
+            dataCallback = None
+
+        def receivedData(data):
+            if dataCallback:
+                self.__updateChecksums(data)
+                dataCallback(data)
+
+        retVal = self.oTransport.receiveRawData(value, receivedData)
+        if not retVal["OK"]:
+            return retVal
+        if not dataCallback:
+            return S_ERROR(f"Chunk of {value} bytes exceeds the maximum size of {maxBufferSize} bytes")
+        return S_OK(value)
+
     def receivedEOF(self):
         return self.bReceivedEOF
 
     def markAsTransferred(self):
-        if not self.bFinishedTransmission:
+        if not self.bFinishedTransmission and self.__rawStream:
+            if self.direction == "receive":
+                # The peer does not wait for an acknowledgement: the data has to be read until the end
+                while not self.bReceivedEOF:
+                    if not self.__receiveRawChunk(None)["OK"]:
+                        break
+            else:
+                abortTrans = S_OK([False, ""])
+                abortTrans["AbortTransfer"] = True
+                retVal = self.oTransport.sendData(abortTrans)
+                if not retVal["OK"]:
+                    return retVal
+        elif not self.bFinishedTransmission:
             if self.direction == "receive":
                 self.oTransport.receiveData()
                 abortTrans = S_OK()
@@ -149,9 +299,11 @@ class FileHelper:
     def networkToDataSink(self, dataSink, maxFileSize=0):
         if "write" not in dir(dataSink):
             return S_ERROR(f"{str(dataSink)} data sink object does not have a write method")
-        self.__oMD5 = hashlib.md5()
+        self.__resetChecksums()
         self.bReceivedEOF = False
         self.bErrorInMD5 = False
+        if self.__rawStream:
+            return self.__rawNetworkToDataSink(dataSink, maxFileSize)
         receivedBytes = 0
         # try:
         result = self.receiveData(maxBufferSize=maxFileSize)
@@ -182,6 +334,24 @@ class FileHelper:
         self.__fileBytes = receivedBytes
         return S_OK()
 
+    def __rawNetworkToDataSink(self, dataSink, maxFileSize=0):
+        """Receive the data in raw stream mode, writing it to the data sink as it arrives"""
+        receivedBytes = 0
+        exceeded = False
+        while not self.receivedEOF():
+            # Once the maximum size is exceeded, the rest of the data is read, but not kept
+            result = self.__receiveRawChunk(None if exceeded else dataSink.write)
+            if not result["OK"]:
+                return result
+            receivedBytes += result["Value"]
+            exceeded = exceeded or (maxFileSize > 0 and receivedBytes > maxFileSize)
+        if exceeded:
+            return S_ERROR(f"Received file exceeded maximum size of {maxFileSize} bytes")
+        if self.errorInTransmission():
+            return S_ERROR("Error in the file CRC")
+        self.__fileBytes = receivedBytes
+        return S_OK()
+
     def stringToNetwork(self, stringVal):
         """Send a given string to the DISET client over the network"""
 
@@ -212,10 +382,12 @@ class FileHelper:
         return S_OK()
 
     def FDToNetwork(self, iFD):
-        self.__oMD5 = hashlib.md5()
+        self.__resetChecksums()
         iPacketSize = self.packetSize
         self.__fileBytes = 0
         sentBytes = 0
+        if self.__rawStream:
+            return self.__rawFDToNetwork(iFD)
         try:
             sBuffer = os.read(iFD, iPacketSize)
             while len(sBuffer) > 0:
@@ -234,6 +406,53 @@ class FileHelper:
         self.__fileBytes = sentBytes
         return S_OK()
 
+    def __rawFDToNetwork(self, iFD):
+        """Send the content of a file descriptor in raw stream mode"""
+        sentBytes = 0
+        try:
+            # Without checksum to compute, the data of regular files does not even need to be read
+            if not self.__checkMD5 and not self.__checksums and stat.S_ISREG(os.fstat(iFD).st_mode):
+                remaining = os.fstat(iFD).st_size - os.lseek(iFD, 0, os.SEEK_CUR)
+                while remaining > 0:
+                    chunkSize = min(remaining, MAX_CHUNK_SIZE)
+                    retVal = self.oTransport.sendData(S_OK([True, chunkSize]))
+                    if retVal["OK"]:
+                        retVal = self.oTransport.sendRawFile(iFD, chunkSize)
+                    if not retVal["OK"]:
+                        return retVal
+                    sentBytes += chunkSize
+                    remaining -= chunkSize
+            else:
+                sBuffer = bytearray(MAX_CHUNK_SIZE)
+                view = memoryview(sBuffer)
+                while True:
+                    # Fill the chunk, pipes giving only a few kB per read
+                    chunkSize = self.__chunkSize
+                    filled = 0
+                    while filled < chunkSize:
+                        readBytes = os.readv(iFD, [view[filled:chunkSize]])
+                        if not readBytes:
+                            break
+                        filled += readBytes
+                    if not filled:
+                        break
+                    start = time.time()
+                    retVal = self.sendData(view[:filled])
+                    if not retVal["OK"]:
+                        return retVal
+                    sentBytes += filled
+                    self.__adaptChunkSize(filled, time.time() - start)
+                    if filled < chunkSize:
+                        break
+            retVal = self.sendEOF()
+            if not retVal["OK"]:
+                return retVal
+        except Exception as e:
+            gLogger.exception("Error while sending file")
+            return S_ERROR(f"Error while sending file: {str(e)}")
+        self.__fileBytes = sentBytes
+        return S_OK()
+
     def BufferToNetwork(self, stringToSend):
         sIO = StringIO(stringToSend)
         try:
@@ -244,13 +463,14 @@ class FileHelper:
     def DataSourceToNetwork(self, dataSource):
         if "read" not in dir(dataSource):
             return S_ERROR(f"{str(dataSource)} data source object does not have a read method")
-        self.__oMD5 = hashlib.md5()
-        iPacketSize = self.packetSize
+        self.__resetChecksums()
+        iPacketSize = self.__chunkSize if self.__rawStream else self.packetSize
         self.__fileBytes = 0
         sentBytes = 0
         try:
             sBuffer = dataSource.read(iPacketSize)
             while len(sBuffer) > 0:
+                start = time.time()
                 dRetVal = self.sendData(sBuffer)
                 if not dRetVal["OK"]:
                     return dRetVal
@@ -258,6 +478,8 @@ class FileHelper:
                     self.__log.verbose("Transfer aborted")
                     return S_OK()
                 sentBytes += len(sBuffer)
+                if self.__rawStream:
+                    iPacketSize = self.__adaptChunkSize(len(sBuffer), time.time() - start)
                 sBuffer = dataSource.read(iPacketSize)
             self.sendEOF()
         except Exception as e:
@@ -0,0 +1,113 @@
+""" Pool of the client connections kept open between RPC calls
+
+When a client asks for persistent connections (see :py:class:`~DIRAC.Core.DISET.private.BaseClient.BaseClient`),
+and the service agrees, the connection of an RPC call is not closed once the result is received, but kept
+in this pool for the next call to the same service with the same credentials. This saves the TCP connection
+and the TLS handshake of each call, the calls being sent one after the other on the same connection.
+
+The connections are only kept for the time announced by the service, and are checked before being reused.
+"""
+import select
+import threading
+import time
+
+from DIRAC import gLogger
+from DIRAC.Core.Utilities.ThreadScheduler import gThreadScheduler
+
+#: Fraction of the keep alive time announced by the service during which a connection is reused,
+#: so that it is not closed by the service while the next call is being sent
+KEEP_ALIVE_MARGIN = 0.8
+
+
+class IdleTransportPool:
+    """Idle client transports, per service URL and credentials"""
+
+    def __init__(self, maxIdlePerKey=4):
+        """C'tor
+
+        :param int maxIdlePerKey: maximum number of idle connections kept for a given service and credentials
+        """
+        self.log = gLogger.getSubLogger(self.__class__.__name__)
+        self.__maxIdlePerKey = maxIdlePerKey
+        self.__lock = threading.Lock()
+        # { key : [ ( transport, expiration time ) ] }, the most recently used at the end
+        self.__idleTransports = {}
+        result = gThreadScheduler.addPeriodicTask(30, self.purge)
+        if not result["OK"]:
+            self.log.error("Cannot add task to thread scheduler", result["Message"])
+
+    def get(self, key):
+        """Take an idle connection out of the pool
+
+        :param tuple key: service URL and credentials
+        :return: a transport ready for the next call, or None
+        """
+        while True:
+            with self.__lock:
+                transports = self.__idleTransports.get(key)
+                if not transports:
+                    return None
+                transport, expiration = transports.pop()
+                if not transports:
+                    del self.__idleTransports[key]
+            if expiration > time.time() and self.isAlive(transport):
+                return transport
+            transport.close()
+
+    def put(self, key, transport, keepAliveTime):
+        """Keep a connection for the next call
+
+        :param tuple key: service URL and credentials
+        :param transport: transport of the finished call
+        :param int keepAliveTime: seconds during which the service keeps the connection open
+        """
+        if transport.isInterrupted():
+            transport.close()
+            return
+        expiration = time.time() + keepAliveTime * KEEP_ALIVE_MARGIN
+        with self.__lock:
+            transports = self.__idleTransports.setdefault(key, [])
+            if len(transports) < self.__maxIdlePerKey:
+                transports.append((transport, expiration))
+                return
+        transport.close()
+
+    @staticmethod
+    def isAlive(transport):
+        """Check that an idle connection can be reused
+
+        Nothing is expected from the service on an idle connection: if the socket is readable,
+        the service closed it.
+
+        :return: bool
+        """
+        if transport.isInterrupted() or transport.byteStream or transport.receivedMessages:
+            return False
+        try:
+            readable, _writable, _errors = select.select([transport.getSocket()], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    def purge(self):
+        """Close the connections the service does not keep open anymore"""
+        now = time.time()
+        expired = []
+        with self.__lock:
+            for key, transports in list(self.__idleTransports.items()):
+                expired.extend(transport for transport, expiration in transports if expiration <= now)
+                transports[:] = [(transport, expiration) for transport, expiration in transports if expiration > now]
+                if not transports:
+                    del self.__idleTransports[key]
+        for transport in expired:
+            transport.close()
+
+
+gIdleTransportPool = None
+
+
+def getGlobalIdleTransportPool():
+    global gIdleTransportPool
+    if not gIdleTransportPool:
+        gIdleTransportPool = IdleTransportPool()
+    return gIdleTransportPool
@@ -1,6 +1,7 @@
 """ This module hosts the logic for executing an RPC call.
 """
 from DIRAC.Core.DISET.private.BaseClient import BaseClient
+from DIRAC.Core.Utilities.DEncode import StreamedResult
 from DIRAC.Core.Utilities.ReturnValues import S_OK
 from DIRAC.Core.Utilities.DErrno import cmpError, ENOAUTH
 
@@ -13,12 +14,41 @@ class InnerRPCClient(BaseClient):
       * proposes the action
       * sends the method parameters
       * retrieve the result
-      * disconnect
+      * disconnect, or keep the connection for the next call if persistent connections are used
     """
 
     # Number of times we retry the call.
     # The connection retry is handled by BaseClient
-    __retry = 0
+    __nbOfRetry = 3
+
+    def __proposeRPC(self, functionName, stub):
+        """Connect and propose the RPC action, retrying in case of network problems
+
+        :param functionName: name of the function
+        :param stub: connection stub, added to the error
+
+        :return: S_OK((transport ID, transport, keep alive time proposed by the service))
+        """
+        for _attempt in range(self.__nbOfRetry + 1):
+            retVal = self._connect()
+            if not retVal["OK"]:
+                break
+            # Get the transport connection ID as well as the Transport object
+            trid, transport = retVal["Value"]
+            # Handshake to perform the RPC call for functionName
+            retVal = self._proposeAction(transport, ("RPC", functionName))
+            if retVal["OK"]:
+                # The service may keep the connection open for the next call
+                keepAliveTime = 0
+                if isinstance(retVal.get("Value"), dict):
+                    keepAliveTime = retVal["Value"].get("keepAlive", 0)
+                return S_OK((trid, transport, keepAliveTime))
+            self._disconnect(trid)
+            # This query is unauthorized, otherwise we have network problem or the service is not responding
+            if cmpError(retVal, ENOAUTH):
+                break
+        retVal["rpcStub"] = stub
+        return retVal
 
     def executeRPC(self, functionName, args):
         """Perform the RPC call, connect before and disconnect after.
@@ -31,31 +61,14 @@ class InnerRPCClient(BaseClient):
 
 
         """
-        retVal = self._connect()
-
         # Generate the stub which contains all the connection and call options
         # JSON: cast args to list for serialization purposes
         stub = [self._getBaseStub(), functionName, list(args)]
+        retVal = self.__proposeRPC(functionName, stub)
         if not retVal["OK"]:
-            retVal["rpcStub"] = stub
             return retVal
-        # Get the transport connection ID as well as the Transport object
-        trid, transport = retVal["Value"]
+        trid, transport, keepAliveTime = retVal["Value"]
         try:
-            # Handshake to perform the RPC call for functionName
-            retVal = self._proposeAction(transport, ("RPC", functionName))
-            if not retVal["OK"]:
-                if cmpError(retVal, ENOAUTH):  # This query is unauthorized
-                    retVal["rpcStub"] = stub
-                    return retVal
-                else:  # we have network problem or the service is not responding
-                    if self.__retry < 3:
-                        self.__retry += 1
-                        return self.executeRPC(functionName, args)
-                    else:
-                        retVal["rpcStub"] = stub
-                        return retVal
-
             # Send the arguments to the function
             # Note: we need to convert the arguments to list
             # We do not need to deseralize it because variadic functions
@@ -73,4 +86,49 @@ class InnerRPCClient(BaseClient):
                 receivedData["rpcStub"] = stub
             return receivedData
         finally:
+            self._disconnect(trid, keepAliveTime)
+
+    def executeRPCStream(self, functionName, *args, streamDepth=0):
+        """Perform the RPC call, and decode the result while it is received.
+
+        Instead of building the whole result in memory, the items of the containers
+        located ``streamDepth`` levels below the ``Value`` of the result are given back
+        one by one as ``(path, key, value)`` tuples, for example::
+
+          result = rpcClient.executeRPCStream("getReplicas", lfns, False, streamDepth=1)
+          if not result["OK"]:
+              return result
+          with result["Value"] as stream:
+              for path, lfn, replicas in stream:
+                  if path == ("Value", "Successful"):
+                      ...
+          # What is left of the result, with the streamed containers left empty
+          if not stream.result["OK"]:
+              return stream.result
+
+        :param functionName: name of the function
+        :param args: arguments to the function
+        :param int streamDepth: depth below the ``Value`` of the containers whose items are streamed
+
+        :return: S_OK(:py:class:`~DIRAC.Core.Utilities.DEncode.StreamedResult`) once the call has been sent.
+                 The connection is closed once the iteration is over, or when the StreamedResult
+                 is closed or garbage collected.
+        """
+        stub = [self._getBaseStub(), functionName, list(args)]
+        retVal = self.__proposeRPC(functionName, stub)
+        if not retVal["OK"]:
+            return retVal
+        trid, transport, _keepAliveTime = retVal["Value"]
+
+        retVal = transport.sendData(S_OK(list(args)))
+        if not retVal["OK"]:
             self._disconnect(trid)
+            return retVal
+
+        def receive():
+            result = yield from transport.receiveDataStream(streamDepth + 1, streamPath=("Value",))
+            if isinstance(result, dict):
+                result["rpcStub"] = stub
+            return result
+
+        return S_OK(StreamedResult(receive(), onClose=lambda: self._disconnect(trid)))
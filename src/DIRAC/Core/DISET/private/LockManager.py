@@ -19,9 +19,10 @@ class LockManager:
         self.dLocks[sLockName] = threading.Semaphore(iMaxThreads)
         self.dLocks[sLockName].release()
 
-    def lockGlobal(self):
+    def lockGlobal(self, blocking=True):
         if self.oGlobalLock:
-            self.oGlobalLock.acquire()
+            return self.oGlobalLock.acquire(blocking)
+        return True
 
     def unlockGlobal(self):
         if self.oGlobalLock:
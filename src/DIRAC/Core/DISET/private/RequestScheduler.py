@@ -0,0 +1,223 @@
+""" Scheduling of the requests of a service between classes of methods
+
+The actions of a service are executed by its thread pool of MaxThreads threads, which also handles the new
+connections. Without scheduling, a burst of slow requests (e.g. the web pages summaries) can take all the threads,
+and the quick requests wait behind them.
+
+The methods are grouped in classes, defined in the ``Scheduling`` section of the service::
+
+  Scheduling
+  {
+    # Methods not listed in any class
+    Default
+    {
+      Weight = 4
+    }
+    Slow
+    {
+      Methods = getJobPageSummaryWeb, getJobStats
+      Weight = 1
+      MaxThreads = 5
+      MaxQueued = 50
+    }
+  }
+
+Each class has its own queue. When a thread is free, it takes the next request of the class which is the most
+behind its share of the threads, the shares being proportional to the weights (stride scheduling).
+
+- ``Methods``: methods of the class, as ``method`` for RPC calls or ``<action type>/<method>``
+- ``Weight``: share of the threads given to the class when the other classes also have requests (1 by default)
+- ``MaxThreads``: maximum number of threads used by the class (no limit by default)
+- ``MaxQueued``: maximum number of waiting requests, the following ones are rejected straight away
+  (MaxWaitingPetitions by default)
+
+Without any class defined, all the requests are in the Default class and are executed in the order they arrive.
+The time spent by the requests in the queues is kept as histograms, reported to the monitoring.
+"""
+import collections
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from DIRAC import gLogger
+from DIRAC.Core.Utilities import List
+
+DEFAULT_CLASS = "Default"
+
+#: Upper bounds, in seconds, of the buckets of the queue wait histograms, with their name.
+#: The last bucket is for the longer waits.
+QUEUE_WAIT_BUCKETS = ((0.01, "QueueWait10ms"), (0.1, "QueueWait100ms"), (1, "QueueWait1s"), (10, "QueueWait10s"))
+QUEUE_WAIT_OVERFLOW = "QueueWaitOver10s"
+
+
+class RequestClass:
+    """Queue and accounting of a class of methods"""
+
+    def __init__(self, name, weight=1, maxThreads=0, maxQueued=0):
+        """C'tor
+
+        :param str name: name of the class
+        :param float weight: share of the threads given to the class
+        :param int maxThreads: maximum number of requests executed at the same time, 0 for no limit
+        :param int maxQueued: maximum number of waiting requests, 0 for no limit
+        """
+        self.name = name
+        self.weight = weight if weight > 0 else 1
+        self.maxThreads = maxThreads
+        self.maxQueued = maxQueued
+        # ( enqueued time, function )
+        self.queue = collections.deque()
+        self.running = 0
+        # Virtual time at which the class gets its next thread
+        self.nextPass = 0.0
+        self.resetStats()
+
+    def resetStats(self):
+        """Start a new accounting period"""
+        self.waitHistogram = [0] * (len(QUEUE_WAIT_BUCKETS) + 1)
+        self.waitTime = 0.0
+        self.executed = 0
+        self.rejected = 0
+
+    def canRun(self):
+        """Whether a request of the class can be started now"""
+        return bool(self.queue) and (not self.maxThreads or self.running < self.maxThreads)
+
+    def addWait(self, waitTime):
+        """Account for the time a request spent in the queue"""
+        for bucket, (upperBound, _name) in enumerate(QUEUE_WAIT_BUCKETS):
+            if waitTime < upperBound:
+                break
+        else:
+            bucket = len(QUEUE_WAIT_BUCKETS)
+        self.waitHistogram[bucket] += 1
+        self.waitTime += waitTime
+        self.executed += 1
+
+
+class RequestScheduler:
+    """Executes the requests of a service with a fair share of the threads between classes of methods"""
+
+    def __init__(self, name, maxThreads, classesConfig=None, maxQueued=0, executor=None):
+        """C'tor
+
+        :param str name: name of the service
+        :param int maxThreads: number of requests executed at the same time
+        :param dict classesConfig: { className : { option : value } }, see the module documentation
+        :param int maxQueued: default maximum number of waiting requests per class, 0 for no limit
+        :param executor: thread pool executing the requests, the thread pool of the service,
+                         a pool of maxThreads threads is created if not given
+        """
+        self.log = gLogger.getSubLogger(self.__class__.__name__)
+        self.__maxThreads = max(1, maxThreads)
+        if not executor:
+            executor = ThreadPoolExecutor(self.__maxThreads, thread_name_prefix=f"{name}Request")
+        self.__executor = executor
+        self.__lock = threading.Lock()
+        self.__running = 0
+        self.__virtualTime = 0.0
+        # { "<action type>/<method>" : class name }
+        self.__methodClasses = {}
+        self.__classes = {DEFAULT_CLASS: RequestClass(DEFAULT_CLASS, maxQueued=maxQueued)}
+        for className, options in (classesConfig or {}).items():
+            try:
+                requestClass = RequestClass(
+                    className,
+                    weight=float(options.get("Weight", 1)),
+                    maxThreads=int(options.get("MaxThreads", 0)),
+                    maxQueued=int(options.get("MaxQueued", maxQueued)),
+                )
+            except ValueError as e:
+                self.log.error("Invalid scheduling class, ignored", f"{className}: {e}")
+                continue
+            self.__classes[className] = requestClass
+            for method in List.fromChar(options.get("Methods", "")):
+                self.__methodClasses[method if "/" in method else f"RPC/{method}"] = className
+
+    def getClassName(self, actionTuple):
+        """Get the class of an action
+
+        :param tuple actionTuple: ( action type, method )
+        :return: str
+        """
+        return self.__methodClasses.get("/".join(actionTuple), DEFAULT_CLASS)
+
+    def submit(self, className, func):
+        """Queue a request, unless there are already too many requests waiting in its class
+
+        :param str className: class of the request
+        :param callable func: execution of the request
+        :return: bool -- whether the request was accepted
+        """
+        with self.__lock:
+            requestClass = self.__classes[className]
+            if requestClass.maxQueued and len(requestClass.queue) >= requestClass.maxQueued:
+                requestClass.rejected += 1
+                return False
+            if not requestClass.queue and not requestClass.running:
+                # A class which was not active does not get the threads it did not use meanwhile
+                requestClass.nextPass = max(requestClass.nextPass, self.__virtualTime)
+            requestClass.queue.append((time.time(), func))
+            self.__dispatch()
+        return True
+
+    def __dispatch(self):
+        """Start the next requests while threads are free. Must be called with the lock held"""
+        while self.__running < self.__maxThreads:
+            candidates = [requestClass for requestClass in self.__classes.values() if requestClass.canRun()]
+            if not candidates:
+                return
+            requestClass = min(candidates, key=lambda candidate: candidate.nextPass)
+            enqueued, func = requestClass.queue.popleft()
+            requestClass.addWait(time.time() - enqueued)
+            self.__virtualTime = requestClass.nextPass
+            requestClass.nextPass += 1 / requestClass.weight
+            requestClass.running += 1
+            self.__running += 1
+            self.__executor.submit(self.__execute, requestClass, func)
+
+    def __execute(self, requestClass, func):
+        """Execute a request in a thread of the pool, and start the next one"""
+        try:
+            func()
+        except Exception as e:  # pylint: disable=broad-except
+            self.log.exception("Exception while executing request", lException=e)
+        finally:
+            with self.__lock:
+                requestClass.running -= 1
+                self.__running -= 1
+                self.__dispatch()
+
+    def getQueuedCount(self):
+        """Number of requests waiting for a thread, in all the classes"""
+        with self.__lock:
+            return sum(len(requestClass.queue) for requestClass in self.__classes.values())
+
+    def getRunningCount(self):
+        """Number of requests being executed"""
+        return self.__running
+
+    def getStats(self, reset=True):
+        """Get the activity of each class since the last reset
+
+        :param bool reset: start a new accounting period
+        :return: { className : { "QueuedRequests", "RunningRequests", "ExecutedRequests", "RejectedRequests",
+                   "QueueWaitTime" (ms), and one entry per bucket of the queue wait histogram } }
+        """
+        stats = {}
+        with self.__lock:
+            for className, requestClass in self.__classes.items():
+                classStats = {
+                    "QueuedRequests": len(requestClass.queue),
+                    "RunningRequests": requestClass.running,
+                    "ExecutedRequests": requestClass.executed,
+                    "RejectedRequests": requestClass.rejected,
+                    "QueueWaitTime": int(requestClass.waitTime * 1000),
+                }
+                bucketNames = [name for _upperBound, name in QUEUE_WAIT_BUCKETS] + [QUEUE_WAIT_OVERFLOW]
+                classStats.update(zip(bucketNames, requestClass.waitHistogram))
+                stats[className] = classStats
+                if reset:
+                    requestClass.resetStats()
+        return stats
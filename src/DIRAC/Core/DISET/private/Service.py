@@ -8,7 +8,9 @@
 # pylint: skip-file
 # __searchInitFunctions gives RuntimeError: maximum recursion depth exceeded
 
+import errno
 import os
+import selectors
 import time
 import datetime
 import threading
@@ -20,6 +22,7 @@ from DIRAC import gConfig, gLogger, S_OK, S_ERROR
 from DIRAC.ConfigurationSystem.Client import PathFinder
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.Core.DISET.private.LockManager import LockManager
+from DIRAC.Core.DISET.private.RequestScheduler import RequestScheduler
 from DIRAC.Core.DISET.private.ServiceConfiguration import ServiceConfiguration
 from DIRAC.Core.DISET.private.TransportPool import getGlobalTransportPool
 from DIRAC.Core.DISET.private.MessageBroker import MessageBroker, MessageSender
@@ -62,6 +65,13 @@ class Service:
         self._transportPool = getGlobalTransportPool()
         self.__cloneId = 0
         self.__maxFD = 0
+        # Number of handshakes, of resumed sessions, and handshakes time in seconds since the last report
+        self.__handshakeStats = [0, 0, 0.0]
+        self.__handshakeStatsLock = threading.Lock()
+        # RPC connections kept open waiting for the next request of the client: { trid : idle since }
+        self.__idleTransports = {}
+        self.__idleTransportsLock = threading.Lock()
+        self.__idleListenerThread = None
         self.activityMonitoring = False
         # Check if monitoring is enabled
         if "Monitoring" in Operations().getMonitoringBackends(monitoringType="ServiceMonitoring"):
@@ -90,6 +100,14 @@ class Service:
         # Initialize lock manager
         self._lockManager = LockManager(self._cfg.getMaxWaitingPetitions())
         self._threadPool = ThreadPoolExecutor(max(0, self._cfg.getMaxThreads()))
+        # The actions are executed in the same thread pool, shared by the scheduler between classes of methods
+        self._scheduler = RequestScheduler(
+            self._name,
+            self._cfg.getMaxThreads(),
+            self._cfg.getSchedulingClasses(),
+            maxQueued=self._cfg.getMaxWaitingPetitions(),
+            executor=self._threadPool,
+        )
         self._msgBroker = MessageBroker(f"{self._name}MSB", threadPool=self._threadPool)
         # Create static dict
         self._serviceInfoDict = {
@@ -239,8 +257,11 @@ class Service:
 
     def __reportActivity(self):
         initialWallTime, initialCPUTime, mem = self.__startReportToMonitoring()
-        pendingQueries = self._threadPool._work_queue.qsize()
-        activeQuereies = len(self._threadPool._threads)
+        pendingQueries = self._threadPool._work_queue.qsize() + self._scheduler.getQueuedCount()
+        activeQuereies = self._scheduler.getRunningCount()
+        with self.__handshakeStatsLock:
+            handshakes, resumedHandshakes, handshakeTime = self.__handshakeStats
+            self.__handshakeStats = [0, 0, 0.0]
         percentage = self.__endReportToMonitoring(initialWallTime, initialCPUTime)
         self.activityMonitoringReporter.addRecord(
             {
@@ -254,9 +275,23 @@ class Service:
                 "ActiveQueries": activeQuereies,
                 "RunningThreads": threading.active_count(),
                 "MaxFD": self.__maxFD,
+                "Handshakes": handshakes,
+                "ResumedHandshakes": resumedHandshakes,
+                "HandshakeTime": int(handshakeTime * 1000),
             }
         )
         self.__maxFD = 0
+        # Queues of the scheduler, one record per class of methods
+        for className, classStats in self._scheduler.getStats().items():
+            record = {
+                "timestamp": int(TimeUtilities.toEpochMilliSeconds()),
+                "Host": Network.getFQDN(),
+                "ServiceName": "_".join(self._name.split("/")),
+                "Location": self._cfg.getURL(),
+                "RequestClass": className,
+            }
+            record.update(classStats)
+            self.activityMonitoringReporter.addRecord(record)
 
     def getConfig(self):
         return self._cfg
@@ -302,7 +337,7 @@ class Service:
         - Instanciate the RequestHandler (RequestHandler contain all methods callable)
 
         (Following is not directly in this method but it describe what happen at
-        #Execute the action)
+        #Execute the action, in a thread of the scheduler, see _processRequest)
         - Notify the client we're ready to execute the action (via _processProposal)
           and call RequestHandler._rh_executeAction()
         - Receive arguments/file/something else (depending on action) in the RequestHandler
@@ -310,12 +345,10 @@ class Service:
 
         :param clientTransport: Object which describe the opened connection (SSLTransport or PlainTransport)
 
-        :return: S_OK with "closeTransport" a boolean to indicate if th connection have to be closed
-                e.g. after RPC, closeTransport=True
+        :return: S_OK once the action is queued, S_ERROR otherwise
 
         """
         self.__maxFD = max(self.__maxFD, clientTransport.oSocket.fileno())
-        self._lockManager.lockGlobal()
         try:
             monReport = self.__startReportToMonitoring()
         except Exception:
@@ -323,40 +356,188 @@ class Service:
         try:
             # Handshake
             try:
+                handshakeStart = time.time()
                 result = clientTransport.handshake()
                 if not result["OK"]:
                     clientTransport.close()
                     return
+                self.__addHandshake(time.time() - handshakeStart, clientTransport.isSessionReused())
             except Exception:
                 return
             # Add to the transport pool
             trid = self._transportPool.add(clientTransport)
             if not trid:
                 return
-            # Receive and check proposal
-            result = self._receiveAndCheckProposal(trid)
-            if not result["OK"]:
-                self._transportPool.sendAndClose(trid, result)
-                return
-            proposalTuple = result["Value"]
+            # The credentials are completed by each authorization, keep them as received for the next requests
+            credDict = dict(clientTransport.getConnectingCredentials())
+            self._transportPool.associateData(trid, "peerCredentials", credDict)
+            return self._processRequest(trid)
+        finally:
+            if monReport:
+                self.__endReportToMonitoring(monReport[0], monReport[1])
+
+    def _processIdleTransportInThread(self, trid):
+        """Handle a new request on a connection kept open after a previous RPC
+
+        :param str trid: transport ID
+        """
+        clientTransport = self._transportPool.get(trid)
+        if not clientTransport:
+            return
+        clientTransport.peerCredentials = dict(self._transportPool.getAssociatedData(trid, "peerCredentials") or {})
+        try:
+            monReport = self.__startReportToMonitoring()
+        except Exception:
+            monReport = False
+        try:
+            return self._processRequest(trid, keptAlive=True)
+        finally:
+            if monReport:
+                self.__endReportToMonitoring(monReport[0], monReport[1])
+
+    def _processRequest(self, trid, keptAlive=False):
+        """Receive, authorize and execute the action proposed on a connection
+
+        :param str trid: transport ID
+        :param bool keptAlive: whether the connection was kept open after a previous RPC
+
+        :return: S_OK once the action is queued, S_ERROR otherwise
+        """
+        # Receive and check proposal
+        result = self._receiveAndCheckProposal(trid, keptAlive)
+        if not result["OK"]:
+            self._transportPool.sendAndClose(trid, result)
+            return result
+        proposalTuple = result["Value"]
+        # The global lock is held until the end of the action, and released by _executeRequest once queued.
+        # It is not waited for: the requests holding it need the threads of the pool to complete
+        if not self._lockManager.lockGlobal(blocking=False):
+            gLogger.warn("Too many requests in progress, request rejected", "/".join(proposalTuple[1]))
+            result = S_ERROR(errno.EBUSY, f"{self._name} is overloaded, try later")
+            self._transportPool.sendAndClose(trid, result)
+            return result
+        queued = False
+        try:
             # Instantiate handler
             result = self._instantiateHandler(trid, proposalTuple)
             if not result["OK"]:
                 self._transportPool.sendAndClose(trid, result)
-                return
+                return result
             handlerObj = result["Value"]
-            # Execute the action
+            # Queue the action, unless too many requests of the same kind are already waiting
+            className = self._scheduler.getClassName(proposalTuple[1])
+            queued = self._scheduler.submit(className, lambda: self._executeRequest(trid, proposalTuple, handlerObj))
+            if not queued:
+                gLogger.warn("Too many queued requests, request rejected", f"{className}: {'/'.join(proposalTuple[1])}")
+                result = S_ERROR(errno.EBUSY, f"{self._name} is overloaded, try later")
+                self._transportPool.sendAndClose(trid, result)
+                return result
+            return S_OK()
+        finally:
+            if not queued:
+                self._lockManager.unlockGlobal()
+
+    def _executeRequest(self, trid, proposalTuple, handlerObj):
+        """Execute an action queued by _processRequest, and release the global lock taken for it
+
+        :param str trid: transport ID
+        :param tuple proposalTuple: tuple describing the proposed action
+        :param handlerObj: handler instance for the request
+
+        :return: S_OK/S_ERROR, with "closeTransport" as in _processProposal
+        """
+        try:
             result = self._processProposal(trid, proposalTuple, handlerObj)
-            # Close the connection if required
-            if result["closeTransport"] or not result["OK"]:
-                if not result["OK"]:
-                    gLogger.error("Error processing proposal", result["Message"])
-                self._transportPool.close(trid)
-            return result
         finally:
             self._lockManager.unlockGlobal()
-            if monReport:
-                self.__endReportToMonitoring(monReport[0], monReport[1])
+        # Close the connection if required
+        if result["closeTransport"] or not result["OK"]:
+            if not result["OK"]:
+                gLogger.error("Error processing proposal", result["Message"])
+            self._transportPool.close(trid)
+        elif result.get("keepAlive"):
+            self.__keepTransportIdle(trid)
+        return result
+
+    def __keepTransportIdle(self, trid):
+        """Wait for the next request on a connection, without holding a thread"""
+        with self.__idleTransportsLock:
+            self.__idleTransports[trid] = time.time()
+            if not self.__idleListenerThread:
+                self.__idleListenerThread = threading.Thread(target=self.__listenToIdleTransports)
+                self.__idleListenerThread.daemon = True
+                self.__idleListenerThread.start()
+
+    def __listenToIdleTransports(self):
+        """Hand the idle connections with a new request to the thread pool, and close those idle for too long"""
+
+        def err_handler(result):
+            err = result.exception()
+            if err:
+                gLogger.exception("Exception in idle connection thread", lException=err)
+
+        while True:
+            keepAliveTime = self._cfg.getKeepAliveTime()
+            expired = []
+            sel = selectors.DefaultSelector()
+            with self.__idleTransportsLock:
+                if not self.__idleTransports:
+                    self.__idleListenerThread = None
+                    sel.close()
+                    return
+                now = time.time()
+                for trid, idleSince in list(self.__idleTransports.items()):
+                    transport = self._transportPool.get(trid)
+                    if transport and now - idleSince <= keepAliveTime:
+                        try:
+                            sel.register(transport.getSocket(), selectors.EVENT_READ, trid)
+                            continue
+                        except (ValueError, KeyError, OSError):
+                            pass
+                    # Idle for too long, or already closed
+                    del self.__idleTransports[trid]
+                    expired.append(trid)
+            for trid in expired:
+                self._transportPool.close(trid)
+
+            try:
+                events = sel.select(timeout=1)
+            except OSError:
+                time.sleep(0.001)
+                continue
+            finally:
+                sel.close()
+
+            for key, _event in events:
+                trid = key.data
+                with self.__idleTransportsLock:
+                    if self.__idleTransports.pop(trid, None) is None:
+                        continue
+
+                future = self._threadPool.submit(self._processIdleTransportInThread, trid)
+                future.add_done_callback(err_handler)
+
+    def __acceptKeepAlive(self, proposalTuple):
+        """Get how long the connection can be kept open after the action, if the client asks for it
+
+        The optional 5th element of the proposal is a dictionary of connection options.
+
+        :return: int -- seconds, 0 to close the connection
+        """
+        if proposalTuple[1][0] != "RPC" or len(proposalTuple) < 5 or not isinstance(proposalTuple[4], dict):
+            return 0
+        if not proposalTuple[4].get("keepAlive"):
+            return 0
+        if len(self.__idleTransports) >= self._cfg.getMaxIdleConnections():
+            return 0
+        return max(0, self._cfg.getKeepAliveTime())
+
+    def __addHandshake(self, duration, resumed):
+        """Account for a successful handshake, reported to the monitoring"""
+        with self.__handshakeStatsLock:
+            self.__handshakeStats[0] += 1
+            self.__handshakeStats[1] += int(resumed)
+            self.__handshakeStats[2] += duration
 
     @staticmethod
     def _createIdentityString(credDict, clientTransport=None):
@@ -383,14 +564,16 @@ class Service:
         proposalTuple = tuple(tuple(x) if isinstance(x, list) else x for x in serializedProposal)
         return proposalTuple
 
-    def _receiveAndCheckProposal(self, trid):
+    def _receiveAndCheckProposal(self, trid, keptAlive=False):
         clientTransport = self._transportPool.get(trid)
         # Get the peer credentials
         credDict = clientTransport.getConnectingCredentials()
         # Receive the action proposal
         retVal = clientTransport.receiveData(1024)
         if not retVal["OK"]:
-            gLogger.error(
+            # Clients close the connections they do not need anymore
+            log = gLogger.debug if keptAlive else gLogger.error
+            log(
                 "Invalid action proposal",
                 f"{self._createIdentityString(credDict, clientTransport)} {retVal['Message']}",
             )
@@ -508,8 +691,9 @@ class Service:
         return S_OK(handlerInstance)
 
     def _processProposal(self, trid, proposalTuple, handlerObj):
-        # Notify the client we're ready to execute the action
-        retVal = self._transportPool.send(trid, S_OK())
+        # Notify the client we're ready to execute the action, and whether the connection is kept open after it
+        keepAliveTime = self.__acceptKeepAlive(proposalTuple)
+        retVal = self._transportPool.send(trid, S_OK({"keepAlive": keepAliveTime} if keepAliveTime else None))
         if not retVal["OK"]:
             return retVal
 
@@ -539,7 +723,8 @@ class Service:
             if not result["OK"]:
                 self._msgBroker.removeTransport(trid)
 
-        result["closeTransport"] = not messageConnection or not result["OK"]
+        result["keepAlive"] = bool(keepAliveTime)
+        result["closeTransport"] = not (messageConnection or keepAliveTime) or not result["OK"]
         return result
 
     def _mbConnect(self, trid, handlerObj=None):
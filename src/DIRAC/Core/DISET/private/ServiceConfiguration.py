@@ -68,12 +68,45 @@ class ServiceConfiguration:
         except Exception:
             return 20
 
+    def getKeepAliveTime(self):
+        """Seconds during which an RPC connection is kept open for the next call, if the client asks for it"""
+        try:
+            return int(self.getOption("KeepAliveTime"))
+        except Exception:
+            return 30
+
+    def getMaxIdleConnections(self):
+        try:
+            return int(self.getOption("MaxIdleConnections"))
+        except Exception:
+            return 50
+
     def getMaxThreadsForMethod(self, actionType, method):
         try:
             return int(self.getOption(f"ThreadLimit/{actionType}/{method}"))
         except Exception:
             return 15
 
+    def getSchedulingClasses(self):
+        """Classes of methods sharing the threads of the service, see
+        :py:mod:`~DIRAC.Core.DISET.private.RequestScheduler`
+
+        :return: { className : { option : value } }
+        """
+        for path in self.pathList:
+            schedulingPath = f"{path}/Scheduling"
+            classNames = gConfigurationData.getSectionsFromCFG(schedulingPath)
+            if not classNames:
+                continue
+            return {
+                className: {
+                    option: gConfigurationData.extractOptionFromCFG(f"{schedulingPath}/{className}/{option}")
+                    for option in gConfigurationData.getOptionsFromCFG(f"{schedulingPath}/{className}") or []
+                }
+                for className in classNames
+            }
+        return {}
+
     def getCloneProcesses(self):
         try:
             return int(self.getOption("CloneProcesses"))
@@ -17,6 +17,7 @@ Client <- RequestHandler : Response
 
 Client <- Service        : Close
 """
+import os
 import time
 from io import BytesIO
 from hashlib import md5
@@ -25,7 +26,7 @@ import selectors
 
 from DIRAC.Core.Utilities.ReturnValues import S_ERROR, S_OK
 from DIRAC.FrameworkSystem.Client.Logger import gLogger
-from DIRAC.Core.Utilities import MixedEncode
+from DIRAC.Core.Utilities import DEncode, MixedEncode
 
 
 class BaseTransport:
@@ -63,6 +64,10 @@ class BaseTransport:
         self.iListenQueueSize = max(self.iListenQueueSize, int(kwargs.get("SocketBacklog", 0)))
         self.__lastActionTimestamp = time.time()
         self.__lastServerRenewTimestamp = self.__lastActionTimestamp
+        # Set while a message is being sent or received
+        self.__inMessage = False
+        # Set when raw data could not be entirely sent or received
+        self.__rawDataInterrupted = False
 
     def __updateLastActionTimestamp(self):
         self.__lastActionTimestamp = time.time()
@@ -70,6 +75,13 @@ class BaseTransport:
     def getLastActionTimestamp(self):
         return self.__lastActionTimestamp
 
+    def isInterrupted(self):
+        """Whether a message was left partially sent or received, in which case the connection cannot be reused
+
+        :return: bool
+        """
+        return self.__inMessage or self.__rawDataInterrupted
+
     def getKeepAliveLapse(self):
         return self.__keepAliveLapse
 
@@ -77,6 +89,10 @@ class BaseTransport:
         """This method is overwritten by SSLTransport if we use a secured transport."""
         return S_OK()
 
+    def isSessionReused(self):
+        """This method is overwritten by SSLTransport, which can resume TLS sessions."""
+        return False
+
     def close(self):
         self.oSocket.close()
 
@@ -165,6 +181,7 @@ class BaseTransport:
         if isinstance(sCodedData, str):
             sCodedData = sCodedData.encode()
         dataToSend = b"".join([prefix, str(len(sCodedData)).encode(), b":", sCodedData])
+        self.__inMessage = True
         for index in range(0, len(dataToSend), self.packetSize):
             bytesToSend = min(self.packetSize, len(dataToSend) - index)
             packSentBytes = 0
@@ -181,36 +198,52 @@ class BaseTransport:
                 packSentBytes += sentBytes
         del sCodedData
         sCodedData = None
+        self.__inMessage = False
         return S_OK()
 
+    def __receiveHeader(self, maxBufferSize):
+        """Receive data until either the message length or the keep alive magic string is found
+
+        :param int maxBufferSize: maximum size of the buffer (0 for no limit)
+
+        :returns: S_OK((position of the message length separator, is keep alive))
+        """
+        # Look either for message length of keep alive magic string
+        iSeparatorPosition = self.byteStream.find(b":", 0, 10)
+        keepAliveMagicLen = len(BaseTransport.keepAliveMagic)
+        isKeepAlive = self.byteStream.find(BaseTransport.keepAliveMagic, 0, keepAliveMagicLen) == 0
+        # While not found the message length or the ka, keep receiving
+        while iSeparatorPosition == -1 and not isKeepAlive:
+            retVal = self._read(16384)
+            # If error return
+            if not retVal["OK"]:
+                return retVal
+            # If closed return error
+            if not retVal["Value"]:
+                return S_ERROR("Peer closed connection")
+            # New data!
+            self.byteStream += retVal["Value"]
+            # Look again for either message length of ka magic string
+            iSeparatorPosition = self.byteStream.find(b":", 0, 10)
+            isKeepAlive = self.byteStream.find(BaseTransport.keepAliveMagic, 0, keepAliveMagicLen) == 0
+            # Over the limit?
+            if maxBufferSize and len(self.byteStream) > maxBufferSize and iSeparatorPosition == -1:
+                return S_ERROR(f"Read limit exceeded ({maxBufferSize} chars)")
+        return S_OK((iSeparatorPosition, isKeepAlive))
+
     def receiveData(self, maxBufferSize=0, blockAfterKeepAlive=True, idleReceive=False):
         self.__updateLastActionTimestamp()
         if self.receivedMessages:
             return self.receivedMessages.pop(0)
         # Buffer size can't be less than 0
         maxBufferSize = max(maxBufferSize, 0)
+        self.__inMessage = True
         try:
-            # Look either for message length of keep alive magic string
-            iSeparatorPosition = self.byteStream.find(b":", 0, 10)
+            retVal = self.__receiveHeader(maxBufferSize)
+            if not retVal["OK"]:
+                return retVal
+            iSeparatorPosition, isKeepAlive = retVal["Value"]
             keepAliveMagicLen = len(BaseTransport.keepAliveMagic)
-            isKeepAlive = self.byteStream.find(BaseTransport.keepAliveMagic, 0, keepAliveMagicLen) == 0
-            # While not found the message length or the ka, keep receiving
-            while iSeparatorPosition == -1 and not isKeepAlive:
-                retVal = self._read(16384)
-                # If error return
-                if not retVal["OK"]:
-                    return retVal
-                # If closed return error
-                if not retVal["Value"]:
-                    return S_ERROR("Peer closed connection")
-                # New data!
-                self.byteStream += retVal["Value"]
-                # Look again for either message length of ka magic string
-                iSeparatorPosition = self.byteStream.find(b":", 0, 10)
-                isKeepAlive = self.byteStream.find(BaseTransport.keepAliveMagic, 0, keepAliveMagicLen) == 0
-                # Over the limit?
-                if maxBufferSize and len(self.byteStream) > maxBufferSize and iSeparatorPosition == -1:
-                    return S_ERROR(f"Read limit exceeded ({maxBufferSize} chars)")
             # Keep alive magic!
             if isKeepAlive:
                 gLogger.debug("Received keep alive header")
@@ -250,6 +283,7 @@ class BaseTransport:
                     pkgMem.seek(0, 0)
                     data = pkgMem.read(pkgSize)
                     self.byteStream = pkgMem.read()
+            self.__inMessage = False
             try:
                 data = MixedEncode.decode(data)[0]
             except Exception as e:
@@ -262,6 +296,150 @@ class BaseTransport:
             gLogger.exception("Network error while receiving data")
             return S_ERROR(f"Network error while receiving data: {str(e)}")
 
+    def sendRawData(self, data):
+        """Send bytes as they are, without message length nor encoding.
+        The peer must know how many bytes to expect, see :py:meth:`receiveRawData`
+
+        :param data: bytes-like object
+        :return: S_OK/S_ERROR
+        """
+        self.__updateLastActionTimestamp()
+        # Slices of a memoryview do not copy the data
+        view = memoryview(data).cast("B")
+        sentBytes = 0
+        self.__inMessage = True
+        try:
+            while sentBytes < len(view):
+                try:
+                    result = self._write(view[sentBytes : sentBytes + self.packetSize])
+                except Exception as e:
+                    return S_ERROR(f"Exception while sending data: {e}")
+                if not result["OK"]:
+                    return result
+                if result["Value"] == 0:
+                    return S_ERROR("Connection closed by peer")
+                sentBytes += result["Value"]
+        finally:
+            self.__inMessage = False
+            if sentBytes < len(view):
+                self.__rawDataInterrupted = True
+        return S_OK()
+
+    def sendRawFile(self, iFD, size):
+        """Send bytes read from a file descriptor, as :py:meth:`sendRawData` does
+
+        :param int iFD: file descriptor, read from its current position
+        :param int size: number of bytes to send
+        :return: S_OK/S_ERROR
+        """
+        while size > 0:
+            sBuffer = os.read(iFD, min(size, self.packetSize))
+            if not sBuffer:
+                return S_ERROR(f"File ended {size} bytes before the announced size")
+            result = self.sendRawData(sBuffer)
+            if not result["OK"]:
+                return result
+            size -= len(sBuffer)
+        return S_OK()
+
+    def receiveRawData(self, size, dataCallback):
+        """Receive a given number of bytes sent with :py:meth:`sendRawData`, handing them over as they arrive,
+        so that they are never all in memory
+
+        :param int size: number of bytes to receive
+        :param callable dataCallback: called with each piece of data received
+        :return: S_OK/S_ERROR
+        """
+        self.__updateLastActionTimestamp()
+        self.__inMessage = True
+        try:
+            # Some data may have been received with the previous message
+            if self.byteStream:
+                data = self.byteStream[:size]
+                self.byteStream = self.byteStream[size:]
+                size -= len(data)
+                dataCallback(data)
+            while size > 0:
+                retVal = self._read(min(size, self.packetSize), skipReadyCheck=True)
+                if not retVal["OK"]:
+                    return retVal
+                if not retVal["Value"]:
+                    return S_ERROR("Peer closed connection")
+                size -= len(retVal["Value"])
+                dataCallback(retVal["Value"])
+        except Exception as e:
+            gLogger.exception("Network error while receiving data")
+            return S_ERROR(f"Network error while receiving data: {str(e)}")
+        finally:
+            self.__inMessage = False
+            if size > 0:
+                self.__rawDataInterrupted = True
+        return S_OK()
+
+    def receiveDataStream(self, streamDepth=1, streamPath=(), maxBufferSize=0):
+        """Receive the next message, decoding it while it arrives
+
+        This is a generator yielding the items of the containers located ``streamDepth``
+        levels below the root of the message as ``(path, key, value)`` tuples
+        (see :py:class:`~DIRAC.Core.Utilities.DEncode.StreamDecoder`), so that the whole
+        message is never held in memory. The generator returns what is left of the message.
+
+        Messages which are not DEncoded dictionaries or lists, as well as keep alives, are
+        received with :py:meth:`receiveData` and then split in the same way.
+
+        :param int streamDepth: depth of the containers whose items are streamed
+        :param tuple streamPath: only stream the containers whose path starts with it
+        :param int maxBufferSize: maximum size of the message (0 for no limit)
+        """
+        self.__updateLastActionTimestamp()
+        if self.receivedMessages:
+            return (yield from DEncode.streamEntries(self.receivedMessages.pop(0), streamDepth, streamPath))
+        maxBufferSize = max(maxBufferSize, 0)
+        try:
+            retVal = self.__receiveHeader(maxBufferSize)
+            if not retVal["OK"]:
+                return retVal
+            iSeparatorPosition, isKeepAlive = retVal["Value"]
+            pkgSize = None if isKeepAlive else int(self.byteStream[:iSeparatorPosition])
+            # We need the first byte of the message to know how it is encoded
+            while not isKeepAlive and pkgSize and len(self.byteStream) <= iSeparatorPosition + 1:
+                retVal = self._read(16384)
+                if not retVal["OK"]:
+                    return retVal
+                if not retVal["Value"]:
+                    return S_ERROR("Peer closed connection")
+                self.byteStream += retVal["Value"]
+            if isKeepAlive or not pkgSize or self.byteStream[iSeparatorPosition + 1] not in b"dl":
+                data = self.receiveData(maxBufferSize)
+                return (yield from DEncode.streamEntries(data, streamDepth, streamPath))
+
+            decoder = DEncode.StreamDecoder(streamDepth, streamPath)
+            pkgData = self.byteStream[iSeparatorPosition + 1 :]
+            self.byteStream = pkgData[pkgSize:]
+            readSize = min(len(pkgData), pkgSize)
+            entries = decoder.feed(pkgData[:pkgSize], final=readSize == pkgSize)
+            del pkgData
+            while True:
+                yield from entries
+                if readSize >= pkgSize:
+                    break
+                retVal = self._read(min(pkgSize - readSize, self.packetSize), skipReadyCheck=True)
+                if not retVal["OK"]:
+                    return retVal
+                if not retVal["Value"]:
+                    return S_ERROR("Peer closed connection")
+                readSize += len(retVal["Value"])
+                if maxBufferSize and readSize > maxBufferSize:
+                    return S_ERROR(f"Read limit exceeded ({maxBufferSize} chars)")
+                entries = decoder.feed(retVal["Value"], final=readSize == pkgSize)
+            try:
+                return decoder.close()
+            except Exception as e:
+                return S_ERROR(f"Could not decode received data: {str(e)}")
+        except Exception as e:
+            gLogger.exception("Network error while receiving data")
+            return S_ERROR(f"Network error while receiving data: {str(e)}")
+
     def __processKeepAlive(self, maxBufferSize, blockAfterKeepAlive=True):
         gLogger.debug("Received Keep Alive")
         # Next message down the stream will be the ka data
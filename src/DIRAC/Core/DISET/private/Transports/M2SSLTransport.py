@@ -9,7 +9,15 @@ from M2Crypto.SSL.Checker import SSLVerificationError
 
 from DIRAC.Core.Utilities.ReturnValues import S_OK, S_ERROR
 from DIRAC.Core.DISET.private.Transports.BaseTransport import BaseTransport
-from DIRAC.Core.DISET.private.Transports.SSL.M2Utils import getM2SSLContext, getM2PeerInfo
+from DIRAC.Core.DISET.private.Transports.SSL.M2Utils import (
+    SESSION_REUSE,
+    PeerInfoCache,
+    configureServerSessionCache,
+    getClientContext,
+    getM2PeerInfo,
+    getM2SSLContext,
+    gPeerInfoCache,
+)
 
 from DIRAC.Core.DISET import DEFAULT_CONNECTION_TIMEOUT, DEFAULT_RPC_TIMEOUT
 
@@ -84,8 +92,15 @@ class SSLTransport(BaseTransport):
                 kwargs["sslCiphers"] = os.environ.get("DIRAC_M2CRYPTO_SSL_CIPHERS")
 
         self.__ctx = kwargs.pop("ctx", None)
+        # Shared client context, holding the sessions to resume
+        self.__clientContext = None
         if not self.__ctx:
-            self.__ctx = getM2SSLContext(**kwargs)
+            if SESSION_REUSE and not kwargs.get("bServerMode"):
+                self.__clientContext = getClientContext(**kwargs)
+            if self.__clientContext:
+                self.__ctx = self.__clientContext.ctx
+            else:
+                self.__ctx = getM2SSLContext(**kwargs)
 
         # Note that kwargs is already kept in BaseTransport
         # as self.extraArgsDict, but at least I am sure that
@@ -138,6 +153,13 @@ class SSLTransport(BaseTransport):
                 # set SNI server name since we know it at this point
                 self.oSocket.set_tlsext_host_name(host)
 
+                # Try to resume the previous session with this server
+                # (OpenSSL falls back to a full handshake if the server does not accept it)
+                if self.__clientContext:
+                    session = self.__clientContext.getSession((host, port))
+                    if session:
+                        self.oSocket.set_session(session)
+
                 self.oSocket.connect((host, port))
 
                 # Once the connection is established, we can use the timeout
@@ -166,7 +188,7 @@ class SSLTransport(BaseTransport):
         # a server session ID in the context
         host = self.stServerAddress[0]
         port = self.stServerAddress[1]
-        self.__ctx.set_session_id_ctx((f"DIRAC-{host}-{port}").encode())
+        configureServerSessionCache(self.__ctx, f"DIRAC-{host}-{port}")
         self.oSocket = self.__getConnection()
         # Make sure reuse address is set correctly
         if self.bAllowReuseAddress:
@@ -184,6 +206,9 @@ class SSLTransport(BaseTransport):
         # pylint: disable=line-too-long
         """Close this socket."""
 
+        if self.oSocket and self.__clientContext and self.remoteAddress:
+            self.__keepSession()
+
         if self.oSocket:
             # TL;DR:
             # Do NOT touch that method
@@ -274,6 +299,38 @@ class SSLTransport(BaseTransport):
             # underlyingSocket.close()
         return S_OK()
 
+    def __keepSession(self):
+        """Keep the session of a client connection, to be resumed by the next connection to the same server.
+        This is done when closing as the TLS 1.3 session tickets are received after the handshake.
+        """
+        try:
+            self.__clientContext.setSession(tuple(self.stServerAddress), self.oSocket.get_session())
+        except Exception:  # pylint: disable=broad-except
+            self.__clientContext.setSession(tuple(self.stServerAddress), None)
+
+    def isSessionReused(self):
+        """Whether the TLS session of the connection was resumed rather than established by a full handshake"""
+        try:
+            return bool(self.oSocket and self.oSocket.session_reused())
+        except (OSError, SSL.SSLError):
+            return False
+
+    def __getPeerInfo(self):
+        """Get the peer credentials, from the session cache if the session was resumed
+        (the peer does not send its certificate chain again in that case)
+        """
+        if not SESSION_REUSE:
+            return getM2PeerInfo(self.oSocket)
+        sessionId = PeerInfoCache.getSessionId(self.oSocket)
+        if sessionId and self.oSocket.session_reused():
+            peerInfo = gPeerInfoCache.get(sessionId)
+            if peerInfo:
+                return peerInfo
+        peerInfo = getM2PeerInfo(self.oSocket)
+        if sessionId:
+            gPeerInfoCache.add(sessionId, peerInfo)
+        return peerInfo
+
     def renewServerContext(self):
         # pylint: disable=line-too-long
         """Renews the server context.
@@ -329,7 +386,7 @@ class SSLTransport(BaseTransport):
                 if not check(self.oSocket.get_peer_cert(), self.oSocket.addr[0]):
                     raise SSL.Checker.SSLVerificationError("post connection check failed")
 
-            self.peerCredentials = getM2PeerInfo(self.oSocket)
+            self.peerCredentials = self.__getPeerInfo()
 
             # Now that the handshake has been performed on the server
             # we can set the timeout for the RPC operations.
@@ -361,7 +418,7 @@ class SSLTransport(BaseTransport):
 
         self.oSocket = oSocket
         self.remoteAddress = self.oSocket.getpeername()
-        self.peerCredentials = getM2PeerInfo(self.oSocket)
+        self.peerCredentials = self.__getPeerInfo()
 
     def setClientSocket_multipleSteps(self, oSocket):
         """Set the inner socket (i.e. SSL.Connection object) of this instance
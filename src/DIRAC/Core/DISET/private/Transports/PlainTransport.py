@@ -113,6 +113,29 @@ class PlainTransport(BaseTransport):
                 return S_ERROR(f"Error while sending: {str(e)}")
         return S_OK(sentBytes)
 
+    def sendRawFile(self, iFD, size):
+        """Send bytes read from a file descriptor, copied by the kernel from the file to the socket"""
+        try:
+            offset = os.lseek(iFD, 0, os.SEEK_CUR)
+        except OSError:
+            # Not a regular file
+            return super().sendRawFile(iFD, size)
+        while size > 0:
+            try:
+                sentBytes = os.sendfile(self.oSocket.fileno(), iFD, offset, min(size, self.packetSize))
+            except BlockingIOError:
+                time.sleep(0.001)
+                continue
+            except OSError as e:
+                return S_ERROR(f"Exception while sending to peer: {str(e)}")
+            if sentBytes == 0:
+                return S_ERROR(f"File ended {size} bytes before the announced size")
+            offset += sentBytes
+            size -= sentBytes
+        # Leave the file position as if it had been read
+        os.lseek(iFD, offset, os.SEEK_SET)
+        return S_OK()
+
 
 def checkSanity(*args, **kwargs):
     return S_OK({})
@@ -2,8 +2,14 @@
 """
 Utilities for using M2Crypto SSL with DIRAC.
 """
+import hashlib
 import os
+import re
 import tempfile
+import threading
+import time
+from collections import OrderedDict
+
 import M2Crypto
 from packaging.version import Version
 from M2Crypto import SSL, m2, X509
@@ -16,6 +22,16 @@ from DIRAC.Core.Security.m2crypto.X509Chain import X509Chain
 # Verify depth of peer certs
 VERIFY_DEPTH = 50
 DEBUG_M2CRYPTO = os.getenv("DIRAC_DEBUG_M2CRYPTO", "No").lower() in ("yes", "true")
+# Reuse of the client SSL contexts and of the TLS sessions (client and server side)
+SESSION_REUSE = os.getenv("DIRAC_M2CRYPTO_SESSION_REUSE", "Yes").lower() in ("yes", "true")
+# Lifetime of the TLS sessions in the server cache, in seconds
+SESSION_TIMEOUT = int(os.getenv("DIRAC_M2CRYPTO_SESSION_TIMEOUT", "600"))
+# Maximum number of sessions in the server cache (default of OpenSSL)
+SESSION_CACHE_SIZE = 1024 * 20
+# Maximum number of client contexts kept
+CLIENT_CONTEXT_CACHE_SIZE = 50
+# Stateful session tickets, so that the resumed sessions can be identified by their session ID
+SSL_OP_NO_TICKET = getattr(m2, "SSL_OP_NO_TICKET", 0x00004000)
 
 
 VERIFY_ALLOW_PROXY_CERTS = 0
@@ -179,6 +195,169 @@ def getM2SSLContext(ctx=None, **kwargs):
     return ctx
 
 
+def __getFileStamp(path):
+    """Get what identifies the content of a file or directory: path, modification time and size"""
+    stat = os.stat(path)
+    return (path, stat.st_mtime, stat.st_size)
+
+
+def __getClientContextKey(kwargs):
+    """Get the key of the client context cache for the arguments of getM2SSLContext
+
+    The key changes when the certificate, the proxy or the CA directory is modified
+
+    :return: tuple, or None if the context can't be cached
+    """
+    try:
+        if kwargs.get("useCertificates", False):
+            certKeyTuple = Locations.getHostCertificateAndKeyLocation()
+            if not certKeyTuple:
+                return None
+            credentials = tuple(__getFileStamp(path) for path in certKeyTuple)
+        elif kwargs.get("proxyString", None):
+            credentials = hashlib.sha256(kwargs["proxyString"].encode()).hexdigest()
+        else:
+            proxyPath = kwargs.get("proxyLocation", None) or Locations.getProxyLocation()
+            if not proxyPath:
+                return None
+            credentials = __getFileStamp(proxyPath)
+        caStamp = None
+        if not kwargs.get("skipCACheck", False):
+            caPath = Locations.getCAsLocation()
+            if not caPath:
+                return None
+            caStamp = __getFileStamp(caPath)
+    except OSError:
+        # Let getM2SSLContext report the missing files
+        return None
+    return (
+        credentials,
+        caStamp,
+        bool(kwargs.get("skipCACheck", False)),
+        kwargs.get("sslMethods", DEFAULT_SSL_METHODS),
+        kwargs.get("sslCiphers", DEFAULT_SSL_CIPHERS),
+    )
+
+
+class ClientContext:
+    """A client SSL context and the TLS sessions established with it, per server (host, port)"""
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.__sessions = {}
+        self.__lock = threading.Lock()
+
+    def getSession(self, serverAddress):
+        """Get the session to resume with a server, if any
+
+        :param tuple serverAddress: (host, port)
+        :return: M2Crypto.SSL.Session or None
+        """
+        with self.__lock:
+            return self.__sessions.get(serverAddress)
+
+    def setSession(self, serverAddress, session):
+        """Keep the session established with a server, or forget it if session is None"""
+        with self.__lock:
+            if session is None:
+                self.__sessions.pop(serverAddress, None)
+            else:
+                self.__sessions[serverAddress] = session
+
+
+gClientContexts = OrderedDict()
+gClientContextsLock = threading.Lock()
+
+
+def getClientContext(**kwargs):
+    """Get a client context from the process-wide cache, creating it with getM2SSLContext if needed.
+
+    The contexts are shared between the transports using the same credentials and CA location,
+    which saves loading them for each connection, and allows to resume the TLS sessions.
+
+    :return: ClientContext, or None if the context can't be cached for these arguments
+    """
+    key = __getClientContextKey(kwargs)
+    if key is None:
+        return None
+    with gClientContextsLock:
+        clientContext = gClientContexts.get(key)
+        if clientContext:
+            gClientContexts.move_to_end(key)
+            return clientContext
+    clientContext = ClientContext(getM2SSLContext(**kwargs))
+    with gClientContextsLock:
+        clientContext = gClientContexts.setdefault(key, clientContext)
+        while len(gClientContexts) > CLIENT_CONTEXT_CACHE_SIZE:
+            gClientContexts.popitem(last=False)
+    return clientContext
+
+
+def configureServerSessionCache(ctx, sessionIdContext):
+    """Configure the session caching of a server context
+
+    :param ctx: server M2Crypto.SSL.Context
+    :param str sessionIdContext: identifies the service in the session IDs
+    """
+    ctx.set_session_id_ctx(sessionIdContext.encode())
+    if SESSION_REUSE:
+        ctx.set_session_timeout(SESSION_TIMEOUT)
+        ctx.set_options(SSL_OP_NO_TICKET)
+
+
+class PeerInfoCache:
+    """Peer info of the sessions established by full handshakes, by session ID
+
+    The peer certificate chain is not sent again when a session is resumed,
+    so the peer info of the resumed sessions has to be taken from here.
+    """
+
+    __sessionIdRE = re.compile(r"Session-ID:\s*([0-9A-Fa-f]+)")
+
+    def __init__(self, maxSize=SESSION_CACHE_SIZE, timeout=SESSION_TIMEOUT):
+        self.__maxSize = maxSize
+        self.__timeout = timeout
+        # { sessionID : ( expiration time, peer info ) }
+        self.__peers = OrderedDict()
+        self.__lock = threading.Lock()
+
+    @classmethod
+    def getSessionId(cls, conn):
+        """Get the ID of the session of a connection
+
+        :param conn: M2Crypto.SSL.Connection
+        :return: str, or None if the session has no ID
+        """
+        session = conn.get_session()
+        if session is None:
+            return None
+        text = session.as_text()
+        if isinstance(text, bytes):
+            text = text.decode(errors="replace")
+        match = cls.__sessionIdRE.search(text)
+        return match.group(1) if match else None
+
+    def add(self, sessionId, peerInfo):
+        with self.__lock:
+            self.__peers[sessionId] = (time.time() + self.__timeout, dict(peerInfo))
+            self.__peers.move_to_end(sessionId)
+            while len(self.__peers) > self.__maxSize:
+                self.__peers.popitem(last=False)
+
+    def get(self, sessionId):
+        """Get the peer info of a session, None if unknown or expired"""
+        with self.__lock:
+            expiration, peerInfo = self.__peers.get(sessionId, (0, None))
+            if expiration < time.time():
+                self.__peers.pop(sessionId, None)
+                return None
+            # The credentials are completed by the service, they must not be shared
+            return dict(peerInfo)
+
+
+gPeerInfoCache = PeerInfoCache()
+
+
 def getM2PeerInfo(conn):
     """Gets the details of the current peer as a standard dict. The peer
     details are obtained from the supplied M2 SSL Connection obj "conn".
@@ -4,7 +4,7 @@ import selectors
 import threading
 
 from diraccfg import CFG
-from pytest import fixture
+from pytest import fixture, skip
 
 from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
 from DIRAC.Core.DISET.private.Transports import M2SSLTransport, PlainTransport
@@ -19,7 +19,6 @@ from DIRAC.Core.Security.test.x509TestUtilities import CERTDIR, USERCERT, getCer
 # TODO: Missing hostcert
 # TODO: Missing usercert
 # TODO: Missing proxy
-# TODO: Session test?
 # TODO: Reload of CAs?
 
 # Define all the locations
@@ -64,6 +63,8 @@ class DummyServiceReactor:
         self.clientTransport = None
         # Message received from the client
         self.receivedMessage = None
+        # Whether the TLS session of the client connection was resumed
+        self.sessionReused = None
 
     def handleConnection(self, clientTransport):
         """This is normally done is Service.py in different thread
@@ -73,6 +74,7 @@ class DummyServiceReactor:
         self.clientTransport = clientTransport
         res = clientTransport.handshake()
         assert res["OK"], res
+        self.sessionReused = clientTransport.isSessionReused()
 
         self.receivedMessage = clientTransport.receiveData(1024)
         clientTransport.sendData(MAGIC_ANSWER)
@@ -163,7 +165,7 @@ def create_serverAndClient(request):
     res = clientTransport.initAsClient()
     assert res["OK"], res
 
-    yield sr, clientTransport
+    yield sr, clientTransport, clientOptions
 
     clientTransport.close()
     sr.closeListeningConnections()
@@ -192,7 +194,7 @@ def ping_server(clientTransport):
 
 def test_simpleMessage(create_serverAndClient):
     """Send a message, wait for an answer"""
-    serv, client = create_serverAndClient
+    serv, client, _clientOptions = create_serverAndClient
     serverAnswer = ping_server(client)
     assert serv.receivedMessage == MAGIC_QUESTION
     assert serverAnswer == MAGIC_ANSWER
@@ -200,7 +202,7 @@ def test_simpleMessage(create_serverAndClient):
 
 def test_getRemoteInfo(create_serverAndClient):
     """Check the information from remote peer"""
-    serv, client = create_serverAndClient
+    serv, client, _clientOptions = create_serverAndClient
     ping_server(client)
 
     addr_info = client.getRemoteAddress()
@@ -221,3 +223,30 @@ def test_getRemoteInfo(create_serverAndClient):
         assert peerCreds["x509Chain"].getNumCertsInChain()["Value"] == 2
         assert peerCreds["isProxy"] is True
         assert peerCreds["isLimitedProxy"] is False
+
+
+def test_sessionResumption(create_serverAndClient):
+    """A new connection to the same server resumes the TLS session, and gets the same credentials"""
+    serv, client, clientOptions = create_serverAndClient
+    if not isinstance(client, M2SSLTransport.SSLTransport):
+        skip("No session for PlainTransport")
+
+    ping_server(client)
+    firstCreds = serv.clientTransport.peerCredentials
+    assert not serv.sessionReused
+    # The session is kept by the client when closing
+    client.close()
+
+    server_thread = threading.Thread(target=serv.serve)
+    server_thread.start()
+    newClient = M2SSLTransport.SSLTransport(("localhost", PORT_NUMBER), bServerMode=False, **clientOptions)
+    res = newClient.initAsClient()
+    assert res["OK"], res
+    assert ping_server(newClient) == MAGIC_ANSWER
+    newClient.close()
+    server_thread.join()
+
+    assert serv.sessionReused
+    peerCreds = serv.clientTransport.peerCredentials
+    assert peerCreds["DN"] == firstCreds["DN"]
+    assert peerCreds["isProxy"] is True
@@ -0,0 +1,119 @@
+""" Unit tests of the streamed and raw transfers of the transports, and of the streamed RPC calls
+"""
+import gc
+import socket
+from unittest.mock import MagicMock
+
+import pytest
+
+from DIRAC import S_ERROR, S_OK
+from DIRAC.Core.DISET.private.InnerRPCClient import InnerRPCClient
+from DIRAC.Core.DISET.private.Transports.PlainTransport import PlainTransport
+from DIRAC.Core.Utilities.DErrno import ENOAUTH
+from DIRAC.Core.Utilities.DEncode import StreamedResult
+
+
+@pytest.fixture
+def connection():
+    """Two connected transports, and the socket of the first one"""
+    senderSocket, receiverSocket = socket.socketpair()
+    transports = []
+    for sock in (senderSocket, receiverSocket):
+        transport = PlainTransport(("", 0))
+        transport.setClientSocket(sock)
+        transports.append(transport)
+    yield transports[0], transports[1], senderSocket
+    senderSocket.close()
+    receiverSocket.close()
+
+
+def test_receiveDataStream(connection):
+    sender, receiver, _senderSocket = connection
+    assert sender.sendData(S_OK({"Successful": {"a": 1, "b": 2}, "Failed": {}}))["OK"]
+
+    stream = StreamedResult(receiver.receiveDataStream(2, streamPath=("Value",)))
+    assert list(stream) == [(("Value", "Successful"), "a", 1), (("Value", "Successful"), "b", 2)]
+    assert stream.result == S_OK({"Successful": {}, "Failed": {}})
+
+
+@pytest.mark.parametrize("data", [b"12", b"12:"])
+def test_receiveDataStream_peerClosed(connection, data):
+    """The peer closes the connection before sending the whole header or the message"""
+    _sender, receiver, senderSocket = connection
+    senderSocket.sendall(data)
+    senderSocket.shutdown(socket.SHUT_WR)
+
+    stream = StreamedResult(receiver.receiveDataStream(2))
+    assert list(stream) == []
+    assert not stream.result["OK"]
+    assert "Peer closed connection" in stream.result["Message"]
+
+
+def test_rawData(connection):
+    sender, receiver, _senderSocket = connection
+    assert sender.sendRawData(b"0123456789")["OK"]
+    received = []
+    assert receiver.receiveRawData(10, received.append)["OK"]
+    assert b"".join(received) == b"0123456789"
+    assert not sender.isInterrupted()
+    assert not receiver.isInterrupted()
+
+
+def test_rawData_peerClosed(connection):
+    """The message flag is reset when a transfer fails, but the connection stays unusable"""
+    sender, receiver, senderSocket = connection
+    senderSocket.sendall(b"01234")
+    senderSocket.shutdown(socket.SHUT_WR)
+    result = receiver.receiveRawData(10, lambda data: None)
+    assert not result["OK"]
+    assert "Peer closed connection" in result["Message"]
+    assert not receiver._BaseTransport__inMessage
+    assert receiver.isInterrupted()
+
+    sender._write = MagicMock(side_effect=OSError("Broken pipe"))
+    assert not sender.sendRawData(b"0123456789")["OK"]
+    assert not sender._BaseTransport__inMessage
+    assert sender.isInterrupted()
+
+
+@pytest.fixture
+def rpcClient():
+    """An InnerRPCClient connected to a fake service"""
+    client = InnerRPCClient.__new__(InnerRPCClient)
+    client._getBaseStub = MagicMock(return_value={})
+    client._connect = MagicMock(return_value=S_OK(("trid", MagicMock())))
+    client._proposeAction = MagicMock(return_value=S_OK())
+    client._disconnect = MagicMock()
+    return client
+
+
+def test_executeRPCStream_close(rpcClient):
+    """The connection is closed even if the result is never iterated"""
+    transport = rpcClient._connect.return_value["Value"][1]
+    transport.receiveDataStream.side_effect = lambda *args, **kwargs: iter([])
+
+    with rpcClient.executeRPCStream("method", 1, 2, streamDepth=1)["Value"]:
+        rpcClient._disconnect.assert_not_called()
+    rpcClient._disconnect.assert_called_once_with("trid")
+    transport.sendData.assert_called_once_with(S_OK([1, 2]))
+
+    rpcClient._disconnect.reset_mock()
+    result = rpcClient.executeRPCStream("method")
+    del result
+    gc.collect()
+    rpcClient._disconnect.assert_called_once_with("trid")
+
+
+def test_executeRPC_retry(rpcClient):
+    """The calls are retried on network errors, not when unauthorized"""
+    rpcClient._proposeAction.return_value = S_ERROR("Network problem")
+    result = rpcClient.executeRPC("method", ())
+    assert not result["OK"]
+    assert "rpcStub" in result
+    assert rpcClient._proposeAction.call_count == 4
+    assert rpcClient._disconnect.call_count == 4
+
+    rpcClient._proposeAction.reset_mock()
+    rpcClient._proposeAction.return_value = S_ERROR(ENOAUTH, "Unauthorized query")
+    assert not rpcClient.executeRPCStream("method")["OK"]
+    assert rpcClient._proposeAction.call_count == 1
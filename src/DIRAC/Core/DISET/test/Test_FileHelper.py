@@ -0,0 +1,140 @@
+""" Unit tests of the transfers of the FileHelper, between two ends of a local socket
+"""
+import hashlib
+import os
+import socket
+import threading
+import zlib
+from io import BytesIO
+
+import pytest
+
+from DIRAC.Core.DISET.private.FileHelper import MIN_CHUNK_SIZE, FileHelper
+from DIRAC.Core.DISET.private.Transports.PlainTransport import PlainTransport
+from DIRAC.Core.Utilities.Adler import intAdlerToHex
+
+# Several chunks, the last one incomplete
+DATA = os.urandom(3 * MIN_CHUNK_SIZE + 1234)
+
+
+def transportPair():
+    """Two connected transports"""
+    transports = []
+    for sock in socket.socketpair():
+        transport = PlainTransport(("", 0))
+        transport.setClientSocket(sock)
+        transports.append(transport)
+    return transports
+
+
+def transfer(send, receive, rawStream=True):
+    """Run send and receive on the two ends of a connection
+
+    :param callable send: called with the FileHelper of the sender
+    :param callable receive: called with the FileHelper of the receiver
+    :return: ( result of send, result of receive, FileHelper of the receiver )
+    """
+    senderTransport, receiverTransport = transportPair()
+    sender, receiver = FileHelper(senderTransport), FileHelper(receiverTransport)
+    if rawStream:
+        sender.enableRawStream()
+        receiver.enableRawStream()
+    results = {}
+    thread = threading.Thread(target=lambda: results.setdefault("send", send(sender)))
+    thread.start()
+    results["receive"] = receive(receiver)
+    thread.join()
+    senderTransport.close()
+    receiverTransport.close()
+    return results["send"], results["receive"], receiver
+
+
+@pytest.mark.parametrize("rawStream", [True, False])
+def test_dataSource(rawStream):
+    sink = BytesIO()
+
+    def receive(receiver):
+        receiver.addChecksum("adler32")
+        receiver.addChecksum("sha256")
+        return receiver.networkToDataSink(sink)
+
+    sendResult, receiveResult, receiver = transfer(
+        lambda sender: sender.DataSourceToNetwork(BytesIO(DATA)), receive, rawStream=rawStream
+    )
+    assert sendResult["OK"], sendResult
+    assert receiveResult["OK"], receiveResult
+    assert sink.getvalue() == DATA
+    assert receiver.getHash() == hashlib.md5(DATA).hexdigest()
+    assert receiver.getChecksum("adler32") == intAdlerToHex(zlib.adler32(DATA))
+    assert receiver.getChecksum("sha256") == hashlib.sha256(DATA).hexdigest()
+    assert receiver.getTransferedBytes() == len(DATA)
+
+
+@pytest.mark.parametrize("checkSum", [True, False])
+def test_file(tmp_path, checkSum):
+    """Without checksum, the file is sent from the kernel"""
+    source = tmp_path / "source"
+    source.write_bytes(DATA)
+
+    def send(sender):
+        if not checkSum:
+            sender.disableCheckSum()
+        with open(source, "rb") as fd:
+            return sender.FDToNetwork(fd.fileno())
+
+    def receive(receiver):
+        if not checkSum:
+            receiver.disableCheckSum()
+        return receiver.networkToString()
+
+    sendResult, receiveResult, _receiver = transfer(send, receive)
+    assert sendResult["OK"], sendResult
+    assert receiveResult["OK"], receiveResult
+    assert receiveResult["Value"] == DATA
+
+
+def test_bulk(tmp_path):
+    source, destination = tmp_path / "source", tmp_path / "destination"
+    source.mkdir()
+    destination.mkdir()
+    (source / "data").write_bytes(DATA)
+    (source / "small").write_text("small")
+
+    sendResult, receiveResult, _receiver = transfer(
+        lambda sender: sender.bulkToNetwork([str(source / "data"), str(source / "small")]),
+        lambda receiver: receiver.networkToBulk(str(destination)),
+    )
+    assert sendResult["OK"], sendResult
+    assert receiveResult["OK"], receiveResult
+    assert (destination / "data").read_bytes() == DATA
+    assert (destination / "small").read_text() == "small"
+
+
+def test_maxFileSize():
+    """The data is read until the end, so that the connection can still be used"""
+    sendResult, receiveResult, receiver = transfer(
+        lambda sender: sender.DataSourceToNetwork(BytesIO(DATA)),
+        lambda receiver: receiver.networkToString(maxFileSize=MIN_CHUNK_SIZE),
+    )
+    assert sendResult["OK"], sendResult
+    assert not receiveResult["OK"]
+    assert "maximum size" in receiveResult["Message"]
+    assert receiver.receivedEOF()
+
+
+def test_markAsTransferred():
+    def receive(receiver):
+        receiver.setDirection("fromClient")
+        receiver.markAsTransferred()
+        return receiver.oTransport.sendData({"OK": True, "Value": "Done"})
+
+    def send(sender):
+        result = sender.DataSourceToNetwork(BytesIO(DATA))
+        if not result["OK"]:
+            return result
+        return sender.oTransport.receiveData()
+
+    sendResult, receiveResult, _receiver = transfer(send, receive)
+    assert receiveResult["OK"], receiveResult
+    assert sendResult["OK"], sendResult
+    assert sendResult["Value"] == "Done"
@@ -0,0 +1,92 @@
+""" Unit tests of the pool of client connections kept open between RPC calls
+"""
+import socket
+
+import pytest
+
+from DIRAC import S_OK
+from DIRAC.Core.DISET.private.IdleTransportPool import IdleTransportPool
+from DIRAC.Core.DISET.private.Transports.PlainTransport import PlainTransport
+
+KEY = ("dips://server:9135/Framework/Service", False, "/tmp/x509up_u1000", None, False, "")
+
+
+@pytest.fixture
+def connection():
+    """A client transport, and the socket of the service it is connected to"""
+    clientSocket, serviceSocket = socket.socketpair()
+    transport = PlainTransport(("server", 9135))
+    transport.oSocket = clientSocket
+    yield transport, serviceSocket
+    serviceSocket.close()
+    clientSocket.close()
+
+
+def test_reuse(connection):
+    transport, serviceSocket = connection
+    pool = IdleTransportPool()
+    pool.put(KEY, transport, 30)
+    # Only for the same service and credentials
+    assert pool.get(KEY[:-1] + ("hosts",)) is None
+    assert pool.get(KEY) is transport
+    assert pool.get(KEY) is None
+
+    # A call was sent and answered on the connection
+    serviceTransport = PlainTransport(("client", 1234))
+    serviceTransport.oSocket = serviceSocket
+    assert transport.sendData(S_OK())["OK"]
+    assert serviceTransport.receiveData() == S_OK()
+    assert serviceTransport.sendData(S_OK(1))["OK"]
+    assert transport.receiveData() == S_OK(1)
+    pool.put(KEY, transport, 30)
+    assert pool.get(KEY) is transport
+
+
+def test_closedByService(connection):
+    transport, serviceSocket = connection
+    pool = IdleTransportPool()
+    pool.put(KEY, transport, 30)
+    serviceSocket.close()
+    assert pool.get(KEY) is None
+
+
+def test_expired(connection):
+    transport, _serviceSocket = connection
+    pool = IdleTransportPool()
+    pool.put(KEY, transport, 0)
+    assert pool.get(KEY) is None
+
+    pool.put(KEY, transport, 0)
+    pool.purge()
+    assert pool.get(KEY) is None
+
+
+def test_interrupted(connection):
+    """A connection with a message partially received is never reused"""
+    transport, serviceSocket = connection
+    serviceSocket.sendall(b"1024:")
+    serviceSocket.close()
+    assert not transport.receiveData()["OK"]
+    assert transport.isInterrupted()
+
+    pool = IdleTransportPool()
+    pool.put(KEY, transport, 30)
+    assert pool.get(KEY) is None
+
+
+def test_maxIdlePerKey():
+    pool = IdleTransportPool(maxIdlePerKey=1)
+    sockets = []
+    transports = []
+    for _ in range(2):
+        clientSocket, serviceSocket = socket.socketpair()
+        sockets.append(serviceSocket)
+        transport = PlainTransport(("server", 9135))
+        transport.oSocket = clientSocket
+        transports.append(transport)
+        pool.put(KEY, transport, 30)
+    # The extra connection is closed
+    assert transports[1].oSocket.fileno() == -1
+    assert pool.get(KEY) is transports[0]
+    for serviceSocket in sockets:
+        serviceSocket.close()
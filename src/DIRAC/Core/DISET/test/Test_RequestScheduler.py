@@ -0,0 +1,122 @@
+""" Unit tests of the scheduling of the requests of a service
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from DIRAC.Core.DISET.private.RequestScheduler import DEFAULT_CLASS, QUEUE_WAIT_OVERFLOW, RequestScheduler
+
+TIMEOUT = 10
+
+
+def blockingRequest(started, release):
+    """A request which runs until released"""
+
+    def request():
+        started.set()
+        assert release.wait(TIMEOUT)
+
+    return request
+
+
+def test_classes():
+    scheduler = RequestScheduler("Test", 1, {"Web": {"Methods": "getJobPageSummaryWeb, FileTransfer/toClient"}})
+    assert scheduler.getClassName(("RPC", "getJobPageSummaryWeb")) == "Web"
+    assert scheduler.getClassName(("FileTransfer", "toClient")) == "Web"
+    assert scheduler.getClassName(("RPC", "setJobStatus")) == DEFAULT_CLASS
+
+
+def test_fairShare():
+    scheduler = RequestScheduler("Test", 1, {DEFAULT_CLASS: {"Weight": 3}, "Web": {"Weight": 1}})
+    started, release = threading.Event(), threading.Event()
+    order = []
+    done = threading.Semaphore(0)
+
+    def request(name):
+        def execute():
+            order.append(name)
+            done.release()
+
+        return execute
+
+    # The only thread is busy: the requests are queued
+    assert scheduler.submit(DEFAULT_CLASS, blockingRequest(started, release))
+    assert started.wait(TIMEOUT)
+    for _ in range(4):
+        assert scheduler.submit("Web", request("Web"))
+    for _ in range(6):
+        assert scheduler.submit(DEFAULT_CLASS, request(DEFAULT_CLASS))
+    release.set()
+    for _ in range(10):
+        assert done.acquire(timeout=TIMEOUT)
+
+    # The Web requests, although first in line, get a quarter of the thread while both classes are waiting
+    assert order[:8].count("Web") == 2
+    assert order[8:] == ["Web", "Web"]
+
+
+def test_admissionControl():
+    scheduler = RequestScheduler("Test", 1, {"Web": {"MaxQueued": 2}}, maxQueued=5)
+    started, release = threading.Event(), threading.Event()
+    assert scheduler.submit("Web", blockingRequest(started, release))
+    assert started.wait(TIMEOUT)
+    assert scheduler.submit("Web", lambda: None)
+    assert scheduler.submit("Web", lambda: None)
+    # The queue of the class is full, but not the one of the other classes
+    assert not scheduler.submit("Web", lambda: None)
+    assert scheduler.submit(DEFAULT_CLASS, lambda: None)
+    assert scheduler.getQueuedCount() == 3
+
+    stats = scheduler.getStats()
+    assert stats["Web"]["RejectedRequests"] == 1
+    assert stats["Web"]["QueuedRequests"] == 2
+    assert stats["Web"]["RunningRequests"] == 1
+    release.set()
+
+
+def test_maxThreads():
+    scheduler = RequestScheduler("Test", 2, {"Web": {"MaxThreads": 1}})
+    webStarted, defaultStarted, release = threading.Event(), threading.Event(), threading.Event()
+    assert scheduler.submit("Web", blockingRequest(webStarted, release))
+    assert webStarted.wait(TIMEOUT)
+    # The second Web request waits for the first one, and leaves the other thread to the other classes
+    assert scheduler.submit("Web", lambda: None)
+    assert scheduler.submit(DEFAULT_CLASS, blockingRequest(defaultStarted, release))
+    assert defaultStarted.wait(TIMEOUT)
+    assert scheduler.getRunningCount() == 2
+    assert scheduler.getQueuedCount() == 1
+    release.set()
+
+
+def test_waitHistogram():
+    scheduler = RequestScheduler("Test", 1)
+    started, release = threading.Event(), threading.Event()
+    done = threading.Event()
+    assert scheduler.submit(DEFAULT_CLASS, blockingRequest(started, release))
+    assert started.wait(TIMEOUT)
+    assert scheduler.submit(DEFAULT_CLASS, done.set)
+    release.set()
+    assert done.wait(TIMEOUT)
+
+    stats = scheduler.getStats()[DEFAULT_CLASS]
+    assert stats["ExecutedRequests"] == 2
+    assert stats["QueueWait10ms"] + stats["QueueWait100ms"] + stats["QueueWait1s"] == 2
+    assert stats[QUEUE_WAIT_OVERFLOW] == 0
+    # The statistics are reset
+    assert scheduler.getStats()[DEFAULT_CLASS]["ExecutedRequests"] == 0
+
+
+def test_executor():
+    """The requests are executed by the thread pool given to the scheduler"""
+    executor = ThreadPoolExecutor(1, thread_name_prefix="Service")
+    scheduler = RequestScheduler("Test", 1, executor=executor)
+    done = threading.Event()
+    threadNames = []
+
+    def request():
+        threadNames.append(threading.current_thread().name)
+        done.set()
+
+    assert scheduler.submit(DEFAULT_CLASS, request)
+    assert done.wait(TIMEOUT)
+    assert threadNames[0].startswith("Service")
+    executor.shutdown()
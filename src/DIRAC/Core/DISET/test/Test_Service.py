@@ -0,0 +1,181 @@
+""" Unit tests of the RPC connections kept open by a service between the calls of a client
+"""
+# pylint: disable=protected-access
+import errno
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import pytest
+
+from DIRAC import S_OK
+from DIRAC.Core.DISET.private.LockManager import LockManager
+from DIRAC.Core.DISET.private.RequestScheduler import RequestScheduler
+from DIRAC.Core.DISET.private.Service import Service
+from DIRAC.Core.DISET.private.Transports.PlainTransport import PlainTransport
+from DIRAC.Core.Utilities.DErrno import ENOAUTH
+
+SERVICE_NAME = "Framework/Test"
+
+
+@pytest.fixture
+def service(mocker):
+    """A service answering the RPC calls with their arguments, with a KeepAliveTime of 30 s"""
+    mocker.patch("DIRAC.Core.DISET.private.Service.Operations")
+    mocker.patch("DIRAC.Core.DISET.private.Service.PathFinder")
+    cfg = mocker.patch("DIRAC.Core.DISET.private.Service.ServiceConfiguration").return_value
+    cfg.getKeepAliveTime.return_value = 30
+    cfg.getMaxIdleConnections.return_value = 10
+    cfg.getMaxThreads.return_value = 2
+    cfg.getMaxWaitingPetitions.return_value = 10
+    authManager = mocker.patch("DIRAC.Core.DISET.private.Service.AuthManager").return_value
+    authManager.authQuery.return_value = True
+
+    service = Service({"modName": SERVICE_NAME, "loadName": SERVICE_NAME, "standalone": True})
+    transportPool = service._transportPool
+
+    class EchoHandler:
+        def __init__(self, handlerInitDict, trid):
+            self.trid = trid
+
+        def initialize(self):
+            pass
+
+        def _rh_executeAction(self, proposalTuple):
+            result = transportPool.receive(self.trid)
+            transportPool.send(self.trid, result)
+            return S_OK([result, 0])
+
+    service._handler = {"class": EchoHandler}
+    service._actions = {"auth": {}}
+    service._serviceInfoDict = {}
+    service.securityLogging = False
+    service._lockManager = LockManager(2)
+    service._threadPool = ThreadPoolExecutor(2)
+    service._scheduler = RequestScheduler(SERVICE_NAME, 2, executor=service._threadPool)
+    service._msgBroker = MagicMock()
+    yield service
+    service._threadPool.shutdown()
+
+
+def connect(service):
+    """Connect a client transport to the service
+
+    :return: (client transport, transport ID on the service side)
+    """
+    with socket.create_server(("127.0.0.1", 0)) as server:
+        address = server.getsockname()
+        clientSocket = socket.create_connection(address)
+        serviceSocket, clientAddress = server.accept()
+    transport = PlainTransport(address)
+    transport.setClientSocket(clientSocket)
+    clientSocket.settimeout(10)
+    serviceTransport = PlainTransport(("", 0))
+    serviceTransport.setClientSocket(serviceSocket)
+    trid = f"{address[0]}:{address[1]}->{clientAddress[0]}:{clientAddress[1]}"
+    service.handleConnection(serviceTransport)
+    return transport, trid
+
+
+@pytest.fixture
+def client(service):
+    """A client transport connected to the service, and the transport ID on the service side"""
+    transport, trid = connect(service)
+    yield transport, trid
+    transport.close()
+
+
+def call(transport, method, *args, extraCredentials=None):
+    """Make an RPC call asking to keep the connection open, as BaseClient does
+
+    :return: (answer to the proposal, result of the call)
+    """
+    proposal = ((SERVICE_NAME, "", "vo"), ("RPC", method), extraCredentials, "v1", {"keepAlive": True})
+    assert transport.sendData(S_OK(proposal))["OK"]
+    answer = transport.receiveData()
+    if not answer["OK"]:
+        return answer, None
+    assert transport.sendData(S_OK(list(args)))["OK"]
+    return answer, transport.receiveData()
+
+
+def waitFor(condition, timeout=5):
+    """Wait until a condition is true"""
+    start = time.time()
+    while not condition():
+        assert time.time() - start < timeout
+        time.sleep(0.05)
+
+
+def test_severalRPCs(service, client):
+    """Several calls on one connection, each of them authorized with the credentials of the connection"""
+    transport, trid = client
+    authQuery = service._authMgr.authQuery
+    assert call(transport, "ping", 1, extraCredentials="hosts") == (S_OK({"keepAlive": 30}), S_OK([1]))
+    assert authQuery.call_args.args[1] == {"extraCredentials": "hosts"}
+    assert call(transport, "echo", "a") == (S_OK({"keepAlive": 30}), S_OK(["a"]))
+    # The extra credentials of the previous call are not kept
+    assert authQuery.call_args.args[1] == {}
+    assert [callArgs.args[0] for callArgs in authQuery.call_args_list] == ["ping", "echo"]
+    assert service._transportPool.exists(trid)
+
+    authQuery.return_value = False
+    answer, result = call(transport, "ping")
+    assert not answer["OK"]
+    assert answer["Errno"] == ENOAUTH
+    assert result is None
+    # The connection is closed after a rejected request
+    assert not transport.receiveData()["OK"]
+    waitFor(lambda: not service._transportPool.exists(trid))
+
+
+def test_idleTimeout(service, client):
+    """The connections idle for longer than the KeepAliveTime are closed"""
+    transport, trid = client
+    service._cfg.getKeepAliveTime.return_value = 1
+    assert call(transport, "ping") == (S_OK({"keepAlive": 1}), S_OK([]))
+    start = time.time()
+    result = transport.receiveData()
+    assert not result["OK"]
+    assert 1 <= time.time() - start < 5
+    waitFor(lambda: not service._transportPool.exists(trid))
+
+
+def test_peerClosed(service, client):
+    """A client closing an idle connection does not leave it behind on the service"""
+    transport, trid = client
+    assert call(transport, "ping") == (S_OK({"keepAlive": 30}), S_OK([]))
+    assert service._transportPool.exists(trid)
+    transport.close()
+    waitFor(lambda: not service._transportPool.exists(trid))
+    # The service goes on with the other connections
+    waitFor(lambda: service._Service__idleListenerThread is None)
+
+
+def test_globalLock(service):
+    """The global lock is held until the end of the actions, the requests beyond it are rejected"""
+    service._lockManager = LockManager(1)
+    transport, _trid = connect(service)
+    proposal = ((SERVICE_NAME, "", "vo"), ("RPC", "echo"), None, "v1", {"keepAlive": True})
+    assert transport.sendData(S_OK(proposal))["OK"]
+    assert transport.receiveData() == S_OK({"keepAlive": 30})
+
+    # The action waits for its arguments, still holding the lock
+    otherTransport, _otherTrid = connect(service)
+    answer, result = call(otherTransport, "ping")
+    assert not answer["OK"]
+    assert answer["Errno"] == errno.EBUSY
+    assert result is None
+    otherTransport.close()
+
+    assert transport.sendData(S_OK(["a"]))["OK"]
+    assert transport.receiveData() == S_OK(["a"])
+    # The lock is released with the end of the action, just after the result is sent
+    waitFor(lambda: not service._scheduler.getRunningCount())
+    otherTransport, _otherTrid = connect(service)
+    assert call(otherTransport, "ping") == (S_OK({"keepAlive": 30}), S_OK([]))
+    otherTransport.close()
+    waitFor(lambda: not service._scheduler.getRunningCount())
+    assert call(transport, "ping", 1) == (S_OK({"keepAlive": 30}), S_OK([1]))
+    transport.close()
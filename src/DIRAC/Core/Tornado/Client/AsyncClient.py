@@ -0,0 +1,249 @@
+"""
+  Asynchronous clients, to call many services concurrently from an asyncio event loop.
+
+  The calls return coroutines, which can be awaited one by one or together::
+
+    import asyncio
+    from DIRAC.Core.Tornado.Client.AsyncClient import AsyncRPCClient, gatherRPCs
+
+    async def getJobsInfo(jobIDs):
+        jobMonitoring = AsyncRPCClient("WorkloadManagement/JobMonitoring")
+        reqManager = AsyncRPCClient("RequestManagement/ReqManager")
+        return await gatherRPCs(
+            jobMonitoring.getJobsStatus(jobIDs),
+            jobMonitoring.getJobsSites(jobIDs),
+            reqManager.getRequestIDsForJobs(jobIDs),
+        )
+
+    # From synchronous code, such as an agent
+    statuses, sites, requests = asyncio.run(getJobsInfo(jobIDs))
+
+  The URL resolution, failover and credentials are the ones of the synchronous clients.
+
+  - HTTPS services are called with the asynchronous HTTP client of Tornado, from the event loop itself.
+  - The DISET protocol is blocking, so the calls to DIPS services are sent from a thread pool shared by all
+    the asynchronous clients, over connections kept open between calls (see the ``persistentConnection``
+    option of :py:class:`~DIRAC.Core.DISET.private.BaseClient.BaseClient`).
+"""
+# pylint: disable=broad-except
+import asyncio
+import errno
+import functools
+import os
+import ssl
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlencode
+
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+
+from DIRAC import S_ERROR
+from DIRAC.ConfigurationSystem.Client.Helpers.CSGlobals import skipCACheck
+from DIRAC.Core.DISET.RPCClient import RPCClient
+from DIRAC.Core.DISET.private.BaseClient import BaseClient
+from DIRAC.Core.DISET.ThreadConfig import ThreadConfig
+from DIRAC.Core.Security import Locations
+from DIRAC.Core.Tornado.Client.ClientSelector import ClientSelector
+from DIRAC.Core.Tornado.Client.private.TornadoBaseClient import TornadoBaseClient, _create_ssl_context
+from DIRAC.Core.Utilities.JEncode import decode, encode
+
+#: Maximum number of concurrent HTTPS requests per event loop
+MAX_HTTP_CLIENTS = 100
+#: Maximum number of concurrent calls to DIPS services
+MAX_DISET_THREADS = 20
+#: Maximum number of SSL contexts kept for the HTTPS requests
+MAX_SSL_CONTEXTS = 32
+
+gDISETExecutor = None
+gDISETExecutorLock = threading.Lock()
+# { ( verified, ( path, modification time, size ) of the certificate files ) : SSLContext }, in least recently used order
+gSSLContexts = OrderedDict()
+gSSLContextsLock = threading.Lock()
+
+
+def getDISETExecutor():
+    """Thread pool sending the calls to DIPS services"""
+    global gDISETExecutor
+    with gDISETExecutorLock:
+        if not gDISETExecutor:
+            gDISETExecutor = ThreadPoolExecutor(MAX_DISET_THREADS, thread_name_prefix="AsyncDISET")
+    return gDISETExecutor
+
+
+def _getFileStamp(path):
+    """Get what identifies the content of a file: path, modification time and size"""
+    stat = os.stat(path)
+    return (path, stat.st_mtime, stat.st_size)
+
+
+def _getSSLContext(verified, cert):
+    """SSL context for the HTTPS requests with a given certificate
+
+    The contexts are cached according to the path, modification time and size of the certificate files,
+    so that they are renewed when the certificate changes, without reading the files from the event loop
+    for each request. Only the MAX_SSL_CONTEXTS last used contexts are kept.
+
+    :param bool verified: check the server certificate against the CAs
+    :param cert: certificate file, or tuple of certificate and key files, as given to requests
+    """
+    certFiles = cert if isinstance(cert, (tuple, list)) else (cert,) if cert else ()
+    key = (verified, tuple(_getFileStamp(certFile) for certFile in certFiles))
+    with gSSLContextsLock:
+        ctx = gSSLContexts.get(key)
+        if ctx is not None:
+            gSSLContexts.move_to_end(key)
+            return ctx
+    ctx = _create_ssl_context()
+    if verified:
+        caLocation = Locations.getCAsLocation()
+        if not caLocation:
+            raise ValueError("No CAs found!")
+        ctx.load_verify_locations(capath=caLocation)
+    else:
+        ctx.check_hostname = False
+        ctx.verify_mode = ssl.CERT_NONE
+    if certFiles:
+        ctx.load_cert_chain(*certFiles)
+    with gSSLContextsLock:
+        gSSLContexts[key] = ctx
+        while len(gSSLContexts) > MAX_SSL_CONTEXTS:
+            gSSLContexts.popitem(last=False)
+    return ctx
+
+
+async def gatherRPCs(*calls):
+    """Run RPC calls concurrently
+
+    :param calls: coroutines of the asynchronous clients
+    :return: list of S_OK/S_ERROR, in the order of the calls. Exceptions are returned as S_ERROR.
+    """
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    return [S_ERROR(f"{type(res).__name__}: {res}") if isinstance(res, BaseException) else res for res in results]
+
+
+class AsyncTornadoClient(TornadoBaseClient):
+    """Asynchronous client of a Tornado service
+
+    Same interface as :py:class:`~DIRAC.Core.Tornado.Client.TornadoClient.TornadoClient`, but the calls
+    return coroutines.
+    """
+
+    def __getattr__(self, attrname):
+        """
+        Return the RPC call procedure
+
+        :param str attrname: Name of the procedure we are trying to call
+        :return: RPC procedure as coroutine function
+        """
+
+        async def call(*args):
+            return await self.executeRPC(attrname, *args)
+
+        return call
+
+    async def executeRPC(self, method, *args):
+        """
+        Calls a remote service
+
+        :param str method: remote procedure name
+        :param args: list of arguments
+        :returns: decoded response from server, server may return S_OK or S_ERROR
+        """
+        retVal = await self.__request(method, args)
+        retVal["rpcStub"] = (self._getBaseStub(), method, list(args))
+        return retVal
+
+    async def __request(self, method, args):
+        """Send the call, trying the other URLs of the service if it cannot be reached"""
+        while True:
+            rpcCall = {"method": method, "args": encode(args)}
+            result = self._prepareRequest(rpcCall)
+            if not result["OK"]:
+                return result
+            url, auth = result["Value"]
+            rawText = None
+            try:
+                response = await self.__post(url, auth, rpcCall)
+                rawText = response.body.decode(errors="replace") if response.body else None
+                if response.code == HTTPStatus.NOT_IMPLEMENTED:
+                    return S_ERROR(errno.ENOSYS, f"{method} is not implemented")
+                if response.code in (HTTPStatus.FORBIDDEN, HTTPStatus.UNAUTHORIZED):
+                    return S_ERROR(errno.EACCES, f"No access to {url}")
+                if response.code == HTTPStatus.NOT_FOUND:
+                    rawText = f"{url} is not found"
+                # Any other error is worth retrying
+                response.rethrow()
+                return decode(rawText)[0]
+            except Exception as e:
+                if not self._banURL(url):
+                    return S_ERROR(f"{str(e)}: {rawText}")
+
+    async def __post(self, url, auth, rpcCall):
+        """Send the request, without raising for HTTP errors
+
+        :return: tornado.httpclient.HTTPResponse
+        """
+        sslContext = None
+        if url.startswith("https://"):
+            verified = not self.kwargs.get(
+                self.KW_SKIP_CA_CHECK, False if self.kwargs[self.KW_USE_CERTIFICATES] else skipCACheck()
+            )
+            sslContext = _getSSLContext(verified, auth.get("cert"))
+        # As requests, do not send the unset parameters
+        body = urlencode({key: value for key, value in rpcCall.items() if value is not None})
+        request = HTTPRequest(
+            url,
+            method="POST",
+            body=body,
+            headers=auth.get("headers"),
+            request_timeout=self.timeout,
+            ssl_options=sslContext,
+        )
+        return await AsyncHTTPClient(max_clients=MAX_HTTP_CLIENTS).fetch(request, raise_error=False)
+
+
+class AsyncDISETClient:
+    """Asynchronous client of a DIPS service
+
+    Same interface as :py:class:`~DIRAC.Core.DISET.RPCClient.RPCClient`, but the calls return coroutines.
+    The arguments are those of RPCClient, the connections being kept open between calls by default.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault(BaseClient.KW_PERSISTENT_CONNECTION, True)
+        # The calls are made from other threads: take the delegation of the current one
+        threadConfig = ThreadConfig()
+        if threadConfig.getDN() and BaseClient.KW_DELEGATED_DN not in kwargs:
+            kwargs[BaseClient.KW_DELEGATED_DN] = threadConfig.getDN()
+            kwargs.setdefault(BaseClient.KW_DELEGATED_GROUP, threadConfig.getGroup())
+        self.__rpcClient = RPCClient(*args, **kwargs)
+
+    def __getattr__(self, attrname):
+        """
+        Return the RPC call procedure
+
+        :param str attrname: Name of the procedure we are trying to call
+        :return: RPC procedure as coroutine function
+        """
+
+        async def call(*args):
+            return await self.executeRPC(attrname, *args)
+
+        return call
+
+    async def executeRPC(self, method, *args):
+        """
+        Calls a remote service from the thread pool
+
+        :param str method: remote procedure name
+        :param args: list of arguments
+        :returns: decoded response from server, server may return S_OK or S_ERROR
+        """
+        call = functools.partial(self.__rpcClient.executeRPC, method, args)
+        return await asyncio.get_running_loop().run_in_executor(getDISETExecutor(), call)
+
+
+# Asynchronous client, for either protocol
+AsyncRPCClient = functools.partial(ClientSelector, AsyncDISETClient, httpsClient=AsyncTornadoClient)
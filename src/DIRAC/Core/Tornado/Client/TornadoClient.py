@@ -19,12 +19,24 @@
     myService = TornadoClient("Framework/MyService")
     myService.doSomething() #Returns S_OK/S_ERROR
 
+  Several calls can be sent to the service in a single request::
+
+    with myService.batch():
+        result1 = myService.doSomething()
+        result2 = myService.doSomethingElse(1, 2)
+    # result1 and result2 are S_OK/S_ERROR only from here
+
 """
 # pylint: disable=broad-except
+import errno
+from contextlib import contextmanager
 
 from DIRAC.Core.Tornado.Client.private.TornadoBaseClient import TornadoBaseClient
+from DIRAC.Core.Utilities.DEncode import StreamedResult, streamEntries
 from DIRAC.Core.Utilities.JEncode import encode
 from DIRAC.Core.Utilities.File import getGlobbedTotalSize
+from DIRAC.Core.Utilities.ReturnValues import S_ERROR, S_OK
+from DIRAC.Core.Utilities.DErrno import cmpError
 
 
 class TornadoClient(TornadoBaseClient):
@@ -33,6 +45,13 @@ class TornadoClient(TornadoBaseClient):
     Interface is based on RPCClient interface
     """
 
+    #: Value of the ``method`` argument of the batched calls.
+    #: It must be the one of :py:class:`~DIRAC.Core.Tornado.Server.TornadoService.TornadoService`
+    BATCH_METHOD = "__batch__"
+
+    # [ ( method, args, result placeholder ) ] of the calls waiting to be sent, None outside of a batch
+    __batchedCalls = None
+
     def __getattr__(self, attrname):
         """
         Return the RPC call procedure
@@ -56,14 +75,78 @@ class TornadoClient(TornadoBaseClient):
 
         :param str method: remote procedure name
         :param args: list of arguments
-        :returns: decoded response from server, server may return S_OK or S_ERROR
+        :returns: decoded response from server, server may return S_OK or S_ERROR.
+                  In a batch, an empty dictionary filled with the result when the batch is sent.
         """
+        if self.__batchedCalls is not None:
+            placeholder = {}
+            self.__batchedCalls.append((method, args, placeholder))
+            return placeholder
         rpcCall = {"method": method, "args": encode(args)}
         # Start request
         retVal = self._request(**rpcCall)
         retVal["rpcStub"] = (self._getBaseStub(), method, list(args))
         return retVal
 
+    @contextmanager
+    def batch(self):
+        """
+        Collect the calls made in the block, and send them in a single request when leaving it.
+
+        The calls return an empty dictionary, which is filled with the S_OK/S_ERROR of the call
+        once the batch is sent: the results must only be used after the block.
+        The calls are executed by the service one after the other, in the order they were made.
+        If the service does not support batches, the calls are sent one by one.
+        If an exception is raised in the block, nothing is sent.
+        """
+        if self.__batchedCalls is not None:
+            # Already in a batch: the calls are simply added to it
+            yield
+            return
+        self.__batchedCalls = []
+        try:
+            yield
+            calls = self.__batchedCalls
+        finally:
+            self.__batchedCalls = None
+        self.__sendBatch(calls)
+
+    def __sendBatch(self, calls):
+        """Send the calls of a batch, and fill the result of each of them
+
+        :param list calls: [ ( method, args, result placeholder ) ]
+        """
+        if not calls:
+            return
+        retVal = self._request(
+            method=self.BATCH_METHOD, batch=encode([[method, list(args)] for method, args, _placeholder in calls])
+        )
+        if not retVal["OK"] and cmpError(retVal, errno.ENOSYS):
+            # The service does not support batches
+            for method, args, placeholder in calls:
+                placeholder.update(self.executeRPC(method, *args))
+            return
+        if retVal["OK"] and len(retVal["Value"]) != len(calls):
+            retVal = S_ERROR(f"Got {len(retVal['Value'])} results for a batch of {len(calls)} calls")
+        for i, (method, args, placeholder) in enumerate(calls):
+            placeholder.update(retVal["Value"][i] if retVal["OK"] else retVal)
+            placeholder["rpcStub"] = (self._getBaseStub(), method, list(args))
+
+    def executeRPCStream(self, method, *args, streamDepth=0):
+        """
+        Equivalent of :py:meth:`~DIRAC.Core.DISET.private.InnerRPCClient.InnerRPCClient.executeRPCStream`
+
+        The JSON response is decoded as a whole, so this does not reduce the memory usage,
+        but it gives the same interface as for DISET services.
+
+        :param str method: remote procedure name
+        :param args: list of arguments
+        :param int streamDepth: depth below the ``Value`` of the containers whose items are streamed
+        :returns: S_OK(:py:class:`~DIRAC.Core.Utilities.DEncode.StreamedResult`)
+        """
+        retVal = self.executeRPC(method, *args)
+        return S_OK(StreamedResult(streamEntries(retVal, streamDepth + 1, streamPath=("Value",))))
+
     def receiveFile(self, destFile, *args):
         """
         Equivalent of :py:meth:`~DIRAC.Core.DISET.TransferClient.TransferClient.receiveFile`
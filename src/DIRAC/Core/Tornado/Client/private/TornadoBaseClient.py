@@ -29,6 +29,7 @@ import os
 import requests
 import ssl
 import tempfile
+import weakref
 from http import HTTPStatus
 
 
@@ -114,6 +115,8 @@ class TornadoBaseClient:
         # RPCClient('dips://volhcb38.cern.ch:9162/Framework/SystemAdministrator')
         self.__nbOfUrls = 1
         self.__bannedUrls = []
+        # Temporary file holding the proxy given as a string, see _prepareRequest
+        self.__proxyStringFile = None
 
         # For pylint...
         self.setup = None
@@ -477,25 +480,23 @@ class TornadoBaseClient:
             del newKwargs["useCertificates"]
         return (self._destinationSrv, newKwargs)
 
-    def _request(self, retry=0, outputFile=None, **kwargs):
-        """
-        Sends the request to server
-
-        :param retry: internal parameters for recursive call. TODO: remove ?
-        :param outputFile: (default None) can be the path to a file, or the file itself where to store the received data.
-                          If set, the server response will be streamed for optimization
-                          purposes, and the response data will not go through the
-                          JDecode process
-        :param **kwargs: Any argument there is used as a post parameter. They are detailed bellow.
-        :param method: (mandatory) name of the distant method
-        :param args: (mandatory) json serialized list of argument for the procedure
-
+    def _banURL(self, url):
+        """Do not use a URL which could not be reached for the next attempts
 
+        :param str url: URL that failed
+        :return: bool -- whether another URL can be tried
+        """
+        if url not in self.__bannedUrls:
+            self.__bannedUrls += [url]
+        return len(self.__bannedUrls) < self.__nbOfUrls
 
-        :returns: The received data. If outputFile is set, return always S_OK
+    def _prepareRequest(self, kwargs):
+        """Select the URL and the credentials of a request
 
+        :param dict kwargs: POST parameters, completed with the client information
+        :returns: S_OK((url, auth)), auth being the arguments of requests for the authentication:
+                  either "cert" (certificate file, or tuple of certificate and key files) or "headers"
         """
-
         # Adding some informations to send
         if self.__extraCredentials:
             kwargs[self.KW_EXTRA_CREDENTIALS] = encode(self.__extraCredentials)
@@ -547,15 +548,43 @@ class TornadoBaseClient:
             auth = {"headers": {"Authorization": f"Bearer {token['access_token']}"}}
         elif self.kwargs.get(self.KW_PROXY_STRING):
             # TODO: This code path cannot work with DiracX
-            tmpHandle, cert = tempfile.mkstemp()
-            fp = os.fdopen(tmpHandle, "w")
-            fp.write(self.kwargs[self.KW_PROXY_STRING])
-            fp.close()
+            if not self.__proxyStringFile:
+                # Written once for all the requests of the client, and removed with it
+                tmpHandle, self.__proxyStringFile = tempfile.mkstemp()
+                with os.fdopen(tmpHandle, "w") as fp:
+                    fp.write(self.kwargs[self.KW_PROXY_STRING])
+                weakref.finalize(self, _removeFile, self.__proxyStringFile)
+            auth = {"cert": self.__proxyStringFile}
         else:
             auth = {"cert": Locations.getProxyLocation()}
             if not auth["cert"]:
                 gLogger.error("No proxy found")
                 return S_ERROR("No proxy found")
+        return S_OK((url, auth))
+
+    def _request(self, retry=0, outputFile=None, **kwargs):
+        """
+        Sends the request to server
+
+        :param retry: internal parameters for recursive call. TODO: remove ?
+        :param outputFile: (default None) can be the path to a file, or the file itself where to store the received data.
+                          If set, the server response will be streamed for optimization
+                          purposes, and the response data will not go through the
+                          JDecode process
+        :param **kwargs: Any argument there is used as a post parameter. They are detailed bellow.
+        :param method: (mandatory) name of the distant method
+        :param args: (mandatory) json serialized list of argument for the procedure
+
+
+
+        :returns: The received data. If outputFile is set, return always S_OK
+
+        """
+
+        result = self._prepareRequest(kwargs)
+        if not result["OK"]:
+            return result
+        url, auth = result["Value"]
 
         # We have a try/except for all the exceptions
         # whose default behavior is to try again,
@@ -647,8 +676,8 @@ class _ContextAdapter(requests.adapters.HTTPAdapter):
         return super().init_poolmanager(*args, **kwargs)
 
 
-@convertToReturnValue
-def _create_session(verified=True):
+def _create_ssl_context():
+    """Client SSL context, with the ciphers and TLS versions set in the environment"""
     ctx = ssl.create_default_context()
     if ssl_ciphers := os.environ.get("DIRAC_HTTPS_SSL_CIPHERS"):
         ctx.set_ciphers(ssl_ciphers)
@@ -656,6 +685,12 @@ def _create_session(verified=True):
         ctx.minimum_version = getattr(ssl.TLSVersion, minimum_tls_version)
     if maximum_tls_version := os.environ.get("DIRAC_HTTPS_SSL_METHOD_MAX"):
         ctx.maximum_version = getattr(ssl.TLSVersion, maximum_tls_version)
+    return ctx
+
+
+@convertToReturnValue
+def _create_session(verified=True):
+    ctx = _create_ssl_context()
     session = requests.Session()
     session.mount("https://", _ContextAdapter(ssl_context=ctx))
     if verified:
@@ -667,3 +702,11 @@ def _create_session(verified=True):
         ctx.check_hostname = False
         session.verify = False
     return session
+
+
+def _removeFile(path):
+    """Remove a temporary file, if it is still there"""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
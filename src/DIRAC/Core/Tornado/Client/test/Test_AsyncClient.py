@@ -0,0 +1,124 @@
+""" Test the asynchronous client against a local Tornado application
+"""
+import asyncio
+import errno
+import gc
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+from tornado.web import Application, RequestHandler
+
+from DIRAC import S_OK
+from DIRAC.Core.Tornado.Client import AsyncClient
+from DIRAC.Core.Tornado.Client.AsyncClient import AsyncTornadoClient, gatherRPCs
+from DIRAC.Core.Utilities.JEncode import decode, encode
+
+CALL_DURATION = 0.2
+
+
+class DummyHandler(RequestHandler):
+    """Mimics the RPC calls of a Tornado service"""
+
+    async def post(self):
+        method = self.get_body_argument("method")
+        args = decode(self.get_body_argument("args"))[0]
+        if method == "notImplemented":
+            self.set_status(501)
+            return
+        if method == "crash":
+            raise RuntimeError("Server crashed")
+        await asyncio.sleep(CALL_DURATION)
+        self.write(encode(S_OK([method] + list(args))))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """A client of the local application, which must be started in the event loop of the test"""
+    sock, port = bind_unused_port()
+    url = f"http://127.0.0.1:{port}/Framework/Dummy"
+    client = AsyncTornadoClient("https://127.0.0.1/Framework/Dummy", useCertificates=False, useAccessToken=False)
+    monkeypatch.setattr(client, "_prepareRequest", lambda rpcCall: S_OK((url, {})))
+    yield client, sock
+    sock.close()
+
+
+def run(client, sock, coroutine):
+    async def main():
+        server = HTTPServer(Application([(r"/Framework/Dummy", DummyHandler)]))
+        server.add_sockets([sock])
+        try:
+            return await coroutine
+        finally:
+            server.stop()
+
+    return asyncio.run(main())
+
+
+def test_call(client):
+    client, sock = client
+    result = run(client, sock, client.echo(1, "a"))
+    assert result["OK"], result
+    assert result["Value"] == ["echo", 1, "a"]
+    assert result["rpcStub"][1:] == ("echo", [1, "a"])
+
+
+def test_errors(client):
+    client, sock = client
+    notImplemented, crash = run(client, sock, gatherRPCs(client.notImplemented(), client.crash()))
+    assert notImplemented["Errno"] == errno.ENOSYS
+    assert not crash["OK"]
+    assert "500" in crash["Message"]
+
+
+def test_concurrentCalls(client):
+    client, sock = client
+    start = time.time()
+    results = run(client, sock, gatherRPCs(*(client.echo(i) for i in range(20))))
+    # The calls are not sent one after the other
+    assert time.time() - start < 10 * CALL_DURATION
+    assert [result["Value"] for result in results] == [["echo", i] for i in range(20)]
+
+
+def test_sslContextCache(monkeypatch, tmp_path):
+    """The SSL contexts are cached according to the certificate files and their changes, in a bounded cache"""
+    monkeypatch.setattr(AsyncClient, "_create_ssl_context", MagicMock)
+    monkeypatch.setattr(AsyncClient, "gSSLContexts", AsyncClient.OrderedDict())
+    monkeypatch.setattr(AsyncClient, "MAX_SSL_CONTEXTS", 2)
+    proxy1 = tmp_path / "proxy1"
+    proxy2 = tmp_path / "proxy2"
+    proxy1.write_text("proxy")
+    proxy2.write_text("proxy")
+
+    ctx = AsyncClient._getSSLContext(False, str(proxy1))
+    assert AsyncClient._getSSLContext(False, str(proxy1)) is ctx
+    ctx2 = AsyncClient._getSSLContext(False, str(proxy2))
+    assert ctx2 is not ctx
+    # The certificate is not read again to find the context
+    with patch("builtins.open", side_effect=AssertionError):
+        assert AsyncClient._getSSLContext(False, str(proxy1)) is ctx
+    proxy1.write_text("renewed proxy")
+    renewedCtx = AsyncClient._getSSLContext(False, str(proxy1))
+    assert renewedCtx is not ctx
+
+    assert AsyncClient._getSSLContext(False, (str(proxy1), str(proxy2))) is not renewedCtx
+    assert len(AsyncClient.gSSLContexts) == 2
+    # The least recently used contexts were dropped
+    assert AsyncClient._getSSLContext(False, str(proxy2)) is not ctx2
+
+
+def test_proxyString():
+    """A proxy given as a string is written in a single temporary file, removed with the client"""
+    client = AsyncTornadoClient(
+        "https://127.0.0.1/Framework/Dummy", proxyString="proxy", useAccessToken=False, skipCACheck=True
+    )
+    cert = client._prepareRequest({})["Value"][1]["cert"]
+    assert client._prepareRequest({})["Value"][1]["cert"] == cert
+    with open(cert) as fd:
+        assert fd.read() == "proxy"
+    del client
+    gc.collect()
+    assert not os.path.exists(cert)
@@ -0,0 +1,131 @@
+""" Test the batched calls of the TornadoClient against a local Tornado application
+"""
+import asyncio
+import errno
+import threading
+
+import pytest
+from tornado.httpserver import HTTPServer
+from tornado.testing import bind_unused_port
+from tornado.web import Application, RequestHandler
+
+from DIRAC import S_ERROR, S_OK
+from DIRAC.Core.Base.Client import Client
+from DIRAC.Core.Tornado.Client.TornadoClient import TornadoClient
+from DIRAC.Core.Utilities.JEncode import decode, encode
+
+
+class DummyHandler(RequestHandler):
+    """Mimics the RPC and batched calls of a Tornado service"""
+
+    # Whether the service supports batches
+    batchSupport = True
+    # Number of requests received
+    requests = 0
+
+    def call(self, method, args):
+        if method == "forbidden":
+            return S_ERROR(errno.EACCES, f"Unauthorized query to {method}")
+        return S_OK([method] + list(args))
+
+    def post(self):
+        DummyHandler.requests += 1
+        method = self.get_body_argument("method")
+        if method == TornadoClient.BATCH_METHOD:
+            if not self.batchSupport:
+                self.set_status(501)
+                return
+            calls = decode(self.get_body_argument("batch"))[0]
+            self.write(encode(S_OK([self.call(*call) for call in calls])))
+        else:
+            self.write(encode(self.call(method, decode(self.get_body_argument("args"))[0])))
+
+
+@pytest.fixture
+def newClient(monkeypatch):
+    """Factory of clients of the local application, running in its own thread"""
+    sock, port = bind_unused_port()
+    url = f"http://127.0.0.1:{port}/Framework/Dummy"
+    loop = asyncio.new_event_loop()
+
+    def serve():
+        asyncio.set_event_loop(loop)
+        server = HTTPServer(Application([(r"/Framework/Dummy", DummyHandler)]))
+        server.add_sockets([sock])
+        loop.run_forever()
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+
+    DummyHandler.requests = 0
+
+    def newClient():
+        client = TornadoClient(
+            "https://127.0.0.1/Framework/Dummy", useCertificates=False, useAccessToken=False, skipCACheck=True
+        )
+        monkeypatch.setattr(client, "_prepareRequest", lambda rpcCall: S_OK((url, {})))
+        return client
+
+    yield newClient
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    sock.close()
+
+
+@pytest.fixture
+def client(newClient):
+    return newClient()
+
+
+@pytest.mark.parametrize("batchSupport, nbRequests", [(True, 1), (False, 4)])
+def test_batch(client, monkeypatch, batchSupport, nbRequests):
+    monkeypatch.setattr(DummyHandler, "batchSupport", batchSupport)
+    with client.batch():
+        echo = client.echo(1, "a")
+        forbidden = client.forbidden()
+        ping = client.ping()
+        # Not sent yet
+        assert not echo
+    assert DummyHandler.requests == nbRequests
+    assert echo["Value"] == ["echo", 1, "a"]
+    assert echo["rpcStub"][1:] == ("echo", [1, "a"])
+    assert forbidden["Errno"] == errno.EACCES
+    assert ping["Value"] == ["ping"]
+
+
+def test_batchException(client):
+    with pytest.raises(RuntimeError):
+        with client.batch():
+            echo = client.echo()
+            raise RuntimeError()
+    assert not echo
+    assert DummyHandler.requests == 0
+    # The client is usable again
+    assert client.echo()["Value"] == ["echo"]
+
+
+def test_clientBatchThreads(newClient, monkeypatch):
+    """The calls made by another thread during a batch are not added to it"""
+    client = Client(url="Framework/Dummy")
+    monkeypatch.setattr(client, "_getRPC", lambda rpc=None, url="", timeout=None: rpc or newClient())
+    inBatch = threading.Event()
+    otherCallDone = threading.Event()
+    results = {}
+
+    def otherThread():
+        inBatch.wait()
+        results["other"] = client.echo("other")
+        otherCallDone.set()
+
+    thread = threading.Thread(target=otherThread)
+    thread.start()
+    with client.batch():
+        results["batched"] = client.echo("batched")
+        inBatch.set()
+        assert otherCallDone.wait(30)
+        # Sent on its own, not in the batch
+        assert results["other"]["Value"] == ["echo", "other"]
+        assert not results["batched"]
+    thread.join()
+    assert results["batched"]["Value"] == ["echo", "batched"]
+    assert DummyHandler.requests == 2
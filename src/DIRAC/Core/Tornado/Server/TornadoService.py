@@ -4,15 +4,17 @@ It directly inherits from :py:class:`tornado.web.RequestHandler`
 """
 
 
+import errno
 import os
 from datetime import datetime
 from tornado.web import url as TornadoURL
 
 import DIRAC
 
-from DIRAC import gLogger, S_OK
+from DIRAC import gLogger, S_ERROR, S_OK
 from DIRAC.Core.Tornado.Server.private.BaseRequestHandler import BaseRequestHandler
 from DIRAC.ConfigurationSystem.Client import PathFinder
+from DIRAC.Core.Utilities.ReturnValues import isReturnStructure
 
 
 class TornadoService(BaseRequestHandler):  # pylint: disable=abstract-method
@@ -84,6 +86,9 @@ class TornadoService(BaseRequestHandler):  # pylint: disable=abstract-method
     * ``extraCredentials``: (optional) Extra informations to authenticate client
     * ``rawContent``: (optionnal, default False) If set to True, return the raw output
         of the method called.
+    * ``batch``: (optional) JSON encoded list of ``[method, args]``, to call several methods in a single request.
+        In that case, ``method`` must be :py:attr:`BATCH_METHOD`, and ``args`` is not used.
+        See :py:meth:`_executeBatch`.
 
     If ``rawContent`` was requested by the client, the ``Content-Type``
     is ``application/octet-stream``, otherwise we set it to ``application/json``
@@ -121,6 +126,12 @@ class TornadoService(BaseRequestHandler):  # pylint: disable=abstract-method
     # DIRAC services use RPC calls only with POST http method.
     SUPPORTED_METHODS = ("POST",)
 
+    #: Value of the ``method`` argument of the batched calls.
+    #: It must be the one of :py:class:`~DIRAC.Core.Tornado.Client.TornadoClient.TornadoClient`
+    BATCH_METHOD = "__batch__"
+    #: Maximum number of calls in a batch
+    MAX_BATCH_SIZE = 1000
+
     @classmethod
     def _pre_initialize(cls) -> list:
         """This method is run by the Tornado server to prepare the handler for launch.
@@ -163,6 +174,8 @@ class TornadoService(BaseRequestHandler):  # pylint: disable=abstract-method
 
     def _getMethod(self) -> str:
         """Get target function name"""
+        if self.get_argument("method") == self.BATCH_METHOD:
+            return self._executeBatch
         # Get method object using prefix and method name from request
         return f"{self.METHOD_PREFIX}{self.get_argument('method')}"
 
@@ -171,6 +184,67 @@ class TornadoService(BaseRequestHandler):  # pylint: disable=abstract-method
         args_encoded = self.get_body_argument("args", default=self.encode([]))
         return (self.decode(args_encoded)[0], {})
 
+    # Each call of a batch is authorized on its own
+    auth_executeBatch = ["all"]
+
+    def _executeBatch(self):
+        """
+        Execute the calls of a batch one after the other, in the order they were sent.
+
+        The credentials are read once for the whole batch, but the authorization is checked for each call,
+        exactly as if it had been sent alone. A call failing does not stop the others.
+        Only the methods returning an S_OK/S_ERROR structure can be called this way.
+
+        :return: S_OK(list of S_OK/S_ERROR, one per call)
+        """
+        try:
+            calls = self.decode(self.get_body_argument("batch"))[0]
+            calls = [(str(method), list(args)) for method, args in calls]
+        except Exception as e:  # pylint: disable=broad-except
+            return S_ERROR(errno.EINVAL, f"Invalid batch of calls: {e!r}")
+        if len(calls) > self.MAX_BATCH_SIZE:
+            return S_ERROR(errno.E2BIG, f"Too many calls in the batch: {len(calls)} > {self.MAX_BATCH_SIZE}")
+
+        batchCredentials = self.credDict
+        try:
+            return S_OK([self.__executeBatchedCall(method, args) for method, args in calls])
+        finally:
+            self.credDict = batchCredentials
+
+    def __executeBatchedCall(self, method, args):
+        """Authorize and execute one call of a batch
+
+        :param str method: name of the method, without prefix
+        :param list args: arguments of the method
+
+        :return: S_OK/S_ERROR
+        """
+        methodObj = getattr(self, f"{self.METHOD_PREFIX}{method}", None)
+        if not callable(methodObj):
+            return S_ERROR(errno.ENOSYS, f"{method} is not implemented")
+
+        # The authorization check completes the credentials: start from those received with the request
+        self.credDict = dict(self._peerCredentials)
+        if not self._authQuery(method, methodObj, self.credDict):
+            self.log.error(
+                "Unauthorized access", f"Identity {self.srv_getFormattedRemoteCredentials()}; method {method}"
+            )
+            return S_ERROR(errno.EACCES, f"Unauthorized query to {method}")
+
+        credentials = self.srv_getFormattedRemoteCredentials()
+        self.log.notice("Incoming request", f"{credentials} {self._fullComponentName}: {method} (batch)")
+        try:
+            result = methodObj(*args)
+        except Exception as e:  # pylint: disable=broad-except
+            self.log.exception("Exception serving request", f"{e}:{e!r}")
+            return S_ERROR(f"Error while executing {method}: {e!r}")
+        if not isReturnStructure(result):
+            return S_ERROR(errno.EINVAL, f"{method} cannot be called in a batch")
+        # Do not leak internal information
+        result.pop("ExecInfo", None)
+        result.pop("CallStack", None)
+        return result
+
     auth_ping = ["all"]
 
     def export_ping(self):
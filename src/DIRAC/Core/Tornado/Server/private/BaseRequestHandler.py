@@ -4,6 +4,7 @@
 
    This module is basic for each of these components and describes the basic concept of access to them.
 """
+import sys
 import time
 import inspect
 import threading
@@ -536,7 +537,7 @@ class BaseRequestHandler(RequestHandler):
         """
         raise NotImplementedError("Please, create the _getMethodArgs method")
 
-    def __getMethodAuthProps(self) -> list:
+    def __getMethodAuthProps(self, methodName: str, methodObj) -> list:
         """Resolves the hard coded authorization requirements for the method.
         CAN be implemented by developer.
 
@@ -557,9 +558,20 @@ class BaseRequestHandler(RequestHandler):
             self.DEFAULT_AUTHORIZATION = [p.strip() for p in self.DEFAULT_AUTHORIZATION.split(",") if p.strip()]
 
         # Define target method authorization requirements
-        return getattr(
-            self, "auth_" + self.__methodName, getattr(self.methodObj, "authorization", self.DEFAULT_AUTHORIZATION)
-        )
+        return getattr(self, "auth_" + methodName, getattr(methodObj, "authorization", self.DEFAULT_AUTHORIZATION))
+
+    def _authQuery(self, methodName: str, methodObj, credDict: dict) -> bool:
+        """Check whether the given credentials are authorized to call a method
+
+        Note that performing the authQuery modifies the credDict...
+
+        :param methodName: core name of the method, without prefix
+        :param methodObj: the method itself, to find the authorization requirements defined by decorator
+        :param credDict: credentials of the client
+
+        :return: bool
+        """
+        return self._authManager.authQuery(methodName, credDict, self.__getMethodAuthProps(methodName, methodObj))
 
     async def prepare(self):
         """Tornados prepare method that called before request"""
@@ -601,10 +613,11 @@ class BaseRequestHandler(RequestHandler):
             self.log.exception(e)
             self.log.error("Error gathering credentials ", f"{self.getRemoteAddress()}; path {self.request.path}")
             raise HTTPError(HTTPStatus.UNAUTHORIZED, str(e))
+        # Keep the credentials as they were received, e.g. to authorize each call of a batch
+        self._peerCredentials = dict(self.credDict)
 
         # Check whether we are authorized to perform the query
-        # Note that performing the authQuery modifies the credDict...
-        authorized = self._authManager.authQuery(self.__methodName, self.credDict, self.__getMethodAuthProps())
+        authorized = self._authQuery(self.__methodName, self.methodObj, self.credDict)
         if not authorized:
             extraInfo = ""
             if self.credDict.get("ID"):
@@ -645,6 +658,10 @@ class BaseRequestHandler(RequestHandler):
             if isinstance(e, HTTPError):
                 raise
             raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, str(e))
+        finally:
+            # Give back the DB connections pinned to the thread during the request, if any DB is used
+            if mySQL := sys.modules.get("DIRAC.Core.Utilities.MySQL"):
+                mySQL.MySQL.releaseThreadConnections()
 
     def on_finish(self):
         """
@@ -19,6 +19,7 @@ import inspect
 import traceback
 
 from collections import defaultdict
+from itertools import chain
 from pprint import pprint
 
 
@@ -51,6 +52,11 @@ class types:
 # call stack
 DIRAC_DEBUG_DENCODE_CALLSTACK = bool(os.environ.get("DIRAC_DEBUG_DENCODE_CALLSTACK", False))
 
+# Setting this environment variable to any value will make encode/decode use the
+# recursive implementation instead of the iterative one. Both produce the same output.
+# The recursive implementation is always used when DIRAC_DEBUG_DENCODE_CALLSTACK is set
+DIRAC_USE_RECURSIVE_DENCODE = bool(os.environ.get("DIRAC_USE_RECURSIVE_DENCODE", False))
+
 # This global dictionary contains
 # {<method name> : set (<class names)}
 # (a method name can be reused in other classes)
@@ -507,25 +513,540 @@ g_dEncodeFunctions[types.DictType] = encodeDict
 g_dDecodeFunctions[_ord("d")] = decodeDict
 
 
-# Encode function
-def encode(uObject):
-    """Generic encoding function"""
+def recursiveEncode(uObject):
+    """Encode an object by recursively calling the functions of g_dEncodeFunctions
+
+    This is the reference implementation of the encoding.
+    """
     eList = []
-    # print("ENCODE FUNCTION : %s" % g_dEncodeFunctions[ type( uObject ) ])
     g_dEncodeFunctions[type(uObject)](uObject, eList)
     return b"".join(eList)
 
 
-def decode(data):
-    """Generic decoding function"""
+def recursiveDecode(data):
+    """Decode data by recursively calling the functions of g_dDecodeFunctions
+
+    This is the reference implementation of the decoding.
+    """
     if not data:
         return data
-    # print("DECODE FUNCTION : %s" % g_dDecodeFunctions[ sStream [ iIndex ] ])
     if not isinstance(data, bytes):
         raise NotImplementedError("This should never happen")
     return g_dDecodeFunctions[data[0]](data, 0)
 
 
+################################################################################
+# Iterative engine
+#
+# The functions below produce exactly the same bytes (and decode to exactly the same
+# objects) as the recursive functions above, but they do not go through one Python
+# function call per encoded value. Scalars are handled from small dispatch tables,
+# containers are handled with an explicit stack, and the output is accumulated in a
+# single bytearray.
+################################################################################
+
+# Opening markers of the containers, indexed by type
+_containerMarkers = {list: b"l", tuple: b"t", dict: b"d"}
+
+
+def _iterEncodeInt(iValue, buf):
+    buf += b"i%de" % iValue
+
+
+def _iterEncodeFloat(fValue, buf):
+    buf += b"f"
+    buf += str(fValue).encode()
+    buf += b"e"
+
+
+def _iterEncodeBool(bValue, buf):
+    buf += b"b1" if bValue else b"b0"
+
+
+def _iterEncodeString(sValue, buf):
+    sValue = sValue.encode()
+    buf += b"s%d:" % len(sValue)
+    buf += sValue
+
+
+def _iterEncodeBytes(sValue, buf):
+    buf += b"s%d:" % len(sValue)
+    buf += sValue
+
+
+def _iterEncodeNone(_oValue, buf):
+    buf += b"n"
+
+
+def _iterEncodeTZInfo(tzInfo, buf):
+    if tzInfo is not None:
+        # Same behaviour as the recursive engine: tzinfo objects cannot be encoded
+        raise KeyError(type(tzInfo))
+    buf += b"n"
+
+
+def _iterEncodeDateTime(oValue, buf):
+    buf += b"zati%dei%dei%dei%dei%dei%dei%de" % (
+        oValue.year,
+        oValue.month,
+        oValue.day,
+        oValue.hour,
+        oValue.minute,
+        oValue.second,
+        oValue.microsecond,
+    )
+    _iterEncodeTZInfo(oValue.tzinfo, buf)
+    buf += b"e"
+
+
+def _iterEncodeDate(oValue, buf):
+    buf += b"zdti%dei%dei%dee" % (oValue.year, oValue.month, oValue.day)
+
+
+def _iterEncodeTime(oValue, buf):
+    buf += b"ztti%dei%dei%dei%de" % (oValue.hour, oValue.minute, oValue.second, oValue.microsecond)
+    _iterEncodeTZInfo(oValue.tzinfo, buf)
+    buf += b"e"
+
+
+_iterScalarEncoders = {
+    int: _iterEncodeInt,
+    float: _iterEncodeFloat,
+    bool: _iterEncodeBool,
+    str: _iterEncodeString,
+    bytes: _iterEncodeBytes,
+    type(None): _iterEncodeNone,
+    _dateTimeType: _iterEncodeDateTime,
+    _dateType: _iterEncodeDate,
+    _timeType: _iterEncodeTime,
+}
+
+
+def iterativeEncode(uObject):
+    """Encode an object without recursion, producing the same output as :py:func:`recursiveEncode`
+
+    :param uObject: object to encode
+
+    :returns: encoded bytes
+    """
+    buf = bytearray()
+    scalarEncoders = _iterScalarEncoders
+    containerMarkers = _containerMarkers
+    # Each element of the stack is an iterator over the items left to encode in a container.
+    # Dictionaries are flattened as key1, value1, key2, value2...
+    stack = [iter((uObject,))]
+    while stack:
+        for item in stack[-1]:
+            itemType = type(item)
+            marker = containerMarkers.get(itemType)
+            if marker is None:
+                scalarEncoders[itemType](item, buf)
+                continue
+            buf += marker
+            if itemType is dict:
+                stack.append(chain.from_iterable(item.items()))
+            else:
+                stack.append(iter(item))
+            break
+        else:
+            stack.pop()
+            # The outermost iterator is not a container, it has no end marker
+            if stack:
+                buf += b"e"
+    return bytes(buf)
+
+
+# Sentinel used as "no key yet" for the dictionaries being decoded
+_noKey = object()
+
+# Kinds of containers being decoded
+_KIND_ROOT = 0
+_KIND_LIST = 1
+_KIND_TUPLE = 2
+_KIND_DICT = 3
+_KIND_DATETIME = 4
+
+_dateTimeConstructors = {
+    _ord("a"): datetime.datetime,
+    _ord("d"): datetime.date,
+    _ord("t"): datetime.time,
+}
+
+
+def iterativeDecode(data):
+    """Decode data without recursion, producing the same output as :py:func:`recursiveDecode`
+
+    :param data: bytes to decode
+
+    :returns: tuple (decoded object, position after the decoded object)
+    """
+    if not data:
+        return data
+    if not isinstance(data, bytes):
+        raise NotImplementedError("This should never happen")
+
+    index = data.index
+    # The container being filled is kept in local variables,
+    # its parents are saved on the stack as (kind, container, key) tuples
+    stack = []
+    kind = _KIND_ROOT
+    container = None
+    key = _noKey
+    i = 0
+    while True:
+        marker = data[i]
+        if marker == 115 or marker == 117:  # s, u
+            colon = index(b":", i + 1)
+            i = colon + 1 + int(data[i + 1 : colon])
+            value = data[colon + 1 : i].decode(errors="surrogateescape")
+        elif marker == 105 or marker == 73:  # i, I
+            end = index(b"e", i + 1)
+            value = int(data[i + 1 : end])
+            i = end + 1
+        elif marker == 101 and (kind == _KIND_LIST or kind == _KIND_DICT or kind == _KIND_TUPLE):  # e
+            value = tuple(container) if kind == _KIND_TUPLE else container
+            kind, container, key = stack.pop()
+            i += 1
+        elif marker == 108 or marker == 116:  # l, t
+            stack.append((kind, container, key))
+            kind = _KIND_LIST if marker == 108 else _KIND_TUPLE
+            container = []
+            i += 1
+            continue
+        elif marker == 100:  # d
+            stack.append((kind, container, key))
+            kind = _KIND_DICT
+            container = {}
+            key = _noKey
+            i += 1
+            continue
+        elif marker == 122:  # z
+            stack.append((kind, container, key))
+            kind = _KIND_DATETIME
+            container = _dateTimeConstructors[data[i + 1]]
+            i += 2
+            continue
+        elif marker == 110:  # n
+            value = None
+            i += 1
+        elif marker == 98:  # b
+            value = data[i + 1] != 48
+            i += 2
+        elif marker == 102:  # f
+            value, i = decodeFloat(data, i)
+        else:
+            raise KeyError(marker)
+
+        # Attach the decoded value to the container being filled
+        while True:
+            if kind == _KIND_DICT:
+                if key is _noKey:
+                    key = value
+                else:
+                    container[key] = value
+                    key = _noKey
+            elif kind == _KIND_LIST or kind == _KIND_TUPLE:
+                container.append(value)
+            elif kind == _KIND_DATETIME:
+                value = container(*value)
+                kind, container, key = stack.pop()
+                continue
+            else:
+                return (value, i)
+            break
+
+
+class StreamDecoder:
+    """Resumable decoder, fed with chunks of encoded data as they arrive
+
+    Instead of building the whole decoded object in memory, the items of the containers
+    (dict, list, tuple) located ``streamDepth`` levels below the root are handed back
+    to the caller as soon as they are complete, and are not kept in the final result.
+    Each streamed item is returned as a tuple ``(path, key, value)``, where ``path`` is the
+    tuple of keys leading from the root to the container, and ``key`` is the dictionary key
+    or the list index of the item.
+
+    For example, with ``streamDepth=2``, decoding ``S_OK({"Successful": {lfn: replicas}, "Failed": {}})``
+    yields ``(("Value", "Successful"), lfn, replicas)`` for every LFN, and the final result is
+    ``{"OK": True, "Value": {"Successful": {}, "Failed": {}}}``.
+
+    Only the items of dictionaries and lists are streamed, tuples are always decoded as a whole.
+    The streaming can be restricted to the containers whose path starts with ``streamPath``,
+    for example ``("Value",)`` to leave the other keys of an S_OK/S_ERROR structure untouched.
+    """
+
+    def __init__(self, streamDepth=1, streamPath=()):
+        """C'tor
+
+        :param int streamDepth: depth of the containers whose items are streamed (0 is the root)
+        :param tuple streamPath: only stream the containers whose path starts with it
+        """
+        self.streamDepth = streamDepth
+        self.streamPath = tuple(streamPath)
+        self.__buffer = bytearray()
+        # Each frame is a list [kind, container, pending dict key, path, number of items, streamed]
+        self.__stack = []
+        self.__result = _noKey
+        self.__consumed = 0
+
+    def isComplete(self):
+        """Whether a complete object has been decoded"""
+        return self.__result is not _noKey
+
+    def getDecodedLength(self):
+        """Number of bytes consumed so far"""
+        return self.__consumed
+
+    def feed(self, chunk, final=False):
+        """Add some encoded data and decode as much as possible of it
+
+        :param bytes chunk: next chunk of encoded data
+        :param bool final: True if no more data will be fed
+
+        :returns: list of the items (path, key, value) completed with this chunk
+        """
+        self.__buffer += chunk
+        entries = []
+        consumed = self.__parse(entries, final)
+        del self.__buffer[:consumed]
+        self.__consumed += consumed
+        return entries
+
+    def close(self):
+        """Finish the decoding
+
+        :returns: the decoded object, without the streamed items
+        """
+        self.feed(b"", final=True)
+        if not self.isComplete() or self.__buffer:
+            raise ValueError("Incomplete or trailing data in the encoded stream")
+        return self.__result
+
+    def __pushContainer(self, kind, container):
+        """Start decoding a new container"""
+        stack = self.__stack
+        depth = 0
+        path = ()
+        streamed = False
+        if stack:
+            parent = stack[-1]
+            # Containers used as keys or inside datetimes are never streamed
+            if parent[3] is None or parent[0] == _KIND_DATETIME or (parent[0] == _KIND_DICT and parent[2] is _noKey):
+                depth = None
+            else:
+                depth = len(parent[3]) + 1
+                path = parent[3] + ((parent[2] if parent[0] == _KIND_DICT else parent[4]),)
+        if depth is None or depth > self.streamDepth:
+            path = None
+        else:
+            streamed = (
+                depth == self.streamDepth and kind != _KIND_TUPLE and path[: len(self.streamPath)] == self.streamPath
+            )
+        stack.append([kind, container, _noKey, path, 0, streamed])
+
+    def __attach(self, value, entries):
+        """Attach a decoded value to the container being decoded"""
+        stack = self.__stack
+        while True:
+            if not stack:
+                self.__result = value
+                return
+            frame = stack[-1]
+            kind = frame[0]
+            if kind == _KIND_DATETIME:
+                stack.pop()
+                value = frame[1](*value)
+                continue
+            if kind == _KIND_DICT:
+                if frame[2] is _noKey:
+                    frame[2] = value
+                    return
+                key = frame[2]
+                frame[2] = _noKey
+                if frame[5]:
+                    entries.append((frame[3], key, value))
+                else:
+                    frame[1][key] = value
+            else:
+                if frame[5]:
+                    entries.append((frame[3], frame[4], value))
+                else:
+                    frame[1].append(value)
+            frame[4] += 1
+            return
+
+    def __parse(self, entries, final):
+        """Decode all the complete values present in the buffer
+
+        :returns: number of bytes consumed
+        """
+        buf = self.__buffer
+        stack = self.__stack
+        length = len(buf)
+        i = 0
+        while i < length:
+            if self.__result is not _noKey:
+                raise ValueError("Trailing data after the end of the encoded object")
+            marker = buf[i]
+            if marker == 115 or marker == 117:  # s, u
+                colon = buf.find(b":", i + 1)
+                if colon == -1:
+                    break
+                end = colon + 1 + int(buf[i + 1 : colon])
+                if end > length:
+                    break
+                value = buf[colon + 1 : end].decode(errors="surrogateescape")
+                i = end
+            elif marker == 105 or marker == 73:  # i, I
+                end = buf.find(b"e", i + 1)
+                if end == -1:
+                    break
+                value = int(buf[i + 1 : end])
+                i = end + 1
+            elif marker == 102:  # f
+                end = buf.find(b"e", i + 1)
+                # We need the next byte to know whether there is an exponent
+                if end == -1 or (end + 1 == length and not final):
+                    break
+                if end + 1 < length and buf[end + 1] in (43, 45):  # +, -
+                    expEnd = buf.find(b"e", end + 1)
+                    if expEnd == -1:
+                        break
+                    value = float(buf[i + 1 : end].decode()) * 10 ** int(buf[end + 1 : expEnd].decode())
+                    i = expEnd + 1
+                else:
+                    value = float(buf[i + 1 : end].decode())
+                    i = end + 1
+            elif marker == 98:  # b
+                if i + 1 >= length:
+                    break
+                value = buf[i + 1] != 48
+                i += 2
+            elif marker == 110:  # n
+                value = None
+                i += 1
+            elif marker == 101 and stack and stack[-1][0] != _KIND_DATETIME:  # e
+                frame = stack.pop()
+                value = tuple(frame[1]) if frame[0] == _KIND_TUPLE else frame[1]
+                i += 1
+            elif marker == 108:  # l
+                self.__pushContainer(_KIND_LIST, [])
+                i += 1
+                continue
+            elif marker == 116:  # t
+                self.__pushContainer(_KIND_TUPLE, [])
+                i += 1
+                continue
+            elif marker == 100:  # d
+                self.__pushContainer(_KIND_DICT, {})
+                i += 1
+                continue
+            elif marker == 122:  # z
+                if i + 1 >= length:
+                    break
+                self.__pushContainer(_KIND_DATETIME, _dateTimeConstructors[buf[i + 1]])
+                i += 2
+                continue
+            else:
+                raise KeyError(marker)
+            self.__attach(value, entries)
+        return i
+
+
+def streamEntries(uObject, streamDepth=1, streamPath=()):
+    """Generator giving the same items as :py:class:`StreamDecoder` for an already decoded object
+
+    The streamed containers are emptied, so that once the generator is exhausted,
+    ``uObject`` is what :py:meth:`StreamDecoder.close` would have returned.
+
+    :param uObject: decoded object
+    :param int streamDepth: depth of the containers whose items are streamed (0 is the root)
+    :param tuple streamPath: only stream the containers whose path starts with it
+    """
+    streamPath = tuple(streamPath)
+
+    def containersAtDepth(obj, path):
+        if not isinstance(obj, (dict, list, tuple)):
+            return
+        if len(path) == streamDepth:
+            if not isinstance(obj, tuple) and path[: len(streamPath)] == streamPath:
+                yield path, obj
+            return
+        items = obj.items() if isinstance(obj, dict) else enumerate(obj)
+        for key, value in items:
+            yield from containersAtDepth(value, path + (key,))
+
+    # Materialize the list first since the containers are modified while streaming
+    for path, container in list(containersAtDepth(uObject, ())):
+        items = container.items() if isinstance(container, dict) else enumerate(container)
+        for key, value in items:
+            yield (path, key, value)
+        container.clear()
+    return uObject
+
+
+class StreamedResult:
+    """Iterate over the items produced by a streamed decoding
+
+    Once the iteration is over, the ``result`` attribute contains what is left
+    of the decoded object, typically the S_OK/S_ERROR structure with the
+    streamed containers left empty.
+
+    The resources of the decoding (e.g. the connection it reads from) are released
+    at the end of the iteration, by :py:meth:`close`, when leaving a ``with`` block,
+    or when the object is garbage collected, whichever comes first.
+    """
+
+    def __init__(self, entries, onClose=None):
+        """C'tor
+
+        :param entries: generator of (path, key, value) returning the rest of the decoded object
+        :param callable onClose: called once, when the decoding is over or abandoned
+        """
+        self.__entries = entries
+        self.__onClose = onClose
+        self.result = None
+
+    def __iter__(self):
+        try:
+            self.result = yield from self.__entries
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop the decoding and release its resources"""
+        onClose, self.__onClose = self.__onClose, None
+        try:
+            self.__entries.close()
+        finally:
+            if onClose:
+                onClose()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+# Encode function
+def encode(uObject):
+    """Generic encoding function"""
+    if DIRAC_USE_RECURSIVE_DENCODE or DIRAC_DEBUG_DENCODE_CALLSTACK:
+        return recursiveEncode(uObject)
+    return iterativeEncode(uObject)
+
+
+def decode(data):
+    """Generic decoding function"""
+    if DIRAC_USE_RECURSIVE_DENCODE or DIRAC_DEBUG_DENCODE_CALLSTACK:
+        return recursiveDecode(data)
+    return iterativeDecode(data)
+
+
 if __name__ == "__main__":
     gObject = {2: "3", True: (3, None), 2.0 * 10**20: 2.0 * 10**-10}
     print(f"Initial: {gObject}")
@@ -2,13 +2,126 @@
   DictCache.
 """
 import datetime
+import heapq
+import itertools
+import math
+import sys
 import threading
+import time
 import weakref
+from collections import OrderedDict
 
 # DIRAC
 from DIRAC.Core.Utilities.LockRing import LockRing
 
 
+class CacheStore(OrderedDict):
+    """Dictionary holding the records of a DictCache, together with the structures used
+    to expire and evict them without scanning all the records.
+
+    The records are kept in least recently used order (the first one is the oldest).
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Heap of (expirationTime, sequence number, key), used to find the expired records
+        self.expirationHeap = []
+        # Total size of the values, as computed by the size function
+        self.totalBytes = 0
+        # For the LFU eviction: {number of hits: OrderedDict(key: None)} and the lowest number of hits
+        self.frequencies = {}
+        self.minFrequency = 0
+        # Last time the expired records were swept
+        self.lastSweep = time.monotonic()
+
+    def insert(self, cKey, record):
+        """Add (or replace) a record"""
+        self.remove(cKey)
+        self[cKey] = record
+        self.totalBytes += record["size"]
+        heapq.heappush(self.expirationHeap, (record["expirationTime"], record["seq"], cKey))
+        self.frequencies.setdefault(0, OrderedDict())[cKey] = None
+        self.minFrequency = 0
+        # Remove the outdated entries of the heap when it gets too big
+        if len(self.expirationHeap) > 2 * len(self) + 64:
+            self.expirationHeap = [entry for entry in self.expirationHeap if self.isCurrent(entry)]
+            heapq.heapify(self.expirationHeap)
+
+    def remove(self, cKey):
+        """Remove a record
+
+        :return: the removed record, or None if it is not there
+        """
+        record = self.pop(cKey, None)
+        if record is None:
+            return None
+        self.totalBytes -= record["size"]
+        bucket = self.frequencies[record["hits"]]
+        del bucket[cKey]
+        if not bucket:
+            del self.frequencies[record["hits"]]
+        return record
+
+    def touch(self, cKey, record):
+        """Record an access to a record"""
+        self.move_to_end(cKey)
+        hits = record["hits"]
+        bucket = self.frequencies[hits]
+        del bucket[cKey]
+        if not bucket:
+            del self.frequencies[hits]
+            if self.minFrequency == hits:
+                self.minFrequency = hits + 1
+        record["hits"] = hits + 1
+        self.frequencies.setdefault(hits + 1, OrderedDict())[cKey] = None
+
+    def isCurrent(self, heapEntry):
+        """Whether an entry of the expiration heap still corresponds to a record"""
+        record = self.get(heapEntry[2])
+        return record is not None and record["seq"] == heapEntry[1]
+
+    def popExpired(self, limitTime):
+        """Remove the records expiring before limitTime
+
+        :return: list of removed records
+        """
+        removed = []
+        heap = self.expirationHeap
+        while heap and heap[0][0] < limitTime:
+            heapEntry = heapq.heappop(heap)
+            if self.isCurrent(heapEntry):
+                removed.append(self.remove(heapEntry[2]))
+        return removed
+
+    def victim(self, evictionPolicy, protectedKey=None):
+        """Return the key of the record to evict first
+
+        :param str evictionPolicy: LRU or LFU
+        :param protectedKey: key to evict only if it is the last one (typically the one just added)
+        """
+        if evictionPolicy == "LFU":
+            if self.minFrequency not in self.frequencies:
+                self.minFrequency = min(self.frequencies)
+            candidates = self.frequencies[self.minFrequency]
+            if len(candidates) == 1 and protectedKey in candidates and len(self) > 1:
+                candidates = itertools.chain.from_iterable(
+                    self.frequencies[frequency] for frequency in sorted(self.frequencies)
+                )
+        else:
+            candidates = self
+        for cKey in candidates:
+            if cKey != protectedKey:
+                return cKey
+        return protectedKey
+
+    def clear(self):
+        super().clear()
+        self.expirationHeap = []
+        self.totalBytes = 0
+        self.frequencies = {}
+        self.minFrequency = 0
+
+
 class ThreadLocalDict(threading.local):
     """This class is just useful to have a mutable object (in this case, a dict) as a thread local
     Read the _threading_local docstring for more details.
@@ -20,7 +133,7 @@ class ThreadLocalDict(threading.local):
         """c'tor"""
         # Note: it is on purpose that the threading.local constructor is not called
         # Dictionary, local to a thread, that will be used as such
-        self.cache = {}
+        self.cache = CacheStore()
 
 
 class MockLockRing:
@@ -37,33 +150,72 @@ class DictCache:
     The user can decide whether this cache should be shared among the threads or not, but it is always thread safe
     Note that when shared, the access to the cache is protected by a lock, but not necessarily the
     object you are retrieving from it.
+
+    Optionally, the cache can be bounded in number of records (maxEntries) and/or in size (maxBytes).
+    When a bound is exceeded, the expired records are removed first, and then the least recently
+    used (evictionPolicy="LRU") or least frequently used (evictionPolicy="LFU") records are evicted.
+    If sweepInterval is set, expired records are also swept every sweepInterval seconds when
+    adding records, so that they do not accumulate when purgeExpired is never called.
     """
 
-    def __init__(self, deleteFunction=False, threadLocal=False):
+    EVICTION_POLICIES = ("LRU", "LFU")
+
+    def __init__(
+        self,
+        deleteFunction=False,
+        threadLocal=False,
+        maxEntries=0,
+        maxBytes=0,
+        evictionPolicy="LRU",
+        sizeFunction=sys.getsizeof,
+        sweepInterval=0,
+        lock=None,
+    ):
         """Initialize the dict cache.
 
         :param deleteFunction: if not False, invoked when deleting a cached object
         :param threadLocal: if False, the cache will be shared among all the threads, otherwise,
                             each thread gets its own cache.
+        :param int maxEntries: maximum number of records (0 for no limit)
+        :param int maxBytes: maximum total size of the values, as computed by sizeFunction (0 for no limit)
+        :param str evictionPolicy: "LRU" or "LFU"
+        :param sizeFunction: function giving the size in bytes of a value
+        :param int sweepInterval: minimum number of seconds between two sweeps of the expired records
+                                  (0, the default, to only purge them with purgeExpired)
+        :param lock: lock protecting this cache, if it should not be the one shared by all the
+                     DictCache instances. Ignored for thread local caches.
         """
+        if evictionPolicy not in self.EVICTION_POLICIES:
+            raise ValueError(f"Unknown eviction policy {evictionPolicy}")
 
         self.__threadLocal = threadLocal
 
         # Placeholder either for a LockRing if the cache is shared,
         # or a mock class if not.
-        self.__lock = None
+        self.__lock = lock if not threadLocal else None
 
         # One of the following two objects is returned
         # by the __cache property, depending on the threadLocal strategy
 
         # This is the Placeholder for a shared cache
-        self.__sharedCache = {}
+        self.__sharedCache = CacheStore()
         # This is the Placeholder for a shared cache
         self.__threadLocalCache = ThreadLocalDict()
 
         # Function to clean the elements
         self.__deleteFunction = deleteFunction
 
+        self.__maxEntries = max(0, maxEntries)
+        self.__maxBytes = max(0, maxBytes)
+        self.__evictionPolicy = evictionPolicy
+        self.__sizeFunction = sizeFunction if self.__maxBytes else None
+        self.__sweepInterval = sweepInterval
+        self.__sequence = itertools.count()
+        self.__stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        # The statistics are shared among the threads even when the records are not,
+        # in which case the lock of the cache does not protect them
+        self.__statsLock = threading.Lock() if threadLocal else MockLockRing()
+
         # Called when this object is deleted or the program ends
         self.__finalizer = weakref.finalize(self, _purgeAll, None, self.__cache, self.__deleteFunction)
 
@@ -92,6 +244,70 @@ class DictCache:
 
         return self.__sharedCache
 
+    def __count(self, counter, number=1):
+        """Increment a statistics counter. Must be called with the lock held."""
+        self.__statsLock.acquire()
+        try:
+            self.__stats[counter] += number
+        finally:
+            self.__statsLock.release()
+
+    def __getValid(self, cKey, validSeconds):
+        """Get the record of a key if it is valid for the given number of seconds.
+        Expired records are deleted. Must be called with the lock held.
+
+        :return: record or None
+        """
+        record = self.__cache.get(cKey)
+        if record is None:
+            self.__count("misses")
+            return None
+        # If it's valid return it!
+        if record["expirationTime"] > datetime.datetime.now() + datetime.timedelta(seconds=validSeconds):
+            self.__count("hits")
+            self.__cache.touch(cKey, record)
+            return record
+
+        # Delete expired
+        self.__count("misses")
+        self.__count("expirations")
+        self.delete(cKey)
+        return None
+
+    def __discard(self, records, counter):
+        """Call the delete function on removed records and count them"""
+        self.__count(counter, len(records))
+        if self.__deleteFunction:
+            for record in records:
+                self.__deleteFunction(record["value"])
+
+    def __sweep(self, force=False):
+        """Remove the expired records if the last sweep is old enough. Must be called with the lock held."""
+        cache = self.__cache
+        now = time.monotonic()
+        if force or (self.__sweepInterval and now - cache.lastSweep > self.__sweepInterval):
+            cache.lastSweep = now
+            self.__discard(cache.popExpired(datetime.datetime.now()), "expirations")
+
+    def __isOverLimits(self):
+        cache = self.__cache
+        return (self.__maxEntries and len(cache) > self.__maxEntries) or (
+            self.__maxBytes and cache.totalBytes > self.__maxBytes
+        )
+
+    def __enforceLimits(self, protectedKey):
+        """Evict records until the cache fits in its limits. Must be called with the lock held.
+
+        :param protectedKey: key evicted only if it alone exceeds the limits
+        """
+        if not self.__isOverLimits():
+            return
+        # Expired records go first
+        self.__sweep(force=True)
+        cache = self.__cache
+        while cache and self.__isOverLimits():
+            self.__discard([cache.remove(cache.victim(self.__evictionPolicy, protectedKey))], "evictions")
+
     def exists(self, cKey, validSeconds=0):
         """Returns True/False if the key exists for the given number of seconds
 
@@ -102,16 +318,7 @@ class DictCache:
         """
         self.lock.acquire()
         try:
-            # Is the key in the cache?
-            if cKey in self.__cache:
-                expTime = self.__cache[cKey]["expirationTime"]
-                # If it's valid return True!
-                if expTime > datetime.datetime.now() + datetime.timedelta(seconds=validSeconds):
-                    return True
-
-                # Delete expired
-                self.delete(cKey)
-            return False
+            return self.__getValid(cKey, validSeconds) is not None
         finally:
             self.lock.release()
 
@@ -122,11 +329,9 @@ class DictCache:
         """
         self.lock.acquire()
         try:
-            if cKey not in self.__cache:
-                return
-            if self.__deleteFunction:
-                self.__deleteFunction(self.__cache[cKey]["value"])
-            del self.__cache[cKey]
+            record = self.__cache.remove(cKey)
+            if record is not None and self.__deleteFunction:
+                self.__deleteFunction(record["value"])
         finally:
             self.lock.release()
 
@@ -141,8 +346,16 @@ class DictCache:
             return
         self.lock.acquire()
         try:
-            vD = {"expirationTime": datetime.datetime.now() + datetime.timedelta(seconds=validSeconds), "value": value}
-            self.__cache[cKey] = vD
+            vD = {
+                "expirationTime": datetime.datetime.now() + datetime.timedelta(seconds=validSeconds),
+                "value": value,
+                "size": self.__sizeFunction(value) if self.__sizeFunction else 0,
+                "hits": 0,
+                "seq": next(self.__sequence),
+            }
+            self.__cache.insert(cKey, vD)
+            self.__sweep()
+            self.__enforceLimits(cKey)
         finally:
             self.lock.release()
 
@@ -156,16 +369,42 @@ class DictCache:
         """
         self.lock.acquire()
         try:
-            # Is the key in the cache?
-            if cKey in self.__cache:
-                expTime = self.__cache[cKey]["expirationTime"]
-                # If it's valid return True!
-                if expTime > datetime.datetime.now() + datetime.timedelta(seconds=validSeconds):
-                    return self.__cache[cKey]["value"]
-
-                # Delete expired
-                self.delete(cKey)
-            return None
+            record = self.__getValid(cKey, validSeconds)
+            return record["value"] if record is not None else None
+        finally:
+            self.lock.release()
+
+    def getMany(self, cKeys, validSeconds=0):
+        """Get several records from the cache, taking the lock only once
+
+        :param cKeys: iterable of identification keys
+        :param int validSeconds: The amount of seconds the keys have to be valid for
+
+        :return: dict {key: value} of the keys found in the cache
+        """
+        self.lock.acquire()
+        try:
+            result = {}
+            for cKey in cKeys:
+                record = self.__getValid(cKey, validSeconds)
+                if record is not None:
+                    result[cKey] = record["value"]
+            return result
+        finally:
+            self.lock.release()
+
+    def addMany(self, records, validSeconds):
+        """Add several records to the cache, taking the lock only once
+
+        :param dict records: {key: value} of the records to add
+        :param int validSeconds: valid seconds of these records
+        """
+        if max(0, validSeconds) == 0:
+            return
+        self.lock.acquire()
+        try:
+            for cKey, value in records.items():
+                self.add(cKey, validSeconds, value)
         finally:
             self.lock.release()
 
@@ -204,6 +443,25 @@ class DictCache:
         finally:
             self.lock.release()
 
+    def getStatistics(self):
+        """Get the usage counters of the cache, to be sent to the monitoring
+
+        :return: dict with the number of hits, misses, evictions and expirations since the creation
+                 of the cache, and the current number of entries and size in bytes
+        """
+        self.lock.acquire()
+        try:
+            self.__statsLock.acquire()
+            try:
+                stats = dict(self.__stats)
+            finally:
+                self.__statsLock.release()
+            stats["entries"] = len(self.__cache)
+            stats["bytes"] = self.__cache.totalBytes
+            return stats
+        finally:
+            self.lock.release()
+
     def purgeExpired(self, expiredInSeconds=0):
         """Purge all entries that are expired or will be expired in <expiredInSeconds>
 
@@ -211,15 +469,8 @@ class DictCache:
         """
         self.lock.acquire()
         try:
-            keys = []
             limitTime = datetime.datetime.now() + datetime.timedelta(seconds=expiredInSeconds)
-            for cKey, cValue in self.__cache.items():
-                if cValue["expirationTime"] < limitTime:
-                    keys.append(cKey)
-            for key in keys:
-                if self.__deleteFunction:
-                    self.__deleteFunction(self.__cache[key]["value"])
-                del self.__cache[key]
+            self.__discard(self.__cache.popExpired(limitTime), "expirations")
         finally:
             self.lock.release()
 
@@ -232,6 +483,107 @@ class DictCache:
         _purgeAll(self.lock if useLock else None, self.__cache, self.__deleteFunction)
 
 
+class ShardedDictCache:
+    """DictCache split in several independently locked segments.
+
+    The keys are distributed among the segments according to their hash, so that
+    threads accessing different keys rarely wait for each other. It offers the same
+    interface as the DictCache, the limits (maxEntries, maxBytes) being shared evenly
+    between the segments.
+    """
+
+    def __init__(self, nbShards=16, deleteFunction=False, maxEntries=0, maxBytes=0, **kwargs):
+        """Initialize the sharded cache
+
+        :param int nbShards: number of segments
+        :param deleteFunction: if not False, invoked when deleting a cached object
+        :param int maxEntries: maximum number of records (0 for no limit)
+        :param int maxBytes: maximum total size of the values (0 for no limit)
+        :param kwargs: other parameters given to each DictCache segment
+        """
+        self.__nbShards = max(1, nbShards)
+        self.__shards = [
+            DictCache(
+                deleteFunction=deleteFunction,
+                maxEntries=math.ceil(maxEntries / self.__nbShards),
+                maxBytes=math.ceil(maxBytes / self.__nbShards),
+                lock=threading.RLock(),
+                **kwargs,
+            )
+            for _ in range(self.__nbShards)
+        ]
+
+    def __getShard(self, cKey):
+        return self.__shards[hash(cKey) % self.__nbShards]
+
+    def __groupByShard(self, cKeys):
+        """Group keys by segment
+
+        :return: dict {segment index: list of keys}
+        """
+        groups = {}
+        for cKey in cKeys:
+            groups.setdefault(hash(cKey) % self.__nbShards, []).append(cKey)
+        return groups
+
+    def exists(self, cKey, validSeconds=0):
+        """See :py:meth:`DictCache.exists`"""
+        return self.__getShard(cKey).exists(cKey, validSeconds=validSeconds)
+
+    def delete(self, cKey):
+        """See :py:meth:`DictCache.delete`"""
+        self.__getShard(cKey).delete(cKey)
+
+    def add(self, cKey, validSeconds, value=None):
+        """See :py:meth:`DictCache.add`"""
+        self.__getShard(cKey).add(cKey, validSeconds, value)
+
+    def get(self, cKey, validSeconds=0):
+        """See :py:meth:`DictCache.get`"""
+        return self.__getShard(cKey).get(cKey, validSeconds=validSeconds)
+
+    def getMany(self, cKeys, validSeconds=0):
+        """See :py:meth:`DictCache.getMany`"""
+        result = {}
+        for shardIndex, shardKeys in self.__groupByShard(cKeys).items():
+            result.update(self.__shards[shardIndex].getMany(shardKeys, validSeconds=validSeconds))
+        return result
+
+    def addMany(self, records, validSeconds):
+        """See :py:meth:`DictCache.addMany`"""
+        for shardIndex, shardKeys in self.__groupByShard(records).items():
+            self.__shards[shardIndex].addMany({cKey: records[cKey] for cKey in shardKeys}, validSeconds)
+
+    def showContentsInString(self):
+        """See :py:meth:`DictCache.showContentsInString`"""
+        return "\n".join(shard.showContentsInString() for shard in self.__shards)
+
+    def getKeys(self, validSeconds=0):
+        """See :py:meth:`DictCache.getKeys`"""
+        keys = []
+        for shard in self.__shards:
+            keys.extend(shard.getKeys(validSeconds=validSeconds))
+        return keys
+
+    def getStatistics(self):
+        """See :py:meth:`DictCache.getStatistics`, summed over all the segments"""
+        stats = {}
+        for shard in self.__shards:
+            for counter, value in shard.getStatistics().items():
+                stats[counter] = stats.get(counter, 0) + value
+        return stats
+
+    def purgeExpired(self, expiredInSeconds=0):
+        """See :py:meth:`DictCache.purgeExpired`"""
+        for shard in self.__shards:
+            shard.purgeExpired(expiredInSeconds=expiredInSeconds)
+
+    def purgeAll(self, useLock=True):
+        """See :py:meth:`DictCache.purgeAll`"""
+        for shard in self.__shards:
+            shard.purgeAll(useLock=useLock)
+
+
 def _purgeAll(lock, cache, deleteFunction):
     """Purge all entries
 
@@ -241,10 +593,10 @@ def _purgeAll(lock, cache, deleteFunction):
     if lock:
         lock.acquire()
     try:
-        for cKey in list(cache):
-            if deleteFunction:
+        if deleteFunction:
+            for cKey in list(cache):
                 deleteFunction(cache[cKey]["value"])
-            del cache[cKey]
+        cache.clear()
     finally:
         if lock:
             lock.release()
@@ -1,6 +1,6 @@
 """ DIRAC Basic MySQL Class
     It provides access to the basic MySQL methods in a multithread-safe mode
-    keeping used connections in a python Queue for further reuse.
+    keeping used connections in a bounded pool for further reuse.
 
     These are the coded methods:
 
@@ -32,20 +32,36 @@
     _query( cmd, [conn=conn] )
 
     Executes SQL command "cmd".
-    Gets a connection from the Queue (or open a new one if none is available),
-    the used connection is  back into the Queue.
+    Checks out a connection from the pool (or open a new one if none is available),
+    the used connection is given back to the pool.
     If a connection to the the DB is passed as second argument this connection
-    is used and is not  in the Queue.
+    is used and is not taken from the pool.
     Returns S_OK with fetchall() out in Value or S_ERROR upon failure.
 
 
     _update( cmd, [conn=conn] )
 
     Executes SQL command "cmd" and issue a commit
-    Gets a connection from the Queue (or open a new one if none is available),
-    the used connection is  back into the Queue.
+    Checks out a connection from the pool (or open a new one if none is available),
+    the used connection is given back to the pool.
     If a connection to the the DB is passed as second argument this connection
-    is used and is not  in the Queue
+    is used and is not taken from the pool
+    Returns S_OK with number of updated registers in Value or S_ERROR upon failure.
+
+
+    _query( cmd, params=params ) / _update( cmd, params=params )
+
+    The command can also be a template with "%s" placeholders, the values being
+    given in "params". The values are then escaped and quoted by the driver in one go,
+    which is cheaper than escaping them one by one with _escapeValues.
+    A literal "%" in such a template has to be written "%%".
+
+
+    _updateMany( cmd, paramsList, [conn=conn] )
+
+    Executes the template "cmd" once for each tuple of parameters in "paramsList",
+    using the same cursor. For "INSERT ... VALUES" templates, the driver sends
+    multi-rows inserts.
     Returns S_OK with number of updated registers in Value or S_ERROR upon failure.
 
 
@@ -56,10 +72,11 @@
 
     _getConnection()
 
-    Gets a connection from the Queue (or open a new one if none is available)
+    Gets the connection pinned to the current thread (or open a new one if none is available)
     Returns S_OK with connection in Value or S_ERROR
-    the calling method is responsible for closing this connection once it is no
-    longer needed.
+    The connection stays pinned until it is given back with _releaseConnection(), the end of
+    the service request or agent cycle (see releaseThreadConnections), the thread dies, or it
+    is idle for longer than the grace time.
 
 
 
@@ -90,6 +107,13 @@
       String type values will be appropriately escaped.
 
 
+    insertManyFields( self, tableName, inFields, rows, chunkSize = 1000, onDuplicate = None, conn = None ):
+
+      Insert many rows in "tableName", each row giving the values of "inFields".
+      Rows are sent by multi-VALUES inserts of "chunkSize" rows, in a single transaction.
+      "onDuplicate" says what to do with rows conflicting with an existing key.
+
+
     updateFields( self, tableName, updateFields = None, updateValues = None,
                   condDict = None,
                   limit = False, conn = None,
@@ -152,6 +176,8 @@ import json
 import os
 import time
 import threading
+from contextlib import contextmanager
+
 import MySQLdb
 
 from DIRAC import gLogger
@@ -162,6 +188,9 @@ from DIRAC.Core.Utilities import DErrno
 gInstancesCount = 0
 MAXCONNECTRETRY = 10
 RETRY_SLEEP_DURATION = 5
+# MySQL client errors meaning that the connection is not usable anymore
+# (server has gone away, lost connection, lost connection during query)
+CONNECTION_LOST_ERRORS = (2006, 2013, 2055)
 
 
 def _checkFields(inFields, inValues):
@@ -324,7 +353,23 @@ def captureOptimizerTraces(meth):
 
 class ConnectionPool:
     """
-    Management of connections per thread
+    Bounded pool of connections
+
+    Connections are normally checked out for the duration of a single statement
+    (checkout/checkin) and shared by all the threads, so that the number of connections
+    depends on the concurrency rather than on the number of threads ever seen.
+    At most maxSize such connections are open, and threads wait for a free one
+    when they are all in use.
+
+    A connection can also be pinned to a thread when several statements have to run on the
+    same connection: either explicitly with get() (the connection then stays with the
+    thread until it is given back with release(), the thread dies or the grace time expires),
+    or for the duration of a transaction (transactionStart/transactionCommit/transactionRollback).
+    While a thread has a pinned connection, all its statements use it. Pinned connections count
+    in maxSize: pinning a connection waits for a free one as checkout does.
+
+    Idle connections are health checked (ping) only when they have not been used for
+    pingAfterIdle seconds, and closed after maxIdleTime seconds.
     """
 
     # The idea of the grace time is that a given thread should not keep a connection object for too long
@@ -341,16 +386,56 @@ class ConnectionPool:
     except Exception:
         MYSQL_CONNECTION_GRACE_TIME = 600
 
-    def __init__(self, host, user, passwd, port=3306, graceTime=MYSQL_CONNECTION_GRACE_TIME):
+    # Maximum number of connections checked out at the same time
+    try:
+        MYSQL_POOL_MAX_SIZE = int(os.environ.get("DIRAC_MYSQL_POOL_MAX_SIZE"))
+    except Exception:
+        MYSQL_POOL_MAX_SIZE = 20
+
+    # Maximum number of seconds to wait for a connection
+    MYSQL_POOL_WAIT_TIMEOUT = 120
+    # Idle connections are pinged before being used if they have not been used for that many seconds
+    MYSQL_PING_AFTER_IDLE = 30
+    # Idle connections are closed after that many seconds
+    MYSQL_MAX_IDLE_TIME = 600
+    # Minimum number of seconds between two cleanings
+    MYSQL_CLEAN_INTERVAL = 30
+
+    def __init__(
+        self,
+        host,
+        user,
+        passwd,
+        port=3306,
+        graceTime=MYSQL_CONNECTION_GRACE_TIME,
+        maxSize=MYSQL_POOL_MAX_SIZE,
+        waitTimeout=MYSQL_POOL_WAIT_TIMEOUT,
+        pingAfterIdle=MYSQL_PING_AFTER_IDLE,
+        maxIdleTime=MYSQL_MAX_IDLE_TIME,
+    ):
         self.__host = host
         self.__user = user
         self.__passwd = passwd
         self.__port = port
         self.__graceTime = graceTime
-        self.__spares = collections.deque()
-        self.__maxSpares = 10
+        self.__maxSize = max(1, maxSize)
+        self.__waitTimeout = waitTimeout
+        self.__pingAfterIdle = pingAfterIdle
+        self.__maxIdleTime = maxIdleTime
         self.__lastClean = 0
+        self.__cond = threading.Condition()
+        # Each connection is kept in a list [connection, selected db name, last use timestamp]
+        # Idle connections, the most recently used at the end
+        self.__idle = collections.deque()
+        # {id(connection): record} of the connections checked out
+        self.__checkedOut = {}
+        # {thread: record + [in a transaction, pinned by get]} of the connections pinned to a thread
         self.__assigned = {}
+        # ids of the connections which got an error and should not be reused
+        self.__broken = set()
+        # Number of connections idle or checked out
+        self.__size = 0
+        self.__stats = collections.Counter()
 
     @property
     def __thid(self):
@@ -360,6 +445,7 @@ class ConnectionPool:
         conn = MySQLdb.connect(host=self.__host, port=self.__port, user=self.__user, passwd=self.__passwd)
 
         self.__execute(conn, "SET AUTOCOMMIT=1")
+        self.__stats["created"] += 1
         return conn
 
     def __execute(self, conn, cmd):
@@ -369,112 +455,252 @@ class ConnectionPool:
         cursor.close()
         return res
 
-    def get(self, dbName, retries=10):
-        retries = max(0, min(MAXCONNECTRETRY, retries))
-        self.clean()
-        return self.__getWithRetry(dbName, retries, retries)
+    def __close(self, conn):
+        self.__broken.discard(id(conn))
+        try:
+            conn.close()
+        except MySQLdb.ProgrammingError as exc:
+            gLogger.warn(f"ProgrammingError exception while closing MySQL connection: {exc}")
+        except Exception as exc:
+            gLogger.warn(f"Exception while closing MySQL connection: {exc}")
 
-    def __getWithRetry(self, dbName, totalRetries, retriesLeft):
+    def __ping(self, conn):
+        self.__stats["pings"] += 1
+        try:
+            conn.ping(True)
+            return True
+        except Exception:
+            return False
+
+    def __prepare(self, record, dbName, totalRetries, retriesLeft):
+        """Make sure the connection of a record is usable and uses the right database.
+        If record[0] is None, a new connection is opened.
+
+        :return: S_OK(connection)/S_ERROR
+        """
         sleepTime = RETRY_SLEEP_DURATION * (totalRetries - retriesLeft)
         if sleepTime > 0:
             time.sleep(sleepTime)
-        try:
-            conn, lastName, thid = self.__innerGet()
-        except MySQLdb.MySQLError as excp:
-            if retriesLeft > 0:
-                return self.__getWithRetry(dbName, totalRetries, retriesLeft - 1)
-            return S_ERROR(DErrno.EMYSQL, f"Could not connect: {excp}")
-
-        if not self.__ping(conn):
+        conn = record[0]
+        now = time.time()
+        if conn is not None and (
+            id(conn) in self.__broken or (now - record[2] > self.__pingAfterIdle and not self.__ping(conn))
+        ):
+            self.__close(conn)
+            conn = record[0] = None
+        if conn is None:
+            record[1] = ""
             try:
-                self.__assigned.pop(thid)
-            except KeyError:
-                pass
-            if retriesLeft > 0:
-                return self.__getWithRetry(dbName, totalRetries, retriesLeft)
-            return S_ERROR(DErrno.EMYSQL, "Could not connect")
-
-        if lastName != dbName:
+                conn = record[0] = self.__newConn()
+            except MySQLdb.MySQLError as excp:
+                if retriesLeft > 0:
+                    return self.__prepare(record, dbName, totalRetries, retriesLeft - 1)
+                return S_ERROR(DErrno.EMYSQL, f"Could not connect: {excp}")
+        if record[1] != dbName:
             try:
                 conn.select_db(dbName)
             except MySQLdb.MySQLError as excp:
+                self.__close(conn)
+                record[0] = None
                 if retriesLeft > 0:
-                    return self.__getWithRetry(dbName, totalRetries, retriesLeft - 1)
+                    return self.__prepare(record, dbName, totalRetries, retriesLeft - 1)
                 return S_ERROR(DErrno.EMYSQL, f"Could not select db {dbName}: {excp}")
-            try:
-                self.__assigned[thid][1] = dbName
-            except KeyError:
-                if retriesLeft > 0:
-                    return self.__getWithRetry(dbName, totalRetries, retriesLeft - 1)
-                return S_ERROR(DErrno.EMYSQL, "Could not connect")
+            record[1] = dbName
+        record[2] = now
         return S_OK(conn)
 
-    def __ping(self, conn):
-        try:
-            conn.ping(True)
-            return True
-        except Exception:
-            return False
+    def __release(self, record):
+        """Give back a connection to the pool. Must be called with the condition held."""
+        conn = record[0]
+        if conn is None or id(conn) in self.__broken or self.__size > self.__maxSize:
+            if conn is not None:
+                self.__close(conn)
+            self.__size -= 1
+        else:
+            record[2] = time.time()
+            self.__idle.append(record[:3])
+        self.__cond.notify()
+
+    def __take(self):
+        """Take an idle connection record, or a new one, waiting while the pool is full.
+        Must be called with the condition held.
+
+        :return: S_OK(record)/S_ERROR
+        """
+        waitStart = None
+        while not self.__idle and self.__size >= self.__maxSize:
+            now = time.monotonic()
+            if waitStart is None:
+                waitStart = now
+                self.__stats["waits"] += 1
+            elif now - waitStart >= self.__waitTimeout:
+                self.__stats["timeouts"] += 1
+                return S_ERROR(DErrno.EMYSQL, f"No MySQL connection available after {self.__waitTimeout}s")
+            self.__cond.wait(self.__waitTimeout - (now - waitStart))
+        if waitStart is not None:
+            waitTime = time.monotonic() - waitStart
+            self.__stats["waitTime"] += waitTime
+            self.__stats["maxWaitTime"] = max(self.__stats["maxWaitTime"], waitTime)
+        if self.__idle:
+            return S_OK(self.__idle.pop())
+        self.__size += 1
+        return S_OK([None, "", time.time()])
+
+    def get(self, dbName, retries=10):
+        """Get the connection pinned to the current thread, pinning one if needed.
+        The connection stays pinned until :py:meth:`release` is called, the thread dies or the grace time expires.
 
-    def __innerGet(self):
+        :return: S_OK(connection)/S_ERROR
+        """
+        return self.__pin(dbName, retries, forTransaction=False)
+
+    def release(self):
+        """Give back the connection pinned to the current thread with :py:meth:`get`.
+        A connection pinned for a transaction is kept until the end of the transaction.
+        """
+        with self.__cond:
+            record = self.__assigned.get(self.__thid)
+            if record is None:
+                return
+            if record[3]:
+                # Given back at the end of the transaction
+                record[4] = False
+            else:
+                self.__unpin(self.__thid)
+
+    def __pin(self, dbName, retries, forTransaction):
+        retries = max(0, min(MAXCONNECTRETRY, retries))
+        self.clean()
         thid = self.__thid
-        now = time.time()
-        if thid in self.__assigned:
-            data = self.__assigned[thid]
-            conn = data[0]
-            data[2] = now
-            return data[0], data[1], thid
-        # Not cached
-        try:
-            conn, dbName = self.__spares.pop()
-        except IndexError:
-            conn = self.__newConn()
-            dbName = ""
+        with self.__cond:
+            record = self.__assigned.get(thid)
+            if record is None:
+                result = self.__take()
+                if not result["OK"]:
+                    return result
+                # The record is pinned for a transaction and/or by get
+                self.__assigned[thid] = result["Value"] + [forTransaction, not forTransaction]
+            elif forTransaction:
+                record[3] = True
+            else:
+                record[4] = True
+            record = self.__assigned[thid]
+        result = self.__prepare(record, dbName, retries, retries)
+        if not result["OK"]:
+            with self.__cond:
+                self.__assigned.pop(thid, None)
+                self.__release(record)
+        return result
 
-        self.__assigned[thid] = [conn, dbName, now]
-        return conn, dbName, thid
+    def checkout(self, dbName, retries=10):
+        """Take a connection from the pool, waiting for one if all of them are in use.
+        It must be given back with :py:meth:`checkin`.
+        If the current thread has a pinned connection, it is returned instead.
 
-    def __pop(self, thid):
-        try:
-            data = self.__assigned.pop(thid)
-            if len(self.__spares) < self.__maxSpares:
-                self.__spares.append((data[0], data[1]))
+        :return: S_OK(connection)/S_ERROR
+        """
+        retries = max(0, min(MAXCONNECTRETRY, retries))
+        thid = self.__thid
+        if time.time() - self.__lastClean > self.MYSQL_CLEAN_INTERVAL:
+            self.clean()
+        with self.__cond:
+            self.__stats["checkouts"] += 1
+            pinned = self.__assigned.get(thid)
+            if pinned is None:
+                result = self.__take()
+                if not result["OK"]:
+                    return result
+                record = result["Value"]
+        if pinned is not None:
+            return self.__prepare(pinned, dbName, retries, retries)
+
+        result = self.__prepare(record, dbName, retries, retries)
+        with self.__cond:
+            if result["OK"]:
+                self.__checkedOut[id(result["Value"])] = record
             else:
-                try:
-                    data[0].close()
-                except MySQLdb.ProgrammingError as exc:
-                    gLogger.warn(f"ProgrammingError exception while closing MySQL connection: {exc}")
-                except Exception as exc:
-                    gLogger.warn(f"Exception while closing MySQL connection: {exc}")
-        except KeyError:
-            pass
+                self.__release(record)
+        return result
+
+    def checkin(self, conn):
+        """Give back a connection obtained with :py:meth:`checkout`.
+        Connections pinned to the thread are left untouched.
+        """
+        with self.__cond:
+            record = self.__checkedOut.pop(id(conn), None)
+            if record is not None:
+                self.__release(record)
+
+    def markBroken(self, conn):
+        """Flag a connection which got an error, so that it is not reused"""
+        with self.__cond:
+            self.__broken.add(id(conn))
+
+    def __unpin(self, thid):
+        """Give back the connection pinned to a thread. Must be called with the condition held."""
+        record = self.__assigned.pop(thid, None)
+        if record is not None:
+            self.__release(record)
 
     def clean(self, now=False):
+        """Give back the connections pinned to dead threads or for longer than the grace time,
+        and close the connections idle for too long
+        """
         if not now:
             now = time.time()
         self.__lastClean = now
-        for thid in list(self.__assigned):
-            if not thid.is_alive():
-                self.__pop(thid)
-            try:
-                data = self.__assigned[thid]
-            except KeyError:
-                continue
-            if self.__graceTime and now - data[2] > self.__graceTime:
-                self.__pop(thid)
+        with self.__cond:
+            for thid in list(self.__assigned):
+                if not thid.is_alive() or (self.__graceTime and now - self.__assigned[thid][2] > self.__graceTime):
+                    self.__unpin(thid)
+            while self.__idle and now - self.__idle[0][2] > self.__maxIdleTime:
+                self.__stats["reaped"] += 1
+                self.__close(self.__idle.popleft()[0])
+                self.__size -= 1
+
+    def getStatistics(self):
+        """Get the state of the pool and its counters
+
+        :return: dict with the current number of connections (size, idle, checkedOut, pinned)
+                 and the counters of checkouts, waits, timeouts, created/reaped connections,
+                 pings, and the total and maximum time spent waiting for a connection
+        """
+        with self.__cond:
+            stats = dict(self.__stats)
+            stats.update(
+                {
+                    "size": self.__size,
+                    "idle": len(self.__idle),
+                    "checkedOut": len(self.__checkedOut),
+                    "pinned": len(self.__assigned),
+                    "maxSize": self.__maxSize,
+                }
+            )
+            return stats
 
     def transactionStart(self, dbName):
-        result = self.get(dbName)
+        result = self.__pin(dbName, MAXCONNECTRETRY, forTransaction=True)
         if not result["OK"]:
             return result
         conn = result["Value"]
         try:
             return S_OK(self.__execute(conn, "START TRANSACTION WITH CONSISTENT SNAPSHOT"))
         except MySQLdb.MySQLError as excp:
+            self.__endTransaction()
             return S_ERROR(DErrno.EMYSQL, f"Could not begin transaction: {excp}")
 
+    def __endTransaction(self):
+        """Unpin the connection of the thread if it was pinned only for a transaction"""
+        thid = self.__thid
+        with self.__cond:
+            record = self.__assigned.get(thid)
+            if record is not None:
+                record[3] = False
+                if not record[4]:
+                    self.__unpin(thid)
+
     def transactionCommit(self, dbName):
-        result = self.get(dbName)
+        result = self.__pin(dbName, MAXCONNECTRETRY, forTransaction=True)
         if not result["OK"]:
             return result
         conn = result["Value"]
@@ -483,9 +709,11 @@ class ConnectionPool:
             return S_OK(result)
         except MySQLdb.MySQLError as excp:
             return S_ERROR(DErrno.EMYSQL, f"Could not commit transaction: {excp}")
+        finally:
+            self.__endTransaction()
 
     def transactionRollback(self, dbName):
-        result = self.get(dbName)
+        result = self.__pin(dbName, MAXCONNECTRETRY, forTransaction=True)
         if not result["OK"]:
             return result
         conn = result["Value"]
@@ -494,6 +722,8 @@ class ConnectionPool:
             return S_OK(result)
         except MySQLdb.MySQLError as excp:
             return S_ERROR(DErrno.EMYSQL, f"Could not rollback transaction: {excp}")
+        finally:
+            self.__endTransaction()
 
 
 class MySQL:
@@ -582,10 +812,10 @@ class MySQL:
         It also includes quotation marks " around the given string
         """
         if connection is None:
-            retDict = self._getConnection()
-            if not retDict["OK"]:
-                return retDict
-            connection = retDict["Value"]
+            with self._connection() as retDict:
+                if not retDict["OK"]:
+                    return retDict
+                return self.__escapeString(myString, connection=retDict["Value"])
 
         if isinstance(myString, bytes):
             myString = myString.decode()
@@ -594,30 +824,42 @@ class MySQL:
         except ValueError:
             return S_ERROR(DErrno.EMYSQL, "Cannot escape value!")
 
-        timeUnits = ["MICROSECOND", "SECOND", "MINUTE", "HOUR", "DAY", "WEEK", "MONTH", "QUARTER", "YEAR"]
-
         try:
             # Check datetime functions first
-            if myString.strip() == "UTC_TIMESTAMP()":
+            retDict = self.__isTimeFunction(myString)
+            if not retDict["OK"]:
+                return retDict
+            if retDict["Value"]:
                 return S_OK(myString)
 
-            for func in ["TIMESTAMPDIFF", "TIMESTAMPADD"]:
-                if myString.strip().startswith(f"{func}(") and myString.strip().endswith(")"):
-                    args = myString.strip()[:-1].replace(f"{func}(", "").strip().split(",")
-                    arg1, arg2, arg3 = (x.strip() for x in args)
-                    if arg1 in timeUnits:
-                        if self.__isDateTime(arg2) or arg2.isalnum():
-                            if self.__isDateTime(arg3) or arg3.isalnum():
-                                return S_OK(myString)
-                    # self.log.debug('__escape_string: Could not escape string', '"%s"' % myString)
-                    return S_ERROR(DErrno.EMYSQL, "__escape_string: Could not escape string")
-
             escape_string = connection.escape_string(myString.encode()).decode()
             # self.log.debug('__escape_string: returns', '"%s"' % escape_string)
             return S_OK(f'"{escape_string}"')
         except Exception as x:
             return self._except("__escape_string", x, "Could not escape string", myString)
 
+    def __isTimeFunction(self, myString):
+        """Check if the string is one of the SQL time functions which are not escaped
+
+        :return: S_OK(bool), S_ERROR if the string looks like a function with wrong arguments
+        """
+        timeUnits = ["MICROSECOND", "SECOND", "MINUTE", "HOUR", "DAY", "WEEK", "MONTH", "QUARTER", "YEAR"]
+
+        if myString.strip() == "UTC_TIMESTAMP()":
+            return S_OK(True)
+
+        for func in ["TIMESTAMPDIFF", "TIMESTAMPADD"]:
+            if myString.strip().startswith(f"{func}(") and myString.strip().endswith(")"):
+                args = myString.strip()[:-1].replace(f"{func}(", "").strip().split(",")
+                arg1, arg2, arg3 = (x.strip() for x in args)
+                if arg1 in timeUnits:
+                    if self.__isDateTime(arg2) or arg2.isalnum():
+                        if self.__isDateTime(arg3) or arg3.isalnum():
+                            return S_OK(True)
+                # self.log.debug('__escape_string: Could not escape string', '"%s"' % myString)
+                return S_ERROR(DErrno.EMYSQL, "__escape_string: Could not escape string")
+        return S_OK(False)
+
     def __checkTable(self, tableName, force=False):
         """Check if a table exists by issuing 'SHOW TABLES'
 
@@ -659,11 +901,15 @@ class MySQL:
         Escapes all strings in the list of values provided
         """
         # self.log.debug('_escapeValues:', inValues)
-        retDict = self._getConnection()
-        if not retDict["OK"]:
-            return retDict
-        connection = retDict["Value"]
+        with self._connection() as retDict:
+            if not retDict["OK"]:
+                return retDict
+            return self.__escapeValues(inValues, retDict["Value"])
 
+    def __escapeValues(self, inValues, connection):
+        """
+        Escapes all strings in the list of values provided, using the given connection
+        """
         inEscapeValues = []
 
         if not inValues:
@@ -694,13 +940,60 @@ class MySQL:
                 inEscapeValues.append(retDict["Value"])
         return S_OK(inEscapeValues)
 
+    def _parameters(self, inValues, params):
+        """
+        Parameterised counterpart of _escapeValues: instead of escaping the values,
+        append them to "params" and return the placeholders to be used in the statement.
+        The values are passed the same way _escapeValues would quote them (as strings),
+        except the SQL time functions which stay in the statement.
+
+        :param list inValues: values to pass
+        :param list params: parameters of the statement, extended in place
+
+        :return: S_OK(list of placeholders) / S_ERROR
+        """
+        placeholders = []
+
+        if not inValues:
+            return S_OK(placeholders)
+
+        for value in inValues:
+            if isinstance(value, (tuple, list)):
+                retDict = self._parameters(value, params)
+                if not retDict["OK"]:
+                    return retDict
+                placeholders.append("(" + ", ".join(retDict["Value"]) + ")")
+                continue
+            if isinstance(value, bool):
+                params.append(value)
+                placeholders.append("%s")
+                continue
+            if isinstance(value, bytes):
+                value = value.decode()
+            try:
+                value = str(value)
+            except ValueError:
+                return S_ERROR(DErrno.EMYSQL, "Cannot escape value!")
+            try:
+                retDict = self.__isTimeFunction(value)
+            except Exception as x:
+                return self._except("_parameters", x, "Could not escape string", value)
+            if not retDict["OK"]:
+                return retDict
+            if retDict["Value"]:
+                placeholders.append(value.replace("%", "%%"))
+            else:
+                params.append(value)
+                placeholders.append("%s")
+        return S_OK(placeholders)
+
     def _safeCmd(self, command):
         """Just replaces password, if visible, with *********"""
         return command.replace(self.__passwd, "**********")
 
     def _connect(self):
         """
-        open connection to MySQL DB and put Connection into Queue
+        open connection to MySQL DB and put Connection into the pool
         set connected flag to True and return S_OK
         return S_ERROR upon failure
         """
@@ -714,18 +1007,55 @@ class MySQL:
             return S_OK()
 
         # Test the connection to the DB
-        retDict = self._getConnection()
-        if not retDict["OK"]:
-            return retDict
+        with self._connection() as retDict:
+            if not retDict["OK"]:
+                return retDict
         self._connected = True
         return S_OK()
 
+    @contextmanager
+    def _connection(self, conn=None):
+        """Context manager giving S_OK(connection) or S_ERROR
+
+        If conn is given, it is used as is. Otherwise, a connection is checked out
+        from the pool, and given back when leaving the context.
+
+        :param conn: connection to use, if any
+        """
+        if conn:
+            yield S_OK(conn)
+            return
+        if not self.__initialized:
+            error = "DB not properly initialized"
+            gLogger.error(error)
+            yield S_ERROR(DErrno.EMYSQL, error)
+            return
+        retDict = self.__connectionPool.checkout(self.__dbName)
+        try:
+            yield retDict
+        finally:
+            if retDict["OK"]:
+                self.__connectionPool.checkin(retDict["Value"])
+
+    def __checkConnectionLost(self, connection, exc):
+        """Make sure a connection which lost its link to the server is not reused"""
+        if isinstance(exc, MySQLdb.OperationalError) and exc.args and exc.args[0] in CONNECTION_LOST_ERRORS:
+            self.__connectionPool.markBroken(connection)
+
+    def getConnectionPoolStatistics(self):
+        """Get the state and counters of the connection pool used by this DB
+
+        :return: S_OK(dict), see :py:meth:`ConnectionPool.getStatistics`
+        """
+        return S_OK(self.__connectionPool.getStatistics())
+
     @captureOptimizerTraces
-    def _query(self, cmd, *, conn=None, debug=True):
+    def _query(self, cmd, *, conn=None, debug=True, params=None):
         """
         execute MySQL query command
 
         :param debug:  print or not the errors
+        :param params: if not None, cmd is a template and params the values to put in it
 
         return S_OK structure with fetchall result as tuple
         it returns an empty tuple if no matching rows are found
@@ -734,72 +1064,109 @@ class MySQL:
 
         self.log.debug(f"_query: {self._safeCmd(cmd)}")
 
-        if conn:
-            connection = conn
-        else:
-            retDict = self._getConnection()
+        with self._connection(conn) as retDict:
             if not retDict["OK"]:
                 return retDict
             connection = retDict["Value"]
 
-        try:
-            cursor = connection.cursor()
-            if cursor.execute(cmd):
-                res = cursor.fetchall()
-            else:
-                res = ()
+            try:
+                cursor = connection.cursor()
+                if cursor.execute(cmd, params):
+                    res = cursor.fetchall()
+                else:
+                    res = ()
 
-            # Log the result limiting it to just 10 records
-            # if len(res) <= 10:
-            #  self.log.debug('_query: returns', res)
-            # else:
-            #  self.log.debug('_query: Total %d records returned' % len(res))
-            #  self.log.debug('_query: %s ...' % str(res[:10]))
+                # Log the result limiting it to just 10 records
+                # if len(res) <= 10:
+                #  self.log.debug('_query: returns', res)
+                # else:
+                #  self.log.debug('_query: Total %d records returned' % len(res))
+                #  self.log.debug('_query: %s ...' % str(res[:10]))
 
-            retDict = S_OK(res)
-        except Exception as x:
-            # self.log.debug('_query: %s' % self._safeCmd(cmd))
-            retDict = self._except("_query", x, "Execution failed.", cmd, debug)
+                retDict = S_OK(res)
+            except Exception as x:
+                # self.log.debug('_query: %s' % self._safeCmd(cmd))
+                self.__checkConnectionLost(connection, x)
+                retDict = self._except("_query", x, "Execution failed.", cmd, debug)
 
-        try:
-            cursor.close()
-        except Exception:
-            pass
+            try:
+                cursor.close()
+            except Exception:
+                pass
 
         return retDict
 
     @captureOptimizerTraces
-    def _update(self, cmd, *, conn=None, debug=True):
+    def _update(self, cmd, *, conn=None, debug=True, params=None):
         """execute MySQL update command
 
         :param debug: print or not the errors
+        :param params: if not None, cmd is a template and params the values to put in it
 
         return S_OK with number of updated registers upon success
         return S_ERROR upon error
         """
 
         self.log.debug(f"_update: {self._safeCmd(cmd)}")
-        if conn:
-            connection = conn
-        else:
-            retDict = self._getConnection()
+        with self._connection(conn) as retDict:
             if not retDict["OK"]:
                 return retDict
             connection = retDict["Value"]
 
-        try:
-            cursor = connection.cursor()
-            res = cursor.execute(cmd)
-            retDict = S_OK(res)
-            if cursor.lastrowid:
-                retDict["lastRowId"] = cursor.lastrowid
-        except Exception as x:
-            retDict = self._except("_update", x, "Execution failed.", cmd, debug)
+            try:
+                cursor = connection.cursor()
+                res = cursor.execute(cmd, params)
+                retDict = S_OK(res)
+                if cursor.lastrowid:
+                    retDict["lastRowId"] = cursor.lastrowid
+            except Exception as x:
+                self.__checkConnectionLost(connection, x)
+                retDict = self._except("_update", x, "Execution failed.", cmd, debug)
 
-        try:
-            cursor.close()
-        except Exception:
-            pass
+            try:
+                cursor.close()
+            except Exception:
+                pass
+
+        return retDict
+
+    @captureOptimizerTraces
+    def _updateMany(self, cmd, paramsList, *, conn=None, debug=True):
+        """execute a MySQL update template for each set of parameters, with the same cursor
+
+        For "INSERT ... VALUES ( %s, ... )" templates, the driver groups the rows
+        in multi-rows inserts.
+
+        :param str cmd: template with "%s" placeholders
+        :param paramsList: list of tuples of values, one per execution
+        :param debug: print or not the errors
+
+        return S_OK with number of updated registers upon success
+        return S_ERROR upon error
+        """
+        if not paramsList:
+            return S_OK(0)
+
+        self.log.debug(f"_updateMany: {self._safeCmd(cmd)} ({len(paramsList)} times)")
+        with self._connection(conn) as retDict:
+            if not retDict["OK"]:
+                return retDict
+            connection = retDict["Value"]
+
+            try:
+                cursor = connection.cursor()
+                res = cursor.executemany(cmd, paramsList)
+                retDict = S_OK(res)
+                if cursor.lastrowid:
+                    retDict["lastRowId"] = cursor.lastrowid
+            except Exception as x:
+                self.__checkConnectionLost(connection, x)
+                retDict = self._except("_updateMany", x, "Execution failed.", cmd, debug)
+
+            try:
+                cursor.close()
+            except Exception:
+                pass
 
         return retDict
 
@@ -807,7 +1174,8 @@ class MySQL:
         """dummy transaction support
 
         :param self: self reference
-        :param list cmdList: list of queries to be executed within the transaction
+        :param list cmdList: list of queries to be executed within the transaction,
+                             or of ( template, params ) tuples
         :param MySQLDB.Connection conn: connection
 
         :return: S_OK( [ ( cmd1, ret1 ), ... ] ) or S_ERROR
@@ -816,28 +1184,30 @@ class MySQL:
             return S_ERROR(DErrno.EMYSQL, f"_transaction: wrong type ({type(cmdList)}) for cmdList")
 
         # # get connection
-        connection = conn
-        if not connection:
-            retDict = self._getConnection()
+        with self._connection(conn) as retDict:
             if not retDict["OK"]:
                 return retDict
             connection = retDict["Value"]
 
-        # # list with cmds and their results
-        cmdRet = []
-        try:
-            cursor = connection.cursor()
-            for cmd in cmdList:
-                cmdRet.append((cmd, cursor.execute(cmd)))
-            connection.commit()
-        except Exception as error:
-            self.logger.exception(error)
-            # # rollback, put back connection to the pool
-            connection.rollback()
-            return S_ERROR(DErrno.EMYSQL, error)
-        # # close cursor, put back connection to the pool
-        cursor.close()
-        return S_OK(cmdRet)
+            # # list with cmds and their results
+            cmdRet = []
+            try:
+                cursor = connection.cursor()
+                for cmd in cmdList:
+                    if isinstance(cmd, tuple):
+                        cmdRet.append((cmd, cursor.execute(*cmd)))
+                    else:
+                        cmdRet.append((cmd, cursor.execute(cmd)))
+                connection.commit()
+            except Exception as error:
+                self.logger.exception(error)
+                self.__checkConnectionLost(connection, error)
+                # # rollback, put back connection to the pool
+                connection.rollback()
+                return S_ERROR(DErrno.EMYSQL, error)
+            # # close cursor, put back connection to the pool
+            cursor.close()
+            return S_OK(cmdRet)
 
     def _createViews(self, viewsDict, force=False):
         """create view based on query
@@ -1049,10 +1419,11 @@ class MySQL:
         return str(param[0])
 
     def _getConnection(self, retries=MAXCONNECTRETRY):
-        """Return  a new connection to the DB,
+        """Return the connection pinned to the current thread, for callers that need to run
+        several statements on the same connection (see :py:class:`ConnectionPool`).
+        The statements which do not give an explicit connection use a pooled one, see :py:meth:`_connection`.
 
-        Try the Queue, if it is empty add a newConnection to the Queue and retry
-        it will retry MAXCONNECTRETRY to open a new connection and will return
+        It will retry MAXCONNECTRETRY to open a new connection and will return
         an error if it fails.
 
         :param int retries: Number of time it will retry to open a connection
@@ -1066,6 +1437,20 @@ class MySQL:
 
         return self.__connectionPool.get(self.__dbName, retries)
 
+    def _releaseConnection(self):
+        """Give back to the pool the connection pinned to the current thread by :py:meth:`_getConnection`.
+        It must not be used anymore afterwards.
+        """
+        self.__connectionPool.release()
+
+    @classmethod
+    def releaseThreadConnections(cls):
+        """Give back the connections pinned to the current thread by all the DBs,
+        once the thread is done with them (end of a service request or agent cycle)
+        """
+        for connectionPool in list(cls.__connectionPools.values()):
+            connectionPool.release()
+
     ########################################################################################
     #
     #  Transaction functions
@@ -1099,15 +1484,22 @@ class MySQL:
             # self.log.debug('countEntries:', error)
             return S_ERROR(DErrno.EMYSQL, error)
 
+        params = []
         try:
             cond = self.buildCondition(
-                condDict=condDict, older=older, newer=newer, timeStamp=timeStamp, greater=greater, smaller=smaller
+                condDict=condDict,
+                older=older,
+                newer=newer,
+                timeStamp=timeStamp,
+                greater=greater,
+                smaller=smaller,
+                params=params,
             )
         except Exception as x:
             return S_ERROR(DErrno.EMYSQL, x)
 
         cmd = f"SELECT COUNT(*) FROM {table} {cond}"
-        res = self._query(cmd, conn=connection)
+        res = self._query(cmd, conn=connection, params=params)
         if not res["OK"]:
             return res
 
@@ -1142,15 +1534,22 @@ class MySQL:
             # self.log.debug('getCounters:', error)
             return S_ERROR(DErrno.EMYSQL, error)
 
+        params = []
         try:
             cond = self.buildCondition(
-                condDict=condDict, older=older, newer=newer, timeStamp=timeStamp, greater=greater, smaller=smaller
+                condDict=condDict,
+                older=older,
+                newer=newer,
+                timeStamp=timeStamp,
+                greater=greater,
+                smaller=smaller,
+                params=params,
             )
         except Exception as x:
             return S_ERROR(DErrno.EMYSQL, x)
 
         cmd = f"SELECT {attrNames}, COUNT(*) FROM {table} {cond} GROUP BY {attrNames} ORDER BY {attrNames}"
-        res = self._query(cmd, conn=connection)
+        res = self._query(cmd, conn=connection, params=params)
         if not res["OK"]:
             return res
 
@@ -1191,15 +1590,22 @@ class MySQL:
             # self.log.debug('getDistinctAttributeValues:', error)
             return S_ERROR(DErrno.EMYSQL, error)
 
+        params = []
         try:
             cond = self.buildCondition(
-                condDict=condDict, older=older, newer=newer, timeStamp=timeStamp, greater=greater, smaller=smaller
+                condDict=condDict,
+                older=older,
+                newer=newer,
+                timeStamp=timeStamp,
+                greater=greater,
+                smaller=smaller,
+                params=params,
             )
         except Exception as exc:
             return S_ERROR(DErrno.EMYSQL, exc)
 
         cmd = f"SELECT DISTINCT( {attributeName} ) FROM {table} {cond} ORDER BY {attributeName}"
-        res = self._query(cmd, conn=connection)
+        res = self._query(cmd, conn=connection, params=params)
         if not res["OK"]:
             return res
         attr_list = [x[0] for x in res["Value"]]
@@ -1218,6 +1624,7 @@ class MySQL:
         smaller=None,
         offset=None,
         useLikeQuery=False,
+        params=None,
     ):
         """Build SQL condition statement from provided condDict and other extra check on
         a specified time stamp.
@@ -1228,7 +1635,14 @@ class MySQL:
         For compatibility with current usage it uses Exceptions to exit in case of
         invalid arguments
         For performing LIKE queries use the parameter useLikeQuery=True
+        If a list is given as params, the condition contains "%s" placeholders instead of
+        the escaped values, and the values are appended to params (see _parameters)
         """
+        if params is None:
+            escapeValues = self._escapeValues
+        else:
+            escapeValues = functools.partial(self._parameters, params=params)
+
         condition = ""
         conjunction = "WHERE"
         attrName = None
@@ -1243,7 +1657,7 @@ class MySQL:
                     # self.log.debug('buildCondition:', error)
                     raise Exception(error)
                 if isinstance(attrValue, list):
-                    retDict = self._escapeValues(attrValue)
+                    retDict = escapeValues(attrValue)
                     if not retDict["OK"]:
                         # self.log.debug('buildCondition:', retDict['Message'])
                         raise Exception(retDict["Message"])
@@ -1253,7 +1667,7 @@ class MySQL:
                         condition = f" {condition} {conjunction} {attrName} IN ( {multiValue} )"
                         conjunction = "AND"
                 else:
-                    retDict = self._escapeValues([attrValue])
+                    retDict = escapeValues([attrValue])
                     if not retDict["OK"]:
                         # self.log.debug('buildCondition:', retDict['Message'])
                         raise Exception(retDict["Message"])
@@ -1275,7 +1689,7 @@ class MySQL:
                 # self.log.debug('buildCondition:', error)
                 raise Exception(error)
             if newer:
-                retDict = self._escapeValues([newer])
+                retDict = escapeValues([newer])
                 if not retDict["OK"]:
                     # self.log.debug('buildCondition:', retDict['Message'])
                     raise Exception(retDict["Message"])
@@ -1284,7 +1698,7 @@ class MySQL:
                     condition = f" {condition} {conjunction} {timeStamp} >= {escapeInValue}"
                     conjunction = "AND"
             if older:
-                retDict = self._escapeValues([older])
+                retDict = escapeValues([older])
                 if not retDict["OK"]:
                     # self.log.debug('buildCondition:', retDict['Message'])
                     raise Exception(retDict["Message"])
@@ -1300,7 +1714,7 @@ class MySQL:
                     # self.log.debug('buildCondition:', error)
                     raise Exception(error)
 
-                retDict = self._escapeValues([attrValue])
+                retDict = escapeValues([attrValue])
                 if not retDict["OK"]:
                     # self.log.debug('buildCondition:', retDict['Message'])
                     raise Exception(retDict["Message"])
@@ -1317,7 +1731,7 @@ class MySQL:
                     # self.log.debug('buildCondition:', error)
                     raise Exception(error)
 
-                retDict = self._escapeValues([attrValue])
+                retDict = escapeValues([attrValue])
                 if not retDict["OK"]:
                     # self.log.debug('buildCondition:', retDict['Message'])
                     raise Exception(retDict["Message"])
@@ -1410,6 +1824,7 @@ class MySQL:
         if condDict is None:
             condDict = {}
 
+        params = []
         try:
             try:
                 mylimit = limit[0]
@@ -1428,11 +1843,12 @@ class MySQL:
                 smaller=smaller,
                 offset=myoffset,
                 useLikeQuery=useLikeQuery,
+                params=params,
             )
         except Exception as x:
             return S_ERROR(DErrno.EMYSQL, x)
 
-        return self._query(f"SELECT {quotedOutFields} FROM {table} {condition}", conn=conn)
+        return self._query(f"SELECT {quotedOutFields} FROM {table} {condition}", conn=conn, params=params)
 
     #############################################################################
     def deleteEntries(
@@ -1462,6 +1878,7 @@ class MySQL:
 
         # self.log.debug('deleteEntries:', 'deleting rows from table %s.' % table)
 
+        params = []
         try:
             condition = self.buildCondition(
                 condDict=condDict,
@@ -1472,11 +1889,12 @@ class MySQL:
                 limit=limit,
                 greater=greater,
                 smaller=smaller,
+                params=params,
             )
         except Exception as x:
             return S_ERROR(DErrno.EMYSQL, x)
 
-        return self._update(f"DELETE FROM {table} {condition}", conn=conn)
+        return self._update(f"DELETE FROM {table} {condition}", conn=conn, params=params)
 
     #############################################################################
     def updateFields(
@@ -1536,7 +1954,8 @@ class MySQL:
                 # self.log.debug('updateFields:', error)
                 return S_ERROR(DErrno.EMYSQL, error)
 
-        updateValues = self._escapeValues(updateValues)
+        params = []
+        updateValues = self._parameters(updateValues, params)
         if not updateValues["OK"]:
             # self.log.debug('updateFields:', updateValues['Message'])
             return updateValues
@@ -1554,6 +1973,7 @@ class MySQL:
                 limit=limit,
                 greater=greater,
                 smaller=smaller,
+                params=params,
             )
         except Exception as x:
             return S_ERROR(DErrno.EMYSQL, x)
@@ -1562,7 +1982,7 @@ class MySQL:
             [f"{_quotedList([updateFields[k]])} = {updateValues[k]}" for k in range(len(updateFields))]
         )
 
-        return self._update(f"UPDATE {table} SET {updateString} {condition}", conn=conn)
+        return self._update(f"UPDATE {table} SET {updateString} {condition}", conn=conn, params=params)
 
     #############################################################################
     def insertFields(self, tableName, inFields=None, inValues=None, conn=None, inDict=None):
@@ -1607,7 +2027,8 @@ class MySQL:
 
         inFieldString = f"(  {inFieldString} )"
 
-        retDict = self._escapeValues(inValues)
+        params = []
+        retDict = self._parameters(inValues, params)
         if not retDict["OK"]:
             # self.log.debug('insertFields:', retDict['Message'])
             return retDict
@@ -1617,65 +2038,152 @@ class MySQL:
         # self.log.debug('insertFields:', 'inserting %s into table %s'
         #               % (inFieldString, table))
 
-        return self._update(f"INSERT INTO {table} {inFieldString} VALUES {inValueString}", conn=conn)
+        return self._update(f"INSERT INTO {table} {inFieldString} VALUES {inValueString}", conn=conn, params=params)
+
+    #############################################################################
+    def insertManyFields(self, tableName, inFields, rows, chunkSize=1000, onDuplicate=None, conn=None):
+        """
+        Insert many rows in "tableName", each row being a list of values for "inFields".
+        The rows are sent by chunks of "chunkSize" rows, each chunk being one multi-VALUES INSERT,
+        all of them in a single transaction (unless a connection is given, in which case the
+        caller is in charge of the transaction).
+        String type values will be appropriately escaped.
+
+        :param str tableName: table name
+        :param list inFields: names of the fields
+        :param rows: iterable of lists of values, in the order of inFields
+        :param int chunkSize: maximum number of rows per INSERT statement
+        :param onDuplicate: what to do with the rows conflicting with an existing key:
+
+            * None: fail (plain INSERT)
+            * "IGNORE": skip them (INSERT IGNORE)
+            * "UPDATE": update all the fields with the new values
+            * a list of field names: update these fields with the new values
+            * a dict { field name: SQL expression }: ON DUPLICATE KEY UPDATE field = expression,
+              e.g. { "Count": "`Count` + VALUES(`Count`)" }
+
+        :return: S_OK(number of affected rows) / S_ERROR
+        """
+        table = _quotedList([tableName])
+        if not table:
+            return S_ERROR(DErrno.EMYSQL, "Invalid tableName argument")
+
+        inFieldString = _quotedList(inFields)
+        if inFieldString is None:
+            return S_ERROR(DErrno.EMYSQL, "Invalid inFields arguments")
+
+        if chunkSize < 1:
+            return S_ERROR(DErrno.EMYSQL, "chunkSize must be positive")
+
+        insert = "INSERT"
+        suffix = ""
+        if onDuplicate is None:
+            pass
+        elif isinstance(onDuplicate, str) and onDuplicate.upper() == "IGNORE":
+            insert = "INSERT IGNORE"
+        else:
+            if isinstance(onDuplicate, str) and onDuplicate.upper() == "UPDATE":
+                onDuplicate = inFields
+            if isinstance(onDuplicate, dict):
+                updates = [(_quotedList([field]), expr) for field, expr in onDuplicate.items()]
+            elif isinstance(onDuplicate, (list, tuple)):
+                updates = [(_quotedList([field]), f"VALUES({_quotedList([field])})") for field in onDuplicate]
+            else:
+                return S_ERROR(DErrno.EMYSQL, f"Invalid onDuplicate argument: {onDuplicate!r}")
+            if not updates or any(field is None for field, _expr in updates):
+                return S_ERROR(DErrno.EMYSQL, f"Invalid onDuplicate argument: {onDuplicate!r}")
+            updates = [f"{field} = {expr}" for field, expr in updates]
+            suffix = " ON DUPLICATE KEY UPDATE " + ", ".join(updates).replace("%", "%%")
+
+        # Build all the statements before touching the DB, so that a bad row does not leave half a transaction
+        cmd = f"{insert} INTO {table} ( {inFieldString} ) VALUES %s{suffix}"
+        statements = []
+        valueStrings = []
+        params = []
+        for row in rows:
+            if len(row) != len(inFields):
+                return S_ERROR(DErrno.EMYSQL, "Mismatch between inFields and inValues.")
+            retDict = self._parameters(row, params)
+            if not retDict["OK"]:
+                return retDict
+            valueStrings.append("( " + ", ".join(retDict["Value"]) + " )")
+            if len(valueStrings) == chunkSize:
+                statements.append((cmd.replace("%s", ", ".join(valueStrings), 1), params))
+                valueStrings = []
+                params = []
+        if valueStrings:
+            statements.append((cmd.replace("%s", ", ".join(valueStrings), 1), params))
+
+        if not statements:
+            return S_OK(0)
+        if len(statements) == 1 or conn:
+            count = 0
+            for cmd, params in statements:
+                retDict = self._update(cmd, conn=conn, params=params)
+                if not retDict["OK"]:
+                    return retDict
+                count += retDict["Value"]
+            return S_OK(count)
+
+        # The connections are in autocommit mode, the transaction has to be opened explicitly
+        retDict = self._transaction(["START TRANSACTION"] + statements)
+        if not retDict["OK"]:
+            return retDict
+        return S_OK(sum(res for _cmd, res in retDict["Value"][1:]))
 
     @captureOptimizerTraces
     def executeStoredProcedure(self, packageName, parameters, outputIds, *, conn=None):
-        if conn:
-            connection = conn
-        else:
-            conDict = self._getConnection()
+        with self._connection(conn) as conDict:
             if not conDict["OK"]:
                 return conDict
 
             connection = conDict["Value"]
-        cursor = connection.cursor()
-        try:
-            cursor.callproc(packageName, parameters)
-            row = []
-            for oId in outputIds:
-                resName = f"@_{packageName}_{oId}"
-                cursor.execute(f"SELECT {resName}")
-                row.append(cursor.fetchone()[0])
-            retDict = S_OK(row)
-        except Exception as x:
-            retDict = self._except("_query", x, "Execution failed.", packageName)
-            connection.rollback()
+            cursor = connection.cursor()
+            try:
+                cursor.callproc(packageName, parameters)
+                row = []
+                for oId in outputIds:
+                    resName = f"@_{packageName}_{oId}"
+                    cursor.execute(f"SELECT {resName}")
+                    row.append(cursor.fetchone()[0])
+                retDict = S_OK(row)
+            except Exception as x:
+                self.__checkConnectionLost(connection, x)
+                retDict = self._except("_query", x, "Execution failed.", packageName)
+                connection.rollback()
 
-        try:
-            cursor.close()
-        except Exception:
-            pass
+            try:
+                cursor.close()
+            except Exception:
+                pass
         return retDict
 
     # For the procedures that execute a select without storing the result
     @captureOptimizerTraces
     def executeStoredProcedureWithCursor(self, packageName, parameters, *, conn=None):
-        if conn:
-            connection = conn
-        else:
-            conDict = self._getConnection()
+        with self._connection(conn) as conDict:
             if not conDict["OK"]:
                 return conDict
 
             connection = conDict["Value"]
 
-        cursor = connection.cursor()
-        try:
-            #       execStr = "call %s(%s);" % ( packageName, ",".join( map( str, parameters ) ) )
-            execStr = "call {}({});".format(
-                packageName,
-                ",".join(['"%s"' % param if isinstance(param, str) else str(param) for param in parameters]),
-            )
-            cursor.execute(execStr)
-            rows = cursor.fetchall()
-            retDict = S_OK(rows)
-        except Exception as x:
-            retDict = self._except("_query", x, "Execution failed.", packageName)
-            connection.rollback()
-        try:
-            cursor.close()
-        except Exception:
-            pass
+            cursor = connection.cursor()
+            try:
+                #       execStr = "call %s(%s);" % ( packageName, ",".join( map( str, parameters ) ) )
+                execStr = "call {}({});".format(
+                    packageName,
+                    ",".join(['"%s"' % param if isinstance(param, str) else str(param) for param in parameters]),
+                )
+                cursor.execute(execStr)
+                rows = cursor.fetchall()
+                retDict = S_OK(rows)
+            except Exception as x:
+                self.__checkConnectionLost(connection, x)
+                retDict = self._except("_query", x, "Execution failed.", packageName)
+                connection.rollback()
+            try:
+                cursor.close()
+            except Exception:
+                pass
 
         return retDict
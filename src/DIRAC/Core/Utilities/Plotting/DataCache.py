@@ -7,6 +7,11 @@ import threading
 from DIRAC import S_OK, S_ERROR, gLogger, rootPath
 from DIRAC.Core.Utilities.DictCache import DictCache
 
+#: Maximum number of report data sets kept in memory, the least recently used ones are dropped first
+MAX_CACHED_REPORTS = 1000
+#: Maximum number of plots kept, the files of the least recently used ones are deleted first
+MAX_CACHED_PLOTS = 5000
+
 
 class DataCache:
     def __init__(self, dirName="accountingPlots"):
@@ -16,8 +21,8 @@ class DataCache:
         self.purgeThread = threading.Thread(target=self.purgeExpired)
         self.purgeThread.daemon = True
         self.purgeThread.start()
-        self.__dataCache = DictCache()
-        self.__graphCache = DictCache(deleteFunction=self._deleteGraph)
+        self.__dataCache = DictCache(maxEntries=MAX_CACHED_REPORTS)
+        self.__graphCache = DictCache(deleteFunction=self._deleteGraph, maxEntries=MAX_CACHED_PLOTS)
         self.__dataLifeTime = 600
         self.__graphLifeTime = 3600
 
@@ -34,6 +39,15 @@ class DataCache:
             time.sleep(600)
             self.__graphCache.purgeExpired()
             self.__dataCache.purgeExpired()
+            for name, stats in self.getStatistics().items():
+                gLogger.info(f"Plots cache usage for {name}", ", ".join(f"{k}={v}" for k, v in stats.items()))
+
+    def getStatistics(self):
+        """Get the usage counters of the report data and plots caches
+
+        :return: { "data" : statistics, "plots" : statistics }, as given by DictCache.getStatistics
+        """
+        return {"data": self.__dataCache.getStatistics(), "plots": self.__graphCache.getStatistics()}
 
     def getReportData(self, reportRequest, reportHash, dataFunc):
         """
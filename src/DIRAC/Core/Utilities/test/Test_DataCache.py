@@ -0,0 +1,37 @@
+""" Test the cache of the accounting plots
+"""
+# pylint: disable=protected-access
+import sys
+
+from DIRAC import S_OK
+from DIRAC.Core.Utilities.Plotting.DataCache import DataCache
+
+
+def test_boundedPlots(monkeypatch, tmp_path):
+    """The least recently used plots are dropped with their files, and the cache usage is counted"""
+    monkeypatch.setattr(sys.modules[DataCache.__module__], "MAX_CACHED_PLOTS", 2)
+    cache = DataCache()
+    cache.setGraphsLocation(str(tmp_path))
+
+    def plotFunc(_reportRequest, _reportData, basePlotFileName):
+        with open(f"{basePlotFileName}.png", "w") as fd:
+            fd.write("plot")
+        return S_OK({"plot": True, "thumbnail": False})
+
+    for reportHash in ("a", "b", "a", "c"):
+        assert cache.getReportPlot({}, reportHash, {}, plotFunc)["OK"]
+
+    # "b" is the least recently used plot
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["a.png", "c.png"]
+    stats = cache.getStatistics()["plots"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+    assert stats["evictions"] == 1
+    assert stats["entries"] == 2
+
+    assert cache.getReportData({}, "a", lambda _reportRequest: S_OK([1]))["Value"] == [1]
+    assert cache.getReportData({}, "a", lambda _reportRequest: S_OK([2]))["Value"] == [1]
+    assert cache.getStatistics()["data"]["hits"] == 1
+
+    # The purge thread keeps the cache alive: delete the plots before the end of the logging
+    cache._DataCache__graphCache.purgeAll()
@@ -0,0 +1,166 @@
+""" Test the DictCache
+"""
+import threading
+import time
+
+import pytest
+
+from DIRAC.Core.Utilities.DictCache import DictCache, ShardedDictCache
+
+
+def test_addGetExpire():
+    """Records are returned until they expire"""
+    cache = DictCache()
+    cache.add("key", 1, "value")
+    assert cache.exists("key")
+    assert cache.get("key") == "value"
+    # Not valid for another 10 seconds
+    assert cache.get("key", validSeconds=10) is None
+    assert not cache.exists("key")
+    # Adding with no validity does nothing
+    cache.add("other", 0, "value")
+    assert cache.get("other") is None
+
+
+def test_purgeExpired():
+    """Only the expired records are purged"""
+    deleted = []
+    cache = DictCache(deleteFunction=deleted.append)
+    cache.add("short", 1, "short")
+    cache.add("long", 100, "long")
+    cache.purgeExpired(expiredInSeconds=10)
+    assert cache.getKeys() == ["long"]
+    assert deleted == ["short"]
+    cache.purgeAll()
+    assert cache.getKeys() == []
+    assert deleted == ["short", "long"]
+
+
+def test_lruEviction():
+    """The least recently used record is evicted first"""
+    cache = DictCache(maxEntries=2)
+    cache.add("a", 100, 1)
+    cache.add("b", 100, 2)
+    # Use "a" so that "b" becomes the least recently used
+    assert cache.get("a") == 1
+    cache.add("c", 100, 3)
+    assert sorted(cache.getKeys()) == ["a", "c"]
+    stats = cache.getStatistics()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 1
+    assert stats["entries"] == 2
+
+
+def test_lfuEviction():
+    """The least frequently used record is evicted first"""
+    cache = DictCache(maxEntries=2, evictionPolicy="LFU")
+    cache.add("a", 100, 1)
+    cache.add("b", 100, 2)
+    for _ in range(3):
+        cache.get("a")
+    cache.get("b")
+    cache.add("c", 100, 3)
+    # "b" has been used less than "a", and "c" is the newest
+    assert sorted(cache.getKeys()) == ["a", "c"]
+    cache.add("d", 100, 4)
+    assert sorted(cache.getKeys()) == ["a", "d"]
+
+
+def test_maxBytes():
+    """The total size of the values stays below maxBytes"""
+    cache = DictCache(maxBytes=10, sizeFunction=len)
+    cache.add("a", 100, "xxxx")
+    cache.add("b", 100, "yyyy")
+    cache.add("c", 100, "zzzz")
+    assert sorted(cache.getKeys()) == ["b", "c"]
+    assert cache.getStatistics()["bytes"] == 8
+    # Replacing a value updates the size
+    cache.add("b", 100, "y")
+    assert cache.getStatistics()["bytes"] == 5
+
+
+def test_expiredRecordsAreEvictedFirst():
+    """When over the limits, expired records are removed before valid ones"""
+    cache = DictCache(maxEntries=2, sweepInterval=0)
+    cache.add("expiring", 1, 1)
+    cache.add("a", 100, 2)
+    time.sleep(1.1)
+    cache.add("b", 100, 3)
+    assert sorted(cache.getKeys()) == ["a", "b"]
+    stats = cache.getStatistics()
+    assert stats["expirations"] == 1
+    assert stats["evictions"] == 0
+
+
+def test_lazySweep():
+    """Expired records are swept when adding records, without calling purgeExpired"""
+    cache = DictCache(sweepInterval=0.5)
+    cache.add("expiring", 1, 1)
+    time.sleep(1.1)
+    cache.add("new", 100, 2)
+    assert cache.getStatistics()["entries"] == 1
+
+    # By default, the expired records are only removed by purgeExpired
+    cache = DictCache()
+    cache.add("expiring", 1, 1)
+    time.sleep(1.1)
+    cache.add("new", 100, 2)
+    assert cache.getStatistics()["entries"] == 2
+
+
+def test_threadLocalStatistics():
+    """The statistics of thread local caches are counted for all the threads"""
+    cache = DictCache(threadLocal=True)
+
+    def work():
+        for i in range(1000):
+            cache.add(i, 100, i)
+            cache.get(i)
+            cache.get("missing")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = cache.getStatistics()
+    assert stats["hits"] == 8000
+    assert stats["misses"] == 8000
+
+
+def test_wrongPolicy():
+    with pytest.raises(ValueError):
+        DictCache(evictionPolicy="FIFO")
+
+
+def test_manyRecords():
+    """Bulk access to the cache"""
+    cache = DictCache()
+    cache.addMany({"a": 1, "b": 2}, 100)
+    assert cache.getMany(["a", "b", "c"]) == {"a": 1, "b": 2}
+
+
+@pytest.mark.parametrize("nbShards", [1, 4])
+def test_shardedCache(nbShards):
+    """The sharded cache behaves like a DictCache"""
+    deleted = []
+    cache = ShardedDictCache(nbShards=nbShards, deleteFunction=deleted.append)
+    cache.add("a", 100, 1)
+    cache.addMany({f"key{i}": i for i in range(20)}, 100)
+    assert cache.get("a") == 1
+    assert cache.exists("key3")
+    assert cache.getMany(["key1", "key2", "missing"]) == {"key1": 1, "key2": 2}
+    assert sorted(cache.getKeys()) == sorted(["a"] + [f"key{i}" for i in range(20)])
+    cache.delete("a")
+    assert cache.get("a") is None
+    assert deleted == [1]
+    assert cache.getStatistics()["entries"] == 20
+    cache.purgeAll()
+    assert cache.getKeys() == []
+
+
+def test_shardedCacheLimits():
+    """The limits are shared between the segments"""
+    cache = ShardedDictCache(nbShards=4, maxEntries=8)
+    cache.addMany({i: i for i in range(100)}, 100)
+    assert len(cache.getKeys()) <= 8
@@ -11,6 +11,8 @@ import datetime
 import sys
 
 from DIRAC.Core.Utilities.DEncode import encode as disetEncode, decode as disetDecode, g_dEncodeFunctions
+from DIRAC.Core.Utilities.DEncode import recursiveEncode, recursiveDecode, iterativeEncode, iterativeDecode
+from DIRAC.Core.Utilities.DEncode import StreamDecoder, StreamedResult, streamEntries
 from DIRAC.Core.Utilities.JEncode import encode as jsonEncode, decode as jsonDecode, JSerializable
 from DIRAC.Core.Utilities.MixedEncode import encode as mixEncode, decode as mixDecode
 
@@ -45,20 +47,44 @@ else:
 # function, and add the tuple here
 
 disetTuple = (disetEncode, disetDecode)
+recursiveDisetTuple = (recursiveEncode, recursiveDecode)
+iterativeDisetTuple = (iterativeEncode, iterativeDecode)
 jsonTuple = (jsonEncode, jsonDecode)
 mixTuple = (mixEncode, mixDecode)
 
-enc_dec_imp = (disetTuple, jsonTuple, (mixTuple, "No", "No"), (mixTuple, "Yes", "No"), (mixTuple, "Yes", "Yes"))
+enc_dec_imp = (
+    disetTuple,
+    recursiveDisetTuple,
+    iterativeDisetTuple,
+    jsonTuple,
+    (mixTuple, "No", "No"),
+    (mixTuple, "Yes", "No"),
+    (mixTuple, "Yes", "Yes"),
+)
 enc_dec_ids = (
     "disetTuple",
+    "recursiveDisetTuple",
+    "iterativeDisetTuple",
     "jsonTuple",
     "mixTuple",
     "mixTuple (DIRAC_USE_JSON_DECODE=Yes)",
     "mixTuple (DIRAC_USE_JSON_ENCODE=Yes)",
 )
 
-enc_dec_imp_without_json = (disetTuple, (mixTuple, "No", "No"), (mixTuple, "Yes", "No"))
-enc_dec_ids_without_json = ("disetTuple", "mixTuple", "mixTuple (DIRAC_USE_JSON_DECODE=Yes)")
+enc_dec_imp_without_json = (
+    disetTuple,
+    recursiveDisetTuple,
+    iterativeDisetTuple,
+    (mixTuple, "No", "No"),
+    (mixTuple, "Yes", "No"),
+)
+enc_dec_ids_without_json = (
+    "disetTuple",
+    "recursiveDisetTuple",
+    "iterativeDisetTuple",
+    "mixTuple",
+    "mixTuple (DIRAC_USE_JSON_DECODE=Yes)",
+)
 
 
 def myDates():
@@ -270,6 +296,53 @@ def test_nestedStructure(enc_dec_without_json, data):
     agnosticTestFunction(enc_dec_without_json, data)
 
 
+@settings(suppress_health_check=function_scoped)
+@given(
+    data=recursive(
+        initialStrategies | floats(allow_nan=False), lambda x: lists(x) | dictionaries(text(), x) | tuples(x)
+    )
+)
+def test_iterativeDEncodeIsIdentical(data):
+    """The iterative DEncode engine must produce exactly the same bytes and objects as the recursive one"""
+    encodedData = recursiveEncode(data)
+    assert iterativeEncode(data) == encodedData
+    assert iterativeDecode(encodedData) == recursiveDecode(encodedData)
+
+
+@settings(suppress_health_check=function_scoped)
+@given(
+    data=nestedStrategy, streamDepth=integers(min_value=0, max_value=3), chunkSize=integers(min_value=1, max_value=64)
+)
+def test_streamDecoder(data, streamDepth, chunkSize):
+    """Feeding the StreamDecoder with chunks gives the same items and rest as splitting the decoded object"""
+    encodedData = disetEncode(data)
+
+    decoder = StreamDecoder(streamDepth)
+    entries = []
+    for i in range(0, len(encodedData), chunkSize):
+        entries.extend(decoder.feed(encodedData[i : i + chunkSize]))
+    rest = decoder.close()
+
+    streamed = StreamedResult(streamEntries(disetDecode(encodedData)[0], streamDepth))
+    assert entries == list(streamed)
+    assert rest == streamed.result
+    assert decoder.getDecodedLength() == len(encodedData)
+
+
+def test_streamDecoderPath():
+    """Only the containers below the stream path are streamed"""
+    data = {"OK": True, "Value": {"Successful": {"/a": 1, "/b": 2}, "Failed": {}}, "CallStack": ["x"]}
+    decoder = StreamDecoder(2, streamPath=("Value",))
+    entries = decoder.feed(disetEncode(data))
+    assert entries == [(("Value", "Successful"), "/a", 1), (("Value", "Successful"), "/b", 2)]
+    assert decoder.close() == {"OK": True, "Value": {"Successful": {}, "Failed": {}}, "CallStack": ["x"]}
+
+    decoder = StreamDecoder(1)
+    decoder.feed(disetEncode(data)[:-1])
+    with raises(ValueError):
+        decoder.close()
+
+
 # DEncode raises KeyError.....
 # Others raise TypeError
 # @parametrize('enc_dec', enc_dec_imp)
@@ -0,0 +1,321 @@
+""" Unit tests of the MySQL connection pool and statements, the connection to the server being mocked
+"""
+# pylint: disable=protected-access
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from DIRAC.Core.Utilities import MySQL
+from DIRAC.Core.Utilities.MySQL import ConnectionPool
+
+DB_NAME = "TestDB"
+
+
+@pytest.fixture
+def connect(monkeypatch):
+    """Mock of MySQLdb.connect, returning a new connection each time"""
+    connect = MagicMock(side_effect=lambda **kwargs: MagicMock())
+    monkeypatch.setattr(MySQL.MySQLdb, "connect", connect)
+    return connect
+
+
+def escape(value):
+    """Escape a string as MySQLdb does"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("'", "\\'")
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    """The connection to the server"""
+    conn = MagicMock()
+    conn.escape_string.side_effect = lambda value: escape(value.decode()).encode()
+    monkeypatch.setattr(MySQL.MySQLdb, "connect", MagicMock(return_value=conn))
+    monkeypatch.setattr(MySQL.MySQL, "_MySQL__connectionPools", {})
+    return conn
+
+
+@pytest.fixture
+def db(conn):
+    """A MySQL instance using the mocked connection"""
+    db = MySQL.MySQL(dbName=DB_NAME)
+    conn.reset_mock()
+    return db
+
+
+def render(cmd, params):
+    """Put the parameters in a template, quoted as _escapeValues does"""
+    return cmd % tuple(f'"{escape(str(param))}"' for param in params)
+
+
+def inThread(function):
+    """Run a function in another thread and return its result"""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_reuse(connect):
+    """The connections given back are reused"""
+    pool = ConnectionPool("host", "user", "passwd", maxSize=2)
+    conn = pool.checkout(DB_NAME)["Value"]
+    conn.select_db.assert_called_once_with(DB_NAME)
+    pool.checkin(conn)
+    assert pool.checkout(DB_NAME)["Value"] is conn
+    assert connect.call_count == 1
+    # The database is only selected again if it changes
+    conn.select_db.assert_called_once_with(DB_NAME)
+    other = pool.checkout(DB_NAME)["Value"]
+    assert other is not conn
+    pool.checkin(conn)
+    pool.checkin(other)
+    stats = pool.getStatistics()
+    assert (stats["size"], stats["idle"], stats["checkedOut"], stats["created"]) == (2, 2, 0, 2)
+
+    # A broken connection is closed when given back, or replaced when taken again
+    assert pool.checkout(DB_NAME)["Value"] is other
+    pool.markBroken(other)
+    pool.checkin(other)
+    other.close.assert_called_once()
+    assert pool.getStatistics()["size"] == 1
+    pool.markBroken(conn)
+    new = pool.checkout(DB_NAME)["Value"]
+    assert new is not conn
+    conn.close.assert_called_once()
+    assert connect.call_count == 3
+
+
+def test_exhaustion(connect):
+    """When all the connections are in use, the others wait for one of them"""
+    pool = ConnectionPool("host", "user", "passwd", maxSize=1, waitTimeout=0.2)
+    conn = pool.checkout(DB_NAME)["Value"]
+
+    result = inThread(lambda: pool.checkout(DB_NAME))
+    assert not result["OK"]
+    assert "No MySQL connection available" in result["Message"]
+    assert pool.getStatistics()["timeouts"] == 1
+
+    pool = ConnectionPool("host", "user", "passwd", maxSize=1, waitTimeout=30)
+    conn = pool.checkout(DB_NAME)["Value"]
+    threading.Timer(0.2, pool.checkin, args=(conn,)).start()
+    assert inThread(lambda: pool.checkout(DB_NAME))["Value"] is conn
+    stats = pool.getStatistics()
+    assert stats["waits"] == 1
+    assert stats["maxWaitTime"] > 0.1
+    assert connect.call_count == 2
+
+
+def test_pinning(connect):
+    """The connection pinned to a thread is used for all its statements, and counts in the pool size"""
+    pool = ConnectionPool("host", "user", "passwd", maxSize=1, waitTimeout=0.2)
+    pinned = pool.get(DB_NAME)["Value"]
+    assert pool.get(DB_NAME)["Value"] is pinned
+    assert pool.checkout(DB_NAME)["Value"] is pinned
+    # Checking in a pinned connection leaves it pinned
+    pool.checkin(pinned)
+    assert pool.getStatistics()["pinned"] == 1
+
+    # No connection left for the other threads
+    assert not inThread(lambda: pool.get(DB_NAME))["OK"]
+    assert not inThread(lambda: pool.checkout(DB_NAME))["OK"]
+
+    pool.release()
+    assert pool.getStatistics()["pinned"] == 0
+    assert inThread(lambda: pool.checkout(DB_NAME))["Value"] is pinned
+    assert connect.call_count == 1
+
+
+def test_pinningReleased(connect):
+    """The pinned connections are given back when the thread ends or after the grace time"""
+    pool = ConnectionPool("host", "user", "passwd", maxSize=1, graceTime=600)
+    pinned = inThread(lambda: pool.get(DB_NAME)["Value"])
+    assert pool.getStatistics()["pinned"] == 1
+    # The thread is over
+    pool.clean()
+    assert pool.getStatistics()["pinned"] == 0
+    assert pool.get(DB_NAME)["Value"] is pinned
+    pool.clean(now=time.time() + 601)
+    assert pool.getStatistics()["pinned"] == 0
+
+
+def test_transaction(connect):
+    """A connection pinned for a transaction is kept until its end"""
+    pool = ConnectionPool("host", "user", "passwd", maxSize=1)
+    assert pool.transactionStart(DB_NAME)["OK"]
+    conn = pool.get(DB_NAME)["Value"]
+    pool.release()
+    assert pool.getStatistics()["pinned"] == 1
+    assert pool.checkout(DB_NAME)["Value"] is conn
+    assert pool.transactionCommit(DB_NAME)["OK"]
+    # Released during the transaction, so given back at its end
+    assert pool.getStatistics()["pinned"] == 0
+
+    assert pool.transactionStart(DB_NAME)["OK"]
+    assert pool.get(DB_NAME)["OK"]
+    assert pool.transactionCommit(DB_NAME)["OK"]
+    # Pinned with get, so kept after the transaction
+    assert pool.getStatistics()["pinned"] == 1
+    pool.release()
+    assert pool.getStatistics()["pinned"] == 0
+
+    assert pool.transactionStart(DB_NAME)["OK"]
+    assert pool.transactionRollback(DB_NAME)["OK"]
+    assert pool.getStatistics()["pinned"] == 0
+
+
+def test_parameters(db):
+    """The values are appended to the parameters, and placeholders returned instead"""
+    params = ["first"]
+    result = db._parameters(["a'b", 'c"d', 3, b"bytes", True, ("e", 4), "UTC_TIMESTAMP()"], params)
+    assert result["Value"] == ["%s", "%s", "%s", "%s", "%s", "(%s, %s)", "UTC_TIMESTAMP()"]
+    assert params == ["first", "a'b", 'c"d', "3", "bytes", True, "e", "4"]
+
+    assert db._parameters([], params) == {"OK": True, "Value": []}
+    assert not db._parameters(["TIMESTAMPADD(SECOND, 'a b', c)"], [])["OK"]
+
+
+def test_parametersCondition(db):
+    """The condition built with placeholders is the one built with escaped values"""
+    kwargs = {
+        "condDict": {"Status": ["Done", 'Fai"led'], "Owner": "o'wner\\", "Site": 3},
+        "timeStamp": "LastUpdateTime",
+        "older": "2024-01-02 00:00:00",
+        "newer": "UTC_TIMESTAMP()",
+        "greater": {"JobID": 10},
+        "smaller": {"JobID": 20},
+        "orderAttribute": "JobID:DESC",
+        "limit": 5,
+    }
+    params = []
+    condition = db.buildCondition(params=params, **kwargs)
+    assert "UTC_TIMESTAMP()" in condition
+    assert len(params) == 7
+    assert render(condition, params) == db.buildCondition(**kwargs)
+
+    params = []
+    condition = db.buildCondition({"Name": "prod%"}, useLikeQuery=True, params=params)
+    assert condition.strip() == "WHERE `Name` LIKE %s"
+    assert params == ["prod%"]
+
+
+def test_parametersStatements(db, conn):
+    """The statements are sent with their parameters, to be escaped by the driver"""
+    cursor = conn.cursor.return_value
+    cursor.execute.return_value = 1
+    cursor.fetchall.return_value = ((1,),)
+    assert db.getFields("Jobs", ["JobID"], {"Owner": ["a'b", "c"]})["Value"] == ((1,),)
+    cmd, params = cursor.execute.call_args.args
+    assert cmd.split() == "SELECT `JobID` FROM `Jobs` WHERE `Owner` IN ( %s, %s )".split()
+    assert params == ["a'b", "c"]
+
+    cursor.lastrowid = 7
+    result = db._update("UPDATE `Jobs` SET `Owner` = %s", params=["x"])
+    assert result == {"OK": True, "Value": 1, "lastRowId": 7}
+    cursor.execute.assert_called_with("UPDATE `Jobs` SET `Owner` = %s", ["x"])
+    # Without parameters, the command is sent as is
+    db._query("SELECT 1")
+    cursor.execute.assert_called_with("SELECT 1", None)
+
+
+def test_updateMany(db, conn):
+    """A template is executed for all the parameters with one cursor"""
+    cursor = conn.cursor.return_value
+    assert db._updateMany("INSERT INTO `T` (`a`) VALUES (%s)", []) == {"OK": True, "Value": 0}
+    cursor.executemany.assert_not_called()
+
+    cursor.executemany.return_value = 2
+    cursor.lastrowid = 0
+    paramsList = [("x",), ("y",)]
+    assert db._updateMany("INSERT INTO `T` (`a`) VALUES (%s)", paramsList) == {"OK": True, "Value": 2}
+    cursor.executemany.assert_called_once_with("INSERT INTO `T` (`a`) VALUES (%s)", paramsList)
+    cursor.close.assert_called_once()
+
+    cursor.lastrowid = 12
+    assert db._updateMany("INSERT INTO `T` (`a`) VALUES (%s)", paramsList)["lastRowId"] == 12
+
+
+def test_insertManyFields(db, conn):
+    """The rows are inserted with one statement per chunk, in a transaction if there are several"""
+    cursor = conn.cursor.return_value
+    cursor.execute.side_effect = lambda cmd, params=None: cmd.count("( %s, %s )") if params else 0
+    cursor.lastrowid = 0
+    rows = [("a", 1), ("b", 2), ("c", 3), ("d", 4), ("e", 5)]
+
+    assert db.insertManyFields("T", ["x", "y"], rows[:2])["Value"] == 2
+    cursor.execute.assert_called_once_with(
+        "INSERT INTO `T` ( `x`, `y` ) VALUES ( %s, %s ), ( %s, %s )",
+        ["a", "1", "b", "2"],
+    )
+    conn.commit.assert_not_called()
+
+    cursor.execute.reset_mock()
+    assert db.insertManyFields("T", ["x", "y"], rows, chunkSize=2)["Value"] == 5
+    calls = [call.args for call in cursor.execute.call_args_list]
+    assert calls[0] == ("START TRANSACTION",)
+    assert [len(params) for _cmd, params in calls[1:]] == [4, 4, 2]
+    assert [params[0] for _cmd, params in calls[1:]] == ["a", "c", "e"]
+    conn.commit.assert_called_once()
+
+    # With a connection, the caller is in charge of the transaction
+    cursor.execute.reset_mock()
+    assert db.insertManyFields("T", ["x", "y"], rows, chunkSize=2, conn=conn)["Value"] == 5
+    assert cursor.execute.call_count == 3
+    assert "START TRANSACTION" not in [call.args[0] for call in cursor.execute.call_args_list]
+
+    # A failing chunk rolls back the whole transaction
+    cursor.execute.side_effect = [0, 2, Exception("Deadlock found")]
+    assert not db.insertManyFields("T", ["x", "y"], rows, chunkSize=2)["OK"]
+    conn.rollback.assert_called_once()
+
+
+def test_insertManyFields_rows(db, conn):
+    """Nothing is sent without rows, or if one of the rows does not match the fields"""
+    cursor = conn.cursor.return_value
+    assert db.insertManyFields("T", ["x", "y"], []) == {"OK": True, "Value": 0}
+    assert db.insertManyFields("T", ["x", "y"], iter([])) == {"OK": True, "Value": 0}
+
+    result = db.insertManyFields("T", ["x", "y"], [("a", 1)] * 3 + [("b",)], chunkSize=2)
+    assert not result["OK"]
+    assert "Mismatch" in result["Message"]
+    assert not db.insertManyFields("T", ["x", "y"], [("a", 1, 2)])["OK"]
+    assert not db.insertManyFields("T", ["x", "y"], [("a", 1)], chunkSize=0)["OK"]
+    assert not db.insertManyFields("T", ["x", "y"], [("TIMESTAMPADD(SECOND, 'a b', c)", 1)])["OK"]
+    cursor.execute.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "onDuplicate, expected",
+    [
+        ("IGNORE", "INSERT IGNORE INTO `T` ( `x`, `y` ) VALUES ( %s, %s )"),
+        (
+            "UPDATE",
+            "INSERT INTO `T` ( `x`, `y` ) VALUES ( %s, %s ) "
+            "ON DUPLICATE KEY UPDATE `x` = VALUES(`x`), `y` = VALUES(`y`)",
+        ),
+        (["y"], "INSERT INTO `T` ( `x`, `y` ) VALUES ( %s, %s ) ON DUPLICATE KEY UPDATE `y` = VALUES(`y`)"),
+        (
+            {"y": "IF(`x` LIKE 'a%', `y` + VALUES(`y`), `y`)"},
+            "INSERT INTO `T` ( `x`, `y` ) VALUES ( %s, %s ) "
+            "ON DUPLICATE KEY UPDATE `y` = IF(`x` LIKE 'a%%', `y` + VALUES(`y`), `y`)",
+        ),
+    ],
+)
+def test_insertManyFields_onDuplicate(db, conn, onDuplicate, expected):
+    cursor = conn.cursor.return_value
+    cursor.execute.return_value = 1
+    assert db.insertManyFields("T", ["x", "y"], [("a", 1)], onDuplicate=onDuplicate)["OK"]
+    cmd, params = cursor.execute.call_args.args
+    assert cmd == expected
+    # The % of the expressions are escaped for the driver
+    assert "%%" not in render(cmd, params)
+
+
+@pytest.mark.parametrize("onDuplicate", ["REPLACE", {}, [], [None], 3])
+def test_insertManyFields_badOnDuplicate(db, conn, onDuplicate):
+    result = db.insertManyFields("T", ["x", "y"], [("a", 1)], onDuplicate=onDuplicate)
+    assert not result["OK"]
+    assert "Invalid onDuplicate" in result["Message"]
+    conn.cursor.return_value.execute.assert_not_called()
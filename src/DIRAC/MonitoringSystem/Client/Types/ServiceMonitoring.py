@@ -17,6 +17,7 @@ class ServiceMonitoring(BaseType):
             "ServiceName",
             "Status",
             "Location",
+            "RequestClass",
         ]
 
         self.monitoringFields = [
@@ -29,6 +30,19 @@ class ServiceMonitoring(BaseType):
             "RunningThreads",
             "MaxFD",
             "ResponseTime",
+            "Handshakes",
+            "ResumedHandshakes",
+            "HandshakeTime",
+            "QueuedRequests",
+            "RunningRequests",
+            "ExecutedRequests",
+            "RejectedRequests",
+            "QueueWaitTime",
+            "QueueWait10ms",
+            "QueueWait100ms",
+            "QueueWait1s",
+            "QueueWait10s",
+            "QueueWaitOver10s",
         ]
 
         self.index = "service_monitoring-index"
@@ -39,6 +53,7 @@ class ServiceMonitoring(BaseType):
                 "ServiceName": {"type": "keyword"},
                 "Status": {"type": "keyword"},
                 "Location": {"type": "keyword"},
+                "RequestClass": {"type": "keyword"},
                 "MemoryUsage": {"type": "long"},
                 "CpuPercentage": {"type": "long"},
                 "Connections": {"type": "long"},
@@ -48,6 +63,19 @@ class ServiceMonitoring(BaseType):
                 "RunningThreads": {"type": "long"},
                 "MaxFD": {"type": "long"},
                 "ResponseTime": {"type": "long"},
+                "Handshakes": {"type": "long"},
+                "ResumedHandshakes": {"type": "long"},
+                "HandshakeTime": {"type": "long"},
+                "QueuedRequests": {"type": "long"},
+                "RunningRequests": {"type": "long"},
+                "ExecutedRequests": {"type": "long"},
+                "RejectedRequests": {"type": "long"},
+                "QueueWaitTime": {"type": "long"},
+                "QueueWait10ms": {"type": "long"},
+                "QueueWait100ms": {"type": "long"},
+                "QueueWait1s": {"type": "long"},
+                "QueueWait10s": {"type": "long"},
+                "QueueWaitOver10s": {"type": "long"},
             }
         )
 
@@ -236,6 +236,9 @@ class PoolComputingElement(ComputingElement):
         if not result["OK"]:
             return result
         ceDict = result["Value"]
+        # The processors are shared by the jobs: when several jobs are matched at once,
+        # the Matcher only gives jobs fitting together in the available processors
+        ceDict["SharedProcessors"] = True
 
         ceDictList = []
         if self.ceParameters.get("MultiProcessorStrategy"):
@@ -738,11 +738,13 @@ class TransformationDB(DB):
             fileIDs.remove(tupleIn[0])
         if not fileIDs:
             return S_OK([])
-        req = "INSERT INTO TransformationFiles (TransformationID,FileID,LastUpdate,InsertedTime) VALUES"
-        for fileID in fileIDs:
-            req = "%s (%d,%d,UTC_TIMESTAMP(),UTC_TIMESTAMP())," % (req, transID, fileID)
-        req = req.rstrip(",")
-        res = self._update(req, conn=connection)
+        res = self.insertManyFields(
+            "TransformationFiles",
+            ["TransformationID", "FileID", "LastUpdate", "InsertedTime"],
+            [[int(transID), int(fileID), "UTC_TIMESTAMP()", "UTC_TIMESTAMP()"] for fileID in fileIDs],
+            chunkSize=10000,
+            conn=connection,
+        )
         if not res["OK"]:
             return res
         return S_OK(fileIDs)
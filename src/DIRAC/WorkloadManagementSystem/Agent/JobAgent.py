@@ -71,6 +71,8 @@ class JobAgent(AgentModule):
         self.stopAfterHostFailures = 3
         self.matchFailedCount = 0
         self.stopAfterFailedMatches = 10
+        # Maximum number of jobs requested to the Matcher at once, when there are several free slots
+        self.maxJobsPerMatch = 10
         self.jobCount = 0
         self.extraOptions = ""
         self.logLevel = "INFO"
@@ -89,6 +91,8 @@ class JobAgent(AgentModule):
         # and jobReport is the JobReport instance for the job
         # (one instance per job to avoid any discrepancy when communicating with the WMS)
         self.jobs = {}
+        # Jobs already matched, that will be submitted in the next cycles (list of matcher info dict)
+        self.matchedJobs = []
 
     #############################################################################
     def initialize(self):
@@ -128,6 +132,7 @@ class JobAgent(AgentModule):
         self.stopOnApplicationFailure = self.am_getOption("StopOnApplicationFailure", self.stopOnApplicationFailure)
         self.stopAfterHostFailures = self.am_getOption("StopAfterHostFailures", self.stopAfterHostFailures)
         self.stopAfterFailedMatches = self.am_getOption("StopAfterFailedMatches", self.stopAfterFailedMatches)
+        self.maxJobsPerMatch = self.am_getOption("MaxJobsPerMatch", self.maxJobsPerMatch)
         self.extraOptions = gConfig.getValue("/AgentJobRequirements/ExtraOptions", self.extraOptions)
         self.logLevel = self.am_getOption("DefaultLogLevel", self.logLevel)
         self.defaultWrapperLocation = self.am_getOption("JobWrapperTemplate", self.defaultWrapperLocation)
@@ -154,7 +159,21 @@ class JobAgent(AgentModule):
 
     #############################################################################
     def execute(self):
-        """The JobAgent execution method."""
+        """The JobAgent execution method.
+
+        All the jobs matched at once (see MaxJobsPerMatch) are submitted in the same cycle,
+        so that they do not stay in the Matched status while waiting for the next cycles.
+        """
+        while True:
+            nMatchedJobs = len(self.matchedJobs)
+            result = self._matchAndSubmitJob()
+            # Stop when the agent fails, when there is no job matched in advance left,
+            # or when the next one could not be taken (no slot available anymore)
+            if not result["OK"] or not self.matchedJobs or len(self.matchedJobs) == nMatchedJobs:
+                return result
+
+    def _matchAndSubmitJob(self):
+        """Match a job, or take the next one matched in advance, and submit it"""
 
         # Temporary mechanism to pass a shutdown message to the agent
         if os.path.exists("/var/lib/dirac_drain"):
@@ -167,6 +186,7 @@ class JobAgent(AgentModule):
             return self._finish(result["Message"])
         if result["OK"] and result["Value"]:
             return result
+        availableSlots = result["AvailableSlots"]
 
         # Check that we are allowed to continue and that time left is sufficient
         if self.jobCount:
@@ -188,7 +208,7 @@ class JobAgent(AgentModule):
             self._setCEDict(ceDict)
 
         # Try to match a job
-        jobRequest = self._matchAJob(ceDictList)
+        jobRequest = self._matchAJob(ceDictList, availableSlots)
 
         if not jobRequest["OK"]:
             res = self._checkMatchingIssues(jobRequest)
@@ -392,7 +412,9 @@ class JobAgent(AgentModule):
                 return S_OK("Job Agent cycle complete with %d running jobs" % runningJobs)
             self.log.info("CE is not available (and there are no running jobs)")
             return S_ERROR("CE Not Available")
-        return S_OK()
+        result = S_OK()
+        result["AvailableSlots"] = availableSlots
+        return result
 
     #############################################################################
     def _computeCPUWorkLeft(self, processors=1):
@@ -529,23 +551,56 @@ class JobAgent(AgentModule):
         return module.execute()
 
     #############################################################################
-    def _matchAJob(self, ceDictList):
-        """Call the Matcher with each ceDict until we get a job"""
+    def _matchAJob(self, ceDictList, nJobs=1):
+        """Call the Matcher with each ceDict until we get a job
+
+        If there are several free slots, up to nJobs jobs are requested at once (see MaxJobsPerMatch):
+        the extra jobs are kept, and returned by the next calls before calling the Matcher again.
+
+        :param list ceDictList: CE descriptions, by order of preference
+        :param int nJobs: number of jobs that can be submitted
+        :return: S_OK(matcher info dict)/S_ERROR
+        """
+        if self.matchedJobs:
+            return S_OK(self.matchedJobs.pop(0))
+
+        nJobs = max(1, min(nJobs, self.maxJobsPerMatch))
         jobRequest = S_ERROR("No CE Dictionary available")
         for ceDict in ceDictList:
             self.log.verbose("CE dict", ceDict)
 
             start = time.time()
-            jobRequest = MatcherClient().requestJob(ceDict)
+            if nJobs > 1:
+                jobRequest = MatcherClient().requestJobs(ceDict, nJobs)
+            else:
+                jobRequest = MatcherClient().requestJob(ceDict)
+                if jobRequest["OK"]:
+                    jobRequest["Value"] = [jobRequest["Value"]]
             matchTime = time.time() - start
 
             self.log.info("MatcherTime", f"= {matchTime:.2f} (s)")
             if jobRequest["OK"]:
-                jobRequest["Value"]["matchTime"] = matchTime
-                jobRequest["Value"]["CEDict"] = ceDict
-                break
+                for matcherInfo in jobRequest["Value"]:
+                    matcherInfo["matchTime"] = matchTime
+                    matcherInfo["CEDict"] = ceDict
+                self.matchedJobs = jobRequest["Value"]
+                return S_OK(self.matchedJobs.pop(0))
         return jobRequest
 
+    def _rescheduleMatchedJobs(self, message):
+        """Reschedule the jobs matched in advance, that will not be submitted
+
+        The matched jobs are submitted in the cycle they are matched, so this only happens
+        when the agent stops in the middle of a batch.
+
+        :param str message: the reason
+        """
+        while self.matchedJobs:
+            jobID = str(self.matchedJobs.pop(0)["JobID"])
+            self.jobs[jobID] = {"JobReport": JobReport(jobID, f"{self.__class__.__name__}@{self.siteName}")}
+            self._rescheduleFailedJob(jobID, message)
+            del self.jobs[jobID]
+
     def _checkMatchingIssues(self, jobRequest):
         """Check the source of the matching issue
 
@@ -809,6 +864,7 @@ class JobAgent(AgentModule):
         """Force the JobAgent to complete gracefully."""
         if stop:
             self.log.info("JobAgent will stop", f'with message "{message}", execution complete.')
+            self._rescheduleMatchedJobs(f"JobAgent stopped: {message}")
             self.am_stopExecution()
             return S_ERROR(message)
 
@@ -870,6 +926,8 @@ class JobAgent(AgentModule):
     def finalize(self):
         """Job Agent finalization method"""
 
+        self._rescheduleMatchedJobs("JobAgent finalized")
+
         # wait for all jobs to be completed
         res = self.computingElement.shutdown()
         if not res["OK"]:
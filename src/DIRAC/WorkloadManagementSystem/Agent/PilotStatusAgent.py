@@ -68,7 +68,7 @@ class PilotStatusAgent(AgentModule):
         # Now handle pilots not updated in the last N days and declare them Deleted.
         result = self.handleOldPilots(connection)
 
-        connection.close()
+        self.pilotDB._releaseConnection()
 
         result = self.pilots.clearPilots(self.clearPilotsDelay, self.clearAbortedDelay)
         if not result["OK"]:
@@ -13,7 +13,7 @@ import random
 import sys
 from collections import defaultdict
 
-from DIRAC import S_OK
+from DIRAC import S_ERROR, S_OK
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.ConfigurationSystem.Client.Helpers.Registry import getDNForUsername
 from DIRAC.Core.Utilities import DErrno
@@ -161,6 +161,13 @@ class PushJobAgent(JobAgent):
             if not result["OK"] or result["Value"]:
                 self.failedQueues[queueName] += 1
                 continue
+            remoteSlots = result["AvailableSlots"]
+
+            # Check that there is enough slots locally
+            result = self._checkCEAvailability(self.computingElement)
+            if not result["OK"] or result["Value"]:
+                return result
+            localSlots = result["AvailableSlots"]
 
             # Get environment details and enhance them
             result = self._getCEDict(ce)
@@ -174,111 +181,38 @@ class PushJobAgent(JobAgent):
                 ceDict["NumberOfProcessors"] = ce.ceParameters.get("NumberOfProcessors")
                 self._setCEDict(ceDict)
 
-            # Try to match a job
-            jobRequest = self._matchAJob(ceDictList)
+            # Try to match jobs, as many as there are slots locally and in the remote CE
+            jobRequest = self._matchAJob(ceDictList, min(localSlots, remoteSlots))
+            queueFailed = False
             while jobRequest["OK"]:
-                # Check matcher information returned
-                matcherParams = ["JDL", "Owner", "Group"]
-                matcherInfo = jobRequest["Value"]
-                jobID = str(matcherInfo["JobID"])
-                self.jobs[jobID] = {}
-                self.jobs[jobID]["JobReport"] = JobReport(jobID, f"{self.__class__.__name__}@{self.siteName}")
-                result = self._checkMatcherInfo(jobID, matcherInfo, matcherParams)
-                if not result["OK"]:
+                result = self._submitMatchedJob(jobRequest["Value"])
+                if not result["OK"] and not queueFailed:
+                    queueFailed = True
                     self.failedQueues[queueName] += 1
-                    break
 
-                jobJDL = matcherInfo["JDL"]
-                jobGroup = matcherInfo["Group"]
-                owner = matcherInfo["Owner"]
-                ceDict = matcherInfo["CEDict"]
-                matchTime = matcherInfo["matchTime"]
-
-                optimizerParams = {}
-                for key in matcherInfo:
-                    if key not in matcherParams:
-                        optimizerParams[key] = matcherInfo[key]
-
-                # Get JDL paramters
-                parameters = self._getJDLParameters(jobJDL)
-                if not parameters["OK"]:
-                    self.jobs[jobID]["JobReport"].setJobStatus(
-                        status=JobStatus.FAILED, minorStatus="Could Not Extract JDL Parameters"
-                    )
-                    self.log.warn("Could Not Extract JDL Parameters", parameters["Message"])
-                    self.failedQueues[queueName] += 1
+                # The slots of the jobs matched in advance were already counted: submit them anyway,
+                # but do not match new jobs for this queue after a failure
+                if self.matchedJobs:
+                    jobRequest = self._matchAJob(ceDictList)
+                    continue
+                if queueFailed:
                     break
 
-                params = parameters["Value"]
-                result = self._extractValuesFromJobParams(params)
-                if not result["OK"]:
-                    self.failedQueues[queueName] += 1
-                    break
-                submissionParams = result["Value"]
-                jobType = submissionParams["jobType"]
-
-                self.log.verbose("Job request successful: \n", jobRequest["Value"])
-                self.log.info("Received", f"JobID={jobID}, JobType={jobType}, Owner={owner}, JobGroup={jobGroup}")
-
-                self.jobs[jobID]["JobReport"].setJobParameter(
-                    par_name="MatcherServiceTime", par_value=str(matchTime), sendFlag=False
-                )
-                self.jobs[jobID]["JobReport"].setJobStatus(
-                    status=JobStatus.MATCHED, minorStatus="Job Received by Agent", sendFlag=False
-                )
-
-                # Setup proxy
-                result_setupProxy = self._setupProxy(owner, jobGroup)
-                if not result_setupProxy["OK"]:
-                    result = self._rescheduleFailedJob(jobID, result_setupProxy["Message"])
-                    self.failedQueues[queueName] += 1
-                    break
-                proxyChain = result_setupProxy.get("Value")
-
-                # Check software and install them if required
-                self.jobs[jobID]["JobReport"].setJobStatus(minorStatus="Installing Software", sendFlag=False)
-                software = self._checkInstallSoftware(params, ceDict)
-                if not software["OK"]:
-                    self.log.error("Failed to install software for job", f"{jobID}")
-                    errorMsg = software["Message"]
-                    if not errorMsg:
-                        errorMsg = "Failed software installation"
-                    result = self._rescheduleFailedJob(jobID, errorMsg)
-                    self.failedQueues[queueName] += 1
-                    break
-
-                # Submit the job to the CE
-                self.log.debug(f"Before self._submitJob() ({self.ceName}CE)")
-                resultSubmission = self._submitJob(
-                    jobID=jobID,
-                    jobParams=params,
-                    resourceParams=ceDict,
-                    optimizerParams=optimizerParams,
-                    proxyChain=proxyChain,
-                    processors=submissionParams["processors"],
-                    wholeNode=submissionParams["wholeNode"],
-                    maxNumberOfProcessors=submissionParams["maxNumberOfProcessors"],
-                    mpTag=submissionParams["mpTag"],
-                )
-                if not result["OK"]:
-                    result = self._rescheduleFailedJob(jobID, resultSubmission["Message"])
-                    self.failedQueues[queueName] += 1
-                    break
-                self.log.debug(f"After {self.ceName}CE submitJob()")
-
                 # Check that there is enough slots locally
                 result = self._checkCEAvailability(self.computingElement)
                 if not result["OK"] or result["Value"]:
                     return result
+                localSlots = result["AvailableSlots"]
 
                 # Check that there is enough slots in the remote CE to match a new job
                 result = self._checkCEAvailability(ce)
                 if not result["OK"] or result["Value"]:
                     self.failedQueues[queueName] += 1
                     break
+                remoteSlots = result["AvailableSlots"]
 
-                # Try to match a new job
-                jobRequest = self._matchAJob(ceDictList)
+                # Try to match new jobs
+                jobRequest = self._matchAJob(ceDictList, min(localSlots, remoteSlots))
 
             if not jobRequest["OK"]:
                 self._checkMatchingIssues(jobRequest)
@@ -287,6 +221,96 @@ class PushJobAgent(JobAgent):
 
         return S_OK("Push Job Agent cycle complete")
 
+    #############################################################################
+    def _submitMatchedJob(self, matcherInfo):
+        """Submit a matched job to the local CE
+
+        :param dict matcherInfo: information returned by the Matcher
+        :return: S_OK()/S_ERROR()
+        """
+        # Check matcher information returned
+        matcherParams = ["JDL", "Owner", "Group"]
+        jobID = str(matcherInfo["JobID"])
+        self.jobs[jobID] = {}
+        self.jobs[jobID]["JobReport"] = JobReport(jobID, f"{self.__class__.__name__}@{self.siteName}")
+        result = self._checkMatcherInfo(jobID, matcherInfo, matcherParams)
+        if not result["OK"]:
+            return result
+
+        jobJDL = matcherInfo["JDL"]
+        jobGroup = matcherInfo["Group"]
+        owner = matcherInfo["Owner"]
+        ceDict = matcherInfo["CEDict"]
+        matchTime = matcherInfo["matchTime"]
+
+        optimizerParams = {}
+        for key in matcherInfo:
+            if key not in matcherParams:
+                optimizerParams[key] = matcherInfo[key]
+
+        # Get JDL paramters
+        parameters = self._getJDLParameters(jobJDL)
+        if not parameters["OK"]:
+            self.jobs[jobID]["JobReport"].setJobStatus(
+                status=JobStatus.FAILED, minorStatus="Could Not Extract JDL Parameters"
+            )
+            self.log.warn("Could Not Extract JDL Parameters", parameters["Message"])
+            return parameters
+
+        params = parameters["Value"]
+        result = self._extractValuesFromJobParams(params)
+        if not result["OK"]:
+            return result
+        submissionParams = result["Value"]
+        jobType = submissionParams["jobType"]
+
+        self.log.verbose("Job request successful: \n", matcherInfo)
+        self.log.info("Received", f"JobID={jobID}, JobType={jobType}, Owner={owner}, JobGroup={jobGroup}")
+
+        self.jobs[jobID]["JobReport"].setJobParameter(
+            par_name="MatcherServiceTime", par_value=str(matchTime), sendFlag=False
+        )
+        self.jobs[jobID]["JobReport"].setJobStatus(
+            status=JobStatus.MATCHED, minorStatus="Job Received by Agent", sendFlag=False
+        )
+
+        # Setup proxy
+        result_setupProxy = self._setupProxy(owner, jobGroup)
+        if not result_setupProxy["OK"]:
+            self._rescheduleFailedJob(jobID, result_setupProxy["Message"])
+            return result_setupProxy
+        proxyChain = result_setupProxy.get("Value")
+
+        # Check software and install them if required
+        self.jobs[jobID]["JobReport"].setJobStatus(minorStatus="Installing Software", sendFlag=False)
+        software = self._checkInstallSoftware(params, ceDict)
+        if not software["OK"]:
+            self.log.error("Failed to install software for job", f"{jobID}")
+            errorMsg = software["Message"]
+            if not errorMsg:
+                errorMsg = "Failed software installation"
+            self._rescheduleFailedJob(jobID, errorMsg)
+            return S_ERROR(errorMsg)
+
+        # Submit the job to the CE
+        self.log.debug(f"Before self._submitJob() ({self.ceName}CE)")
+        resultSubmission = self._submitJob(
+            jobID=jobID,
+            jobParams=params,
+            resourceParams=ceDict,
+            optimizerParams=optimizerParams,
+            proxyChain=proxyChain,
+            processors=submissionParams["processors"],
+            wholeNode=submissionParams["wholeNode"],
+            maxNumberOfProcessors=submissionParams["maxNumberOfProcessors"],
+            mpTag=submissionParams["mpTag"],
+        )
+        if not resultSubmission["OK"]:
+            self._rescheduleFailedJob(jobID, resultSubmission["Message"])
+            return resultSubmission
+        self.log.debug(f"After {self.ceName}CE submitJob()")
+        return S_OK()
+
     #############################################################################
     def _buildQueueDict(self, siteNames, ces, ceTypes):
         """Get the queues and construct a queue dictionary
@@ -2,6 +2,10 @@
 "running" state not receiving a heart beat signal for more than stalledTime
 seconds will be assigned the "Stalled" state.
 
+The jobs are processed in batches of BulkSize jobs: the attributes, heart beats, logging records
+and pilot statuses of a batch are fetched with a few queries, and its status changes, kill commands
+and accounting records are sent in bulk.
+
 .. literalinclude:: ../ConfigTemplate.cfg
   :start-after: ##BEGIN StalledJobAgent
   :end-before: ##END
@@ -12,9 +16,11 @@ import concurrent.futures
 import datetime
 
 from DIRAC import S_OK, S_ERROR, gConfig
+from DIRAC.AccountingSystem.Client.DataStoreClient import gDataStoreClient
 from DIRAC.AccountingSystem.Client.Types.Job import Job
 from DIRAC.Core.Base.AgentModule import AgentModule
 from DIRAC.Core.Utilities import DErrno
+from DIRAC.Core.Utilities.List import breakListIntoChunks
 from DIRAC.Core.Utilities.TimeUtilities import fromString, toEpoch, second
 from DIRAC.Core.Utilities.ClassAd.ClassAdLight import ClassAd
 from DIRAC.ConfigurationSystem.Client.Helpers import cfgPath
@@ -47,6 +53,7 @@ class StalledJobAgent(AgentModule):
         self.stalledJobsToleranceTime = 0
         self.stalledJobsTolerantSites = []
         self.stalledJobsToRescheduleSites = []
+        self.bulkSize = 1000
         self.threadPoolExecutor = None
 
     #############################################################################
@@ -73,6 +80,8 @@ class StalledJobAgent(AgentModule):
         self.submittingTime = self.am_getOption("SubmittingTime", self.submittingTime)
         self.matchedTime = self.am_getOption("MatchedTime", self.matchedTime)
         self.rescheduledTime = self.am_getOption("RescheduledTime", self.rescheduledTime)
+        # Number of jobs processed together, with a few queries per batch
+        self.bulkSize = self.am_getOption("BulkSize", self.bulkSize)
 
         wrapperSection = cfgPath("Systems", "WorkloadManagement", wmsInstance, "JobWrapper")
 
@@ -119,9 +128,7 @@ class StalledJobAgent(AgentModule):
                 f"{' & '.join(checkedStatuses)} jobs will be checked for being stalled",
                 f"(n={len(jobs)}, heartbeat before {str(checkTime)})",
             )
-            for job in jobs:
-                future = self.threadPoolExecutor.submit(self._execute, f"{job}:_markStalledJobs")
-                futures.append(future)
+            futures += self._submitBatches("_markStalledJobs", jobs)
 
         # 2) fail Stalled Jobs
         result = self.jobDB.selectJobs({"Status": JobStatus.STALLED})
@@ -130,9 +137,7 @@ class StalledJobAgent(AgentModule):
         if result["Value"]:
             jobs = sorted(result["Value"])
             self.log.info("Jobs Stalled will be checked for failure", f"(n={len(jobs)})")
-            for job in jobs:
-                future = self.threadPoolExecutor.submit(self._execute, f"{job}:_failStalledJobs")
-                futures.append(future)
+            futures += self._submitBatches("_failStalledJobs", jobs)
 
         # 3) Send accounting
         for minor in self.minorStalledStatuses:
@@ -140,11 +145,9 @@ class StalledJobAgent(AgentModule):
             if not result["OK"]:
                 self.log.error("Issue selecting jobs for accounting", result["Message"])
             if result["Value"]:
-                jobs = result["Value"]
+                jobs = sorted(result["Value"])
                 self.log.info("Stalled jobs will be Accounted", f"(n={len(jobs)})")
-                for job in jobs:
-                    future = self.threadPoolExecutor.submit(self._execute, f"{job}:_sendAccounting")
-                    futures.append(future)
+                futures += self._submitBatches("_sendAccounting", jobs)
 
         for future in concurrent.futures.as_completed(futures):
             try:
@@ -174,327 +177,385 @@ class StalledJobAgent(AgentModule):
         self.log.info("Threads are empty, terminating the agent...")
         return S_OK()
 
-    def _execute(self, job_Op):
-        """Doing the actual job.
+    def _submitBatches(self, jobOp, jobIDs):
+        """Submit an operation to the threads, for batches of at most bulkSize jobs
+
+        :return: list of futures
+        """
+        return [
+            self.threadPoolExecutor.submit(self._execute, jobOp, batch)
+            for batch in breakListIntoChunks(jobIDs, self.bulkSize)
+        ]
+
+    def _execute(self, jobOp, jobIDs):
+        """Doing the actual job, on a batch of jobs.
 
         This is run inside the threads
         """
-        jobID, jobOp = job_Op.split(":")
-        jobID = int(jobID)
-        res = getattr(self, f"{jobOp}")(jobID)
+        res = getattr(self, jobOp)(jobIDs)
         if not res["OK"]:
-            self.log.error(f"Failure executing {jobOp}", f"on {jobID}: {res['Message']}")
+            self.log.error(f"Failure executing {jobOp}", f"on {len(jobIDs)} jobs: {res['Message']}")
 
     #############################################################################
-    def _markStalledJobs(self, jobID):
+    def _markStalledJobs(self, jobIDs):
         """
-        Identifies if JobID is stalled:
+        Identifies which of the jobs are stalled:
         running or completing without update longer than stalledTime.
 
         Run inside thread.
+
+        :param list jobIDs: job IDs
         """
-        delayTime = self.stalledTime
+        result = self._getLatestUpdateTimes(jobIDs)
+        if not result["OK"]:
+            return result
+        latestUpdates = result["Value"]
+
         # Add a tolerance time for some sites if required
+        sites = {}
         if self.stalledJobsTolerantSites:
-            result = self.jobDB.getJobAttribute(jobID, "site")
+            result = self._getJobsSites(jobIDs)
             if not result["OK"]:
                 return result
-            site = result["Value"]
-            if site in self.stalledJobsTolerantSites:
+            sites = result["Value"]
+
+        now = toEpoch()
+        stalledJobs = []
+        for jobID in jobIDs:
+            if jobID not in latestUpdates:
+                continue
+            delayTime = self.stalledTime
+            if sites.get(jobID) in self.stalledJobsTolerantSites:
                 delayTime += self.stalledJobsToleranceTime
-        # Check if the job is really stalled
-        result = self._checkJobStalled(jobID, delayTime)
-        if not result["OK"]:
-            return result
-        self.log.verbose("Updating status to Stalled", f"for job {jobID}")
-        return self._updateJobStatus(jobID, JobStatus.STALLED)
+            elapsedTime = now - latestUpdates[jobID]
+            if elapsedTime > delayTime:
+                self.log.info(
+                    "Job is identified as stalled", ": jobID %d with last update > %s secs ago" % (jobID, elapsedTime)
+                )
+                stalledJobs.append(jobID)
+
+        if not stalledJobs:
+            return S_OK()
+        self.log.verbose("Updating status to Stalled", f"for {len(stalledJobs)} jobs")
+        return self._updateJobsStatus(stalledJobs, JobStatus.STALLED)
 
     #############################################################################
-    def _failStalledJobs(self, jobID):
+    def _failStalledJobs(self, jobIDs):
         """Changes the Stalled status to Failed for jobs long in the Stalled
         status.
 
         Run inside thread.
-        """
 
-        setFailed = False
-        # Check if the job pilot is lost
-        result = self._getJobPilotStatus(jobID)
+        :param list jobIDs: job IDs
+        """
+        # Check if the job pilots are lost
+        result = self._getJobsPilotStatus(jobIDs)
         if not result["OK"]:
-            self.log.error("Failed to get pilot status", f"for job {jobID}: {result['Message']}")
+            self.log.error("Failed to get pilot status", f"for {len(jobIDs)} jobs: {result['Message']}")
             return result
-        pilotStatus = result["Value"]
-        if pilotStatus != "Running":
-            setFailed = self.minorStalledStatuses[0]
-        else:
-            # Verify that there was no sign of life for long enough
-            result = self._getLatestUpdateTime(jobID)
+        pilotStatuses = result["Value"]
+
+        # { minor status : [ job IDs ] }
+        failedJobs = {}
+        runningPilotJobs = []
+        for jobID in jobIDs:
+            if pilotStatuses[jobID] != "Running":
+                failedJobs.setdefault(self.minorStalledStatuses[0], []).append(jobID)
+            else:
+                runningPilotJobs.append(jobID)
+
+        # Verify that there was no sign of life for long enough
+        if runningPilotJobs:
+            result = self._getLatestUpdateTimes(runningPilotJobs)
             if not result["OK"]:
-                self.log.error("Failed to get job update time", f"for job {jobID}: {result['Message']}")
+                self.log.error("Failed to get job update times", result["Message"])
                 return result
-            elapsedTime = toEpoch() - result["Value"]
-            if elapsedTime > self.failedTime:
-                setFailed = self.minorStalledStatuses[1]
+            now = toEpoch()
+            for jobID, latestUpdate in result["Value"].items():
+                if now - latestUpdate > self.failedTime:
+                    failedJobs.setdefault(self.minorStalledStatuses[1], []).append(jobID)
+
+        if not failedJobs:
+            return S_OK()
 
         # Set the jobs Failed, send them a kill signal in case they are not really dead
         # and send accounting info
-        if setFailed:
-            res = self._sendKillCommand(jobID)
-            if not res["OK"]:
-                self.log.error("Failed to kill job", jobID)
+        result = self._sendKillCommands([jobID for jobs in failedJobs.values() for jobID in jobs])
+        if not result["OK"]:
+            self.log.error("Failed to kill jobs", result["Message"])
 
-            # For some sites we might want to reschedule rather than fail the jobs
-            if self.stalledJobsToRescheduleSites:
-                result = self.jobDB.getJobAttribute(jobID, "site")
-                if not result["OK"]:
-                    return result
-                site = result["Value"]
-                if site in self.stalledJobsToRescheduleSites:
-                    return self._updateJobStatus(jobID, JobStatus.RESCHEDULED, minorStatus=setFailed, force=True)
+        # For some sites we might want to reschedule rather than fail the jobs
+        sites = {}
+        if self.stalledJobsToRescheduleSites:
+            result = self._getJobsSites([jobID for jobs in failedJobs.values() for jobID in jobs])
+            if not result["OK"]:
+                return result
+            sites = result["Value"]
 
-            return self._updateJobStatus(jobID, JobStatus.FAILED, minorStatus=setFailed, force=True)
+        toRet = S_OK()
+        for minorStatus, jobs in failedJobs.items():
+            rescheduledJobs = [jobID for jobID in jobs if sites.get(jobID) in self.stalledJobsToRescheduleSites]
+            for status, statusJobs in (
+                (JobStatus.RESCHEDULED, rescheduledJobs),
+                (JobStatus.FAILED, [jobID for jobID in jobs if jobID not in rescheduledJobs]),
+            ):
+                if statusJobs:
+                    result = self._updateJobsStatus(statusJobs, status, minorStatus=minorStatus, force=True)
+                    if not result["OK"]:
+                        toRet = result
+        return toRet
 
-        return S_OK()
+    def _getJobsSites(self, jobIDs):
+        """Get the sites of the jobs
 
-    def _getJobPilotStatus(self, jobID):
-        """Get the job pilot status."""
-        result = JobMonitoringClient().getJobParameter(jobID, "Pilot_Reference")
+        :return: S_OK({ jobID : site })
+        """
+        result = self.jobDB.getJobsAttributes(jobIDs, ["Site"])
         if not result["OK"]:
             return result
-        pilotReference = result["Value"].get("Pilot_Reference", "Unknown")
-        if pilotReference == "Unknown":
-            # There is no pilot reference, hence its status is unknown
-            return S_OK("NoPilot")
+        return S_OK({jobID: attributes["Site"] for jobID, attributes in result["Value"].items()})
 
-        result = PilotManagerClient().getPilotInfo(pilotReference)
+    def _getJobsPilotStatus(self, jobIDs):
+        """Get the status of the pilots of the jobs, "NoPilot" when there is no pilot
+
+        :return: S_OK({ jobID : pilot status })
+        """
+        result = JobMonitoringClient().getJobParameters(jobIDs, "Pilot_Reference")
         if not result["OK"]:
-            if DErrno.cmpError(result, DErrno.EWMSNOPILOT):
-                self.log.warn("No pilot found", f"for job {jobID}: {result['Message']}")
-                return S_OK("NoPilot")
-            self.log.error("Failed to get pilot information", f"for job {jobID}: {result['Message']}")
             return result
-        pilotStatus = result["Value"][pilotReference]["Status"]
+        pilotReferences = {jobID: result["Value"].get(jobID, {}).get("Pilot_Reference", "Unknown") for jobID in jobIDs}
+        references = sorted({reference for reference in pilotReferences.values() if reference != "Unknown"})
+
+        pilotsInfo = {}
+        if references:
+            result = PilotManagerClient().getPilotInfo(references)
+            if result["OK"]:
+                pilotsInfo = result["Value"]
+            elif DErrno.cmpError(result, DErrno.EWMSNOPILOT):
+                self.log.warn("No pilot found", f"for {len(jobIDs)} jobs: {result['Message']}")
+            else:
+                self.log.error("Failed to get pilot information", result["Message"])
+                return result
 
-        return S_OK(pilotStatus)
+        # There is no pilot reference, or no such pilot, hence its status is unknown
+        return S_OK(
+            {
+                jobID: pilotsInfo[reference]["Status"] if reference in pilotsInfo else "NoPilot"
+                for jobID, reference in pilotReferences.items()
+            }
+        )
 
     #############################################################################
-    def _checkJobStalled(self, job, stalledTime):
-        """Compares the most recent of LastUpdateTime and HeartBeatTime against
-        the stalledTime limit."""
-        result = self._getLatestUpdateTime(job)
+    def _getLatestUpdateTimes(self, jobIDs):
+        """Returns the most recent of HeartBeatTime and LastUpdateTime of the jobs.
+
+        :return: S_OK({ jobID : seconds since epoch }), without the jobs having none of them
+        """
+        result = self.jobDB.getJobsAttributes(jobIDs, ["HeartBeatTime", "LastUpdateTime"])
         if not result["OK"]:
+            self.log.error("Failed to get job attributes", f"for {len(jobIDs)} jobs: {result['Message']}")
             return result
 
-        elapsedTime = toEpoch() - result["Value"]
-        self.log.debug(f"(CurrentTime-LastUpdate) = {elapsedTime} secs")
-        if elapsedTime > stalledTime:
-            self.log.info(
-                "Job is identified as stalled", ": jobID %d with last update > %s secs ago" % (job, elapsedTime)
-            )
-            return S_OK()
-
-        return S_ERROR(f"Job {job} is running and will be ignored")
+        latestUpdates = {}
+        for jobID, attributes in result["Value"].items():
+            latestUpdate = 0
+            for attribute in ("HeartBeatTime", "LastUpdateTime"):
+                if not attributes[attribute] or attributes[attribute] == "None":
+                    self.log.verbose(f"{attribute} is null", f"for job {jobID}")
+                else:
+                    latestUpdate = max(latestUpdate, toEpoch(fromString(attributes[attribute])))
+            if not latestUpdate:
+                self.log.error("LastUpdate and HeartBeat times are null", f"for job {jobID}")
+                continue
+            latestUpdates[jobID] = latestUpdate
+        return S_OK(latestUpdates)
 
     #############################################################################
-    def _getLatestUpdateTime(self, job):
-        """Returns the most recent of HeartBeatTime and LastUpdateTime."""
-        result = self.jobDB.getJobAttributes(job, ["HeartBeatTime", "LastUpdateTime"])
-        if not result["OK"] or not result["Value"]:
-            self.log.error(
-                "Failed to get job attributes",
-                "for job %d: %s" % (job, result["Message"] if "Message" in result else "empty"),
-            )
-            return S_ERROR("Could not get attributes for job")
-
-        latestUpdate = 0
-        if not result["Value"]["HeartBeatTime"] or result["Value"]["HeartBeatTime"] == "None":
-            self.log.verbose("HeartBeatTime is null", f"for job {job}")
-        else:
-            latestUpdate = toEpoch(fromString(result["Value"]["HeartBeatTime"]))
-
-        if not result["Value"]["LastUpdateTime"] or result["Value"]["LastUpdateTime"] == "None":
-            self.log.verbose("LastUpdateTime is null", f"for job {job}")
-        else:
-            latestUpdate = max(latestUpdate, toEpoch(fromString(result["Value"]["LastUpdateTime"])))
+    def _updateJobsStatus(self, jobIDs, status, minorStatus=None, force=False):
+        """This method updates the status of the jobs in the JobDB, and adds the logging records.
 
-        if not latestUpdate:
-            return S_ERROR(f"LastUpdate and HeartBeat times are null for job {job}")
-        else:
-            self.log.verbose("", f"Latest update time from epoch for job {job} is {latestUpdate}")
-            return S_OK(latestUpdate)
-
-    #############################################################################
-    def _updateJobStatus(self, job, status, minorStatus=None, force=False):
-        """This method updates the job status in the JobDB."""
+        :param list jobIDs: job IDs
+        :param str status: new status
+        :param str minorStatus: new minor status, the current one is kept if not given
+        :param bool force: override the state machine decision
+        """
 
         if not self.am_getOption("Enable", True):
             return S_OK("Disabled")
 
         toRet = S_OK()
 
-        self.log.debug(f"self.jobDB.setJobAttribute({job},'Status','{status}',update=True)")
-        result = self.jobDB.setJobAttribute(job, "Status", status, update=True, force=force)
+        attrNames, attrValues = ["Status"], [status]
+        if minorStatus:
+            attrNames.append("MinorStatus")
+            attrValues.append(minorStatus)
+        self.log.debug(f"self.jobDB.setJobAttributes({jobIDs},{attrNames},{attrValues},update=True)")
+        result = self.jobDB.setJobAttributes(jobIDs, attrNames, attrValues, update=True, force=force)
         if not result["OK"]:
-            self.log.error("Failed setting Status", f"{status} for job {job}: {result['Message']}")
+            self.log.error("Failed setting Status", f"{status} for {len(jobIDs)} jobs: {result['Message']}")
             toRet = result
-        if minorStatus:
-            self.log.debug(f"self.jobDB.setJobAttribute({job},'MinorStatus','{minorStatus}',update=True)")
-            result = self.jobDB.setJobAttribute(job, "MinorStatus", minorStatus, update=True)
-            if not result["OK"]:
-                self.log.error("Failed setting MinorStatus", f"{minorStatus} for job {job}: {result['Message']}")
-                toRet = result
 
+        minorStatuses = {jobID: minorStatus for jobID in jobIDs}
         if not minorStatus:  # Retain last minor status for stalled jobs
-            result = self.jobDB.getJobAttributes(job, ["MinorStatus"])
-            if result["OK"] and "MinorStatus" in result["Value"]:
-                minorStatus = result["Value"]["MinorStatus"]
+            result = self.jobDB.getJobsAttributes(jobIDs, ["MinorStatus"])
+            if result["OK"]:
+                minorStatuses = {jobID: result["Value"].get(jobID, {}).get("MinorStatus", "idem") for jobID in jobIDs}
             else:
-                self.log.error("Failed getting MinorStatus", f"for job {job}: {result['Message']}")
-                minorStatus = "idem"
+                self.log.error("Failed getting MinorStatus", f"for {len(jobIDs)} jobs: {result['Message']}")
+                minorStatuses = {jobID: "idem" for jobID in jobIDs}
                 toRet = result
 
-        result = self.logDB.addLoggingRecord(job, status=status, minorStatus=minorStatus, source="StalledJobAgent")
+        result = self.logDB.addLoggingRecords(
+            [
+                {"jobID": jobID, "status": status, "minorStatus": minorStatuses[jobID], "source": "StalledJobAgent"}
+                for jobID in jobIDs
+            ]
+        )
         if not result["OK"]:
-            self.log.warn("Failed adding logging record", result["Message"])
+            self.log.warn("Failed adding logging records", result["Message"])
             toRet = result
 
         return toRet
 
-    def _getProcessingType(self, jobID):
+    @staticmethod
+    def _getProcessingType(jdl):
         """Get the Processing Type from the JDL, until it is promoted to a real
         Attribute."""
         processingType = "unknown"
-        result = self.jobDB.getJobJDL(jobID, original=True)
-        if not result["OK"]:
+        if not jdl:
             return processingType
-        classAdJob = ClassAd(result["Value"])
+        classAdJob = ClassAd(jdl)
         if classAdJob.lookupAttribute("ProcessingType"):
             processingType = classAdJob.getAttributeString("ProcessingType")
         return processingType
 
-    def _sendAccounting(self, jobID):
-        """Send WMS accounting data for the given job.
+    def _sendAccounting(self, jobIDs):
+        """Send WMS accounting data for the given jobs, in one bundle.
 
         Run inside thread.
+
+        :param list jobIDs: job IDs
         """
-        try:
-            accountingReport = Job()
-            endTime = "Unknown"
-            lastHeartBeatTime = "Unknown"
+        result = self.jobDB.getJobsAttributes(jobIDs)
+        if not result["OK"]:
+            return result
+        jobDicts = result["Value"]
+        jobIDs = [jobID for jobID in jobIDs if jobID in jobDicts]
+        if not jobIDs:
+            return S_OK()
+
+        result = self.logDB.getJobsLoggingInfo(jobIDs)
+        if not result["OK"]:
+            self.log.error("Failed to get logging info", result["Message"])
+        loggingInfo = result.get("Value", {})
+
+        result = self.jobDB.getHeartBeatDataSummary(jobIDs)
+        if not result["OK"]:
+            self.log.error("Failed to get heart beat data", result["Message"])
+        heartBeats = result.get("Value", {})
+
+        result = JobMonitoringClient().getJobParameters(jobIDs, "CPUNormalizationFactor")
+        if not result["OK"]:
+            self.log.error("Error getting Job Parameter CPUNormalizationFactor, setting 0", result["Message"])
+        cpuNormalizations = result.get("Value", {})
+
+        result = self.jobDB.getJobsJDL(jobIDs, original=True)
+        if not result["OK"]:
+            self.log.error("Failed to get the JDLs", result["Message"])
+        jdls = result.get("Value", {})
+
+        accountedJobs = []
+        for jobID in jobIDs:
+            jobDict = jobDicts[jobID]
+            try:
+                startTime, endTime = self._checkLoggingInfo(jobDict, loggingInfo.get(jobID, []))
+                lastCPUTime, lastWallTime, lastHeartBeatTime = self._checkHeartBeat(jobDict, heartBeats.get(jobID))
+                if lastHeartBeatTime is not None and lastHeartBeatTime > endTime:
+                    endTime = lastHeartBeatTime
+                cpuNormalization = float(cpuNormalizations.get(jobID, {}).get("CPUNormalizationFactor", 0.0))
+            except Exception as e:
+                self.log.exception("Exception in _sendAccounting", f"for job={str(jobID)}", lException=e)
+                continue
 
-            result = self.jobDB.getJobAttributes(jobID)
+            accountingReport = Job()
+            accountingReport.setStartTime(startTime)
+            accountingReport.setEndTime(endTime)
+            # execTime = toEpoch( endTime ) - toEpoch( startTime )
+            # Fill the accounting data
+            acData = {
+                "Site": jobDict["Site"],
+                "User": jobDict["Owner"],
+                "UserGroup": jobDict["OwnerGroup"],
+                "JobGroup": jobDict["JobGroup"],
+                "JobType": jobDict["JobType"],
+                "JobClass": "unknown",
+                "ProcessingType": self._getProcessingType(jdls.get(jobID)),
+                "FinalMajorStatus": JobStatus.FAILED,
+                "FinalMinorStatus": JobMinorStatus.STALLED_PILOT_NOT_RUNNING,
+                "CPUTime": lastCPUTime,
+                "NormCPUTime": lastCPUTime * cpuNormalization,
+                "ExecTime": lastWallTime,
+                "InputDataSize": 0.0,
+                "OutputDataSize": 0.0,
+                "InputDataFiles": 0,
+                "OutputDataFiles": 0,
+                "DiskSpace": 0.0,
+                "InputSandBoxSize": 0.0,
+                "OutputSandBoxSize": 0.0,
+                "ProcessedEvents": 0,
+            }
+
+            # For accidentally stopped jobs ExecTime can be not set
+            if not acData["ExecTime"]:
+                acData["ExecTime"] = acData["CPUTime"]
+            elif acData["ExecTime"] < acData["CPUTime"]:
+                acData["ExecTime"] = acData["CPUTime"]
+
+            self.log.verbose("Accounting Report is:")
+            self.log.verbose(acData)
+            accountingReport.setValuesFromDict(acData)
+
+            result = gDataStoreClient.addRegister(accountingReport)
             if not result["OK"]:
-                return result
-            jobDict = result["Value"]
-
-            startTime, endTime = self._checkLoggingInfo(jobID, jobDict)
-            lastCPUTime, lastWallTime, lastHeartBeatTime = self._checkHeartBeat(jobID, jobDict)
-            lastHeartBeatTime = fromString(lastHeartBeatTime)
-            if lastHeartBeatTime is not None and lastHeartBeatTime > endTime:
-                endTime = lastHeartBeatTime
-
-            result = JobMonitoringClient().getJobParameter(jobID, "CPUNormalizationFactor")
-            if not result["OK"] or not result["Value"]:
-                self.log.error(
-                    "Error getting Job Parameter CPUNormalizationFactor, setting 0",
-                    result.get("Message", "No such value"),
-                )
-                cpuNormalization = 0.0
-            else:
-                cpuNormalization = float(result["Value"].get("CPUNormalizationFactor"))
+                self.log.error("Failed to add accounting report", f"for job {jobID}: {result['Message']}")
+                continue
+            accountedJobs.append(jobID)
 
-        except Exception as e:
-            self.log.exception(
-                "Exception in _sendAccounting",
-                f"for job={str(jobID)}: endTime={str(endTime)}, lastHBTime={str(lastHeartBeatTime)}",
-                lException=e,
-            )
-            return S_ERROR("Exception")
-        processingType = self._getProcessingType(jobID)
-
-        accountingReport.setStartTime(startTime)
-        accountingReport.setEndTime(endTime)
-        # execTime = toEpoch( endTime ) - toEpoch( startTime )
-        # Fill the accounting data
-        acData = {
-            "Site": jobDict["Site"],
-            "User": jobDict["Owner"],
-            "UserGroup": jobDict["OwnerGroup"],
-            "JobGroup": jobDict["JobGroup"],
-            "JobType": jobDict["JobType"],
-            "JobClass": "unknown",
-            "ProcessingType": processingType,
-            "FinalMajorStatus": JobStatus.FAILED,
-            "FinalMinorStatus": JobMinorStatus.STALLED_PILOT_NOT_RUNNING,
-            "CPUTime": lastCPUTime,
-            "NormCPUTime": lastCPUTime * cpuNormalization,
-            "ExecTime": lastWallTime,
-            "InputDataSize": 0.0,
-            "OutputDataSize": 0.0,
-            "InputDataFiles": 0,
-            "OutputDataFiles": 0,
-            "DiskSpace": 0.0,
-            "InputSandBoxSize": 0.0,
-            "OutputSandBoxSize": 0.0,
-            "ProcessedEvents": 0,
-        }
-
-        # For accidentally stopped jobs ExecTime can be not set
-        if not acData["ExecTime"]:
-            acData["ExecTime"] = acData["CPUTime"]
-        elif acData["ExecTime"] < acData["CPUTime"]:
-            acData["ExecTime"] = acData["CPUTime"]
-
-        self.log.verbose("Accounting Report is:")
-        self.log.verbose(acData)
-        accountingReport.setValuesFromDict(acData)
-
-        result = accountingReport.commit()
-        if result["OK"]:
-            self.jobDB.setJobAttribute(jobID, "AccountedFlag", "True")
-        else:
-            self.log.error("Failed to send accounting report", f"for job {jobID}: {result['Message']}")
-        return result
-
-    def _checkHeartBeat(self, jobID, jobDict):
-        """Get info from HeartBeat."""
-        result = self.jobDB.getHeartBeatData(jobID)
-        lastCPUTime = 0
-        lastWallTime = 0
-        lastHeartBeatTime = jobDict["StartExecTime"]
-        if lastHeartBeatTime == "None":
-            lastHeartBeatTime = 0
-
-        if result["OK"]:
-            for name, value, heartBeatTime in result["Value"]:
-                if name == "CPUConsumed":
-                    try:
-                        value = int(float(value))
-                        if value > lastCPUTime:
-                            lastCPUTime = value
-                    except ValueError:
-                        pass
-                if name == "WallClockTime":
-                    try:
-                        value = int(float(value))
-                        if value > lastWallTime:
-                            lastWallTime = value
-                    except ValueError:
-                        pass
-                if isinstance(heartBeatTime, str):
-                    heartBeatTime = datetime.datetime.strptime(heartBeatTime, "%Y-%m-%d %H:%M:%S")
-                if heartBeatTime > lastHeartBeatTime:
-                    lastHeartBeatTime = heartBeatTime
+        if not accountedJobs:
+            return S_OK()
+        result = gDataStoreClient.commit()
+        if not result["OK"]:
+            self.log.error("Failed to send accounting reports", f"for {len(accountedJobs)} jobs: {result['Message']}")
+            return result
+        return self.jobDB.setJobAttributes(accountedJobs, ["AccountedFlag"], ["True"])
+
+    @staticmethod
+    def _checkHeartBeat(jobDict, heartBeatSummary):
+        """Get info from HeartBeat.
+
+        :param dict jobDict: job attributes
+        :param dict heartBeatSummary: as returned by JobDB.getHeartBeatDataSummary for the job, or None
+        :return: CPU time, wall clock time, time of the last heart beat (or of the start) or None
+        """
+        lastHeartBeatTime = fromString(jobDict["StartExecTime"]) if jobDict["StartExecTime"] != "None" else None
+        if not heartBeatSummary:
+            return 0, 0, lastHeartBeatTime
+
+        maxValues = heartBeatSummary["MaxValues"]
+        lastCPUTime = int(maxValues.get("CPUConsumed", 0))
+        lastWallTime = int(maxValues.get("WallClockTime", 0))
+        heartBeatTime = heartBeatSummary["LastHeartBeatTime"]
+        if heartBeatTime is not None and (lastHeartBeatTime is None or heartBeatTime > lastHeartBeatTime):
+            lastHeartBeatTime = heartBeatTime
 
         return lastCPUTime, lastWallTime, lastHeartBeatTime
 
-    def _checkLoggingInfo(self, jobID, jobDict):
-        """Get info from JobLogging."""
-        logList = []
-        result = self.logDB.getJobLoggingInfo(jobID)
-        if result["OK"]:
-            logList = result["Value"]
+    def _checkLoggingInfo(self, jobDict, logList):
+        """Get info from JobLogging.
 
+        :param dict jobDict: job attributes
+        :param list logList: logging records of the job, as returned by JobLoggingDB.getJobsLoggingInfo
+        """
         startTime = jobDict["StartExecTime"]
         if not startTime or startTime == "None":
             # status, minor, app, stime, source
@@ -506,9 +567,10 @@ class StalledJobAgent(AgentModule):
                 startTime = jobDict["SubmissionTime"]
 
         if isinstance(startTime, str):
-            startTime = fromString(startTime)
+            timeStamp = startTime
+            startTime = fromString(timeStamp)
             if startTime is None:
-                self.log.error("Wrong timestamp in DB", items[3])
+                self.log.error("Wrong timestamp in DB", timeStamp)
                 startTime = datetime.datetime.utcnow()
 
         endTime = datetime.datetime.utcnow()
@@ -516,9 +578,9 @@ class StalledJobAgent(AgentModule):
         for items in logList:
             if items[0] == "Stalled":
                 endTime = fromString(items[3])
-        if endTime is None:
-            self.log.error("Wrong timestamp in DB", items[3])
-            endTime = datetime.datetime.utcnow()
+                if endTime is None:
+                    self.log.error("Wrong timestamp in DB", items[3])
+                    endTime = datetime.datetime.utcnow()
 
         return startTime, endTime
 
@@ -582,33 +644,37 @@ class StalledJobAgent(AgentModule):
             self.log.error("Failed to select jobs", result["Message"])
             return result
 
-        for jobID in result["Value"]:
-            result = self._updateJobStatus(jobID, JobStatus.FAILED, force=True)
+        for jobIDs in breakListIntoChunks(result["Value"], self.bulkSize):
+            result = self._updateJobsStatus(jobIDs, JobStatus.FAILED, force=True)
             if not result["OK"]:
                 self.log.error("Failed to update job status", result["Message"])
                 continue
 
         return S_OK()
 
-    def _sendKillCommand(self, job):
-        """Send a kill signal to the job such that it cannot continue running.
+    def _sendKillCommands(self, jobIDs):
+        """Send a kill signal to the jobs such that they cannot continue running,
+        with one call per owner of the jobs.
 
-        :param int job: ID of job to send kill command
+        :param list jobIDs: IDs of the jobs to send kill command
         """
 
-        res = self.jobDB.getJobAttribute(job, "Owner")
-        if not res["OK"]:
-            return res
-        owner = res["Value"]
-
-        res = self.jobDB.getJobAttribute(job, "OwnerGroup")
+        res = self.jobDB.getJobsAttributes(jobIDs, ["Owner", "OwnerGroup"])
         if not res["OK"]:
             return res
-        ownerGroup = res["Value"]
+        jobsPerOwner = {}
+        for jobID, attributes in res["Value"].items():
+            jobsPerOwner.setdefault((attributes["Owner"], attributes["OwnerGroup"]), []).append(jobID)
 
-        wmsClient = WMSClient(
-            useCertificates=True,
-            delegatedDN=getDNForUsername(owner)["Value"][0] if owner else None,
-            delegatedGroup=ownerGroup,
-        )
-        return wmsClient.killJob(job)
+        toRet = S_OK()
+        for (owner, ownerGroup), ownerJobIDs in jobsPerOwner.items():
+            wmsClient = WMSClient(
+                useCertificates=True,
+                delegatedDN=getDNForUsername(owner)["Value"][0] if owner else None,
+                delegatedGroup=ownerGroup,
+            )
+            res = wmsClient.killJob(ownerJobIDs)
+            if not res["OK"]:
+                self.log.error("Failed to kill jobs", f"of {owner}: {res['Message']}")
+                toRet = res
+        return toRet
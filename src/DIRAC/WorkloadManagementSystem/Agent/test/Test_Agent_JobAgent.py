@@ -780,3 +780,49 @@ def test_submitAndCheck2Jobs(mocker):
 
     # From here, taskResults should be empty
     assert len(jobAgent.computingElement.taskResults) == 0
+
+
+@pytest.mark.parametrize("noSlotAfter, expectedSubmitted", [(None, 3), (1, 1)])
+def test_executeMatchedJobs(mocker, noSlotAfter, expectedSubmitted):
+    """The jobs matched at once are submitted in the same cycle, as long as there are slots"""
+    mocker.patch("DIRAC.WorkloadManagementSystem.Agent.JobAgent.AgentModule.__init__")
+    mockMatcher = mocker.patch("DIRAC.WorkloadManagementSystem.Agent.JobAgent.MatcherClient")
+    mockMatcher.return_value.requestJobs.return_value = S_OK(
+        [{"JobID": jobID, "JDL": "[]", "Owner": "owner", "Group": "group"} for jobID in (1, 2, 3)]
+    )
+    mockReschedule = mocker.patch("DIRAC.WorkloadManagementSystem.Agent.JobAgent.JobManagerClient")
+
+    jobAgent = JobAgent("Test", "Test1")
+    jobAgent.log = gLogger
+    available = S_OK()
+    available["AvailableSlots"] = 3
+    noSlot = S_OK("Job Agent cycle complete with 3 running jobs")
+    checkCEAvailability = [available] * 4
+    if noSlotAfter:
+        checkCEAvailability[noSlotAfter] = noSlot
+    mocker.patch.object(jobAgent, "_checkCEAvailability", side_effect=checkCEAvailability)
+    mocker.patch.object(jobAgent, "_computeCPUWorkLeft", return_value=1000)
+    mocker.patch.object(jobAgent, "_checkCPUWorkLeft", return_value=S_OK())
+    mocker.patch.object(jobAgent, "_setCPUWorkLeft", return_value=S_OK())
+    mocker.patch.object(jobAgent, "_getCEDict", return_value=S_OK([{}]))
+    mocker.patch.object(jobAgent, "_setCEDict")
+    mocker.patch.object(jobAgent, "_getJDLParameters", return_value=S_OK({}))
+    mocker.patch.object(
+        jobAgent,
+        "_extractValuesFromJobParams",
+        return_value=S_OK(
+            {"jobType": "User", "processors": 1, "wholeNode": False, "maxNumberOfProcessors": 1, "mpTag": False}
+        ),
+    )
+    mocker.patch.object(jobAgent, "_setupProxy", return_value=S_OK())
+    mocker.patch.object(jobAgent, "_saveJobJDLRequest")
+    mocker.patch.object(jobAgent, "_checkInstallSoftware", return_value=S_OK())
+    mockSubmit = mocker.patch.object(jobAgent, "_submitJob", return_value=S_OK())
+    mocker.patch.object(jobAgent, "_checkSubmittedJobs", return_value=S_OK(([], [])))
+
+    assert jobAgent.execute()["OK"]
+    mockMatcher.return_value.requestJobs.assert_called_once_with({}, 3)
+    assert [call.kwargs["jobID"] for call in mockSubmit.call_args_list] == ["1", "2", "3"][:expectedSubmitted]
+    # The jobs which could not be submitted yet are kept for the next cycle, not rescheduled
+    assert len(jobAgent.matchedJobs) == 3 - expectedSubmitted
+    mockReschedule.assert_not_called()
@@ -4,12 +4,13 @@
 # imports
 import pytest
 from collections import defaultdict
+from unittest.mock import MagicMock
 
 # DIRAC Components
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.WorkloadManagementSystem.Agent.PushJobAgent import PushJobAgent
 
-from DIRAC import gLogger, S_ERROR
+from DIRAC import gLogger, S_ERROR, S_OK
 
 gLogger.setLevel("DEBUG")
 
@@ -104,3 +105,42 @@ def test__checkMatchingIssues(mocker, issueMessage, expectedResult):
 
     result = jobAgent._checkMatchingIssues(S_ERROR(issueMessage))
     assert result["OK"] == expectedResult
+
+
+def test_executeMatchedJobs(mocker):
+    """A failing job does not prevent the other jobs matched with it from being submitted"""
+    mocker.patch("DIRAC.WorkloadManagementSystem.Agent.JobAgent.AgentModule.__init__")
+    mocker.patch(
+        "DIRAC.WorkloadManagementSystem.Agent.JobAgent.AgentModule._AgentModule__moduleProperties",
+        side_effect=lambda x, y=None: y,
+        create=True,
+    )
+    mocker.patch("DIRAC.WorkloadManagementSystem.Agent.PushJobAgent.Operations")
+    mocker.patch("DIRAC.WorkloadManagementSystem.Agent.PushJobAgent.gProxyManager")
+    mockMatcher = mocker.patch("DIRAC.WorkloadManagementSystem.Agent.JobAgent.MatcherClient")
+    mockMatcher.return_value.requestJobs.return_value = S_OK([{"JobID": jobID} for jobID in (1, 2, 3)])
+
+    jobAgent = PushJobAgent("Test", "Test1")
+    jobAgent.log = gLogger
+    jobAgent.queueDict = {"queue1": {"CE": MagicMock()}}
+    jobAgent.failedQueues = defaultdict(int)
+    jobAgent.pilotDN = "/DN"
+    jobAgent.vo = "vo"
+    available = S_OK()
+    available["AvailableSlots"] = 3
+    mocker.patch.object(jobAgent, "_checkCEAvailability", return_value=available)
+    mocker.patch.object(jobAgent, "_checkSubmittedJobs", return_value=S_OK(([], [])))
+    mocker.patch.object(jobAgent, "_getCEDict", return_value=S_OK([{}]))
+    mocker.patch.object(jobAgent, "_setCEDict")
+    mockSubmit = mocker.patch.object(
+        jobAgent, "_submitMatchedJob", side_effect=[S_ERROR("Failed software installation"), S_OK(), S_OK()]
+    )
+    mockReschedule = mocker.patch.object(jobAgent, "_rescheduleFailedJob")
+
+    assert jobAgent.execute()["OK"]
+    assert [call.args[0]["JobID"] for call in mockSubmit.call_args_list] == [1, 2, 3]
+    assert not jobAgent.matchedJobs
+    mockReschedule.assert_not_called()
+    # No new job is matched for a queue after a failure
+    mockMatcher.return_value.requestJobs.assert_called_once()
+    assert jobAgent.failedQueues["queue1"] == 1
@@ -1,8 +1,11 @@
 """ Test class for Stalled Job Agent
 """
+import datetime
 import pytest
 from unittest.mock import MagicMock
 
+from DIRAC import S_OK
+
 # DIRAC Components
 from DIRAC.WorkloadManagementSystem.Agent.StalledJobAgent import StalledJobAgent
 from DIRAC import gLogger
@@ -49,5 +52,116 @@ def test__sjaFunctions(sja):
 
     assert sja._failSubmittingJobs()["OK"]
     assert sja._kickStuckJobs()["OK"]
-    assert sja._failStalledJobs(0)["OK"]
-    assert not sja._markStalledJobs(0)["OK"]
+    assert sja._failStalledJobs([0])["OK"]
+    assert sja._markStalledJobs([0])["OK"]
+
+
+def _timeAgo(seconds):
+    return (datetime.datetime.utcnow() - datetime.timedelta(seconds=seconds)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _setJobs(sja, jobs):
+    """Make the mocked JobDB return the attributes of the given jobs"""
+
+    def getJobsAttributes(jobIDs, attrList=None):
+        return S_OK(
+            {
+                jobID: {name: value for name, value in jobs[jobID].items() if not attrList or name in attrList}
+                for jobID in jobIDs
+                if jobID in jobs
+            }
+        )
+
+    sja.jobDB.getJobsAttributes.side_effect = getJobsAttributes
+    sja.jobDB.setJobAttributes.return_value = S_OK()
+    sja.logDB.addLoggingRecords.return_value = S_OK()
+
+
+def test_markStalledJobs(sja):
+    """Only the jobs without update for long enough are marked Stalled, with a single update"""
+    _setJobs(
+        sja,
+        {
+            1: {"HeartBeatTime": _timeAgo(1000), "LastUpdateTime": _timeAgo(2000), "MinorStatus": "Application"},
+            2: {"HeartBeatTime": _timeAgo(10), "LastUpdateTime": _timeAgo(2000), "MinorStatus": "Application"},
+            3: {"HeartBeatTime": "None", "LastUpdateTime": _timeAgo(500), "MinorStatus": "Uploading"},
+        },
+    )
+
+    assert sja._markStalledJobs([1, 2, 3])["OK"]
+    sja.jobDB.setJobAttributes.assert_called_once_with([1, 3], ["Status"], ["Stalled"], update=True, force=False)
+    records = sja.logDB.addLoggingRecords.call_args[0][0]
+    assert [(record["jobID"], record["status"], record["minorStatus"]) for record in records] == [
+        (1, "Stalled", "Application"),
+        (3, "Stalled", "Uploading"),
+    ]
+
+
+def test_failStalledJobs(sja, mocker):
+    """Jobs without running pilot, or without update for too long, are failed. One kill per owner"""
+    _setJobs(
+        sja,
+        {
+            1: {"HeartBeatTime": _timeAgo(10), "LastUpdateTime": _timeAgo(10), "Owner": "a", "OwnerGroup": "g"},
+            2: {"HeartBeatTime": _timeAgo(10), "LastUpdateTime": _timeAgo(10), "Owner": "a", "OwnerGroup": "g"},
+            3: {"HeartBeatTime": _timeAgo(10), "LastUpdateTime": _timeAgo(10), "Owner": "b", "OwnerGroup": "g"},
+            4: {
+                "HeartBeatTime": _timeAgo(10**6),
+                "LastUpdateTime": _timeAgo(10**6),
+                "Owner": "b",
+                "OwnerGroup": "g",
+            },
+        },
+    )
+    monitoringClient = mocker.patch("DIRAC.WorkloadManagementSystem.Agent.StalledJobAgent.JobMonitoringClient")
+    monitoringClient.return_value.getJobParameters.return_value = S_OK(
+        {1: {"Pilot_Reference": "p1"}, 2: {"Pilot_Reference": "p2"}, 4: {"Pilot_Reference": "p2"}}
+    )
+    pilotClient = mocker.patch("DIRAC.WorkloadManagementSystem.Agent.StalledJobAgent.PilotManagerClient")
+    pilotClient.return_value.getPilotInfo.return_value = S_OK({"p1": {"Status": "Done"}, "p2": {"Status": "Running"}})
+    wmsClient = mocker.patch("DIRAC.WorkloadManagementSystem.Agent.StalledJobAgent.WMSClient")
+    wmsClient.return_value.killJob.return_value = S_OK()
+
+    assert sja._failStalledJobs([1, 2, 3, 4])["OK"]
+    # The pilots are looked up once
+    pilotClient.return_value.getPilotInfo.assert_called_once_with(["p1", "p2"])
+    assert sorted(call[0][0] for call in wmsClient.return_value.killJob.call_args_list) == [[1], [3, 4]]
+    failed = {
+        tuple(call[0][0]): call[0][2][1]
+        for call in sja.jobDB.setJobAttributes.call_args_list
+        if call[0][2][0] == "Failed"
+    }
+    assert failed == {(1, 3): sja.minorStalledStatuses[0], (4,): sja.minorStalledStatuses[1]}
+
+
+def test_sendAccounting(sja, mocker):
+    """The accounting records of the jobs are sent together"""
+    job = {
+        "Site": "LCG.CERN.ch",
+        "Owner": "a",
+        "OwnerGroup": "g",
+        "JobGroup": "jg",
+        "JobType": "User",
+        "StartExecTime": _timeAgo(3600),
+        "SubmissionTime": _timeAgo(7200),
+    }
+    _setJobs(sja, {1: job, 2: job})
+    sja.logDB.getJobsLoggingInfo.return_value = S_OK({1: [("Stalled", "", "", _timeAgo(1800), "StalledJobAgent")]})
+    sja.jobDB.getHeartBeatDataSummary.return_value = S_OK(
+        {1: {"LastHeartBeatTime": datetime.datetime.utcnow(), "MaxValues": {"CPUConsumed": 100.0}}}
+    )
+    sja.jobDB.getJobsJDL.return_value = S_OK({1: '[ProcessingType = "Simulation";]'})
+    monitoringClient = mocker.patch("DIRAC.WorkloadManagementSystem.Agent.StalledJobAgent.JobMonitoringClient")
+    monitoringClient.return_value.getJobParameters.return_value = S_OK({1: {"CPUNormalizationFactor": "2.0"}})
+    dataStoreClient = mocker.patch("DIRAC.WorkloadManagementSystem.Agent.StalledJobAgent.gDataStoreClient")
+    dataStoreClient.addRegister.return_value = S_OK()
+    dataStoreClient.commit.return_value = S_OK()
+
+    assert sja._sendAccounting([1, 2])["OK"]
+    assert dataStoreClient.addRegister.call_count == 2
+    dataStoreClient.commit.assert_called_once()
+    # Type, start time, end time, key and value fields
+    values = dataStoreClient.addRegister.call_args_list[0][0][0].getValues()[3]
+    assert "Simulation" in values
+    assert 200.0 in values
+    sja.jobDB.setJobAttributes.assert_called_once_with([1, 2], ["AccountedFlag"], ["True"])
@@ -127,11 +127,15 @@ class JobState:
                 return result
 
         gLogger.verbose("Adding logging records", f" for {self.__jid}")
+        records = []
         for record, updateTime, source in jobLog:
             gLogger.verbose("", f"Logging records for {self.__jid}: {record} {updateTime} {source}")
+            record["jobID"] = self.__jid
             record["date"] = updateTime
             record["source"] = source
-            result = self.__retryFunction(5, JobState.__db.logDB.addLoggingRecord, (self.__jid,), record)
+            records.append(record)
+        if records:
+            result = self.__retryFunction(5, JobState.__db.logDB.addLoggingRecords, (records,))
             if not result["OK"]:
                 return result
 
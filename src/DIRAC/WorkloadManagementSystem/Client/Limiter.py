@@ -10,6 +10,7 @@ from DIRAC.Core.Utilities.DErrno import cmpError, ESECTION
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.WorkloadManagementSystem.DB.JobDB import JobDB
 from DIRAC.WorkloadManagementSystem.Client import JobStatus
+from DIRAC.WorkloadManagementSystem.private.RunningJobsCounters import COUNTED_STATUSES, gRunningJobsCounters
 
 
 class Limiter:
@@ -22,6 +23,7 @@ class Limiter:
         """Constructor"""
         self.__runningLimitSection = "JobScheduling/RunningLimit"
         self.__matchingDelaySection = "JobScheduling/MatchingDelay"
+        self.runningCounters = gRunningJobsCounters
 
         if jobDB:
             self.jobDB = jobDB
@@ -116,6 +118,25 @@ class Limiter:
 
         return negativeCond
 
+    def hasRunningLimits(self, siteName, gridCE=None):
+        """Check if running limits are set for a site or its CE, and have to be checked
+
+        :param str siteName: site name
+        :param str gridCE: CE of the site
+        :return: bool
+        """
+        if not self.__opsHelper.getValue("JobScheduling/CheckJobLimits", True):
+            return False
+        sections = [f"{self.__runningLimitSection}/{siteName}"]
+        if gridCE:
+            sections.append(f"{self.__runningLimitSection}/{siteName}/CEs/{gridCE}")
+        for section in sections:
+            result = self.__extractCSData(section)
+            # In doubt, the limits are checked
+            if not result["OK"] or result["Value"]:
+                return True
+        return False
+
     def __mergeCond(self, negCond, addCond):
         """Merge two negative dicts"""
         # Merge both negative dicts
@@ -177,19 +198,10 @@ class Limiter:
             if attName not in self.jobDB.jobAttributeNames:
                 self.log.error("Attribute does not exist", f"({attName}). Check the job limits")
                 continue
-            cK = f"Running:{siteName}:{attName}"
-            data = self.condCache.get(cK)
-            if not data:
-                result = self.jobDB.getCounters(
-                    "Jobs",
-                    [attName],
-                    {"Site": siteName, "Status": [JobStatus.RUNNING, JobStatus.MATCHED, JobStatus.STALLED]},
-                )
-                if not result["OK"]:
-                    return result
-                data = result["Value"]
-                data = {k[0][attName]: k[1] for k in data}
-                self.condCache.add(cK, 10, data)
+            result = self.__getRunningCounters(siteName, attName)
+            if not result["OK"]:
+                return result
+            data = result["Value"]
             for attValue in limitsDict[attName]:
                 limit = limitsDict[attName][attValue]
                 running = data.get(attValue, 0)
@@ -204,7 +216,43 @@ class Limiter:
         # negCond is something like : {'JobType': ['Merge']}
         return S_OK(negCond)
 
+    def __getRunningCounters(self, siteName, attName):
+        """Get the number of jobs occupying a site, per value of a job attribute
+
+        The in-memory counters are used, and reconciled with the JobDB when they are too old
+        """
+        maxAge = self.__opsHelper.getValue("JobScheduling/RunningCountersReconcileTime", 10)
+        data = self.runningCounters.get(siteName, attName, maxAge)
+        if data is not None:
+            return S_OK(data)
+        result = self.jobDB.getCounters("Jobs", [attName], {"Site": siteName, "Status": list(COUNTED_STATUSES)})
+        if not result["OK"]:
+            return result
+        data = {k[0][attName]: k[1] for k in result["Value"]}
+        self.runningCounters.reconcile(siteName, attName, data)
+        return S_OK(data)
+
+    def jobMatched(self, siteName, jid, previousStatus):
+        """Count a job just matched at a site in the running counters
+
+        :param str siteName: site name
+        :param int jid: job ID
+        :param str previousStatus: status of the job before it was matched
+        """
+        attNames = self.runningCounters.getAttributeNames(siteName)
+        if not attNames:
+            return S_OK()
+        result = self.jobDB.getJobAttributes(jid, list(attNames))
+        if not result["OK"]:
+            return result
+        self.runningCounters.jobStatusChanged(siteName, previousStatus, JobStatus.MATCHED, result["Value"])
+        return S_OK()
+
     def updateDelayCounters(self, siteName, jid):
+        """Start the matching delays triggered by a job matched at a site
+
+        :return: S_OK(bool) True if a delay was added / S_ERROR
+        """
         # Get the info from the CS
         siteSection = f"{self.__matchingDelaySection}/{siteName}"
         result = self.__extractCSData(siteSection)
@@ -213,7 +261,7 @@ class Limiter:
         delayDict = result["Value"]
         # limitsDict is something like { 'JobType' : { 'Merge' : 20, 'MCGen' : 1000 } }
         if not delayDict:
-            return S_OK()
+            return S_OK(False)
         attNames = []
         for attName in delayDict:
             if attName not in self.jobDB.jobAttributeNames:
@@ -230,13 +278,15 @@ class Limiter:
             self.delayMem[siteName] = DictCache()
         # Update the counters
         delayCounter = self.delayMem[siteName]
+        delayAdded = False
         for attName in atts:
             attValue = atts[attName]
             if attValue in delayDict[attName]:
                 delayTime = delayDict[attName][attValue]
                 self.log.notice(f"Adding delay for {siteName}/{attName}={attValue} of {delayTime} secs")
                 delayCounter.add((attName, attValue), delayTime)
-        return S_OK()
+                delayAdded = True
+        return S_OK(delayAdded)
 
     def __getDelayCondition(self, siteName):
         """Get extra conditions allowing matching delay"""
@@ -8,6 +8,7 @@ from DIRAC import convertToPy3VersionNumber, gLogger
 from DIRAC.ConfigurationSystem.Client.Helpers import Registry
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.Core.Security import Properties
+from DIRAC.Core.Utilities.ClassAd.ClassAdLight import ClassAd
 from DIRAC.Core.Utilities.PrettyPrint import printDict
 from DIRAC.ResourceStatusSystem.Client.SiteStatus import SiteStatus
 from DIRAC.WorkloadManagementSystem.Client import JobStatus, PilotStatus
@@ -64,6 +65,24 @@ class Matcher:
 
     def selectJob(self, resourceDescription, credDict):
         """Main job selection function to find the highest priority job matching the resource capacity"""
+        jobs = self.selectJobs(resourceDescription, credDict, 1)
+        return jobs[0] if jobs else {}
+
+    def selectJobs(self, resourceDescription, credDict, nJobs):
+        """Find up to nJobs jobs matching the resource capacity, by order of priority
+
+        The resource description is processed, and the credentials, pilot version and site mask
+        are checked, once for all the jobs. The running limits and matching delays of the site are
+        evaluated again after each job matched. If the jobs share the processors of the resource
+        ("SharedProcessors" flag, e.g. in a PoolComputingElement), the processors taken by each matched job
+        are not available anymore for the next ones.
+
+        :param dict resourceDescription: resource description, e.g. a ceDict coming from a JobAgent
+        :param dict credDict: credentials of the requester
+        :param int nJobs: maximum number of jobs to match
+
+        :return: list of job dictionaries (JDL, JobID, Owner...), empty if no match
+        """
 
         startTime = time.time()
 
@@ -85,29 +104,91 @@ class Matcher:
         self.log.info("Resource description for matching", printDict(toPrintDict))
 
         negativeCond = self.limiter.getNegativeCondForSite(resourceDict["Site"], resourceDict.get("GridCE"))
-        result = self.tqDB.matchAndGetJob(resourceDict, negativeCond=negativeCond)
+        # Each job matched counts in the running limits of the site for the next ones
+        runningLimits = self.limiter.hasRunningLimits(resourceDict["Site"], resourceDict.get("GridCE"))
 
-        if not result["OK"]:
-            raise RuntimeError(result["Message"])
-        result = result["Value"]
-        if not result["matchFound"]:
+        processors = 0
+        if resourceDescription.get("SharedProcessors"):
+            try:
+                processors = int(resourceDescription.get("NumberOfProcessors", 0))
+            except ValueError:
+                pass
+
+        jobs = []
+        while len(jobs) < nJobs:
+            try:
+                result = self.tqDB.matchAndGetJob(resourceDict, negativeCond=negativeCond)
+                if not result["OK"]:
+                    raise RuntimeError(result["Message"])
+                result = result["Value"]
+                if not result["matchFound"]:
+                    break
+                jobID = result["jobId"]
+                jobs.append(self._assignJob(resourceDict, jobID))
+            except RuntimeError as excp:
+                # The jobs already matched are assigned to the resource: they have to be returned
+                if not jobs:
+                    raise
+                self.log.error("Error matching more jobs", f"after {len(jobs)} jobs: {excp}")
+                break
+
+            updateCond = runningLimits
+            if self.opsHelper.getValue("JobScheduling/CheckMatchingDelay", True):
+                result = self.limiter.updateDelayCounters(resourceDict["Site"], jobID)
+                # The delays apply to the next jobs
+                updateCond = updateCond or (result["OK"] and result["Value"])
+            if updateCond and len(jobs) < nJobs:
+                negativeCond = self.limiter.getNegativeCondForSite(resourceDict["Site"], resourceDict.get("GridCE"))
+
+            if len(jobs) == nJobs:
+                break
+
+            # Match the next jobs with the processors left
+            if processors:
+                processors -= self._getProcessorsForJob(jobs[-1]["JDL"], processors)
+                if processors < 1:
+                    break
+                resourceDescription = dict(resourceDescription)
+                resourceDescription["NumberOfProcessors"] = processors
+                resourceDescription["PilotInfoReportedFlag"] = True
+                resourceDescription.pop("WholeNode", None)
+                newResourceDict = self._processResourceDescription(resourceDescription)
+                # Keep what was set from the credentials and the site mask
+                for key in ("OwnerGroup", "OwnerDN", "JobType"):
+                    if key in resourceDict:
+                        newResourceDict[key] = resourceDict[key]
+                if not set(newResourceDict.get("RequiredTag", [])) <= set(newResourceDict.get("Tag", [])):
+                    break
+                resourceDict = newResourceDict
+
+        if not jobs:
             self.log.info("No match found")
-            return {}
+            return []
+
+        matchTime = time.time() - startTime
+        self.log.verbose("Match time", f"[{str(matchTime)}] for {len(jobs)} job(s)")
+
+        return jobs
+
+    def _assignJob(self, resourceDict, jobID):
+        """Assign a job picked from the task queues to the resource
 
-        jobID = result["jobId"]
+        :return: job dictionary (JDL, JobID, Owner...)
+        """
         resAtt = self.jobDB.getJobAttributes(jobID, ["Status"])
         if not resAtt["OK"]:
             raise RuntimeError("Could not retrieve job attributes")
         if not resAtt["Value"]:
             raise RuntimeError("No attributes returned for job")
-        if not resAtt["Value"]["Status"] == "Waiting":
+        previousStatus = resAtt["Value"]["Status"]
+        if not previousStatus == "Waiting":
             self.log.error("Job matched by the TQ is not in Waiting state", str(jobID))
             result = self.tqDB.deleteJob(jobID)
             if not result["OK"]:
                 raise RuntimeError(result["Message"])
             raise RuntimeError(f"Job {str(jobID)} is not in Waiting state")
 
-        self._reportStatus(resourceDict, jobID)
+        self._reportStatus(resourceDict, jobID, previousStatus)
 
         result = self.jobDB.getJobJDL(jobID)
         if not result["OK"]:
@@ -117,9 +198,6 @@ class Matcher:
         resultDict["JDL"] = result["Value"]
         resultDict["JobID"] = jobID
 
-        matchTime = time.time() - startTime
-        self.log.verbose("Match time", f"[{str(matchTime)}]")
-
         # Get some extra stuff into the response returned
         resOpt = self.jobDB.getJobOptParameters(jobID)
         if resOpt["OK"]:
@@ -131,12 +209,10 @@ class Matcher:
         if not resAtt["Value"]:
             raise RuntimeError("No attributes returned for job")
 
-        if self.opsHelper.getValue("JobScheduling/CheckMatchingDelay", True):
-            self.limiter.updateDelayCounters(resourceDict["Site"], jobID)
-
         pilotInfoReportedFlag = resourceDict.get("PilotInfoReportedFlag", False)
         if not pilotInfoReportedFlag:
             self._updatePilotInfo(resourceDict)
+            resourceDict["PilotInfoReportedFlag"] = True
         self._updatePilotJobMapping(resourceDict, jobID)
 
         resultDict["Owner"] = resAtt["Value"]["Owner"]
@@ -145,6 +221,25 @@ class Matcher:
 
         return resultDict
 
+    @staticmethod
+    def _getProcessorsForJob(jdl, availableProcessors):
+        """Get the number of processors a job will take from the resource,
+        as allocated by the PoolComputingElement
+
+        :param str jdl: JDL of the job
+        :param int availableProcessors: processors available on the resource
+        :return: int
+        """
+        classAdJob = ClassAd(jdl)
+        if classAdJob.lookupAttribute("WholeNode"):
+            return availableProcessors
+        processors = (
+            classAdJob.getAttributeInt("NumberOfProcessors") or classAdJob.getAttributeInt("MinNumberOfProcessors") or 1
+        )
+        # Jobs with a maximum number of processors can take all of them, up to this maximum
+        maxProcessors = classAdJob.getAttributeInt("MaxNumberOfProcessors") or 0
+        return min(max(processors, maxProcessors), availableProcessors)
+
     def _getResourceDict(self, resourceDescription, credDict):
         """from resourceDescription to resourceDict (just various mods)"""
         resourceDict = self._processResourceDescription(resourceDescription)
@@ -241,10 +336,12 @@ class Matcher:
 
         return resourceDict
 
-    def _reportStatus(self, resourceDict, jobID):
+    def _reportStatus(self, resourceDict, jobID, previousStatus):
         """Reports the status of the matched job in jobDB and jobLoggingDB
 
         Do not fail if errors happen here
+
+        :param str previousStatus: status of the job before it was matched
         """
         attNames = ["Status", "MinorStatus", "ApplicationStatus", "Site"]
         attValues = ["Matched", "Assigned", "Unknown", resourceDict["Site"]]
@@ -253,6 +350,9 @@ class Matcher:
             self.log.error("Problem reporting job status", f"setJobAttributes, jobID = {jobID}: {result['Message']}")
         else:
             self.log.verbose("Set job attributes for jobID", jobID)
+            result = self.limiter.jobMatched(resourceDict["Site"], jobID, previousStatus)
+            if not result["OK"]:
+                self.log.warn("Problem updating the running counters", f"jobID = {jobID}: {result['Message']}")
 
         result = self.jlDB.addLoggingRecord(jobID, status=JobStatus.MATCHED, minorStatus="Assigned", source="Matcher")
         if not result["OK"]:
@@ -0,0 +1,138 @@
+""" Node-local cache of the downloaded sandboxes
+
+A sandbox is identified by its URL, which contains its checksum: it never changes once uploaded.
+The jobs running on the same node (e.g. the jobs of a pilot, or parametric jobs sharing their input sandbox)
+can share the cache, which is enabled by the local configuration of the node::
+
+  LocalSite
+  {
+    SandboxCache
+    {
+      Path = /scratch/dirac/sandboxes
+      # In MB
+      MaxSize = 2048
+    }
+  }
+
+When the cache exceeds its size, the least recently used sandboxes are removed.
+"""
+import fcntl
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+from DIRAC import gConfig, gLogger
+from DIRAC.Core.Utilities.File import mkDir
+
+#: Prefix of the files being added to the cache
+TMP_PREFIX = ".tmp."
+#: Age, in seconds, after which the files left by an interrupted addition are removed
+TMP_MAX_AGE = 3600
+
+
+class SandboxCache:
+    """Size-bounded LRU cache of sandboxes in a directory, which several processes can share"""
+
+    def __init__(self, path, maxSize):
+        """C'tor
+
+        :param str path: directory of the cache
+        :param int maxSize: maximum size of the cache, in bytes
+        """
+        self.path = path
+        self.maxSize = maxSize
+        self.log = gLogger.getSubLogger(self.__class__.__name__)
+
+    @classmethod
+    def fromConfig(cls):
+        """Get the cache configured in the LocalSite section
+
+        :return: SandboxCache, or None if there is no cache
+        """
+        path = gConfig.getValue("/LocalSite/SandboxCache/Path", "")
+        if not path:
+            return None
+        return cls(path, gConfig.getValue("/LocalSite/SandboxCache/MaxSize", 1024) * 1024 * 1024)
+
+    def __entryPath(self, sbURL):
+        return os.path.join(self.path, hashlib.sha256(sbURL.encode()).hexdigest())
+
+    def open(self, sbURL):
+        """Open a cached sandbox. The file stays readable even if the sandbox is removed from the cache meanwhile
+
+        :param str sbURL: URL of the sandbox
+        :return: file object open for binary reading, or None if the sandbox is not in the cache
+        """
+        entryPath = self.__entryPath(sbURL)
+        try:
+            fileObj = open(entryPath, "rb")
+        except OSError:
+            return None
+        try:
+            # The modification time tells which sandboxes were used last
+            os.utime(entryPath)
+        except OSError:
+            pass
+        self.log.verbose("Sandbox found in the cache", sbURL)
+        return fileObj
+
+    def add(self, sbURL, filePath):
+        """Copy a downloaded sandbox in the cache. A failure does not prevent the use of the sandbox, it is only logged
+
+        :param str sbURL: URL of the sandbox
+        :param str filePath: downloaded file
+        :return: bool -- whether the sandbox was added
+        """
+        tmpPath = None
+        try:
+            if os.stat(filePath).st_size > self.maxSize:
+                return False
+            mkDir(self.path)
+            tmpFD, tmpPath = tempfile.mkstemp(prefix=TMP_PREFIX, dir=self.path)
+            os.close(tmpFD)
+            shutil.copyfile(filePath, tmpPath)
+            # The other processes never see an incomplete sandbox
+            os.replace(tmpPath, self.__entryPath(sbURL))
+        except OSError as e:
+            self.log.warn("Could not add the sandbox to the cache", f"{sbURL}: {repr(e)}")
+            if tmpPath:
+                try:
+                    os.unlink(tmpPath)
+                except OSError:
+                    pass
+            return False
+        self.__evict()
+        return True
+
+    def __evict(self):
+        """Remove the least recently used sandboxes until the cache fits in its size"""
+        try:
+            with open(os.path.join(self.path, ".lock"), "a") as lockFile:
+                fcntl.flock(lockFile, fcntl.LOCK_EX)
+                entries = []
+                with os.scandir(self.path) as dirEntries:
+                    for dirEntry in dirEntries:
+                        try:
+                            entryStat = dirEntry.stat()
+                        except FileNotFoundError:
+                            continue
+                        if not dirEntry.name.startswith("."):
+                            entries.append((entryStat.st_mtime, entryStat.st_size, dirEntry.path))
+                        elif dirEntry.name.startswith(TMP_PREFIX) and time.time() - entryStat.st_mtime > TMP_MAX_AGE:
+                            try:
+                                os.unlink(dirEntry.path)
+                            except FileNotFoundError:
+                                pass
+                totalSize = sum(size for _mtime, size, _path in entries)
+                for _mtime, size, path in sorted(entries):
+                    if totalSize <= self.maxSize:
+                        break
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                    totalSize -= size
+        except OSError as e:
+            self.log.warn("Could not clean the sandbox cache", repr(e))
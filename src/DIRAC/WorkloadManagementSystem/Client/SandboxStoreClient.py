@@ -5,6 +5,7 @@
 import hashlib
 import os
 import re
+import shutil
 import tarfile
 import tempfile
 from io import BytesIO, StringIO
@@ -16,6 +17,7 @@ from DIRAC.Core.Tornado.Client.ClientSelector import TransferClientSelector as T
 from DIRAC.Core.Utilities.File import getGlobbedTotalSize, mkDir
 from DIRAC.Core.Utilities.ReturnValues import returnSingleResult
 from DIRAC.Resources.Storage.StorageElement import StorageElement
+from DIRAC.WorkloadManagementSystem.Client.SandboxCache import SandboxCache
 
 
 class SandboxStoreClient:
@@ -49,7 +51,7 @@ class SandboxStoreClient:
                 if not result["OK"]:
                     SandboxStoreClient.__smdb = False
                 else:
-                    result["Value"].close()
+                    SandboxStoreClient.__smdb._releaseConnection()  # pylint: disable=protected-access
             except (ImportError, RuntimeError, AttributeError):
                 SandboxStoreClient.__smdb = False
 
@@ -136,13 +138,17 @@ class SandboxStoreClient:
 
         oMD5 = hashlib.md5()
         with open(tmpFilePath, "rb") as fd:
-            bData = fd.read(10240)
+            bData = fd.read(1048576)
             while bData:
                 oMD5.update(bData)
-                bData = fd.read(10240)
-
-        transferClient = self.__getTransferClient()
-        result = transferClient.sendFile(tmpFilePath, [f"{oMD5.hexdigest()}.tar.bz2", assignTo])
+                bData = fd.read(1048576)
+        fileId = f"{oMD5.hexdigest()}.tar.bz2"
+
+        # The same sandbox may have been uploaded already, e.g. by the other jobs of a parametric job
+        result = self.__getExistingSandbox(fileId, assignTo)
+        if not result["OK"] or not result["Value"]:
+            transferClient = self.__getTransferClient()
+            result = transferClient.sendFile(tmpFilePath, [fileId, assignTo])
         result["SandboxFileName"] = tmpFilePath
         try:
             if result["OK"]:
@@ -151,6 +157,29 @@ class SandboxStoreClient:
             pass
         return result
 
+    def __getExistingSandbox(self, fileId, assignTo):
+        """Get a sandbox already in the SandboxStore, and assign it as requested
+
+        :param str fileId: <md5 checksum>.<extension> of the sandbox
+        :param dict assignTo: { 'Job:<jobid>' : '<sbType>', ... }
+        :return: S_OK(sandbox URL), S_OK(None) if the sandbox has to be uploaded
+        """
+        rpcClient = self.__getRPCClient()
+        result = rpcClient.getSandboxByChecksum(fileId)
+        if not result["OK"]:
+            # e.g. a service not knowing about this method yet
+            gLogger.debug("Could not look for an existing sandbox", result["Message"])
+            return S_OK(None)
+        sbURL = result["Value"]
+        if not sbURL:
+            return S_OK(None)
+        gLogger.verbose("Sandbox already in the SandboxStore, skipping upload", sbURL)
+        if assignTo:
+            result = rpcClient.assignSandboxesToEntities({key: [(sbURL, assignTo[key])] for key in assignTo})
+            if not result["OK"]:
+                return result
+        return S_OK(sbURL)
+
     ##############
     # Download sandbox
 
@@ -172,15 +201,31 @@ class SandboxStoreClient:
         except OSError as e:
             return S_ERROR(f"Cannot create temporary file: {repr(e)}")
 
+        sbFileName = os.path.basename(sePFN)
+        tarFileName = os.path.join(tmpSBDir, sbFileName)
+
+        sandboxCache = SandboxCache.fromConfig()
+        cachedFile = sandboxCache.open(sbLocation) if sandboxCache else None
+        if cachedFile:
+            with cachedFile:
+                if inMemory:
+                    os.rmdir(tmpSBDir)
+                    return S_OK(cachedFile.read())
+                if not unpack:
+                    with open(tarFileName, "wb") as tfile:
+                        shutil.copyfileobj(cachedFile, tfile)
+                    return S_OK(tarFileName)
+                return self.__unpackSandbox(cachedFile, destinationDir, tmpSBDir)
+
         se = StorageElement(seName, vo=self.__vo)
         result = returnSingleResult(se.getFile(sePFN, localPath=tmpSBDir))
 
         if not result["OK"]:
             return result
-        sbFileName = os.path.basename(sePFN)
+        if sandboxCache:
+            sandboxCache.add(sbLocation, tarFileName)
 
         result = S_OK()
-        tarFileName = os.path.join(tmpSBDir, sbFileName)
 
         if inMemory:
             try:
@@ -193,6 +238,27 @@ class SandboxStoreClient:
                 os.rmdir(tmpSBDir)
             return S_OK(data)
 
+        if not unpack:
+            result["Value"] = tarFileName
+            return result
+
+        with open(tarFileName, "rb") as tfile:
+            result = self.__unpackSandbox(tfile, destinationDir, tmpSBDir)
+        try:
+            os.unlink(tarFileName)
+        except OSError as e:
+            gLogger.warn(f"Could not remove temporary file {tarFileName}: {repr(e)}")
+        return result
+
+    @staticmethod
+    def __unpackSandbox(tfile, destinationDir, tmpSBDir):
+        """Extract a sandbox archive, and remove the temporary directory of the download
+
+        :param tfile: file object of the archive
+        :param str destinationDir: where to extract the sandbox, the current directory by default
+        :param str tmpSBDir: temporary directory to remove
+        :return: S_OK(size of the extracted files)/S_ERROR
+        """
         # If destination dir is not specified use current working dir
         # If its defined ensure the dir structure is there
         if not destinationDir:
@@ -200,24 +266,19 @@ class SandboxStoreClient:
         else:
             mkDir(destinationDir)
 
-        if not unpack:
-            result["Value"] = tarFileName
-            return result
-
         try:
             sandboxSize = 0
-            with tarfile.open(name=tarFileName, mode="r") as tf:
+            with tarfile.open(fileobj=tfile, mode="r") as tf:
                 for tarinfo in tf:
                     tf.extract(tarinfo, path=destinationDir)
                     sandboxSize += tarinfo.size
             # FIXME: here we return the size, but otherwise we always return the location: inconsistent
             # FIXME: looks like this size is used by the JobWrapper
-            result["Value"] = sandboxSize
-        except OSError as e:
+            result = S_OK(sandboxSize)
+        except (OSError, tarfile.TarError) as e:
             result = S_ERROR(f"Could not open bundle: {repr(e)}")
 
         try:
-            os.unlink(tarFileName)
             os.rmdir(tmpSBDir)
         except OSError as e:
             gLogger.warn(f"Could not remove temporary dir {tmpSBDir}: {repr(e)}")
@@ -8,13 +8,15 @@ from io import BytesIO
 import pytest
 from unittest.mock import MagicMock
 
-from DIRAC import gLogger
+from DIRAC import gLogger, S_OK, S_ERROR
+from DIRAC.Core.Utilities.DErrno import ESECTION
 
 gLogger.setLevel("DEBUG")
 
 # sut
 from DIRAC.WorkloadManagementSystem.Client.Matcher import Matcher
 from DIRAC.WorkloadManagementSystem.Client.SandboxStoreClient import SandboxStoreClient
+from DIRAC.WorkloadManagementSystem.private.RunningJobsCounters import RunningJobsCounters
 
 
 pilotAgentsDBMock = MagicMock()
@@ -79,6 +81,97 @@ def test__processResourceDescription(setUp):
     assert res == resExpected
 
 
+@pytest.mark.parametrize(
+    "jdl, availableProcessors, expected",
+    [
+        ("[Executable = 'ls';]", 8, 1),
+        ("[NumberOfProcessors = 4;]", 8, 4),
+        ("[MinNumberOfProcessors = 2; MaxNumberOfProcessors = 6;]", 8, 6),
+        ("[MinNumberOfProcessors = 2; MaxNumberOfProcessors = 16;]", 8, 8),
+        ("[WholeNode = 'yes';]", 8, 8),
+    ],
+)
+def test__getProcessorsForJob(jdl, availableProcessors, expected):
+    assert Matcher._getProcessorsForJob(jdl, availableProcessors) == expected
+
+
+@pytest.mark.parametrize(
+    "description, jdls, nJobs, expectedJobs",
+    [
+        # Without shared processors, only the number of jobs is limited
+        ({"NumberOfProcessors": 4}, ["[NumberOfProcessors = 4;]"] * 5, 3, 3),
+        # The jobs have to fit together in the processors of the resource
+        ({"NumberOfProcessors": 4, "SharedProcessors": True}, ["[NumberOfProcessors = 2;]"] * 5, 3, 2),
+        ({"NumberOfProcessors": 4, "SharedProcessors": True}, ["[Executable = 'ls';]"] * 5, 10, 4),
+        # No more job matching
+        ({"NumberOfProcessors": 4}, ["[Executable = 'ls';]"] * 2, 10, 2),
+    ],
+)
+def test_selectJobs(mocker, description, jdls, nJobs, expectedJobs):
+    resourceDescription = {"Site": "DIRAC.Jenkins.ch", "CPUTime": 1000}
+    resourceDescription.update(description)
+    bulkMatcher = Matcher(
+        pilotAgentsDB=MagicMock(),
+        jobDB=MagicMock(),
+        tqDB=MagicMock(),
+        jlDB=MagicMock(),
+        opsHelper=MagicMock(),
+    )
+    bulkMatcher.limiter = MagicMock()
+    bulkMatcher.limiter.hasRunningLimits.return_value = False
+    bulkMatcher.limiter.updateDelayCounters.return_value = {"OK": True, "Value": False}
+    mocker.patch.object(bulkMatcher, "_getResourceDict", return_value=dict(resourceDescription))
+    matches = [{"OK": True, "Value": {"matchFound": True, "jobId": jobID}} for jobID in range(len(jdls))]
+    bulkMatcher.tqDB.matchAndGetJob.side_effect = matches + [{"OK": True, "Value": {"matchFound": False}}]
+    mocker.patch.object(
+        bulkMatcher, "_assignJob", side_effect=lambda _resourceDict, jobID: {"JobID": jobID, "JDL": jdls[jobID]}
+    )
+
+    jobs = bulkMatcher.selectJobs(resourceDescription, {}, nJobs)
+    assert [job["JobID"] for job in jobs] == list(range(expectedJobs))
+    # Without running limits nor delays, the limits are only computed once
+    assert bulkMatcher.limiter.getNegativeCondForSite.call_count == 1
+
+
+def test_selectJobsRunningLimit(mocker):
+    """The running limit of the site is reached in the middle of a batch: the following jobs are not matched"""
+    site = "DIRAC.Limited.ch"
+    opsHelper = MagicMock()
+    opsHelper.getValue.side_effect = lambda _option, default=None: default
+    opsHelper.getSections.side_effect = lambda section: (
+        S_OK(["JobType"]) if section == f"JobScheduling/RunningLimit/{site}" else S_ERROR(ESECTION, section)
+    )
+    opsHelper.getOptionsDict.return_value = S_OK({"User": "3"})
+    jobDB = MagicMock()
+    jobDB.jobAttributeNames = ["JobType"]
+    jobDB.getCounters.return_value = S_OK([({"JobType": "User"}, 1)])
+    jobDB.getJobAttributes.return_value = S_OK({"JobType": "User"})
+    jobDB.setJobAttributes.return_value = S_OK()
+    limitedMatcher = Matcher(
+        pilotAgentsDB=MagicMock(), jobDB=jobDB, tqDB=MagicMock(), jlDB=MagicMock(), opsHelper=opsHelper
+    )
+    limitedMatcher.limiter.runningCounters = RunningJobsCounters()
+    mocker.patch.object(limitedMatcher, "_getResourceDict", return_value={"Site": site})
+    jobIDs = iter(range(10))
+
+    def matchAndGetJob(_resourceDict, negativeCond=None):
+        if "User" in (negativeCond or {}).get("JobType", []):
+            return S_OK({"matchFound": False})
+        return S_OK({"matchFound": True, "jobId": next(jobIDs)})
+
+    def assignJob(resourceDict, jobID):
+        # The status change of the matched job is counted in the running jobs of the site
+        limitedMatcher._reportStatus(resourceDict, jobID, "Waiting")
+        return {"JobID": jobID, "JDL": "[]"}
+
+    limitedMatcher.tqDB.matchAndGetJob.side_effect = matchAndGetJob
+    mocker.patch.object(limitedMatcher, "_assignJob", side_effect=assignJob)
+
+    # 1 job already running, the limit is 3
+    jobs = limitedMatcher.selectJobs({"Site": site}, {}, 5)
+    assert [job["JobID"] for job in jobs] == [0, 1]
+
+
 def test_uploadFilesAsSandbox(mocker, setUp):
     mocker.patch("DIRAC.WorkloadManagementSystem.Client.SandboxStoreClient.TransferClient", return_value=MagicMock())
     ssc = SandboxStoreClient()
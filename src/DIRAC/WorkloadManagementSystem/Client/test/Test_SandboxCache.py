@@ -0,0 +1,78 @@
+""" Test the node-local cache of sandboxes, and its use when downloading sandboxes
+"""
+import io
+import os
+import tarfile
+from unittest.mock import MagicMock
+
+from DIRAC import S_OK
+from DIRAC.WorkloadManagementSystem.Client.SandboxCache import SandboxCache
+from DIRAC.WorkloadManagementSystem.Client.SandboxStoreClient import SandboxStoreClient
+
+SB_URL = "SB:SandboxSE|/SandBox/u/user.group/123/456/123456.tar.bz2"
+
+
+def writeFile(path, size):
+    with open(path, "wb") as fd:
+        fd.write(os.urandom(size))
+    return str(path)
+
+
+def test_cache(tmp_path):
+    cache = SandboxCache(str(tmp_path / "cache"), 1000)
+    assert cache.open(SB_URL) is None
+    source = writeFile(tmp_path / "sb", 100)
+    assert cache.add(SB_URL, source)
+    with cache.open(SB_URL) as fd:
+        assert fd.read() == open(source, "rb").read()
+    # Too big for the cache
+    assert not cache.add("SB:SandboxSE|/big.tar.bz2", writeFile(tmp_path / "big", 1001))
+
+
+def test_lruEviction(tmp_path):
+    cache = SandboxCache(str(tmp_path / "cache"), 1000)
+    for i in range(3):
+        assert cache.add(f"SB:SandboxSE|/{i}.tar.bz2", writeFile(tmp_path / str(i), 400))
+        # The last use of a sandbox is given by its modification time
+        for entry in os.scandir(cache.path):
+            if not entry.name.startswith("."):
+                os.utime(entry.path, (entry.stat().st_atime, entry.stat().st_mtime - 10))
+        if i == 1:
+            # The first sandbox is used again, the second one is now the least recently used
+            cache.open("SB:SandboxSE|/0.tar.bz2").close()
+    assert cache.open("SB:SandboxSE|/0.tar.bz2") is not None
+    assert cache.open("SB:SandboxSE|/1.tar.bz2") is None
+    assert cache.open("SB:SandboxSE|/2.tar.bz2") is not None
+
+
+def test_downloadSandbox(mocker, tmp_path, monkeypatch):
+    """The sandbox is downloaded only once"""
+    tarPath = tmp_path / "123456.tar.bz2"
+    with tarfile.open(tarPath, "w:bz2") as tf:
+        tarInfo = tarfile.TarInfo("input.txt")
+        tarInfo.size = 5
+        tf.addfile(tarInfo, io.BytesIO(b"input"))
+
+    def getFile(_pfn, localPath):
+        os.link(tarPath, os.path.join(localPath, tarPath.name))
+        return S_OK({"Successful": {_pfn: 1}, "Failed": {}})
+
+    storageElement = MagicMock()
+    storageElement.return_value.getFile.side_effect = getFile
+    mocker.patch("DIRAC.WorkloadManagementSystem.Client.SandboxStoreClient.StorageElement", storageElement)
+    cache = SandboxCache(str(tmp_path / "cache"), 10000)
+    mocker.patch.object(SandboxCache, "fromConfig", return_value=cache)
+    monkeypatch.chdir(tmp_path)
+
+    for job in ("job1", "job2"):
+        result = SandboxStoreClient().downloadSandbox(SB_URL, destinationDir=str(tmp_path / job))
+        assert result["OK"], result
+        assert result["Value"] == 5
+        assert (tmp_path / job / "input.txt").read_bytes() == b"input"
+    assert storageElement.return_value.getFile.call_count == 1
+
+    result = SandboxStoreClient().downloadSandbox(SB_URL, inMemory=True)
+    assert result["Value"] == tarPath.read_bytes()
+    result = SandboxStoreClient().downloadSandbox(SB_URL, unpack=False)
+    assert open(result["Value"], "rb").read() == tarPath.read_bytes()
+    assert storageElement.return_value.getFile.call_count == 1
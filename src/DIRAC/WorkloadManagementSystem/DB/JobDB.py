@@ -9,10 +9,17 @@ The following options can be set in ``Systems/WorkloadManagement/<Setup>/Databas
 
 * *MaxRescheduling*:     Set the maximum number of times a job can be rescheduled, default *3*.
 * *CompressJDLs*:        Enable compression of JDLs when they are stored in the database, default *False*.
+* *ParametricJDLTemplates*: Store the JDL of a parametric job once, as a template, instead of the JDL of each
+                         of its jobs, which is expanded when needed, default *False*.
 
 """
 import datetime
+import json
 import operator
+import threading
+import uuid
+
+import cachetools
 
 from DIRAC.ConfigurationSystem.Client.Helpers.Registry import getVOForGroup
 from DIRAC.ConfigurationSystem.Client.Helpers.Resources import getSiteTier
@@ -32,6 +39,10 @@ from DIRAC.WorkloadManagementSystem.DB.JobDBUtils import (
     extractJDL,
     fixJDL,
 )
+from DIRAC.WorkloadManagementSystem.Utilities.ParametricJob import expandParametricJob, getParametricJobParameters
+
+#: Prefix of the JDLs of the jobs stored as a reference to the template of their parametric job
+JDL_TEMPLATE_PREFIX = "Template:"
 
 
 class JobDB(DB):
@@ -60,6 +71,17 @@ class JobDB(DB):
 
         self.jdl2DBParameters = ["JobName", "JobType", "JobGroup"]
 
+        self.jdlTemplates = self.getCSOption("ParametricJDLTemplates", False)
+        if self.jdlTemplates:
+            result = self.__createJDLTemplatesTable()
+            if not result["OK"]:
+                self.log.fatal("JobDB: Can not create the JobJDLTemplates table", result["Message"])
+                return
+        # The templates never change: they and the JDLs expanded from them are kept in memory
+        self.__jdlTemplateCache = cachetools.TTLCache(100, 3600)
+        self.__expandedJDLCache = cachetools.TTLCache(10000, 3600)
+        self.__jdlCacheLock = threading.Lock()
+
         self.log.info("MaxReschedule", self.maxRescheduling)
         self.log.info("==================================================")
         self.__initialized = True
@@ -82,6 +104,27 @@ class JobDB(DB):
 
         return S_OK()
 
+    def __createJDLTemplatesTable(self):
+        """Create the table of the templates of the parametric jobs, if it does not exist yet"""
+        result = self._query("SHOW TABLES")
+        if not result["OK"]:
+            return result
+        if "JobJDLTemplates" in [row[0] for row in result["Value"]]:
+            return S_OK()
+        return self._createTables(
+            {
+                "JobJDLTemplates": {
+                    "Fields": {
+                        "TemplateID": "INT(11) UNSIGNED NOT NULL AUTO_INCREMENT",
+                        "JDL": "MEDIUMTEXT NOT NULL",
+                        "Overlay": "TEXT NOT NULL",
+                        "NJobs": "INT(11) NOT NULL DEFAULT 0",
+                    },
+                    "PrimaryKey": "TemplateID",
+                }
+            }
+        )
+
     #############################################################################
     def getDistinctJobAttributes(self, attribute, condDict=None, older=None, newer=None, timeStamp="LastUpdateTime"):
         """Get distinct values of the job attribute under specified conditions"""
@@ -465,15 +508,11 @@ class JobDB(DB):
                 return res
 
         # if we are here it's because we are not updating the status
-        ret = self._escapeString(jobID)
-        if not ret["OK"]:
-            return ret
-        jobID = ret["Value"]
-
-        ret = self._escapeString(attrValue)
+        params = []
+        ret = self._parameters([attrValue, jobID], params)
         if not ret["OK"]:
             return ret
-        value = ret["Value"]
+        value, jobID = ret["Value"]
 
         if update:
             cmd = f"UPDATE Jobs SET {attrName}={value},LastUpdateTime=UTC_TIMESTAMP() WHERE JobID={jobID}"
@@ -483,7 +522,7 @@ class JobDB(DB):
         if myDate:
             cmd += f" AND LastUpdateTime < {myDate}"
 
-        return self._update(cmd)
+        return self._update(cmd, params=params)
 
     #############################################################################
     def setJobAttributes(self, jobID, attrNames, attrValues, update=False, myDate=None, force=False):
@@ -600,6 +639,84 @@ class JobDB(DB):
 
         return self._update(cmd)
 
+    def setJobsStatusAttributes(self, jobAttributes, jobTimes=None, chunkSize=1000):
+        """Set the status attributes and the execution time stamps of many jobs, each with its own values.
+        The jobs changing the same attributes are updated together, with one UPDATE statement per chunk of jobs.
+        The state machine is not applied: the caller is in charge of validating the transitions.
+
+        :param dict jobAttributes: { jobID : { attribute : value } }, with the Status, MinorStatus and/or
+                                   ApplicationStatus attributes. The LastUpdateTime of these jobs is refreshed.
+        :param dict jobTimes: { jobID : { name : time stamp } }, with StartExecTime and EndExecTime, set only if
+                              not yet set, and HeartBeatTime. The HeartBeatTime is set to the StartExecTime
+                              if it is not given and not yet set.
+        :param int chunkSize: maximum number of jobs per statement
+        :return: S_OK/S_ERROR
+        """
+        jobTimes = jobTimes or {}
+        timeNames = ["StartExecTime", "EndExecTime", "HeartBeatTime"]
+        # { ( attribute names ) : [ job IDs ] }
+        groups = {}
+        for jobID in sorted(set(jobAttributes) | set(jobTimes)):
+            attrNames = tuple(sorted(jobAttributes.get(jobID, {})))
+            for attrName in attrNames:
+                if attrName not in ("Status", "MinorStatus", "ApplicationStatus"):
+                    return S_ERROR(EWMSJMAN, f"Request to set a non-status job attribute: {attrName}")
+            groups.setdefault(attrNames, []).append(jobID)
+
+        for attrNames, jobIDs in groups.items():
+            for start in range(0, len(jobIDs), chunkSize):
+                chunk = jobIDs[start : start + chunkSize]
+                # Only the jobs of the chunk are updated: nothing is created for the jobs removed meanwhile
+                assignments = []
+                params = []
+                for attrName in attrNames:
+                    assignments.append(f"`{attrName}` = CASE JobID {' '.join(['WHEN %s THEN %s'] * len(chunk))} END")
+                    for jobID in chunk:
+                        value = jobAttributes[jobID][attrName]
+                        if attrName == "ApplicationStatus":
+                            value = value[:255]
+                        params.extend([int(jobID), value])
+                if attrNames:
+                    assignments.append("LastUpdateTime = UTC_TIMESTAMP()")
+                # { name : ( CASE expression, parameters ) } of the time stamps given for the jobs of the chunk
+                cases = {}
+                for name in timeNames:
+                    whens = []
+                    for jobID in chunk:
+                        times = jobTimes.get(jobID, {})
+                        if times.get(name):
+                            whens.append((int(jobID), str(times[name])))
+                    if whens:
+                        cases[name] = (
+                            f"CASE JobID {' '.join(['WHEN %s THEN %s'] * len(whens))} END",
+                            [param for when in whens for param in when],
+                        )
+                for name in ("StartExecTime", "EndExecTime"):
+                    if name in cases:
+                        assignments.append(f"`{name}` = IFNULL(`{name}`, {cases[name][0]})")
+                        params.extend(cases[name][1])
+                # The HeartBeatTime given wins over the current one, which wins over the new StartExecTime
+                heartBeatTerms = []
+                heartBeatParams = []
+                if "HeartBeatTime" in cases:
+                    heartBeatTerms.append(cases["HeartBeatTime"][0])
+                    heartBeatParams.extend(cases["HeartBeatTime"][1])
+                heartBeatTerms.append("`HeartBeatTime`")
+                if "StartExecTime" in cases:
+                    heartBeatTerms.append(cases["StartExecTime"][0])
+                    heartBeatParams.extend(cases["StartExecTime"][1])
+                if len(heartBeatTerms) > 1:
+                    assignments.append(f"`HeartBeatTime` = COALESCE({', '.join(heartBeatTerms)})")
+                    params.extend(heartBeatParams)
+                if not assignments:
+                    continue
+                params.extend(int(jobID) for jobID in chunk)
+                req = f"UPDATE Jobs SET {', '.join(assignments)} WHERE JobID IN ({','.join(['%s'] * len(chunk))})"
+                result = self._update(req, params=params)
+                if not result["OK"]:
+                    return result
+        return S_OK()
+
     def setJobStatus(self, jobID, status="", minorStatus="", applicationStatus=""):
         """Set status of the job specified by its jobID"""
         # Do not update the LastUpdate time stamp if setting the Stalled status
@@ -783,12 +900,24 @@ class JobDB(DB):
     #############################################################################
     def __setInitialJobParameters(self, classadJob, jobID):
         """Set initial job parameters as was defined in the Classad"""
+        return self.setJobParameters(jobID, list(self.__getInitialJobParameters(classadJob).items()))
 
-        # Extract initital job parameters
+    @staticmethod
+    def __getInitialJobParameters(classadJob):
+        """Extract initial job parameters from the Classad"""
         parameters = {}
         if classadJob.lookupAttribute("Parameters"):
             parameters = classadJob.getDictionaryFromSubJDL("Parameters")
-        return self.setJobParameters(jobID, list(parameters.items()))
+        return parameters
+
+    @staticmethod
+    def __getInputData(classadJob):
+        """Extract the input data LFNs from the Classad"""
+        inputData = []
+        if classadJob.lookupAttribute("InputData"):
+            inputData = classadJob.getListFromExpression("InputData")
+        # some jobs are setting empty string as InputData
+        return [lfn.strip() for lfn in inputData if lfn]
 
     #############################################################################
     def setJobJDL(self, jobID, jdl=None, originalJDL=None):
@@ -861,21 +990,142 @@ class JobDB(DB):
         ret = self._escapeString(jobID)
         if not ret["OK"]:
             return ret
-        jobID = ret["Value"]
+        e_jobID = ret["Value"]
 
         if original:
-            cmd = f"SELECT OriginalJDL FROM JobJDLs WHERE JobID={jobID}"
+            cmd = f"SELECT OriginalJDL FROM JobJDLs WHERE JobID={e_jobID}"
         else:
-            cmd = f"SELECT JDL FROM JobJDLs WHERE JobID={jobID}"
+            cmd = f"SELECT JDL FROM JobJDLs WHERE JobID={e_jobID}"
 
         result = self._query(cmd)
         if result["OK"]:
             jdl = result["Value"]
             if not jdl:
                 return S_OK(jdl)
-            return S_OK(extractJDL(jdl[0][0]))
+            return self.__extractJDL(int(jobID), jdl[0][0], original)
         return result
 
+    #############################################################################
+    def getJobsJDL(self, jobIDs, original=False):
+        """Get the JDLs of several jobs, with a single query
+
+        :param list jobIDs: job IDs
+        :param bool original: get the original JDLs rather than the current ones
+        :return: S_OK({ jobID : JDL })
+        """
+        if not jobIDs:
+            return S_OK({})
+        jdlField = "OriginalJDL" if original else "JDL"
+        jobIDString = ",".join(str(int(jobID)) for jobID in jobIDs)
+        result = self._query(f"SELECT JobID, {jdlField} FROM JobJDLs WHERE JobID IN ({jobIDString})")
+        if not result["OK"]:
+            return result
+        jdls = {}
+        for jobID, jdl in result["Value"]:
+            result = self.__extractJDL(int(jobID), jdl, original)
+            if not result["OK"]:
+                return result
+            jdls[int(jobID)] = result["Value"]
+        return S_OK(jdls)
+
+    def __extractJDL(self, jobID, storedJDL, original):
+        """Get the JDL of a job as stored in the JobJDLs table, expanding it if it refers to a template
+
+        :param int jobID: job ID
+        :param storedJDL: value of the JDL or OriginalJDL column
+        :param bool original: whether it is the original JDL
+        :return: S_OK(JDL)
+        """
+        record = self.__parseJDLRecord(storedJDL)
+        if not record:
+            return S_OK(extractJDL(storedJDL))
+        templateID, parameterNumber, overlay = record
+
+        cacheKey = (jobID, original, storedJDL)
+        with self.__jdlCacheLock:
+            jdl = self.__expandedJDLCache.get(cacheKey)
+        if jdl is not None:
+            return S_OK(jdl)
+
+        result = self.__getJDLTemplate(templateID)
+        if not result["OK"]:
+            return result
+        template = result["Value"]
+        if parameterNumber >= len(template["Parameters"]):
+            return S_ERROR(f"Job {jobID} refers to the job {parameterNumber} of JDL template {templateID}")
+        if original:
+            jdl = self.__expandJDLTemplate(template, parameterNumber)
+        else:
+            jdl = self.__expandJDLTemplate(template, parameterNumber, jobID, overlay).asJDL()
+        with self.__jdlCacheLock:
+            self.__expandedJDLCache[cacheKey] = jdl
+        return S_OK(jdl)
+
+    @staticmethod
+    def __parseJDLRecord(storedJDL):
+        """Parse the reference of a job to the template of its parametric job
+
+        :return: ( template ID, parameter number, overlay ), or None if the JDL is stored in full
+        """
+        if isinstance(storedJDL, bytes):
+            storedJDL = storedJDL.decode()
+        if not storedJDL.startswith(JDL_TEMPLATE_PREFIX):
+            return None
+        fields = storedJDL[len(JDL_TEMPLATE_PREFIX) :].split(":", 2)
+        overlay = json.loads(fields[2]) if len(fields) > 2 else {}
+        return int(fields[0]), int(fields[1]), overlay
+
+    def __getJDLTemplate(self, templateID):
+        """Get a template of parametric job
+
+        :param int templateID: template ID
+        :return: S_OK(dict) with the JDL of the parametric job, the parameters of each of its jobs,
+                 and the overlay common to all its jobs
+        """
+        with self.__jdlCacheLock:
+            template = self.__jdlTemplateCache.get(templateID)
+        if template:
+            return S_OK(template)
+
+        result = self._query("SELECT JDL, Overlay FROM JobJDLTemplates WHERE TemplateID = %s", params=[templateID])
+        if not result["OK"]:
+            return result
+        if not result["Value"]:
+            return S_ERROR(f"JDL template {templateID} not found")
+        jdl, overlay = result["Value"][0]
+        jdl = extractJDL(jdl)
+        result = getParametricJobParameters(ClassAd(jdl))
+        if not result["OK"]:
+            return result
+        template = {"JDL": jdl, "Parameters": result["Value"], "Overlay": json.loads(overlay)}
+        with self.__jdlCacheLock:
+            self.__jdlTemplateCache[templateID] = template
+        return S_OK(template)
+
+    @staticmethod
+    def __expandJDLTemplate(template, parameterNumber, jobID=None, overlay=None):
+        """Expand the JDL of a job from the template of its parametric job
+
+        :param dict template: template, as given by __getJDLTemplate
+        :param int parameterNumber: number of the job in its parametric job
+        :param int jobID: job ID, to get the JDL of the job rather than its original JDL
+        :param dict overlay: { attribute : expression, or None if removed } specific to the job,
+                             to apply after the overlay common to all the jobs
+        :return: original JDL if no jobID is given, else ClassAd of the job
+        """
+        parameters = template["Parameters"]
+        jdl = expandParametricJob(template["JDL"], parameterNumber, parameters[parameterNumber], len(parameters))
+        if jobID is None:
+            return jdl
+        classAdJob = ClassAd(jdl.replace("%j", str(jobID)))
+        classAdJob.insertAttributeInt("JobID", jobID)
+        for attribute, expression in list(template["Overlay"].items()) + list((overlay or {}).items()):
+            if expression is None:
+                classAdJob.deleteAttribute(attribute)
+            else:
+                classAdJob.set_expression(attribute, expression)
+        return classAdJob
+
     #############################################################################
     def insertNewJobIntoDB(
         self,
@@ -922,26 +1172,16 @@ class JobDB(DB):
 
         jobID = result["Value"]
 
-        jobManifest.setOption("JobID", jobID)
-
-        jobAttrs["JobID"] = jobID
-
-        # 2.- Check JDL and Prepare DIRAC JDL
-        jobJDL = jobManifest.dumpAsJDL()
-
-        # Replace the JobID placeholder if any
-        if jobJDL.find("%j") != -1:
-            jobJDL = jobJDL.replace("%j", str(jobID))
+        result = self.__prepareNewJob(
+            jobID, jobManifest, owner, ownerGroup, jobAttrs, initialStatus, initialMinorStatus
+        )
+        if not result["OK"]:
+            return result
+        classAdJob, jobJDL = result["Value"]
 
-        classAdJob = ClassAd(jobJDL)
-        classAdReq = ClassAd("[]")
         retVal = S_OK(jobID)
         retVal["JobID"] = jobID
-        if not classAdJob.isOK():
-            jobAttrs["Status"] = JobStatus.FAILED
-
-            jobAttrs["MinorStatus"] = "Error in JDL syntax"
-
+        if jobJDL is None:
             result = self.insertFields("Jobs", inDict=jobAttrs)
             if not result["OK"]:
                 return result
@@ -950,16 +1190,6 @@ class JobDB(DB):
             retVal["MinorStatus"] = "Error in JDL syntax"
             return retVal
 
-        classAdJob.insertAttributeInt("JobID", jobID)
-        vo = getVOForGroup(ownerGroup)
-        result = self.__checkAndPrepareJob(jobID, classAdJob, classAdReq, owner, ownerGroup, jobAttrs, vo)
-        if not result["OK"]:
-            return result
-
-        jobJDL = createJDLWithInitialStatus(
-            classAdJob, classAdReq, self.jdl2DBParameters, jobAttrs, initialStatus, initialMinorStatus
-        )
-
         result = self.setJobJDL(jobID, jobJDL)
         if not result["OK"]:
             return result
@@ -975,9 +1205,6 @@ class JobDB(DB):
             return result
 
         # Looking for the Input Data
-        inputData = []
-        if classAdJob.lookupAttribute("InputData"):
-            inputData = classAdJob.getListFromExpression("InputData")
         values = []
 
         ret = self._escapeString(jobID)
@@ -985,11 +1212,8 @@ class JobDB(DB):
             return ret
         e_jobID = ret["Value"]
 
-        for lfn in inputData:
-            # some jobs are setting empty string as InputData
-            if not lfn:
-                continue
-            ret = self._escapeString(lfn.strip())
+        for lfn in self.__getInputData(classAdJob):
+            ret = self._escapeString(lfn)
             if not ret["OK"]:
                 return ret
             lfn = ret["Value"]
@@ -1008,6 +1232,267 @@ class JobDB(DB):
 
         return retVal
 
+    def insertNewJobsIntoDB(
+        self,
+        jdls,
+        owner,
+        ownerGroup,
+        initialStatus=JobStatus.RECEIVED,
+        initialMinorStatus="Job accepted",
+        vo=None,
+        chunkSize=1000,
+        templateJDL=None,
+    ):
+        """Insert many new jobs (e.g. the jobs of a parametric job) into the Job database.
+        The jobs are prepared as by insertNewJobIntoDB, but their IDs are reserved at once
+        and their JDLs, attributes, parameters and input data are written with multi-rows inserts.
+        Nothing is inserted if one of the jobs can not be prepared.
+
+        :param list jdls: job descriptions JDL
+        :param str owner: job owner user name
+        :param str ownerGroup: job owner group
+        :param str initialStatus: optional initial job status (Received by default)
+        :param str initialMinorStatus: optional initial minor job status
+        :param int chunkSize: maximum number of rows per INSERT statement
+        :param str templateJDL: JDL of the parametric job the jobs were generated from. With the
+                                ParametricJDLTemplates option, it is stored once and the jobs only refer to it
+        :return: S_OK({ jobID : { "Status" : status, "MinorStatus" : minor status, "TimeStamp" : time } }),
+                 in the order of the JDLs
+        """
+        if not vo:
+            vo = getVOForGroup(ownerGroup)
+
+        jobManifests = []
+        originalJDLs = []
+        for jdl in jdls:
+            result = checkAndAddOwner(jdl, owner, ownerGroup)
+            if not result["OK"]:
+                return result
+            jobManifests.append(result["Value"])
+            originalJDLs.append(fixJDL(jdl))
+
+        result = self.__reserveJobIDs(len(jdls), chunkSize)
+        if not result["OK"]:
+            return S_ERROR(EWMSSUBM, "Failed to insert JDL in to DB")
+        jobIDs = result["Value"]
+
+        now = str(datetime.datetime.utcnow())
+        jobs = {}
+        jobJDLs = []
+        parameterRows = []
+        inputDataRows = []
+        # The jobs may not all have the same attributes: { ( attribute names ) : [ values ] }
+        jobRows = {}
+        for jobID, jobManifest in zip(jobIDs, jobManifests):
+            jobAttrs = {
+                "LastUpdateTime": now,
+                "SubmissionTime": now,
+                "Owner": owner,
+                "OwnerGroup": ownerGroup,
+                "VO": vo,
+            }
+            result = self.__prepareNewJob(
+                jobID, jobManifest, owner, ownerGroup, jobAttrs, initialStatus, initialMinorStatus
+            )
+            if not result["OK"]:
+                self.removeJobFromDB(jobIDs)
+                return result
+            classAdJob, jobJDL = result["Value"]
+
+            jobRows.setdefault(tuple(jobAttrs), []).append(list(jobAttrs.values()))
+            jobJDLs.append(jobJDL)
+            if jobJDL is None:
+                jobs[jobID] = {"Status": JobStatus.FAILED, "MinorStatus": "Error in JDL syntax"}
+                continue
+            parameters = self.__getInitialJobParameters(classAdJob)
+            parameterRows.extend([jobID, name, value] for name, value in parameters.items())
+            inputDataRows.extend([jobID, lfn] for lfn in self.__getInputData(classAdJob))
+            jobs[jobID] = {"Status": initialStatus, "MinorStatus": initialMinorStatus}
+
+        templateID = None
+        templateRecords = {}
+        if templateJDL and self.jdlTemplates:
+            result = self.__insertJDLTemplate(templateJDL, jobIDs, jobJDLs, originalJDLs)
+            if not result["OK"]:
+                self.log.warn("Failed to store the JDL template, storing the JDLs of the jobs", result["Message"])
+            else:
+                templateID, templateRecords = result["Value"]
+
+        jdlRows = []
+        for jobID, jobJDL, originalJDL in zip(jobIDs, jobJDLs, originalJDLs):
+            if jobID in templateRecords:
+                jdlRows.append([jobID, templateRecords[jobID][0], "", templateRecords[jobID][1]])
+            else:
+                jdlRows.append([jobID, compressJDL(jobJDL) if jobJDL else "", "", compressJDL(originalJDL)])
+
+        inserts = [("JobJDLs", ["JobID", "JDL", "JobRequirements", "OriginalJDL"], jdlRows, ["JDL", "OriginalJDL"])]
+        inserts += [("Jobs", list(attrNames), rows, None) for attrNames, rows in jobRows.items()]
+        inserts += [
+            ("JobParameters", ["JobID", "Name", "Value"], parameterRows, "UPDATE"),
+            ("InputData", ["JobID", "LFN"], inputDataRows, None),
+        ]
+        for table, fields, rows, onDuplicate in inserts:
+            if not rows:
+                continue
+            result = self.insertManyFields(table, fields, rows, chunkSize=chunkSize, onDuplicate=onDuplicate)
+            if not result["OK"]:
+                self.log.error("Failed to insert the new jobs", f"in {table}: {result['Message']}")
+                if table == "JobJDLs" and templateID:
+                    # No job refers to the template yet
+                    self._update("DELETE FROM JobJDLTemplates WHERE TemplateID = %s", params=[templateID])
+                self.removeJobFromDB(jobIDs)
+                return result
+
+        self.log.info("JobDB: New jobs inserted", f"{len(jobIDs)} jobs, from {jobIDs[0]} to {jobIDs[-1]}")
+        timeStamp = str(datetime.datetime.utcnow())
+        for job in jobs.values():
+            job["TimeStamp"] = timeStamp
+        return S_OK(jobs)
+
+    def __reserveJobIDs(self, nJobs, chunkSize):
+        """Insert empty JDLs for new jobs in the system, this produces their JobIDs
+
+        The rows are marked with a unique token in place of their JDL, which allows to find their IDs
+        with a range scan above the highest ID existing before, whatever the concurrent insertions.
+
+        :return: S_OK(list of job IDs)
+        """
+        result = self._query("SELECT MAX(JobID) FROM JobJDLs")
+        if not result["OK"]:
+            return result
+        lastJobID = result["Value"][0][0] or 0
+
+        token = f"Reserved:{uuid.uuid4().hex}"
+        result = self.insertManyFields(
+            "JobJDLs",
+            ["JDL", "JobRequirements", "OriginalJDL"],
+            ([token, "", ""] for _ in range(nJobs)),
+            chunkSize=chunkSize,
+        )
+        if not result["OK"]:
+            self.log.error("Can not insert New JDLs", result["Message"])
+            return result
+
+        # The auto-increment values are increasing in the order of the inserted rows
+        result = self._query(
+            "SELECT JobID FROM JobJDLs WHERE JobID > %s AND JDL = %s ORDER BY JobID", params=[lastJobID, token]
+        )
+        if not result["OK"]:
+            return result
+        jobIDs = [int(row[0]) for row in result["Value"]]
+        if len(jobIDs) != nJobs:
+            self.removeJobFromDB(jobIDs)
+            return S_ERROR(f"JobDB.__reserveJobIDs: {len(jobIDs)} JobIDs served for {nJobs} jobs")
+
+        self.log.info("JobDB: New JobIDs served", f"{len(jobIDs)}, from {jobIDs[0]} to {jobIDs[-1]}")
+        return S_OK(jobIDs)
+
+    def __insertJDLTemplate(self, templateJDL, jobIDs, jobJDLs, originalJDLs):
+        """Store the JDL of a parametric job as the template of the JDLs of its jobs
+
+        The JDL of a job is expanded from the template, then it gets the attributes added or modified
+        when it was prepared: those common to all the jobs are stored with the template,
+        the others are stored with the reference of the job to the template.
+        A job refers to the template only if its JDLs are exactly reproduced from it.
+
+        :param str templateJDL: JDL of the parametric job
+        :param list jobIDs: IDs of the jobs, in the order of their parameters
+        :param list jobJDLs: prepared JDLs of the jobs, None for those which failed
+        :param list originalJDLs: original JDLs of the jobs
+        :return: S_OK(( template ID, { jobID : ( JDL, original JDL ) } )) for the jobs referring to the template
+        """
+        classAd = ClassAd(templateJDL)
+        result = getParametricJobParameters(classAd)
+        if not result["OK"]:
+            return result
+        template = {"JDL": classAd.asJDL(), "Parameters": result["Value"], "Overlay": {}}
+        if len(template["Parameters"]) != len(jobIDs):
+            return S_ERROR(f"The template gives {len(template['Parameters'])} jobs for {len(jobIDs)} jobs")
+
+        # { parameter number : { attribute : expression, or None if removed } }
+        overlays = {}
+        for parameterNumber, (jobID, jobJDL, originalJDL) in enumerate(zip(jobIDs, jobJDLs, originalJDLs)):
+            if jobJDL is None or self.__expandJDLTemplate(template, parameterNumber) != originalJDL:
+                continue
+            expanded = self.__expandJDLTemplate(template, parameterNumber, jobID).contents
+            prepared = ClassAd(jobJDL).contents
+            overlay = {name: value for name, value in prepared.items() if expanded.get(name) != value}
+            overlay.update({name: None for name in expanded if name not in prepared})
+            overlays[parameterNumber] = overlay
+        if not overlays:
+            return S_OK((None, {}))
+
+        commonItems = None
+        for overlay in overlays.values():
+            items = set(overlay.items())
+            commonItems = items if commonItems is None else commonItems & items
+        template["Overlay"] = dict(commonItems)
+
+        records = {}
+        for parameterNumber, overlay in overlays.items():
+            jobID = jobIDs[parameterNumber]
+            overlay = {name: value for name, value in overlay.items() if name not in template["Overlay"]}
+            jdl = self.__expandJDLTemplate(template, parameterNumber, jobID, overlay).asJDL()
+            if jdl != jobJDLs[parameterNumber]:
+                self.log.debug("JDL not reproduced from the template", f"for job {jobID}")
+                continue
+            records[jobID] = (parameterNumber, json.dumps(overlay, separators=(",", ":")) if overlay else "")
+        if not records:
+            return S_OK((None, {}))
+
+        result = self.insertFields(
+            "JobJDLTemplates",
+            ["JDL", "Overlay", "NJobs"],
+            [compressJDL(template["JDL"]), json.dumps(template["Overlay"]), len(records)],
+        )
+        if not result["OK"]:
+            return result
+        templateID = int(result["lastRowId"])
+        with self.__jdlCacheLock:
+            self.__jdlTemplateCache[templateID] = template
+
+        self.log.info("JobDB: JDL template stored", f"{templateID}, for {len(records)} jobs")
+        for jobID, (parameterNumber, overlay) in records.items():
+            originalRecord = f"{JDL_TEMPLATE_PREFIX}{templateID}:{parameterNumber}"
+            records[jobID] = (f"{originalRecord}:{overlay}" if overlay else originalRecord, originalRecord)
+        return S_OK((templateID, records))
+
+    def __prepareNewJob(self, jobID, jobManifest, owner, ownerGroup, jobAttrs, initialStatus, initialMinorStatus):
+        """Check the JDL of a new job and prepare it, in memory, with its job attributes
+
+        :return: S_OK((job ClassAd, job JDL)), the JDL being None if its syntax is wrong:
+                 jobAttrs are then those of a failed job
+        """
+        jobManifest.setOption("JobID", jobID)
+
+        jobAttrs["JobID"] = jobID
+
+        # 2.- Check JDL and Prepare DIRAC JDL
+        jobJDL = jobManifest.dumpAsJDL()
+
+        # Replace the JobID placeholder if any
+        if jobJDL.find("%j") != -1:
+            jobJDL = jobJDL.replace("%j", str(jobID))
+
+        classAdJob = ClassAd(jobJDL)
+        classAdReq = ClassAd("[]")
+        if not classAdJob.isOK():
+            jobAttrs["Status"] = JobStatus.FAILED
+
+            jobAttrs["MinorStatus"] = "Error in JDL syntax"
+            return S_OK((classAdJob, None))
+
+        classAdJob.insertAttributeInt("JobID", jobID)
+        vo = getVOForGroup(ownerGroup)
+        result = self.__checkAndPrepareJob(jobID, classAdJob, classAdReq, owner, ownerGroup, jobAttrs, vo)
+        if not result["OK"]:
+            return result
+
+        jobJDL = createJDLWithInitialStatus(
+            classAdJob, classAdReq, self.jdl2DBParameters, jobAttrs, initialStatus, initialMinorStatus
+        )
+        return S_OK((classAdJob, jobJDL))
+
     def __checkAndPrepareJob(self, jobID, classAdJob, classAdReq, owner, ownerGroup, jobAttrs, vo):
         """
         Check Consistency of Submitted JDL and set some defaults
@@ -1046,6 +1531,18 @@ class JobDB(DB):
         else:
             jobIDList = jobIDs
 
+        # The templates of the parametric jobs, to remove with their last job
+        templateJobs = {}
+        cmd = "SELECT OriginalJDL FROM JobJDLs WHERE JobID in (%s) AND OriginalJDL LIKE %%s" % ",".join(
+            str(j) for j in jobIDList
+        )
+        result = self._query(cmd, params=[f"{JDL_TEMPLATE_PREFIX}%"])
+        if not result["OK"]:
+            return result
+        for (originalJDL,) in result["Value"]:
+            templateID = self.__parseJDLRecord(originalJDL)[0]
+            templateJobs[templateID] = templateJobs.get(templateID, 0) + 1
+
         failedTablesList = []
         for table in [
             "InputData",
@@ -1065,6 +1562,23 @@ class JobDB(DB):
         if failedTablesList:
             return S_ERROR(f"Errors while job removal (tables {','.join(failedTablesList)})")
 
+        if templateJobs:
+            for templateID, nJobs in templateJobs.items():
+                result = self._update(
+                    "UPDATE JobJDLTemplates SET NJobs = NJobs - %s WHERE TemplateID = %s", params=[nJobs, templateID]
+                )
+                if not result["OK"]:
+                    return result
+            cmd = "DELETE FROM JobJDLTemplates WHERE NJobs <= 0 AND TemplateID in (%s)" % ",".join(
+                str(templateID) for templateID in templateJobs
+            )
+            result = self._update(cmd)
+            if not result["OK"]:
+                return result
+            with self.__jdlCacheLock:
+                for templateID in templateJobs:
+                    self.__jdlTemplateCache.pop(templateID, None)
+
         return S_OK()
 
     #############################################################################
@@ -1733,6 +2247,71 @@ class JobDB(DB):
 
         return S_OK() if ok else S_ERROR("Failed to store some or all the parameters")
 
+    #####################################################################################
+    def setHeartBeatDataBulk(self, heartBeatTimes, dynamicData=None, chunkSize=1000):
+        """Set the heart beat time of many jobs and add their heart beat data, with one statement per chunk of jobs
+
+        :param dict heartBeatTimes: { jobID : heart beat time }
+        :param list dynamicData: [ ( jobID, name, value, heart beat time ), ... ]
+        :param int chunkSize: maximum number of jobs or data rows per statement
+        :return: S_OK/S_ERROR
+        """
+        # Always the same order of the rows, not to lock them in different orders
+        jobIDs = sorted(int(jobID) for jobID in heartBeatTimes)
+        heartBeatTimes = {int(jobID): heartBeatTime for jobID, heartBeatTime in heartBeatTimes.items()}
+        for start in range(0, len(jobIDs), chunkSize):
+            chunk = jobIDs[start : start + chunkSize]
+            params = []
+            for jobID in chunk:
+                params.extend([jobID, str(heartBeatTimes[jobID])])
+            params.extend(chunk)
+            cases = " ".join(["WHEN %s THEN %s"] * len(chunk))
+            placeholders = ",".join(["%s"] * len(chunk))
+            req = f"UPDATE Jobs SET HeartBeatTime = CASE JobID {cases} END WHERE JobID IN ({placeholders})"
+            result = self._update(req, params=params)
+            if not result["OK"]:
+                return S_ERROR(f"Failed to set the heart beat time: {result['Message']}")
+
+        if dynamicData:
+            # The jobs may have been removed meanwhile: their data is ignored
+            result = self.insertManyFields(
+                "HeartBeatLoggingInfo",
+                ["JobID", "Name", "Value", "HeartBeatTime"],
+                dynamicData,
+                chunkSize=chunkSize,
+                onDuplicate="IGNORE",
+            )
+            if not result["OK"]:
+                return S_ERROR(f"Failed to store the heart beat data: {result['Message']}")
+        return S_OK()
+
+    #####################################################################################
+    def getHeartBeatDataSummary(self, jobIDs):
+        """Get the maximum of each heart beat value and the last heart beat time of several jobs, with a single query
+
+        :param list jobIDs: job IDs
+        :return: S_OK({ jobID : { "LastHeartBeatTime" : datetime, "MaxValues" : { name : float } } })
+        """
+        if not jobIDs:
+            return S_OK({})
+        jobIDString = ",".join(str(int(jobID)) for jobID in jobIDs)
+        # The values are stored as text: "+ 0" converts them to numbers, 0 for the non numeric ones
+        result = self._query(
+            "SELECT JobID, Name, MAX(Value + 0), MAX(HeartBeatTime) FROM HeartBeatLoggingInfo "
+            f"WHERE JobID IN ({jobIDString}) GROUP BY JobID, Name"
+        )
+        if not result["OK"]:
+            return result
+        summaries = {}
+        for jobID, name, maxValue, lastHeartBeatTime in result["Value"]:
+            summary = summaries.setdefault(int(jobID), {"LastHeartBeatTime": None, "MaxValues": {}})
+            summary["MaxValues"][name] = float(maxValue or 0)
+            if isinstance(lastHeartBeatTime, str):
+                lastHeartBeatTime = datetime.datetime.strptime(lastHeartBeatTime, "%Y-%m-%d %H:%M:%S")
+            if summary["LastHeartBeatTime"] is None or lastHeartBeatTime > summary["LastHeartBeatTime"]:
+                summary["LastHeartBeatTime"] = lastHeartBeatTime
+        return S_OK(summaries)
+
     #####################################################################################
     def getHeartBeatData(self, jobID):
         """Retrieve the job's heart beat data"""
@@ -30,6 +30,17 @@ CREATE TABLE `JobJDLs` (
   PRIMARY KEY (`JobID`)
 ) ENGINE=InnoDB DEFAULT CHARSET=latin1;
 
+-- ------------------------------------------------------------------------------
+-- Templates of the JDLs of parametric jobs, used with the ParametricJDLTemplates option
+DROP TABLE IF EXISTS `JobJDLTemplates`;
+CREATE TABLE `JobJDLTemplates` (
+  `TemplateID` INT(11) UNSIGNED NOT NULL AUTO_INCREMENT,
+  `JDL` MEDIUMTEXT NOT NULL,
+  `Overlay` TEXT NOT NULL,
+  `NJobs` INT(11) NOT NULL DEFAULT 0,
+  PRIMARY KEY (`TemplateID`)
+) ENGINE=InnoDB DEFAULT CHARSET=latin1;
+
 -- ------------------------------------------------------------------------------
 DROP TABLE IF EXISTS `Jobs`;
 CREATE TABLE `Jobs` (
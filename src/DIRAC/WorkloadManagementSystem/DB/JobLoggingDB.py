@@ -2,6 +2,7 @@
     The following methods are provided
 
     addLoggingRecord()
+    addLoggingRecords()
     getJobLoggingInfo()
     deleteJob()
     getWMSTimeStamps()
@@ -42,37 +43,67 @@ class JobLoggingDB(DB):
         as datetime.datetime object. If the time stamp is not provided the current
         UTC time is used.
         """
+        return self.addLoggingRecords(
+            [
+                {
+                    "jobID": jobID,
+                    "status": status,
+                    "minorStatus": minorStatus,
+                    "applicationStatus": applicationStatus,
+                    "date": date,
+                    "source": source,
+                }
+            ]
+        )
+
+    #############################################################################
+    def addLoggingRecords(self, records):
+        """Add several entries to the JobLoggingDB table, with a single multi-rows insert.
 
-        event = f"status/minor/app={status}/{minorStatus}/{applicationStatus}"
-        self.log.info("Adding record for job ", str(jobID) + ": '" + event + "' from " + source)
+        :param list records: dictionaries with the arguments of :py:meth:`addLoggingRecord`
+                             (jobID, and optionally status, minorStatus, applicationStatus, date, source)
 
+        :return: S_OK/S_ERROR
+        """
+        rows = []
+        for record in records:
+            jobID = record["jobID"]
+            status = record.get("status", "idem")
+            minorStatus = record.get("minorStatus", "idem")
+            applicationStatus = record.get("applicationStatus", "idem")
+            source = record.get("source", "Unknown")
+
+            event = f"status/minor/app={status}/{minorStatus}/{applicationStatus}"
+            self.log.info("Adding record for job ", str(jobID) + ": '" + event + "' from " + source)
+
+            _date = self.__getDate(record.get("date"))
+            # We need to specify that timezone is UTC because otherwise timestamp
+            # assumes local time while we mean UTC.
+            epoc = _date.replace(tzinfo=datetime.timezone.utc).timestamp() - MAGIC_EPOC_NUMBER
+
+            rows.append([int(jobID), status, minorStatus, applicationStatus[:255], str(_date), epoc, source[:32]])
+
+        return self.insertManyFields(
+            "LoggingInfo",
+            ["JobId", "Status", "MinorStatus", "ApplicationStatus", "StatusTime", "StatusTimeOrder", "StatusSource"],
+            rows,
+        )
+
+    def __getDate(self, date):
+        """Get the datetime of a record from a string, a datetime or None (now)"""
         try:
             if not date:
                 # Make the UTC datetime string and float
-                _date = datetime.datetime.utcnow()
-            elif isinstance(date, str):
+                return datetime.datetime.utcnow()
+            if isinstance(date, str):
                 # The date is provided as a string in UTC
-                _date = TimeUtilities.fromString(date)
-            elif isinstance(date, datetime.datetime):
-                _date = date
-            else:
-                self.log.error("Incorrect date for the logging record")
-                _date = datetime.datetime.utcnow()
+                return TimeUtilities.fromString(date)
+            if isinstance(date, datetime.datetime):
+                return date
+            self.log.error("Incorrect date for the logging record")
         except Exception:
             self.log.exception("Exception while date evaluation")
-            _date = datetime.datetime.utcnow()
-
-        # We need to specify that timezone is UTC because otherwise timestamp
-        # assumes local time while we mean UTC.
-        epoc = _date.replace(tzinfo=datetime.timezone.utc).timestamp() - MAGIC_EPOC_NUMBER
-
-        cmd = (
-            "INSERT INTO LoggingInfo (JobId, Status, MinorStatus, ApplicationStatus, "
-            + "StatusTime, StatusTimeOrder, StatusSource) VALUES (%d,'%s','%s','%s','%s',%f,'%s')"
-            % (int(jobID), status, minorStatus, applicationStatus[:255], str(_date), epoc, source[:32])
-        )
-
-        return self._update(cmd)
+        return datetime.datetime.utcnow()
 
     #############################################################################
     def getJobLoggingInfo(self, jobID):
@@ -91,20 +122,47 @@ class JobLoggingDB(DB):
         if result["OK"] and not result["Value"]:
             return S_ERROR("No Logging information for job %d" % int(jobID))
 
-        return_value = []
-        status, minor, app = result["Value"][0][:3]
+        return S_OK(self.__resolveIdem(result["Value"]))
+
+    @staticmethod
+    def __resolveIdem(rows):
+        """Replace the 'idem' values of the logging records by the previous values, in historical order"""
+        records = []
+        status, minor, app = rows[0][:3]
         if app == "idem":
             app = "Unknown"
-        for row in result["Value"]:
+        for row in rows:
             if row[0] != "idem":
                 status = row[0]
             if row[1] != "idem":
                 minor = row[1]
             if row[2] != "idem":
                 app = row[2]
-            return_value.append((status, minor, app, str(row[3]), row[4]))
+            records.append((status, minor, app, str(row[3]), row[4]))
+        return records
 
-        return S_OK(return_value)
+    #############################################################################
+    def getJobsLoggingInfo(self, jobIDs):
+        """Get the logging records of several jobs, with a single query
+
+        :param list jobIDs: job IDs
+        :return: S_OK({ jobID : [ (Status, MinorStatus, ApplicationStatus, StatusTime, StatusSource) ] }),
+                 in historical order. The jobs without records are not in the dictionary.
+        """
+        if not jobIDs:
+            return S_OK({})
+        jobIDString = ",".join(str(int(jobID)) for jobID in jobIDs)
+        cmd = (
+            "SELECT JobID,Status,MinorStatus,ApplicationStatus,StatusTime,StatusSource FROM"
+            f" LoggingInfo WHERE JobID IN ({jobIDString}) ORDER BY JobID,StatusTimeOrder,StatusTime"
+        )
+        result = self._query(cmd)
+        if not result["OK"]:
+            return result
+        rowsPerJob = {}
+        for row in result["Value"]:
+            rowsPerJob.setdefault(int(row[0]), []).append(row[1:])
+        return S_OK({jobID: self.__resolveIdem(rows) for jobID, rows in rowsPerJob.items()})
 
     #############################################################################
     def deleteJob(self, jobID):
@@ -152,3 +210,33 @@ class JobLoggingDB(DB):
             result["LastTime"] = "Unknown"
 
         return S_OK(result)
+
+    #############################################################################
+    def getJobsWMSTimeStamps(self, jobIDs):
+        """Get the time stamps of the major state transitions of several jobs, with a single query
+
+        :param list jobIDs: job IDs
+        :return: S_OK({ jobID : { State : timestamp, "LastTime" : last status time } }), as getWMSTimeStamps.
+                 The jobs without logging records are not in the dictionary.
+        """
+        if not jobIDs:
+            return S_OK({})
+        jobIDString = ",".join(str(int(jobID)) for jobID in jobIDs)
+        cmd = (
+            "SELECT JobID,Status,StatusTimeOrder,StatusTime FROM LoggingInfo "
+            f"WHERE JobID IN ({jobIDString}) ORDER BY JobID,StatusTimeOrder"
+        )
+        resCmd = self._query(cmd)
+        if not resCmd["OK"]:
+            return resCmd
+
+        result = {}
+        lastTimes = {}
+        for jobID, event, etime, stime in resCmd["Value"]:
+            jobID = int(jobID)
+            result.setdefault(jobID, {})[event] = str(etime + MAGIC_EPOC_NUMBER)
+            if jobID not in lastTimes or stime > lastTimes[jobID]:
+                lastTimes[jobID] = stime
+        for jobID, lastTime in lastTimes.items():
+            result[jobID]["LastTime"] = str(lastTime)
+        return S_OK(result)
@@ -90,12 +90,17 @@ class SandboxMetadataDB(DB):
             return S_OK(data[0][0])
         # Its not there, insert it
         sqlCmd = f"INSERT INTO `sb_Owners` ( OwnerId, Owner, OwnerGroup, VO ) VALUES ( 0, {ownerEscaped}, {ownerGroupEscaped}, {VOEscaped} )"
-        result = self._update(sqlCmd)
-        if not result["OK"]:
-            return result
-        if "lastRowId" in result:
-            return S_OK(result["lastRowId"])
-        result = self._query("SELECT LAST_INSERT_ID()")
+        # LAST_INSERT_ID() is only meaningful on the connection of the INSERT
+        with self._connection() as retDict:
+            if not retDict["OK"]:
+                return retDict
+            conn = retDict["Value"]
+            result = self._update(sqlCmd, conn=conn)
+            if not result["OK"]:
+                return result
+            if "lastRowId" in result:
+                return S_OK(result["lastRowId"])
+            result = self._query("SELECT LAST_INSERT_ID()", conn=conn)
         if not result["OK"]:
             return S_ERROR("Can't determine owner id after insertion")
         return S_OK(result["Value"][0][0])
@@ -117,7 +122,13 @@ class SandboxMetadataDB(DB):
             sbPFN,
             size,
         )
-        result = self._update(sqlCmd)
+        # LAST_INSERT_ID() is only meaningful on the connection of the INSERT
+        with self._connection() as retDict:
+            if not retDict["OK"]:
+                return retDict
+            result = self._update(sqlCmd, conn=retDict["Value"])
+            if result["OK"] and "lastRowId" not in result:
+                lastIdResult = self._query("SELECT LAST_INSERT_ID()", conn=retDict["Value"])
         if not result["OK"]:
             if result["Message"].find("Duplicate entry") == -1:
                 return result
@@ -138,10 +149,9 @@ class SandboxMetadataDB(DB):
         # Inserted, time to get the id
         if "lastRowId" in result:
             return S_OK((result["lastRowId"], True))
-        result = self._query("SELECT LAST_INSERT_ID()")
-        if not result["OK"]:
+        if not lastIdResult["OK"]:
             return S_ERROR("Can't determine sandbox id after insertion")
-        return S_OK((result["Value"][0][0], True))
+        return S_OK((lastIdResult["Value"][0][0], True))
 
     def accessedSandboxById(self, sbId):
         """
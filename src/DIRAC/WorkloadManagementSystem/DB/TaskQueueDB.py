@@ -2,6 +2,8 @@
 """
 import random
 import string
+import threading
+import time
 from collections import defaultdict
 from typing import Any
 
@@ -14,6 +16,7 @@ from DIRAC.Core.Utilities import List
 from DIRAC.Core.Utilities.DictCache import DictCache
 from DIRAC.Core.Utilities.PrettyPrint import printDict
 from DIRAC.WorkloadManagementSystem.private.SharesCorrector import SharesCorrector
+from DIRAC.WorkloadManagementSystem.private.TaskQueueMatchIndex import TaskQueueMatchIndex
 
 DEFAULT_GROUP_SHARE = 1000
 TQ_MIN_SHARE = 0.001
@@ -61,6 +64,16 @@ class TaskQueueDB(DB):
         self.__deleteTQWithDelay = DictCache(self.__deleteTQIfEmpty)
         self.__opsHelper = Operations()
         self.__sharesCorrector = SharesCorrector(self.__opsHelper)
+        # In-memory index of the TQ definitions used for matching,
+        # new TQs are looked for every __matchIndexUpdateTime and the whole index is reloaded every __matchIndexReloadTime
+        self.__matchIndex = TaskQueueMatchIndex()
+        self.__matchIndexLock = threading.Lock()
+        self.__matchIndexUpdateTime = 5
+        self.__matchIndexReloadTime = 60
+        self.__matchIndexLastUpdate = 0
+        self.__matchIndexLastReload = 0
+        # TQs seen while still disabled: their definition may not be complete yet
+        self.__matchIndexPending = set()
         result = self.__initializeDB()
         if not result["OK"]:
             raise Exception(f"Can't create tables: {result['Message']}")
@@ -294,6 +307,7 @@ class TaskQueueDB(DB):
                 self.cleanOrphanedTaskQueues(connObj=connObj)
                 return S_ERROR(f"Can't insert values {values} for field {field}: {result['Message']}")
         self.log.info("Created TQ", tqId)
+        self.__updateMatchIndex(f"TQId = {int(tqId)}", connObj=connObj)
         return S_OK(tqId)
 
     def cleanOrphanedTaskQueues(self, connObj=False):
@@ -320,6 +334,7 @@ class TaskQueueDB(DB):
         result = self._update(f"DELETE FROM `tq_TaskQueues` WHERE TQId in ( {','.join(orphanedTQs)} )", conn=connObj)
         if not result["OK"]:
             return result
+        self.__matchIndex.remove(int(tqId) for tqId in orphanedTQs)
         return S_OK()
 
     def __setTaskQueueEnabled(self, tqId, enabled=True, connObj=False):
@@ -419,10 +434,10 @@ class TaskQueueDB(DB):
         hackedPriority = self.__hackJobPriority(jobPriority)
         result = self._update(
             "INSERT INTO tq_Jobs ( TQId, JobId, Priority, RealPriority ) \
-                            VALUES ( %s, %s, %s, %f ) ON DUPLICATE KEY UPDATE TQId = %s, \
-                            Priority = %s, RealPriority = %f"
-            % (tqId, jobId, jobPriority, hackedPriority, tqId, jobPriority, hackedPriority),
+                            VALUES ( %s, %s, %s, %s ) ON DUPLICATE KEY UPDATE TQId = %s, \
+                            Priority = %s, RealPriority = %s",
             conn=connObj,
+            params=(tqId, jobId, jobPriority, hackedPriority, tqId, jobPriority, hackedPriority),
         )
         if not result["OK"]:
             return result
@@ -522,6 +537,7 @@ ORDER BY COUNT( `tq_Jobs`.JobID ) ASC"
         if negativeCond is None:
             negativeCond = {}
         # Make a copy to avoid modification of original if escaping needs to be done
+        rawMatchDict = tqMatchDict
         tqMatchDict = dict(tqMatchDict)
         retVal = self._checkMatchDefinition(tqMatchDict)
         if not retVal["OK"]:
@@ -540,15 +556,13 @@ WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
             noJobsFound = False
             if "JobID" in tqMatchDict:
                 # A certain JobID is required by the resource, so all TQ are to be considered
-                retVal = self.matchAndGetTaskQueue(
-                    tqMatchDict, numQueuesToGet=0, skipMatchDictDef=True, connObj=connObj
-                )
+                retVal = self.__matchTaskQueues(tqMatchDict, rawMatchDict, numQueuesToGet=0, connObj=connObj)
                 preJobSQL = f"{preJobSQL} AND `tq_Jobs`.JobId = {tqMatchDict['JobID']} "
             else:
-                retVal = self.matchAndGetTaskQueue(
+                retVal = self.__matchTaskQueues(
                     tqMatchDict,
+                    rawMatchDict,
                     numQueuesToGet=numQueuesPerTry,
-                    skipMatchDictDef=True,
                     negativeCond=negativeCond,
                     connObj=connObj,
                 )
@@ -600,11 +614,32 @@ WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
         if negativeCond is None:
             negativeCond = {}
         # Make a copy to avoid modification of original if escaping needs to be done
+        rawMatchDict = tqMatchDict
         tqMatchDict = dict(tqMatchDict)
         if not skipMatchDictDef:
             retVal = self._checkMatchDefinition(tqMatchDict)
             if not retVal["OK"]:
                 return retVal
+        else:
+            # The values are already escaped, only the SQL matching can be used
+            rawMatchDict = None
+        return self.__matchTaskQueues(
+            tqMatchDict, rawMatchDict, numQueuesToGet=numQueuesToGet, negativeCond=negativeCond, connObj=connObj
+        )
+
+    def __matchTaskQueues(self, tqMatchDict, rawMatchDict, numQueuesToGet=1, negativeCond=None, connObj=False):
+        """Get the queues that match the requirements, from the in-memory index if possible
+
+        :param dict tqMatchDict: checked and escaped match definition, for the SQL matching
+        :param dict rawMatchDict: the same definition without escaping, for the in-memory matching (can be None)
+
+        :returns: S_OK( [ ( tqId, owner, ownerGroup ) ] ) / S_ERROR
+        """
+        if rawMatchDict is not None and self.__getCSOption("InMemoryTQMatching", True):
+            retVal = self.__refreshMatchIndex(connObj=connObj)
+            if retVal["OK"]:
+                return self.__matchIndex.match(rawMatchDict, numQueuesToGet=numQueuesToGet, negativeCond=negativeCond)
+            self.log.warn("Could not refresh the TQ match index, using SQL matching", retVal["Message"])
         retVal = self.__generateTQMatchSQL(tqMatchDict, numQueuesToGet=numQueuesToGet, negativeCond=negativeCond)
         if not retVal["OK"]:
             return retVal
@@ -614,6 +649,89 @@ WHERE `tq_Jobs`.TQId = %s ORDER BY RAND() / `tq_Jobs`.RealPriority ASC LIMIT 1"
             return retVal
         return S_OK([(row[0], row[1], row[2]) for row in retVal["Value"]])
 
+    def __loadTaskQueueDefinitions(self, tqCond="", connObj=False):
+        """Load the definitions of the task queues for the match index
+
+        :param str tqCond: SQL condition on the TQId
+        :returns: S_OK( { tqId : definition } ) / S_ERROR
+        """
+        where = f"WHERE {tqCond}" if tqCond else ""
+        retVal = self._query(
+            f"SELECT TQId, Owner, OwnerGroup, CPUTime, Priority, Enabled FROM `tq_TaskQueues` {where}", conn=connObj
+        )
+        if not retVal["OK"]:
+            return retVal
+        tqDefs = {}
+        for tqId, owner, ownerGroup, cpuTime, priority, enabled in retVal["Value"]:
+            tqDefs[tqId] = {
+                "Owner": owner,
+                "OwnerGroup": ownerGroup,
+                "CPUTime": cpuTime,
+                "Priority": priority,
+                "Enabled": enabled,
+            }
+        if not tqDefs:
+            return S_OK(tqDefs)
+        for field in multiValueDefFields:
+            retVal = self._query(f"SELECT TQId, Value FROM `tq_TQTo{field}` {where}", conn=connObj)
+            if not retVal["OK"]:
+                return retVal
+            for tqId, value in retVal["Value"]:
+                if tqId in tqDefs:
+                    tqDefs[tqId].setdefault(field, []).append(value)
+        return S_OK(tqDefs)
+
+    def __updateMatchIndex(self, tqCond, connObj=False):
+        """Add to the match index the task queues selected by the condition,
+        as soon as they are created in this process (so their definition is complete)
+        """
+        retVal = self.__loadTaskQueueDefinitions(tqCond, connObj=connObj)
+        if not retVal["OK"]:
+            self.log.warn("Could not update the TQ match index", retVal["Message"])
+            return retVal
+        self.__matchIndex.add(retVal["Value"])
+        return S_OK()
+
+    def __refreshMatchIndex(self, connObj=False):
+        """Keep the match index in sync with the DB, which can be modified by other processes:
+        look for new task queues (TQIds only increase) and reload everything from time to time
+        to drop the deleted task queues and get the new priorities.
+
+        A TQ is created disabled and enabled once its multi-valued fields are inserted,
+        so TQs which were never seen enabled are kept aside until they are.
+        If another thread is already refreshing the index, the current content is used.
+        """
+        now = time.time()
+        if now - self.__matchIndexLastUpdate < self.__matchIndexUpdateTime:
+            return S_OK()
+        if not self.__matchIndexLock.acquire(blocking=not self.__matchIndexLastReload):
+            return S_OK()
+        try:
+            reload = now - self.__matchIndexLastReload >= self.__matchIndexReloadTime
+            if reload:
+                tqCond = ""
+            else:
+                tqCond = f"TQId > {self.__matchIndex.getMaxTQId()}"
+                if self.__matchIndexPending:
+                    tqCond += f" OR TQId IN ( {', '.join(str(tqId) for tqId in self.__matchIndexPending)} )"
+            retVal = self.__loadTaskQueueDefinitions(tqCond, connObj=connObj)
+            if not retVal["OK"]:
+                return retVal
+            tqDefs = retVal["Value"]
+            indexed = self.__matchIndex.getTQIds()
+            complete = {tqId: tqDef for tqId, tqDef in tqDefs.items() if tqDef["Enabled"] >= 1 or tqId in indexed}
+            self.__matchIndexPending = set(tqDefs) - set(complete)
+            if reload:
+                self.__matchIndex.reset(complete)
+                self.__matchIndexLastReload = now
+                self.log.verbose("Reloaded the TQ match index", f"({len(self.__matchIndex)} TQs)")
+            else:
+                self.__matchIndex.add(complete)
+            self.__matchIndexLastUpdate = now
+            return S_OK()
+        finally:
+            self.__matchIndexLock.release()
+
     @staticmethod
     def __generateSQLSubCond(sqlString, value, boolOp="OR"):
         if not isinstance(value, (list, tuple)):
@@ -987,6 +1105,7 @@ WHERE j.JobId = %s AND t.TQId = j.TQId"
             retVal = self._update(f"DELETE FROM `tq_TaskQueues` WHERE TQId = {tqId}", conn=connObj)
             if not retVal["OK"]:
                 return retVal
+            self.__matchIndex.remove([int(tqId)])
             self.recalculateTQSharesForEntity(tqOwner, tqOwnerGroup, connObj=connObj)
             self.log.info("Deleted empty and enabled TQ", tqId)
             return S_OK()
@@ -1182,6 +1301,7 @@ FROM `tq_TaskQueues` t, `tq_Jobs` j WHERE "
             tqList = ", ".join([str(tqId) for tqId in tqs])
             updateSQL = f"UPDATE `tq_TaskQueues` SET Priority={prio:.4f} WHERE TQId in ( {tqList} )"
             self._update(updateSQL, conn=connObj)
+        self.__matchIndex.setPriorities({tqId: prio for prio, tqs in prioDict.items() for tqId in tqs})
         return S_OK()
 
     @staticmethod
@@ -2,12 +2,16 @@
 
 # pylint: disable=protected-access, invalid-name
 
+import threading
 from unittest.mock import MagicMock, patch
 
 import pytest
 
 from DIRAC import S_OK
+from DIRAC.Core.Utilities.ClassAd.ClassAdLight import ClassAd
 from DIRAC.WorkloadManagementSystem.DB.JobDB import JobDB
+from DIRAC.WorkloadManagementSystem.DB.JobDBUtils import extractJDL
+from DIRAC.WorkloadManagementSystem.Utilities.ParametricJob import generateParametricJobs
 
 
 @pytest.fixture(name="jobDB")
@@ -19,6 +23,11 @@ def fixturejobDB():
     jobDB.log = MagicMock()
     jobDB.logger = MagicMock()
     jobDB._connected = True
+    jobDB.jdl2DBParameters = ["JobName", "JobType", "JobGroup"]
+    jobDB.jdlTemplates = False
+    jobDB._JobDB__jdlTemplateCache = {}
+    jobDB._JobDB__expandedJDLCache = {}
+    jobDB._JobDB__jdlCacheLock = threading.Lock()
 
     with patch("DIRAC.WorkloadManagementSystem.DB.JobDB.getVOForGroup", MagicMock(return_value="vo")):
         yield jobDB
@@ -36,3 +45,117 @@ def test_getInputData(jobDB: JobDB):
     # Assert
     assert res["OK"], res["Message"]
     assert res["Value"] == ["/vo/user/lfn1", "/vo/user/lfn2"]
+
+
+def test_insertNewJobsIntoDB(jobDB: JobDB):
+    """The jobs are inserted with one INSERT per table, the IDs being reserved at once"""
+    # The highest JobID before the insertion, then the reserved IDs
+    jobDB._query = MagicMock(side_effect=[S_OK(((100,),)), S_OK(((101,), (103,), (104,)))])
+    jobDB.insertManyFields = MagicMock(return_value=S_OK())
+    jdls = [
+        f'[Executable = "my.sh"; Arguments = "{i}"; JobName = "job_%j"; InputData = {{"/vo/lfn{i}", ""}};]'
+        for i in range(3)
+    ]
+
+    res = jobDB.insertNewJobsIntoDB(jdls, "owner", "ownerGroup", initialStatus="Submitting", initialMinorStatus="Bulk")
+
+    assert res["OK"], res["Message"]
+    assert list(res["Value"]) == [101, 103, 104]
+    assert {job["Status"] for job in res["Value"].values()} == {"Submitting"}
+    # The reservation of the IDs, then one insert per table
+    inserts = {call[0][0]: call[0][2] for call in jobDB.insertManyFields.call_args_list[1:]}
+    assert sorted(inserts) == ["InputData", "JobJDLs", "Jobs"]
+    assert inserts["InputData"] == [[101, "/vo/lfn0"], [103, "/vo/lfn1"], [104, "/vo/lfn2"]]
+    assert [row[0] for row in inserts["JobJDLs"]] == [101, 103, 104]
+    # The JobID placeholder is replaced
+    assert "job_103" in extractJDL(inserts["JobJDLs"][1][1])
+    jobNames = [row[list(jobDB.insertManyFields.call_args_list[2][0][1]).index("JobName")] for row in inserts["Jobs"]]
+    assert jobNames == ["job_101", "job_103", "job_104"]
+
+
+def test_insertNewJobsIntoDB_templates(jobDB: JobDB):
+    """The JDLs of the jobs of a parametric job refer to its template, and are expanded back when read"""
+    templateJDL = """[
+        Executable = "my.sh";
+        Arguments = "-n %n -p %s";
+        JobName = "job_%j_%n";
+        Parameters = {"a1", "b2", "c3"};
+        InputData = {"/vo/%s"};
+        CPUTime = 1000;
+    ]"""
+    jdls = generateParametricJobs(ClassAd(templateJDL))["Value"]
+    jobIDs = ((101,), (103,), (104,))
+    jobDB.insertManyFields = MagicMock(return_value=S_OK())
+
+    # The JDLs stored in full, as without the ParametricJDLTemplates option
+    jobDB._query = MagicMock(side_effect=[S_OK(((100,),)), S_OK(jobIDs)])
+    assert jobDB.insertNewJobsIntoDB(jdls, "owner", "ownerGroup", templateJDL=templateJDL)["OK"]
+    fullRows = jobDB.insertManyFields.call_args_list[1][0][2]
+
+    jobDB.jdlTemplates = True
+    jobDB.insertManyFields.reset_mock()
+    jobDB.insertFields = MagicMock(return_value={"OK": True, "Value": 1, "lastRowId": 7})
+    jobDB._query = MagicMock(side_effect=[S_OK(((100,),)), S_OK(jobIDs)])
+    res = jobDB.insertNewJobsIntoDB(jdls, "owner", "ownerGroup", templateJDL=templateJDL)
+    assert res["OK"], res["Message"]
+    rows = jobDB.insertManyFields.call_args_list[1][0][2]
+    assert [row[3] for row in rows] == ["Template:7:0", "Template:7:1", "Template:7:2"]
+    # Only the differences specific to each job are kept with it
+    assert all(row[1].startswith(f"{row[3]}:") and len(row[1]) < 100 for row in rows)
+
+    # Expanded with the template in memory, then with the template read from the DB
+    jobDB._escapeString = MagicMock(side_effect=lambda value: S_OK(f"'{value}'"))
+    for clearCache in (False, True):
+        if clearCache:
+            jobDB._JobDB__jdlTemplateCache.clear()
+            jobDB._JobDB__expandedJDLCache.clear()
+            templateRow = jobDB.insertFields.call_args[0][2][:2]
+        for (jobID, jdl, _, originalJDL), (_, fullJDL, _, fullOriginalJDL) in zip(rows, fullRows):
+            side_effect = [S_OK(((originalJDL,),))]
+            if clearCache:
+                side_effect.append(S_OK((templateRow,)))
+            jobDB._query = MagicMock(side_effect=side_effect)
+            res = jobDB.getJobJDL(jobID, original=True)
+            assert res["OK"], res["Message"]
+            assert res["Value"] == extractJDL(fullOriginalJDL)
+            jobDB._query = MagicMock(return_value=S_OK(((jdl,),)))
+            res = jobDB.getJobJDL(jobID)
+            assert res["OK"], res["Message"]
+            assert res["Value"] == extractJDL(fullJDL)
+
+
+def test_setJobsStatusAttributes(jobDB: JobDB):
+    """The jobs are updated with one UPDATE per group of attributes and chunk, nothing being inserted"""
+    jobDB._update = MagicMock(return_value=S_OK())
+    jobDB.insertManyFields = MagicMock()
+
+    res = jobDB.setJobsStatusAttributes(
+        {1: {"Status": "Running"}, 2: {"Status": "Done"}, 3: {"Status": "Matched", "MinorStatus": "Assigned"}},
+        {1: {"StartExecTime": "2024-01-01 10:00:00"}, 4: {"HeartBeatTime": "2024-01-01 11:00:00"}},
+    )
+
+    assert res["OK"], res["Message"]
+    jobDB.insertManyFields.assert_not_called()
+    statements = {call[0][0]: call[1]["params"] for call in jobDB._update.call_args_list}
+    assert len(statements) == 3
+    for req in statements:
+        assert req.startswith("UPDATE Jobs SET ")
+    assert statements[
+        "UPDATE Jobs SET `Status` = CASE JobID WHEN %s THEN %s WHEN %s THEN %s END, LastUpdateTime = UTC_TIMESTAMP(), "
+        "`StartExecTime` = IFNULL(`StartExecTime`, CASE JobID WHEN %s THEN %s END), "
+        "`HeartBeatTime` = COALESCE(`HeartBeatTime`, CASE JobID WHEN %s THEN %s END) WHERE JobID IN (%s,%s)"
+    ] == [1, "Running", 2, "Done", 1, "2024-01-01 10:00:00", 1, "2024-01-01 10:00:00", 1, 2]
+    assert statements[
+        "UPDATE Jobs SET `HeartBeatTime` = COALESCE(CASE JobID WHEN %s THEN %s END, `HeartBeatTime`) "
+        "WHERE JobID IN (%s)"
+    ] == [4, "2024-01-01 11:00:00", 4]
+
+    # The ApplicationStatus is truncated as in setJobStatus
+    jobDB._update.reset_mock()
+    assert jobDB.setJobsStatusAttributes({1: {"ApplicationStatus": "a" * 300}})["OK"]
+    assert jobDB._update.call_args[1]["params"] == [1, "a" * 255, 1]
+
+    # Non status attributes are refused
+    jobDB._update.reset_mock()
+    assert not jobDB.setJobsStatusAttributes({1: {"Site": "LCG.CERN.ch"}})["OK"]
+    jobDB._update.assert_not_called()
@@ -6,6 +6,7 @@ from datetime import datetime, timezone
 from DIRAC.Core.Security.DiracX import DiracXClient, FutureClient, addRPCStub
 from DIRAC.Core.Utilities.ReturnValues import convertToReturnValue
 from DIRAC.Core.Utilities.TimeUtilities import fromString
+from DIRAC.WorkloadManagementSystem.Utilities.JobStatusUtility import getStatusDict
 
 
 def stripValueIfOK(func):
@@ -119,6 +120,23 @@ class JobStateUpdateClient(FutureClient):
                 force=force,
             )
 
+    @addRPCStub
+    @convertToReturnValue
+    def setJobsStatusBulk(self, jobsStatus: dict, force=False):
+        statusDicts = {}
+        successful = {}
+        for jobID, updates in jobsStatus.items():
+            statusDict = {fromString(k).replace(tzinfo=timezone.utc): v for k, v in getStatusDict(updates).items()}
+            statusDicts[jobID] = statusDict
+            # The attributes of the last update win, as in JobStatusUtility.setJobsStatusBulk
+            attributes = {}
+            for dateTime in sorted(statusDict):
+                attributes.update({name: value for name, value in statusDict[dateTime].items() if name != "Source"})
+            successful[jobID] = (list(attributes), list(attributes.values()))
+        with DiracXClient() as api:
+            api.jobs.set_job_status_bulk(statusDicts, force=force)
+        return {"Successful": successful, "Failed": {}}
+
     @stripValueIfOK
     @convertToReturnValue
     def setJobsParameter(self, jobsParameterDict: dict):
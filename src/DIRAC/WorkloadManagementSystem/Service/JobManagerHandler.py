@@ -192,9 +192,40 @@ class JobManagerHandlerMixin:
             except ValidationError as e:
                 return S_ERROR(str(e))
 
-        for jobDescription in jobDescList:  # jobDescList because there might be a list generated by a parametric job
+        if parametricJob:
+            # The parametric jobs are inserted together, with multi-rows inserts
+            result = self.jobDB.insertNewJobsIntoDB(
+                jobDescList,
+                self.owner,
+                self.ownerGroup,
+                initialStatus=initialStatus,
+                initialMinorStatus=initialMinorStatus,
+                vo=getVOForGroup(self.ownerGroup),
+                templateJDL=jobDesc,
+            )
+            if not result["OK"]:
+                return result
+            jobs = result["Value"]
+            jobIDList = list(jobs)
+            self.log.info("Jobs added to the JobDB", f"{len(jobIDList)} jobs for {self.owner}/{self.ownerGroup}")
+
+            result = self.jobLoggingDB.addLoggingRecords(
+                [
+                    {
+                        "jobID": jobID,
+                        "status": job["Status"],
+                        "minorStatus": job["MinorStatus"],
+                        "date": job["TimeStamp"],
+                        "source": "JobManager",
+                    }
+                    for jobID, job in jobs.items()
+                ]
+            )
+            if not result["OK"]:
+                self.log.error("Failed to add the logging records of the new jobs", result["Message"])
+        else:
             result = self.jobDB.insertNewJobIntoDB(
-                jobDescription,
+                jobDesc,
                 self.owner,
                 self.ownerGroup,
                 initialStatus=initialStatus,
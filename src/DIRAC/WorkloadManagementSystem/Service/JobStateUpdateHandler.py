@@ -13,7 +13,9 @@ from DIRAC import S_OK, S_ERROR
 from DIRAC.Core.DISET.RequestHandler import RequestHandler
 from DIRAC.Core.Utilities.DEncode import ignoreEncodeWarning
 from DIRAC.Core.Utilities.ObjectLoader import ObjectLoader
+from DIRAC.Core.Utilities.ThreadScheduler import gThreadScheduler
 from DIRAC.WorkloadManagementSystem.Client import JobStatus
+from DIRAC.WorkloadManagementSystem.Utilities.HeartBeatBuffer import HeartBeatBuffer
 from DIRAC.WorkloadManagementSystem.Utilities.JobStatusUtility import JobStatusUtility
 
 
@@ -46,6 +48,15 @@ class JobStateUpdateHandlerMixin:
 
         cls.jsu = JobStatusUtility(cls.jobDB, cls.jobLoggingDB, cls.elasticJobParametersDB)
 
+        # The heart beats are written to the JobDB in bulk, unless the flush period is 0
+        cls.heartBeatBuffer = None
+        flushPeriod = cls.srv_getCSOption("HeartBeatFlushPeriod", 30)
+        if flushPeriod > 0:
+            cls.heartBeatBuffer = HeartBeatBuffer(cls.jobDB, maxJobs=cls.srv_getCSOption("HeartBeatBufferSize", 10000))
+            result = gThreadScheduler.addPeriodicTask(flushPeriod, cls.heartBeatBuffer.flush)
+            if not result["OK"]:
+                return result
+
         return S_OK()
 
     ###########################################################################
@@ -109,6 +120,18 @@ class JobStateUpdateHandlerMixin:
         """Set various job status fields with a time stamp and a source"""
         return cls.jsu.setJobStatusBulk(int(jobID), statusDict, force=force)
 
+    ###########################################################################
+    types_setJobsStatusBulk = [dict]
+
+    @classmethod
+    def export_setJobsStatusBulk(cls, jobsStatus, force=False):
+        """Set the statuses of many jobs at once
+
+        :param dict jobsStatus: { jobID : [ (status, minorStatus, applicationStatus, source, dateTime) ] }
+        :return: S_OK({"Successful": { jobID : (attrNames, attrValues) }, "Failed": { jobID : error message }})
+        """
+        return cls.jsu.setJobsStatusBulk(jobsStatus, force=force)
+
     ###########################################################################
     types_setJobAttribute = [[str, int], str, str]
 
@@ -209,9 +232,12 @@ class JobStateUpdateHandlerMixin:
     def export_sendHeartBeat(cls, jobID, dynamicData, staticData):
         """Send a heart beat sign of life for a job jobID"""
 
-        result = cls.jobDB.setHeartBeatData(int(jobID), dynamicData)
-        if not result["OK"]:
-            cls.log.warn("Failed to set the heart beat data", f"for job {jobID} ")
+        if cls.heartBeatBuffer:
+            cls.heartBeatBuffer.add(int(jobID), dynamicData)
+        else:
+            result = cls.jobDB.setHeartBeatData(int(jobID), dynamicData)
+            if not result["OK"]:
+                cls.log.warn("Failed to set the heart beat data", f"for job {jobID} ")
 
         for key, value in staticData.items():
             result = cls.elasticJobParametersDB.setJobParameter(int(jobID), key, value)
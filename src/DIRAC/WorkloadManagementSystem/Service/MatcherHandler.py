@@ -78,6 +78,41 @@ class MatcherHandlerMixin:
             return S_OK(result)
         return S_ERROR(DErrno.EWMSNOMATCH, callStack=[])
 
+    ##############################################################################
+    types_requestJobs = [[str, dict], int]
+
+    def export_requestJobs(self, resourceDescription, nJobs):
+        """Serve up to nJobs jobs to the request of an agent, the highest priority
+        ones matching the agent's site capacity. The resource description is processed once for all the jobs.
+        """
+
+        credDict = self.getRemoteCredentials()
+        pilotRef = resourceDescription.get("PilotReference", "Unknown")
+
+        try:
+            opsHelper = Operations(group=credDict["group"])
+            nJobs = max(1, min(nJobs, opsHelper.getValue("JobScheduling/MaxJobsPerMatch", 100)))
+            matcher = Matcher(
+                pilotAgentsDB=self.pilotAgentsDB,
+                jobDB=self.jobDB,
+                tqDB=self.taskQueueDB,
+                jlDB=self.jobLoggingDB,
+                opsHelper=opsHelper,
+                pilotRef=pilotRef,
+            )
+            result = matcher.selectJobs(resourceDescription, credDict, nJobs)
+        except RuntimeError as rte:
+            self.log.error("Error requesting jobs for pilot", f"[{pilotRef}] {rte}")
+            return S_ERROR("Error requesting job")
+        except PilotVersionError as pve:
+            self.log.warn("Pilot version error for pilot", f"[{pilotRef}] {pve}")
+            return S_ERROR(DErrno.EWMSPLTVER, callStack=[])
+
+        # result can be empty, meaning that no job matched
+        if result:
+            return S_OK(result)
+        return S_ERROR(DErrno.EWMSNOMATCH, callStack=[])
+
     ##############################################################################
     types_getActiveTaskQueues = []
 
@@ -101,22 +101,20 @@ class SandboxStoreHandlerMixin:
         if self._useDiracXBackend and vo not in disabledVOs:
             gLogger.info("Forwarding to DiracX")
             with tempfile.TemporaryFile(mode="w+b") as tar_fh:
+                # The checksum is computed while the sandbox is received
+                fileHelper.addChecksum("sha256")
                 result = fileHelper.networkToDataSink(tar_fh, maxFileSize=self._maxUploadBytes)
                 if not result["OK"]:
                     return result
                 tar_fh.seek(0)
 
-                hasher = hashlib.sha256()
-                while data := tar_fh.read(512 * 1024):
-                    hasher.update(data)
-                checksum = hasher.hexdigest()
-                tar_fh.seek(0)
+                checksum = fileHelper.getChecksum("sha256")
                 gLogger.debug("Sandbox checksum is", checksum)
 
                 sandbox_info = SandboxInfo(
                     checksum_algorithm="sha256",
                     checksum=checksum,
-                    size=os.stat(tar_fh.fileno()).st_size,
+                    size=fileHelper.getTransferedBytes(),
                     format=extension,
                 )
 
@@ -151,7 +149,7 @@ class SandboxStoreHandlerMixin:
             gLogger.info("Sandbox already exists. Skipping upload")
             if fileHelper:
                 fileHelper.markAsTransferred()
-            sbURL = f"SB:{self.__localSEName}|sbPath"
+            sbURL = f"SB:{self.__localSEName}|{sbPath}"
             assignTo = {key: [(sbURL, assignTo[key])] for key in assignTo}
             result = self.export_assignSandboxesToEntities(assignTo)
             if not result["OK"]:
@@ -228,7 +226,7 @@ class SandboxStoreHandlerMixin:
         result = self.__networkToFile(fileHelper)
         if not result["OK"]:
             return result
-        tmpFilePath = result["OK"]
+        tmpFilePath = result["Value"]
         gLogger.info("Got Sandbox to local storage", tmpFilePath)
 
         extension = fileId[fileId.find(".tar") + 1 :]
@@ -277,11 +275,10 @@ class SandboxStoreHandlerMixin:
         """
         Dump incoming network data to temporal file
         """
-        tfd = None
         if not destFileName:
             try:
                 tfd, destFileName = tempfile.mkstemp(prefix="DSB.")
-                tfd.close()
+                os.close(tfd)
             except Exception as e:
                 gLogger.error(f"{repr(e).replace(',)', ')')}")
                 return S_ERROR("Cannot create temporary file")
@@ -290,12 +287,9 @@ class SandboxStoreHandlerMixin:
         mkDir(os.path.dirname(destFileName))
 
         try:
-            if tfd is not None:
-                fd = tfd
-            else:
-                fd = open(destFileName, "wb")
-            result = fileHelper.networkToDataSink(fd, maxFileSize=self._maxUploadBytes)
-            fd.close()
+            # The data is written as it is received
+            with open(destFileName, "wb") as fd:
+                result = fileHelper.networkToDataSink(fd, maxFileSize=self._maxUploadBytes)
         except Exception as e:
             gLogger.error("Cannot open to write destination file", f"{destFileName}: {repr(e).replace(',)', ')')}")
             return S_ERROR("Cannot open to write destination file")
@@ -343,6 +337,34 @@ class SandboxStoreHandlerMixin:
             enDict, credDict["username"], credDict["group"], ownerName, ownerGroup
         )
 
+    ##################
+    # Look for sandboxes before uploading them
+
+    types_getSandboxByChecksum = [str]
+
+    def export_getSandboxByChecksum(self, fileId):
+        """
+        Get a sandbox the client already uploaded, so that it does not upload it again
+
+        :param str fileId: <md5 checksum>.<extension> of the sandbox, as given to the upload
+        :return: S_OK(sandbox URL), S_OK(None) if the sandbox has to be uploaded
+        """
+        credDict = self.getRemoteCredentials()
+        vo = credDict.get("VO", Registry.getVOForGroup(credDict["group"]))
+        if self._useDiracXBackend and vo not in gConfig.getValue("/DiracX/DisabledVOs", []):
+            # DiracX identifies the sandboxes by their sha256 checksum, computed during the upload
+            return S_OK(None)
+
+        extPos = fileId.find(".tar")
+        if extPos > -1:
+            sbPath = self.__getSandboxPath(f"{fileId[:extPos]}.{fileId[extPos + 1 :]}")
+        else:
+            sbPath = self.__getSandboxPath(f"{fileId}.")
+        result = self.sandboxDB.getSandboxId(self.__localSEName, sbPath, credDict["username"], credDict["group"])
+        if not result["OK"]:
+            return S_OK(None)
+        return S_OK(f"SB:{self.__localSEName}|{sbPath}")
+
     ##################
     # Unassign sbs to jobs
 
@@ -0,0 +1,70 @@
+""" Buffer of the heart beats of the jobs, written to the JobDB in bulk
+
+Every running job sends a heart beat regularly. Instead of updating the JobDB for each of them,
+the heart beats are kept in memory and written periodically, with one UPDATE and one INSERT per chunk of jobs.
+For each job, only the latest heart beat time is kept. The heart beats received since the last flush are lost
+if the service stops.
+"""
+import datetime
+import threading
+
+from DIRAC import S_OK, gLogger
+
+
+class HeartBeatBuffer:
+    """Coalesces the heart beats of the jobs until they are flushed to the JobDB"""
+
+    def __init__(self, jobDB, maxJobs=10000):
+        """C'tor
+
+        :param jobDB: JobDB instance
+        :param int maxJobs: number of jobs in the buffer triggering a flush, before the periodic one
+        """
+        self.jobDB = jobDB
+        self.maxJobs = maxJobs
+        self.log = gLogger.getSubLogger(self.__class__.__name__)
+        self.__lock = threading.Lock()
+        # Serializes the flushes, so that the heart beat times are written in order
+        self.__flushLock = threading.Lock()
+        # { jobID : heart beat time }
+        self.__heartBeatTimes = {}
+        # [ ( jobID, name, value, heart beat time ) ]
+        self.__dynamicData = []
+
+    def add(self, jobID, dynamicData):
+        """Add the heart beat of a job
+
+        :param int jobID: job ID
+        :param dict dynamicData: heart beat data, with optionally the "HeartBeatTime"
+        """
+        now = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        dynamicData = dict(dynamicData)
+        heartBeatTime = str(dynamicData.pop("HeartBeatTime", None) or now)
+        with self.__lock:
+            if heartBeatTime > self.__heartBeatTimes.get(jobID, ""):
+                self.__heartBeatTimes[jobID] = heartBeatTime
+            self.__dynamicData.extend((jobID, name, value, now) for name, value in dynamicData.items())
+            full = len(self.__heartBeatTimes) >= self.maxJobs
+        if full:
+            self.flush()
+
+    def __len__(self):
+        return len(self.__heartBeatTimes)
+
+    def flush(self):
+        """Write the buffered heart beats to the JobDB
+
+        :return: S_OK/S_ERROR
+        """
+        with self.__flushLock:
+            with self.__lock:
+                heartBeatTimes, self.__heartBeatTimes = self.__heartBeatTimes, {}
+                dynamicData, self.__dynamicData = self.__dynamicData, []
+            if not heartBeatTimes:
+                return S_OK()
+            result = self.jobDB.setHeartBeatDataBulk(heartBeatTimes, dynamicData)
+            if not result["OK"]:
+                self.log.error("Heart beats lost", f"for {len(heartBeatTimes)} jobs: {result['Message']}")
+                return result
+            self.log.verbose("Heart beats written", f"for {len(heartBeatTimes)} jobs")
+            return S_OK()
@@ -8,8 +8,10 @@ from typing import TYPE_CHECKING, Any
 from DIRAC import S_ERROR, S_OK, gLogger
 from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
 from DIRAC.Core.Utilities import TimeUtilities
+from DIRAC.Core.Utilities.List import breakListIntoChunks
 from DIRAC.Core.Utilities.ObjectLoader import ObjectLoader
 from DIRAC.WorkloadManagementSystem.Client import JobStatus
+from DIRAC.WorkloadManagementSystem.private.RunningJobsCounters import gRunningJobsCounters
 
 if TYPE_CHECKING:
     from DIRAC.WorkloadManagementSystem.DB.ElasticJobParametersDB import ElasticJobParametersDB
@@ -94,30 +96,15 @@ class JobStatusUtility:
         jobID = int(jobID)
         log = self.log.getLocalSubLogger("JobStatusBulk/Job-%d" % jobID)
 
-        result = self.jobDB.getJobAttributes(jobID, ["Status", "StartExecTime", "EndExecTime"])
+        # The attributes needed to update the running counters of the Limiter, if any in this process
+        countedAttributes = gRunningJobsCounters.getAttributeNames()
+        result = self.jobDB.getJobAttributes(jobID, self.__getReadAttributes(countedAttributes))
         if not result["OK"]:
             return result
         if not result["Value"]:
             # if there is no matching Job it returns an empty dictionary
             return S_ERROR("No Matching Job")
-
-        # If the current status is Stalled and we get an update, it should probably be "Running"
-        currentStatus = result["Value"]["Status"]
-        if currentStatus == JobStatus.STALLED:
-            currentStatus = JobStatus.RUNNING
-        startTime = result["Value"].get("StartExecTime")
-        endTime = result["Value"].get("EndExecTime")
-        # getJobAttributes only returns strings :(
-        if startTime == "None":
-            startTime = None
-        if endTime == "None":
-            endTime = None
-
-        # Remove useless items in order to make it simpler later, although there should not be any
-        for sDict in statusDict.values():
-            for item in sorted(sDict):
-                if not sDict[item]:
-                    sDict.pop(item, None)
+        jobAttributes = result["Value"]
 
         # Get the latest time stamps of major status updates
         result = self.jobLoggingDB.getWMSTimeStamps(int(jobID))
@@ -125,77 +112,258 @@ class JobStatusUtility:
             return result
         if not result["Value"]:
             return S_ERROR("No registered WMS timeStamps")
-        # This is more precise than "LastTime". timeStamps is a sorted list of tuples...
-        timeStamps = sorted((float(t), s) for s, t in result["Value"].items() if s != "LastTime")
-        lastTime = TimeUtilities.toString(TimeUtilities.fromEpoch(timeStamps[-1][0]))
 
-        # Get chronological order of new updates
-        updateTimes = sorted(statusDict)
-        log.debug("*** New call ***", f"Last update time {lastTime} - Sorted new times {updateTimes}")
-        # Get the status (if any) at the time of the first update
-        newStartTime, newEndTime = getStartAndEndTime(startTime, endTime, updateTimes, timeStamps, statusDict)
+        result = getStatusUpdate(jobID, jobAttributes, result["Value"], statusDict, force, log)
+        if not result["OK"]:
+            return result
+        update = result["Value"]
+        attrNames = list(update["Attributes"])
+        attrValues = list(update["Attributes"].values())
 
         # We should only update the status to the last one if its time stamp is more recent than the last update
-        attrNames = []
-        attrValues = []
-        if updateTimes[-1] >= lastTime:
-            res = getNewStatus(jobID, updateTimes, lastTime, statusDict, currentStatus, force, log)
-            if not res["OK"]:
-                return res
-            status, minor, application = res["Value"]
-            log.debug("Final statuses:", f"status '{status}', minor '{minor}', application '{application}'")
-            if status:
-                attrNames.append("Status")
-                attrValues.append(status)
-            if minor:
-                attrNames.append("MinorStatus")
-                attrValues.append(minor)
-            if application:
-                attrNames.append("ApplicationStatus")
-                attrValues.append(application)
+        if attrNames:
             # Here we are forcing the update as it's always updating to the last status
-            result = self.jobDB.setJobAttributes(jobID, attrNames, attrValues, update=True, force=True)
+            result = self.jobDB.setJobAttributes(jobID, list(attrNames), list(attrValues), update=True, force=True)
+            if not result["OK"]:
+                return result
+            result = self.__statusChanged(jobID, jobAttributes, update["Attributes"], countedAttributes)
             if not result["OK"]:
                 return result
-            if self.elasticJobParametersDB:
-                result = self.elasticJobParametersDB.setJobParameter(int(jobID), "Status", status)
-                if not result["OK"]:
-                    return result
         # Update start and end time if needed
-        if not endTime and newEndTime:
-            log.debug("Set job end time", endTime)
-            result = self.jobDB.setEndExecTime(jobID, endTime)
+        if update["EndExecTime"]:
+            log.debug("Set job end time", update["EndExecTime"])
+            result = self.jobDB.setEndExecTime(jobID, update["EndExecTime"])
             if not result["OK"]:
                 return result
-        if not startTime and newStartTime:
-            log.debug("Set job start time", startTime)
-            result = self.jobDB.setStartExecTime(jobID, startTime)
+        if update["StartExecTime"]:
+            log.debug("Set job start time", update["StartExecTime"])
+            result = self.jobDB.setStartExecTime(jobID, update["StartExecTime"])
             if not result["OK"]:
                 return result
 
         # Update the JobLoggingDB records
-        heartBeatTime = None
-        for updTime in updateTimes:
-            sDict = statusDict[updTime]
-            status = sDict.get("Status", "idem")
-            minor = sDict.get("MinorStatus", "idem")
-            application = sDict.get("ApplicationStatus", "idem")
-            source = sDict.get("Source", "Unknown")
-            result = self.jobLoggingDB.addLoggingRecord(
-                jobID, status=status, minorStatus=minor, applicationStatus=application, date=updTime, source=source
-            )
+        if update["Records"]:
+            result = self.jobLoggingDB.addLoggingRecords(update["Records"])
             if not result["OK"]:
                 return result
-            # If the update comes from a job, update the heart beat time stamp with this item's stamp
-            if source.startswith("Job"):
-                heartBeatTime = updTime
-        if heartBeatTime is not None:
-            result = self.jobDB.setHeartBeatData(jobID, {"HeartBeatTime": heartBeatTime})
+        if update["HeartBeatTime"] is not None:
+            result = self.jobDB.setHeartBeatData(jobID, {"HeartBeatTime": update["HeartBeatTime"]})
             if not result["OK"]:
                 return result
 
         return S_OK((attrNames, attrValues))
 
+    def setJobsStatusBulk(self, jobsStatus: dict, force: bool = False, chunkSize: int = 1000):
+        """Set the statuses of many jobs, with a few statements per chunk of jobs.
+        As for setJobStatusBulk, the transitions are validated with the job state machine (unless forced),
+        only the last status of each job is set in the JobDB and all the updates are added to the JobLoggingDB.
+
+        :param dict jobsStatus: { jobID : [ (status, minorStatus, applicationStatus, source, dateTime) ] },
+                                the empty values being left unchanged and the empty dateTime meaning now
+        :param bool force: override the state machine decisions
+        :param int chunkSize: maximum number of jobs processed together
+        :return: S_OK({"Successful": { jobID : (attrNames, attrValues) }, "Failed": { jobID : error message }})
+        """
+        jobIDs = sorted(int(jobID) for jobID in jobsStatus)
+        statusDicts = {int(jobID): getStatusDict(updates) for jobID, updates in jobsStatus.items()}
+        successful = {}
+        failed = {}
+        for chunk in breakListIntoChunks(jobIDs, chunkSize):
+            result = self.__setJobsStatusChunk({jobID: statusDicts[jobID] for jobID in chunk}, force)
+            if not result["OK"]:
+                self.log.error("Failed to set the status", f"of {len(chunk)} jobs: {result['Message']}")
+                failed.update({jobID: result["Message"] for jobID in chunk})
+                continue
+            successful.update(result["Value"]["Successful"])
+            failed.update(result["Value"]["Failed"])
+        return S_OK({"Successful": successful, "Failed": failed})
+
+    def __setJobsStatusChunk(self, statusDicts: dict, force: bool):
+        """Set the statuses of a chunk of jobs, validated in memory and written in bulk
+
+        :param dict statusDicts: { jobID : statusDict }, statusDict as for setJobStatusBulk
+        """
+        countedAttributes = gRunningJobsCounters.getAttributeNames()
+        result = self.jobDB.getJobsAttributes(list(statusDicts), self.__getReadAttributes(countedAttributes))
+        if not result["OK"]:
+            return result
+        jobsAttributes = result["Value"]
+        result = self.jobLoggingDB.getJobsWMSTimeStamps(list(jobsAttributes))
+        if not result["OK"]:
+            return result
+        wmsTimeStamps = result["Value"]
+
+        successful = {}
+        failed = {}
+        updates = {}
+        for jobID, statusDict in statusDicts.items():
+            if jobID not in jobsAttributes:
+                failed[jobID] = "No Matching Job"
+            elif jobID not in wmsTimeStamps:
+                failed[jobID] = "No registered WMS timeStamps"
+            elif not statusDict:
+                successful[jobID] = ([], [])
+            else:
+                log = self.log.getLocalSubLogger("JobStatusBulk/Job-%d" % jobID)
+                result = getStatusUpdate(jobID, jobsAttributes[jobID], wmsTimeStamps[jobID], statusDict, force, log)
+                if result["OK"]:
+                    updates[jobID] = result["Value"]
+                else:
+                    failed[jobID] = result["Message"]
+
+        jobTimes = {}
+        for jobID, update in updates.items():
+            times = {name: update[name] for name in ("StartExecTime", "EndExecTime", "HeartBeatTime") if update[name]}
+            if times:
+                jobTimes[jobID] = times
+        result = self.jobDB.setJobsStatusAttributes(
+            {jobID: update["Attributes"] for jobID, update in updates.items() if update["Attributes"]}, jobTimes
+        )
+        if not result["OK"]:
+            return result
+        records = [record for update in updates.values() for record in update["Records"]]
+        if records:
+            result = self.jobLoggingDB.addLoggingRecords(records)
+            if not result["OK"]:
+                return result
+
+        for jobID, update in updates.items():
+            if update["Attributes"]:
+                result = self.__statusChanged(jobID, jobsAttributes[jobID], update["Attributes"], countedAttributes)
+                if not result["OK"]:
+                    failed[jobID] = result["Message"]
+                    continue
+            successful[jobID] = (list(update["Attributes"]), list(update["Attributes"].values()))
+        return S_OK({"Successful": successful, "Failed": failed})
+
+    @staticmethod
+    def __getReadAttributes(countedAttributes):
+        """The attributes of the jobs needed to update their status"""
+        attributes = ["Status", "StartExecTime", "EndExecTime"]
+        if countedAttributes:
+            attributes += ["Site"] + sorted(countedAttributes)
+        return attributes
+
+    def __statusChanged(self, jobID: int, jobAttributes: dict, newAttributes: dict, countedAttributes):
+        """Propagate a status update of a job to the running counters and the job parameters"""
+        status = newAttributes.get("Status")
+        if countedAttributes and status:
+            gRunningJobsCounters.jobStatusChanged(
+                jobAttributes.get("Site"),
+                jobAttributes["Status"],
+                status,
+                {attName: jobAttributes.get(attName) for attName in countedAttributes},
+            )
+        if self.elasticJobParametersDB:
+            return self.elasticJobParametersDB.setJobParameter(int(jobID), "Status", status)
+        return S_OK()
+
+
+def getStatusDict(updates: list) -> dict:
+    """Convert a list of status updates to a statusDict as given to setJobStatusBulk
+
+    :param list updates: (status, minorStatus, applicationStatus, source, dateTime) tuples
+    :return: { dateTime : { "Status" : status, "MinorStatus" : minorStatus, ... } }
+    """
+    now = str(datetime.utcnow())
+    statusDict = {}
+    for status, minorStatus, appStatus, source, dateTime in updates:
+        sDict = {
+            name: value
+            for name, value in (("Status", status), ("MinorStatus", minorStatus), ("ApplicationStatus", appStatus))
+            if value
+        }
+        if sDict:
+            if source:
+                sDict["Source"] = source
+            statusDict.setdefault(str(dateTime or now), {}).update(sDict)
+    return statusDict
+
+
+def getStatusUpdate(jobID: int, jobAttributes: dict, wmsTimeStamps: dict, statusDict: dict, force: bool, log):
+    """Evaluate in memory the changes of a job, for a statusDict as given to setJobStatusBulk
+
+    :param dict jobAttributes: Status, StartExecTime and EndExecTime of the job
+    :param dict wmsTimeStamps: as returned by JobLoggingDB.getWMSTimeStamps
+    :return: S_OK with a dictionary of
+
+      * Attributes: the status attributes to set, empty if the updates are older than the last one
+      * StartExecTime, EndExecTime: time stamps to set, or None
+      * HeartBeatTime: time of the last update sent by the job, or None
+      * Records: the logging records to add
+    """
+    # If the current status is Stalled and we get an update, it should probably be "Running"
+    currentStatus = jobAttributes["Status"]
+    if currentStatus == JobStatus.STALLED:
+        currentStatus = JobStatus.RUNNING
+    startTime = jobAttributes.get("StartExecTime")
+    endTime = jobAttributes.get("EndExecTime")
+    # getJobAttributes only returns strings :(
+    if startTime == "None":
+        startTime = None
+    if endTime == "None":
+        endTime = None
+
+    # Remove useless items in order to make it simpler later, although there should not be any
+    for sDict in statusDict.values():
+        for item in sorted(sDict):
+            if not sDict[item]:
+                sDict.pop(item, None)
+
+    # This is more precise than "LastTime". timeStamps is a sorted list of tuples...
+    timeStamps = sorted((float(t), s) for s, t in wmsTimeStamps.items() if s != "LastTime")
+    lastTime = TimeUtilities.toString(TimeUtilities.fromEpoch(timeStamps[-1][0]))
+
+    # Get chronological order of new updates
+    updateTimes = sorted(statusDict)
+    log.debug("*** New call ***", f"Last update time {lastTime} - Sorted new times {updateTimes}")
+    # Get the status (if any) at the time of the first update
+    newStartTime, newEndTime = getStartAndEndTime(startTime, endTime, updateTimes, timeStamps, statusDict)
+
+    # We should only update the status to the last one if its time stamp is more recent than the last update
+    attributes = {}
+    if updateTimes[-1] >= lastTime:
+        res = getNewStatus(jobID, updateTimes, lastTime, statusDict, currentStatus, force, log)
+        if not res["OK"]:
+            return res
+        status, minor, application = res["Value"]
+        log.debug("Final statuses:", f"status '{status}', minor '{minor}', application '{application}'")
+        if status:
+            attributes["Status"] = status
+        if minor:
+            attributes["MinorStatus"] = minor
+        if application:
+            attributes["ApplicationStatus"] = application
+
+    # The logging records, and the heart beat time stamp if the updates come from the job
+    heartBeatTime = None
+    records = []
+    for updTime in updateTimes:
+        sDict = statusDict[updTime]
+        source = sDict.get("Source", "Unknown")
+        records.append(
+            {
+                "jobID": jobID,
+                "status": sDict.get("Status", "idem"),
+                "minorStatus": sDict.get("MinorStatus", "idem"),
+                "applicationStatus": sDict.get("ApplicationStatus", "idem"),
+                "date": updTime,
+                "source": source,
+            }
+        )
+        if source.startswith("Job"):
+            heartBeatTime = updTime
+
+    return S_OK(
+        {
+            "Attributes": attributes,
+            "StartExecTime": newStartTime if not startTime else None,
+            "EndExecTime": newEndTime if not endTime else None,
+            "HeartBeatTime": heartBeatTime,
+            "Records": records,
+        }
+    )
+
 
 def getStartAndEndTime(startTime, endTime, updateTimes, timeStamps, statusDict):
     newStat = ""
@@ -2,6 +2,8 @@
     bunches of parametric jobs. It exposes the following functions:
 
     getParameterVectorLength() - to get the total size of the bunch of parametric jobs
+    getParametricJobParameters() - to get the parameter values of each job of the bunch
+    expandParametricJob() - to get the expanded description of one job of the bunch
     generateParametricJobs() - to get a list of expanded descriptions of all the jobs
 """
 import re
@@ -78,16 +80,12 @@ def __updateAttribute(classAd, attribute, parName, parValue):
     return True
 
 
-def generateParametricJobs(jobClassAd):
-    """Generate a series of ClassAd job descriptions expanding
-        job parameters
+def getParametricJobParameters(jobClassAd):
+    """Get the values of the parameters of each job of a parametric job description
 
     :param jobClassAd: ClassAd job description object
-    :return: list of ClassAd job description objects
+    :return: S_OK(list), with for each job a dict { sequence ID : parameter value }
     """
-    if not jobClassAd.lookupAttribute("Parameters"):
-        return S_OK([jobClassAd.asJDL()])
-
     result = getParameterVectorLength(jobClassAd)
     if not result["OK"]:
         return result
@@ -142,38 +140,62 @@ def generateParametricJobs(jobClassAd):
 
         parameterLists[seqID] = parList
 
-    jobDescList = []
-    jobDesc = jobClassAd.asJDL()
-    # Width of the sequential parameter number
-    zLength = len(str(nParValues - 1))
-    for n in range(nParValues):
-        newJobDesc = jobDesc
-        newJobDesc = newJobDesc.replace("%n", str(n).zfill(zLength))
-        newClassAd = ClassAd(newJobDesc)
-        for seqID in parameterLists:
-            parameter = parameterLists[seqID][n]
-            for attribute in newClassAd.getAttributes():
-                __updateAttribute(newClassAd, attribute, seqID, str(parameter))
-
-        for seqID in parameterLists:
-            for attribute in ["Parameters", "ParameterStart", "ParameterStep", "ParameterFactor"]:
-                if seqID == "0":
-                    newClassAd.deleteAttribute(attribute)
-                else:
-                    newClassAd.deleteAttribute(f"{attribute}.{seqID}")
+    return S_OK([{seqID: parList[n] for seqID, parList in parameterLists.items()} for n in range(nParValues)])
+
 
-            parameter = parameterLists[seqID][n]
+def expandParametricJob(jobDesc, parameterNumber, parameters, nJobs):
+    """Get the description of one job of a parametric job
+
+    :param str jobDesc: JDL of the parametric job, as given by ClassAd.asJDL()
+    :param int parameterNumber: number of the job in the parametric job
+    :param dict parameters: { sequence ID : parameter value } of the job, as given by getParametricJobParameters()
+    :param int nJobs: number of jobs of the parametric job
+    :return: JDL of the job
+    """
+    # Width of the sequential parameter number
+    zLength = len(str(nJobs - 1))
+    newJobDesc = jobDesc.replace("%n", str(parameterNumber).zfill(zLength))
+    newClassAd = ClassAd(newJobDesc)
+    for seqID, parameter in parameters.items():
+        for attribute in newClassAd.getAttributes():
+            __updateAttribute(newClassAd, attribute, seqID, str(parameter))
+
+    for seqID, parameter in parameters.items():
+        for attribute in ["Parameters", "ParameterStart", "ParameterStep", "ParameterFactor"]:
             if seqID == "0":
-                attribute = "Parameter"
-            else:
-                attribute = f"Parameter.{seqID}"
-            if isinstance(parameter, str) and parameter.startswith("{"):
-                newClassAd.insertAttributeInt(attribute, str(parameter))
+                newClassAd.deleteAttribute(attribute)
             else:
-                newClassAd.insertAttributeString(attribute, str(parameter))
+                newClassAd.deleteAttribute(f"{attribute}.{seqID}")
 
-        newClassAd.insertAttributeInt("ParameterNumber", n)
-        newJDL = newClassAd.asJDL()
-        jobDescList.append(newJDL)
+        if seqID == "0":
+            attribute = "Parameter"
+        else:
+            attribute = f"Parameter.{seqID}"
+        if isinstance(parameter, str) and parameter.startswith("{"):
+            newClassAd.insertAttributeInt(attribute, str(parameter))
+        else:
+            newClassAd.insertAttributeString(attribute, str(parameter))
 
-    return S_OK(jobDescList)
+    newClassAd.insertAttributeInt("ParameterNumber", parameterNumber)
+    return newClassAd.asJDL()
+
+
+def generateParametricJobs(jobClassAd):
+    """Generate a series of ClassAd job descriptions expanding
+        job parameters
+
+    :param jobClassAd: ClassAd job description object
+    :return: list of ClassAd job description objects
+    """
+    if not jobClassAd.lookupAttribute("Parameters"):
+        return S_OK([jobClassAd.asJDL()])
+
+    result = getParametricJobParameters(jobClassAd)
+    if not result["OK"]:
+        return result
+    jobParameters = result["Value"]
+
+    jobDesc = jobClassAd.asJDL()
+    return S_OK(
+        [expandParametricJob(jobDesc, n, parameters, len(jobParameters)) for n, parameters in enumerate(jobParameters)]
+    )
@@ -0,0 +1,64 @@
+""" Test the buffer of the heart beats of the jobs
+"""
+# pylint: disable=missing-docstring, invalid-name
+
+from unittest.mock import MagicMock
+
+from DIRAC import S_ERROR, S_OK
+
+# sut
+from DIRAC.WorkloadManagementSystem.Utilities.HeartBeatBuffer import HeartBeatBuffer
+
+
+def test_coalescing():
+    jobDB = MagicMock()
+    jobDB.setHeartBeatDataBulk.return_value = S_OK()
+    buffer = HeartBeatBuffer(jobDB)
+
+    buffer.add(1, {"HeartBeatTime": "2024-01-01 10:00:00", "CPUConsumed": 10.0})
+    buffer.add(1, {"HeartBeatTime": "2024-01-01 10:30:00", "CPUConsumed": 20.0})
+    # A late heart beat does not move the time backwards
+    buffer.add(1, {"HeartBeatTime": "2024-01-01 09:00:00"})
+    buffer.add(2, {"LoadAverage": 1.5})
+    assert len(buffer) == 2
+    jobDB.setHeartBeatDataBulk.assert_not_called()
+
+    assert buffer.flush()["OK"]
+    heartBeatTimes, dynamicData = jobDB.setHeartBeatDataBulk.call_args[0]
+    assert heartBeatTimes[1] == "2024-01-01 10:30:00"
+    # Without time given, the time of the reception is used
+    assert heartBeatTimes[2] > "2024-01-01"
+    assert [row[:3] for row in dynamicData] == [
+        (1, "CPUConsumed", 10.0),
+        (1, "CPUConsumed", 20.0),
+        (2, "LoadAverage", 1.5),
+    ]
+
+    # Nothing left to write
+    assert len(buffer) == 0
+    assert buffer.flush()["OK"]
+    assert jobDB.setHeartBeatDataBulk.call_count == 1
+
+
+def test_maxJobs():
+    jobDB = MagicMock()
+    jobDB.setHeartBeatDataBulk.return_value = S_OK()
+    buffer = HeartBeatBuffer(jobDB, maxJobs=3)
+    for jobID in range(5):
+        buffer.add(jobID, {})
+    assert jobDB.setHeartBeatDataBulk.call_count == 1
+    assert sorted(jobDB.setHeartBeatDataBulk.call_args[0][0]) == [0, 1, 2]
+    assert len(buffer) == 2
+
+
+def test_dbError():
+    jobDB = MagicMock()
+    jobDB.setHeartBeatDataBulk.return_value = S_ERROR("DB down")
+    buffer = HeartBeatBuffer(jobDB)
+    buffer.add(1, {})
+    assert not buffer.flush()["OK"]
+    # The lost heart beats are not written again with the next ones
+    jobDB.setHeartBeatDataBulk.return_value = S_OK()
+    buffer.add(2, {})
+    assert buffer.flush()["OK"]
+    assert list(jobDB.setHeartBeatDataBulk.call_args[0][0]) == [2]
@@ -229,3 +229,61 @@ def test__setJobStatusBulk(
     assert res["OK"] is resExpected
     if res["OK"]:
         assert res["Value"] == resExpected_value
+
+
+def test__setJobsStatusBulk():
+    """The updates of several jobs are validated in memory and written with one call per DB"""
+    timeStamps = {
+        JobStatus.RECEIVED: "1000000001.001",
+        JobStatus.WAITING: "1000000003.003",
+        "LastTime": "2001-09-09 03:46:43",
+    }
+    jobDB_mock = MagicMock()
+    jobDB_mock.getJobsAttributes.return_value = {
+        "OK": True,
+        "Value": {
+            1: {"Status": JobStatus.WAITING, "StartExecTime": "None", "EndExecTime": "None"},
+            2: {"Status": JobStatus.RUNNING, "StartExecTime": "2002-01-01 00:00:00", "EndExecTime": "None"},
+            4: {"Status": JobStatus.WAITING, "StartExecTime": "None", "EndExecTime": "None"},
+        },
+    }
+    jobDB_mock.setJobsStatusAttributes.return_value = {"OK": True, "Value": None}
+    jobLoggingDB_mock = MagicMock()
+    jobLoggingDB_mock.getJobsWMSTimeStamps.return_value = {"OK": True, "Value": {1: timeStamps, 2: timeStamps}}
+    jobLoggingDB_mock.addLoggingRecords.return_value = {"OK": True, "Value": 3}
+
+    jsu = JobStatusUtility(jobDB_mock, jobLoggingDB_mock, MagicMock())
+    res = jsu.setJobsStatusBulk(
+        {
+            1: [(JobStatus.MATCHED, "Assigned", "", "Matcher", "2002-01-01 00:00:00")],
+            # Not allowed by the state machine
+            2: [
+                (JobStatus.WAITING, "", "", "Somebody", "2002-01-01 00:00:01"),
+                ("", "", "Step 2", "JobWrapper", "2002-01-01 00:00:02"),
+            ],
+            3: [(JobStatus.DONE, "", "", "JobWrapper", None)],
+            4: [(JobStatus.MATCHED, "", "", "Matcher", None)],
+        }
+    )
+
+    assert res["OK"], res
+    assert res["Value"]["Successful"] == {
+        1: (["Status", "MinorStatus"], [JobStatus.MATCHED, "Assigned"]),
+        2: (["Status", "ApplicationStatus"], [JobStatus.RUNNING, "Step 2"]),
+    }
+    assert set(res["Value"]["Failed"]) == {3, 4}
+
+    jobDB_mock.setJobsStatusAttributes.assert_called_once_with(
+        {
+            1: {"Status": JobStatus.MATCHED, "MinorStatus": "Assigned"},
+            2: {"Status": JobStatus.RUNNING, "ApplicationStatus": "Step 2"},
+        },
+        # The updates from the job set its heart beat time
+        {2: {"HeartBeatTime": "2002-01-01 00:00:02"}},
+    )
+    records = jobLoggingDB_mock.addLoggingRecords.call_args[0][0]
+    assert [(record["jobID"], record["status"], record["source"]) for record in records] == [
+        (1, JobStatus.MATCHED, "Matcher"),
+        (2, JobStatus.RUNNING, "Somebody(SM)"),
+        (2, "idem", "JobWrapper"),
+    ]
@@ -4,7 +4,12 @@
 
 import pytest
 
-from DIRAC.WorkloadManagementSystem.Utilities.ParametricJob import generateParametricJobs, getParameterVectorLength
+from DIRAC.WorkloadManagementSystem.Utilities.ParametricJob import (
+    expandParametricJob,
+    generateParametricJobs,
+    getParameterVectorLength,
+    getParametricJobParameters,
+)
 from DIRAC.Core.Utilities.ClassAd.ClassAdLight import ClassAd
 
 TEST_JDL_NO_PARAMETERS = """
@@ -136,3 +141,28 @@ def test_generateParametricJobs(jdl: str, expectedArguments: list[str]):
         jobDescription = ClassAd(jobDescList[i])
         assert jobDescription.getAttributeString("JobName") == f"Test_{i}"
         assert jobDescription.getAttributeString("Arguments") == expectedArguments[i]
+
+
+@pytest.mark.parametrize(
+    "jdl, expectedParameters",
+    [
+        (TEST_JDL_SIMPLE, [{"0": "a"}, {"0": "b"}, {"0": "c"}]),
+        (TEST_JDL_SIMPLE_PROGRESSION, [{"0": 1}, {"0": 3}, {"0": 7}]),
+        (TEST_JDL_MULTI, [{"0": 1, "A": 1, "B": "a"}, {"0": 1, "A": 3, "B": "b"}, {"0": 1, "A": 7, "B": "c"}]),
+    ],
+)
+def test_expandParametricJob(jdl: str, expectedParameters: list[dict]):
+    # Arrange
+    parametricJobDescription = ClassAd(jdl)
+
+    # Act
+    result = getParametricJobParameters(parametricJobDescription)
+
+    # Assert
+    assert result["OK"], result["Message"]
+    assert result["Value"] == expectedParameters
+    # Each job can be expanded alone, as when generating all of them
+    jobDescList = generateParametricJobs(parametricJobDescription)["Value"]
+    jobDesc = parametricJobDescription.asJDL()
+    for n, parameters in enumerate(result["Value"]):
+        assert expandParametricJob(jobDesc, n, parameters, len(expectedParameters)) == jobDescList[n]
@@ -0,0 +1,85 @@
+""" In-memory counters of the jobs occupying the sites (Matched, Running or Stalled jobs)
+
+The counters are used by the Limiter to check the running limits of the sites, without counting the jobs
+in the JobDB at each match. They are kept up to date with the job status transitions seen in the process:
+the jobs matched by the Matcher and the status updates going through the JobStatusUtility.
+The transitions done in other processes are only seen when the counters are reconciled with the JobDB,
+which the Limiter does periodically.
+
+Only the (site, attribute) pairs having limits are counted: they are registered by the first reconciliation.
+"""
+import threading
+import time
+
+from DIRAC.WorkloadManagementSystem.Client import JobStatus
+
+# Statuses of the jobs counted against the running limits
+COUNTED_STATUSES = (JobStatus.RUNNING, JobStatus.MATCHED, JobStatus.STALLED)
+
+
+class RunningJobsCounters:
+    """Number of jobs in COUNTED_STATUSES per site, job attribute and attribute value"""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        # { ( site, attName ) : { attValue : count } }
+        self.__counters = {}
+        # { ( site, attName ) : time of the last reconciliation }
+        self.__reconciled = {}
+
+    def getAttributeNames(self, site=None):
+        """Get the names of the job attributes counted, at a given site or at any site
+
+        :param str site: site name
+        :return: set of attribute names
+        """
+        with self.__lock:
+            return {attName for cSite, attName in self.__counters if site is None or cSite == site}
+
+    def get(self, site, attName, maxAge):
+        """Get the counters for a site and a job attribute
+
+        :param str site: site name
+        :param str attName: job attribute name (e.g. JobType)
+        :param int maxAge: maximum time in seconds since the last reconciliation
+
+        :return: dict { attValue : count }, or None if the counters have to be reconciled
+        """
+        with self.__lock:
+            if time.time() - self.__reconciled.get((site, attName), 0) > maxAge:
+                return None
+            return dict(self.__counters[(site, attName)])
+
+    def reconcile(self, site, attName, counts):
+        """Replace the counters for a site and a job attribute with the values counted in the JobDB
+
+        :param str site: site name
+        :param str attName: job attribute name
+        :param dict counts: { attValue : count }
+        """
+        with self.__lock:
+            self.__counters[(site, attName)] = dict(counts)
+            self.__reconciled[(site, attName)] = time.time()
+
+    def jobStatusChanged(self, site, oldStatus, newStatus, attributes):
+        """Account for a job status transition
+
+        :param str site: site of the job
+        :param str oldStatus: status before the transition
+        :param str newStatus: status after the transition
+        :param dict attributes: { attName : attValue } attributes of the job
+        """
+        wasCounted = oldStatus in COUNTED_STATUSES
+        isCounted = newStatus in COUNTED_STATUSES
+        if wasCounted == isCounted:
+            return
+        delta = 1 if isCounted else -1
+        with self.__lock:
+            for attName, attValue in attributes.items():
+                counts = self.__counters.get((site, attName))
+                if counts is None or attValue is None:
+                    continue
+                counts[attValue] = max(0, counts.get(attValue, 0) + delta)
+
+
+gRunningJobsCounters = RunningJobsCounters()
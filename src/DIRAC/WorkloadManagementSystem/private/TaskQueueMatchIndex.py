@@ -0,0 +1,298 @@
+""" In-memory index of the task queue definitions
+
+The index holds a snapshot of the task queues (owner, group, CPU time, priority and
+multi-valued requirements) organised as inverted indexes, so that the task queues
+matching a resource description can be found without building and running the
+match SQL of the TaskQueueDB. It gives the same answer as the SQL:
+
+  - the multi-valued fields are matched if the task queue has no value for the field,
+    or if one of the values of the resource is in the task queue values
+  - the task queue tags have to be a subset of the resource tags,
+    and the "RequiredTag" of the resource a subset of the task queue tags
+  - "Banned<Field>" and negative conditions exclude task queues
+  - the task queues are returned in a random order weighted by their priority
+
+String comparisons ignore the case and surrounding spaces, as MySQL does.
+The index is fed by the TaskQueueDB, which is responsible for keeping it up to date.
+"""
+import random
+import string
+import threading
+from collections import defaultdict
+
+from DIRAC import S_ERROR, S_OK
+from DIRAC.ConfigurationSystem.Client.Helpers import Registry
+from DIRAC.Core.Security import Properties
+
+# Same as in the TaskQueueDB
+singleValueDefFields = ("Owner", "OwnerGroup", "CPUTime")
+multiValueMatchFields = ("GridCE", "Site", "Platform", "JobType", "Tag")
+bannedJobMatchFields = ("Site",)
+# Fields looked up through the inverted indexes, the others are checked on the candidates
+indexedMatchFields = ("GridCE", "Site", "Platform", "JobType")
+
+
+def _lowerAndRemovePunctuation(s):
+    table = str.maketrans("", "", string.punctuation)
+    return s.lower().translate(table)
+
+
+def _norm(value):
+    """Normalise a value the way MySQL compares strings"""
+    return str(value).strip().lower()
+
+
+def _asList(value):
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def _isAny(value):
+    """True if the match value is empty or is (or contains) "any" """
+    if not value:
+        return True
+    return any(_lowerAndRemovePunctuation(str(v)) == "any" for v in _asList(value))
+
+
+class TaskQueueEntry:
+    """Definition of one task queue, as stored in the index"""
+
+    __slots__ = ("tqId", "owner", "ownerGroup", "normOwner", "normOwnerGroup", "cpuTime", "priority", "values")
+
+    def __init__(self, tqId, tqDef):
+        self.tqId = tqId
+        self.owner = tqDef["Owner"]
+        self.ownerGroup = tqDef["OwnerGroup"]
+        self.normOwner = _norm(self.owner)
+        self.normOwnerGroup = _norm(self.ownerGroup)
+        self.cpuTime = int(tqDef["CPUTime"])
+        self.priority = float(tqDef.get("Priority", 1))
+        # Match field (singular) -> set of normalised values
+        self.values = {}
+        for field in multiValueMatchFields + tuple(f"Banned{f}" for f in bannedJobMatchFields):
+            self.values[field] = frozenset(_norm(v) for v in tqDef.get(f"{field}s", []) if str(v).strip())
+
+
+class TaskQueueMatchIndex:
+    """Inverted indexes of the task queues by OwnerGroup, Site, GridCE, Platform, JobType and Tag"""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__entries = {}
+        self.__byGroup = defaultdict(set)
+        # Match field -> value -> set of TQIds, and match field -> TQIds without value for the field
+        self.__byValue = {field: defaultdict(set) for field in multiValueMatchFields}
+        self.__withoutValue = {field: set() for field in multiValueMatchFields}
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def getTQIds(self):
+        """Get the ids of the task queues in the index"""
+        with self.__lock:
+            return set(self.__entries)
+
+    def getMaxTQId(self):
+        """Get the largest task queue id in the index (0 if empty)"""
+        with self.__lock:
+            return max(self.__entries, default=0)
+
+    def __add(self, entry):
+        self.__remove(entry.tqId)
+        self.__entries[entry.tqId] = entry
+        self.__byGroup[entry.normOwnerGroup].add(entry.tqId)
+        for field in multiValueMatchFields:
+            values = entry.values[field]
+            if not values:
+                self.__withoutValue[field].add(entry.tqId)
+            for value in values:
+                self.__byValue[field][value].add(entry.tqId)
+
+    def __remove(self, tqId):
+        entry = self.__entries.pop(tqId, None)
+        if not entry:
+            return
+        self.__byGroup[entry.normOwnerGroup].discard(tqId)
+        if not self.__byGroup[entry.normOwnerGroup]:
+            del self.__byGroup[entry.normOwnerGroup]
+        for field in multiValueMatchFields:
+            self.__withoutValue[field].discard(tqId)
+            for value in entry.values[field]:
+                self.__byValue[field][value].discard(tqId)
+                if not self.__byValue[field][value]:
+                    del self.__byValue[field][value]
+
+    def add(self, tqDefs):
+        """Add (or replace) task queues
+
+        :param dict tqDefs: { tqId : definition }, the definition having the keys Owner, OwnerGroup,
+                            CPUTime, Priority and the multi-valued fields (Sites, BannedSites, Tags...)
+        """
+        entries = [TaskQueueEntry(tqId, tqDef) for tqId, tqDef in tqDefs.items()]
+        with self.__lock:
+            for entry in entries:
+                self.__add(entry)
+
+    def remove(self, tqIds):
+        """Remove task queues from the index
+
+        :param tqIds: iterable of task queue ids
+        """
+        with self.__lock:
+            for tqId in tqIds:
+                self.__remove(tqId)
+
+    def reset(self, tqDefs):
+        """Replace the whole content of the index, see :py:meth:`add`"""
+        entries = [TaskQueueEntry(tqId, tqDef) for tqId, tqDef in tqDefs.items()]
+        with self.__lock:
+            for tqId in list(self.__entries):
+                self.__remove(tqId)
+            for entry in entries:
+                self.__add(entry)
+
+    def setPriorities(self, priorities):
+        """Update the priorities of the task queues
+
+        :param dict priorities: { tqId : priority }
+        """
+        with self.__lock:
+            for tqId, priority in priorities.items():
+                entry = self.__entries.get(tqId)
+                if entry:
+                    entry.priority = float(priority)
+
+    def match(self, tqMatchDict, numQueuesToGet=1, negativeCond=None):
+        """Get the task queues matching a resource
+
+        :param dict tqMatchDict: resource description, with the raw (not escaped) values
+        :param int numQueuesToGet: maximum number of task queues to return, 0 for all
+        :param negativeCond: dict or list of dicts of conditions excluding task queues
+
+        :return: S_OK( [ ( tqId, owner, ownerGroup ) ] ) ordered by priority / S_ERROR
+        """
+        # Without Tag nor RequiredTag, only the task queues without tags are matched
+        tagValues = _asList(tqMatchDict.get("Tag", []))
+        checkTags = ("Tag" in tqMatchDict or "RequiredTag" not in tqMatchDict) and not (tagValues and _isAny(tagValues))
+        tagValues = {_norm(v) for v in tagValues}
+
+        requiredTags = _asList(tqMatchDict.get("RequiredTag", []))
+        if not requiredTags or _isAny(requiredTags):
+            requiredTags = []
+        else:
+            requiredTags = [_norm(v) for v in requiredTags]
+            if not set(requiredTags) <= tagValues:
+                return S_ERROR("Wrong conditions")
+
+        checks = self.__buildChecks(tqMatchDict, negativeCond)
+
+        with self.__lock:
+            candidates = self.__getCandidates(tqMatchDict)
+            if candidates is None:
+                candidates = self.__entries.keys()
+            entries = [self.__entries[tqId] for tqId in candidates]
+            matched = []
+            for entry in entries:
+                if checkTags and not entry.values["Tag"] <= tagValues:
+                    continue
+                if requiredTags and len(entry.values["Tag"].intersection(requiredTags)) != len(requiredTags):
+                    continue
+                if all(check(entry) for check in checks):
+                    matched.append((entry.tqId, entry.owner, entry.ownerGroup, entry.priority))
+
+        # ORDER BY RAND() / Priority ASC
+        matched.sort(key=lambda tq: random.random() / tq[3] if tq[3] > 0 else float("-inf"))
+        if numQueuesToGet:
+            matched = matched[:numQueuesToGet]
+        return S_OK([tq[:3] for tq in matched])
+
+    def __getCandidates(self, tqMatchDict):
+        """Intersect the inverted indexes for the group and the indexed multi-valued fields
+
+        :return: set of TQIds, or None if nothing restricts the candidates
+        """
+        candidates = None
+        if "OwnerGroup" in tqMatchDict:
+            candidates = set()
+            for group in _asList(tqMatchDict["OwnerGroup"]):
+                candidates |= self.__byGroup.get(_norm(group), set())
+        for field in indexedMatchFields:
+            values = tqMatchDict.get(field)
+            if _isAny(values):
+                continue
+            fieldCandidates = set(self.__withoutValue[field])
+            for value in _asList(values):
+                fieldCandidates |= self.__byValue[field].get(_norm(value), set())
+            candidates = fieldCandidates if candidates is None else candidates & fieldCandidates
+            if not candidates:
+                break
+        return candidates
+
+    @staticmethod
+    def __buildChecks(tqMatchDict, negativeCond):
+        """Build the list of predicates a task queue entry has to fulfil, besides the indexed fields"""
+        checks = []
+
+        if "Owner" in tqMatchDict and "OwnerGroup" in tqMatchDict:
+            owner = _norm(tqMatchDict["Owner"])
+            sharingGroups = set()
+            ownerGroups = set()
+            for group in _asList(tqMatchDict["OwnerGroup"]):
+                if Properties.JOB_SHARING in Registry.getPropertiesForGroup(group):
+                    sharingGroups.add(_norm(group))
+                else:
+                    ownerGroups.add(_norm(group))
+            checks.append(
+                lambda e: e.normOwnerGroup in sharingGroups
+                or (e.normOwnerGroup in ownerGroups and e.normOwner == owner)
+            )
+        elif "Owner" in tqMatchDict:
+            owners = {_norm(v) for v in _asList(tqMatchDict["Owner"])}
+            checks.append(lambda e: e.normOwner in owners)
+
+        if "CPUTime" in tqMatchDict:
+            cpuTime = max(int(v) for v in _asList(tqMatchDict["CPUTime"]))
+            checks.append(lambda e: e.cpuTime <= cpuTime)
+
+        # The site of the resource should not be banned by the task queue
+        for field in bannedJobMatchFields:
+            values = tqMatchDict.get(field)
+            if _isAny(values):
+                continue
+            values = {_norm(v) for v in _asList(values)}
+            checks.append(lambda e, field=field, values=values: not values <= e.values[f"Banned{field}"])
+
+        # The resource can ban some values
+        for field in multiValueMatchFields:
+            values = tqMatchDict.get(f"Banned{field}")
+            if _isAny(values):
+                continue
+            values = {_norm(v) for v in _asList(values)}
+            checks.append(lambda e, field=field, values=values: not values <= e.values[field])
+
+        if negativeCond:
+            condDicts = negativeCond if isinstance(negativeCond, (list, tuple)) else [negativeCond]
+            condChecks = [TaskQueueMatchIndex.__buildNegativeCheck(condDict) for condDict in condDicts]
+            checks.append(lambda e: any(check(e) for check in condChecks))
+
+        return checks
+
+    @staticmethod
+    def __buildNegativeCheck(negativeCond):
+        """Build the predicate for a negative condition dict:
+        not ( cond1 and cond2 ) = ( not cond1 or not cond 2 )
+        """
+        condChecks = []
+        for field, values in negativeCond.items():
+            if field in multiValueMatchFields:
+                values = {_norm(v) for v in _asList(values)}
+                condChecks.append(lambda e, field=field, values=values: not values & e.values[field])
+            elif field in singleValueDefFields:
+                for value in _asList(values):
+                    if field == "CPUTime":
+                        condChecks.append(lambda e, value=int(value): e.cpuTime != value)
+                    else:
+                        attr = "normOwner" if field == "Owner" else "normOwnerGroup"
+                        condChecks.append(lambda e, attr=attr, value=_norm(value): getattr(e, attr) != value)
+        return lambda e: any(check(e) for check in condChecks)
@@ -0,0 +1,68 @@
+""" Test the running jobs counters used by the Limiter
+"""
+from unittest.mock import MagicMock
+
+from DIRAC import S_OK
+from DIRAC.WorkloadManagementSystem.Client import JobStatus
+from DIRAC.WorkloadManagementSystem.Client.Limiter import Limiter
+from DIRAC.WorkloadManagementSystem.private.RunningJobsCounters import RunningJobsCounters
+
+SITE = "LCG.CERN.ch"
+
+
+def test_reconcile():
+    """The counters have to be reconciled before being used, and when they are too old"""
+    counters = RunningJobsCounters()
+    assert counters.get(SITE, "JobType", 60) is None
+    assert counters.getAttributeNames() == set()
+
+    counters.reconcile(SITE, "JobType", {"User": 10, "MCSimulation": 5})
+    assert counters.get(SITE, "JobType", 60) == {"User": 10, "MCSimulation": 5}
+    assert counters.get(SITE, "JobType", -1) is None
+    assert counters.getAttributeNames() == {"JobType"}
+    assert counters.getAttributeNames("Other.Site.org") == set()
+
+
+def test_jobStatusChanged():
+    """Only the transitions in and out of the counted statuses change the counters"""
+    counters = RunningJobsCounters()
+    counters.reconcile(SITE, "JobType", {"User": 1})
+
+    counters.jobStatusChanged(SITE, JobStatus.WAITING, JobStatus.MATCHED, {"JobType": "User"})
+    counters.jobStatusChanged(SITE, JobStatus.WAITING, JobStatus.MATCHED, {"JobType": "MCSimulation"})
+    assert counters.get(SITE, "JobType", 60) == {"User": 2, "MCSimulation": 1}
+
+    # Still occupying the site
+    counters.jobStatusChanged(SITE, JobStatus.MATCHED, JobStatus.RUNNING, {"JobType": "User"})
+    counters.jobStatusChanged(SITE, JobStatus.RUNNING, JobStatus.STALLED, {"JobType": "User"})
+    assert counters.get(SITE, "JobType", 60) == {"User": 2, "MCSimulation": 1}
+
+    counters.jobStatusChanged(SITE, JobStatus.RUNNING, JobStatus.DONE, {"JobType": "User"})
+    counters.jobStatusChanged(SITE, JobStatus.STALLED, JobStatus.FAILED, {"JobType": "MCSimulation"})
+    counters.jobStatusChanged(SITE, JobStatus.STALLED, JobStatus.FAILED, {"JobType": "MCSimulation"})
+    assert counters.get(SITE, "JobType", 60) == {"User": 1, "MCSimulation": 0}
+
+    # Sites and attributes without limits are not counted
+    counters.jobStatusChanged("Other.Site.org", JobStatus.WAITING, JobStatus.MATCHED, {"JobType": "User"})
+    counters.jobStatusChanged(SITE, JobStatus.WAITING, JobStatus.MATCHED, {"Owner": "someone"})
+    assert counters.get("Other.Site.org", "JobType", 60) is None
+    assert counters.getAttributeNames(SITE) == {"JobType"}
+
+
+def test_limiterJobMatched():
+    """The Limiter counts the matched jobs from their actual previous status"""
+    jobDB = MagicMock()
+    jobDB.getJobAttributes.return_value = S_OK({"JobType": "User"})
+    limiter = Limiter(jobDB=jobDB, opsHelper=MagicMock())
+    limiter.runningCounters = RunningJobsCounters()
+    assert limiter.jobMatched(SITE, 1, JobStatus.WAITING)["OK"]
+    jobDB.getJobAttributes.assert_not_called()
+
+    limiter.runningCounters.reconcile(SITE, "JobType", {"User": 1})
+    assert limiter.jobMatched(SITE, 1, JobStatus.WAITING)["OK"]
+    jobDB.getJobAttributes.assert_called_once_with(1, ["JobType"])
+    assert limiter.runningCounters.get(SITE, "JobType", 60) == {"User": 2}
+
+    # A job already occupying the site is not counted twice
+    assert limiter.jobMatched(SITE, 1, JobStatus.MATCHED)["OK"]
+    assert limiter.runningCounters.get(SITE, "JobType", 60) == {"User": 2}
@@ -0,0 +1,95 @@
+""" Test the in-memory TaskQueue match index
+"""
+import pytest
+
+from DIRAC.WorkloadManagementSystem.private.TaskQueueMatchIndex import TaskQueueMatchIndex
+
+
+def tqDef(cpuTime=3600, owner="userName", ownerGroup="myGroup", priority=1, **multiValues):
+    tq = {"Owner": owner, "OwnerGroup": ownerGroup, "CPUTime": cpuTime, "Priority": priority}
+    tq.update(multiValues)
+    return tq
+
+
+def match(index, tqMatchDict, **kwargs):
+    result = index.match(tqMatchDict, numQueuesToGet=0, **kwargs)
+    assert result["OK"], result
+    return {tq[0] for tq in result["Value"]}
+
+
+@pytest.fixture
+def index():
+    index = TaskQueueMatchIndex()
+    index.add(
+        {
+            1: tqDef(Sites=["LCG.CERN.ch"]),
+            2: tqDef(Sites=["CLOUD.IN2P3.fr"]),
+            3: tqDef(Sites=["LCG.CERN.ch", "CLOUD.IN2P3.fr"]),
+            4: tqDef(BannedSites=["LCG.CERN.ch", "CLOUD.IN2P3.fr"]),
+            5: tqDef(Platforms=["centos7", "slc6"]),
+            6: tqDef(Platforms=["ubuntu"]),
+            7: tqDef(cpuTime=86400),
+            8: tqDef(Tags=["MultiProcessor"]),
+            9: tqDef(Tags=["MultiProcessor", "GPU"], ownerGroup="otherGroup", owner="otherUser"),
+        }
+    )
+    return index
+
+
+def test_sites(index):
+    """A TQ matches the sites it requires, and not its banned sites"""
+    assert match(index, {"CPUTime": 50000}) == {1, 2, 3, 4, 5, 6}
+    assert match(index, {"CPUTime": 50000, "Site": "LCG.CERN.ch"}) == {1, 3, 5, 6}
+    # The comparison is case insensitive, as in MySQL
+    assert match(index, {"CPUTime": 50000, "Site": "lcg.cern.ch "}) == {1, 3, 5, 6}
+    assert match(index, {"CPUTime": 50000, "Site": "DIRAC.Test.org"}) == {4, 5, 6}
+    assert match(index, {"CPUTime": 50000, "Site": "ANY"}) == {1, 2, 3, 4, 5, 6}
+    assert match(index, {"CPUTime": 50000, "BannedSite": ["LCG.CERN.ch"]}) == {2, 4, 5, 6}
+
+
+def test_platforms(index):
+    assert match(index, {"CPUTime": 50000, "Platform": "slc6"}) == {1, 2, 3, 4, 5}
+    assert match(index, {"CPUTime": 50000, "Platform": ["ubuntu", "debian"]}) == {1, 2, 3, 4, 6}
+    assert match(index, {"CPUTime": 50000, "Platform": ["ANY"]}) == {1, 2, 3, 4, 5, 6}
+
+
+def test_cpuTimeAndOwner(index):
+    assert match(index, {"CPUTime": 100000}) == {1, 2, 3, 4, 5, 6, 7}
+    assert match(index, {"CPUTime": 100000, "OwnerGroup": "myGroup", "Owner": "someoneElse"}) == set()
+    assert match(index, {"CPUTime": 100000, "OwnerGroup": ["otherGroup"], "Tag": "ANY"}) == {9}
+
+
+def test_tags(index):
+    """The TQ tags have to be provided by the resource, the required tags have to be in the TQ"""
+    assert match(index, {"CPUTime": 50000, "Tag": ["MultiProcessor"]}) == {1, 2, 3, 4, 5, 6, 8}
+    assert match(index, {"CPUTime": 50000, "Tag": ["MultiProcessor", "GPU"]}) == {1, 2, 3, 4, 5, 6, 8, 9}
+    assert match(index, {"CPUTime": 50000, "Tag": ["GPU", "MultiProcessor"], "RequiredTag": "GPU"}) == {9}
+    assert match(index, {"CPUTime": 50000, "Tag": "ANY"}) == {1, 2, 3, 4, 5, 6, 8, 9}
+    assert not index.match({"CPUTime": 50000, "Tag": ["GPU"], "RequiredTag": ["MultiProcessor"]})["OK"]
+
+
+def test_negativeConditions(index):
+    assert match(index, {"CPUTime": 50000}, negativeCond={"Site": ["LCG.CERN.ch"]}) == {2, 4, 5, 6}
+    negativeCond = [{"Site": "CLOUD.IN2P3.fr"}, {"OwnerGroup": ["myGroup"]}]
+    assert match(index, {"CPUTime": 50000, "Tag": "ANY"}, negativeCond=negativeCond) == {1, 4, 5, 6, 8, 9}
+
+
+def test_updates(index):
+    """TQs can be added, removed and replaced"""
+    index.remove([1, 3])
+    assert match(index, {"CPUTime": 50000, "Site": "LCG.CERN.ch"}) == {5, 6}
+    index.add({1: tqDef(Sites=["LCG.CERN.ch"], Platforms=["centos7"])})
+    assert match(index, {"CPUTime": 50000, "Site": "LCG.CERN.ch", "Platform": "centos7"}) == {1, 5}
+    assert index.getMaxTQId() == 9
+    index.reset({10: tqDef()})
+    assert index.getTQIds() == {10}
+
+
+def test_priorityAndLimit(index):
+    """TQs with a higher priority come first more often"""
+    index.reset({1: tqDef(priority=1), 2: tqDef(priority=1000)})
+    firsts = [index.match({"CPUTime": 50000}, numQueuesToGet=1)["Value"][0][0] for _ in range(200)]
+    assert firsts.count(2) > 150
+    index.setPriorities({1: 1000, 2: 1})
+    firsts = [index.match({"CPUTime": 50000}, numQueuesToGet=1)["Value"][0][0] for _ in range(200)]
+    assert firsts.count(1) > 150
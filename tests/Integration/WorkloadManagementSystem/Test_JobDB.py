@@ -15,10 +15,12 @@ import pytest
 DIRAC.initialize()  # Initialize configuration
 
 from DIRAC import S_OK, gLogger
+from DIRAC.Core.Utilities.ClassAd.ClassAdLight import ClassAd
 from DIRAC.WorkloadManagementSystem.Client import JobMinorStatus, JobStatus
 
 # sut
 from DIRAC.WorkloadManagementSystem.DB.JobDB import JobDB
+from DIRAC.WorkloadManagementSystem.Utilities.ParametricJob import generateParametricJobs
 
 jdl = """[
     Arguments = "jobDescription.xml -o LogLevel=info";
@@ -104,6 +106,75 @@ def test_insertNewJobIntoDB(jobDB: JobDB):
     assert res["Value"] == {}
 
 
+def test_insertNewJobsIntoDB(jobDB: JobDB):
+    """Test the insertNewJobsIntoDB method, inserting several jobs at once"""
+
+    jdls = [jdl.replace('JobName = "helloWorld"', f'JobName = "helloWorld_{i}_%j"') for i in range(3)]
+
+    # Act
+    res = jobDB.insertNewJobsIntoDB(jdls, "owner", "ownerGroup", initialStatus=JobStatus.SUBMITTING, vo="vo")
+
+    # Assert
+    assert res["OK"], res["Message"]
+    jobIDs = list(res["Value"])
+    assert len(jobIDs) == 3
+    assert jobIDs == sorted(jobIDs)
+    res = jobDB.getJobsAttributes(jobIDs, ["Status", "JobName", "Owner"])
+    assert res["OK"], res["Message"]
+    for i, jobID in enumerate(jobIDs):
+        assert res["Value"][jobID] == {
+            "Status": JobStatus.SUBMITTING,
+            "JobName": f"helloWorld_{i}_{jobID}",
+            "Owner": "owner",
+        }
+    for i, jobID in enumerate(jobIDs):
+        res = jobDB.getJobJDL(jobID, original=True)
+        assert res["OK"], res["Message"]
+        assert f"helloWorld_{i}_%j" in res["Value"]
+        res = jobDB.getJobJDL(jobID)
+        assert res["OK"], res["Message"]
+        assert f"helloWorld_{i}_{jobID}" in res["Value"]
+
+
+def test_insertNewJobsIntoDB_templates(jobDB: JobDB):
+    """The jobs of a parametric job refer to its stored template, which is removed with the last of them"""
+    templateJDL = jdl.replace('JobName = "helloWorld";', 'JobName = "helloWorld_%n_%j"; Parameters = {"a", "b"};')
+    jdls = generateParametricJobs(ClassAd(templateJDL))["Value"]
+
+    jobDB.jdlTemplates = False
+    res = jobDB.insertNewJobsIntoDB(jdls, "owner", "ownerGroup", vo="vo")
+    assert res["OK"], res["Message"]
+    fullJobIDs = list(res["Value"])
+    jobDB.jdlTemplates = True
+    res = jobDB.insertNewJobsIntoDB(jdls, "owner", "ownerGroup", vo="vo", templateJDL=templateJDL)
+    assert res["OK"], res["Message"]
+    jobIDs = list(res["Value"])
+
+    res = jobDB._query(f"SELECT OriginalJDL FROM JobJDLs WHERE JobID IN ({jobIDs[0]}, {jobIDs[1]})")
+    assert res["OK"], res["Message"]
+    assert all(row[0].startswith("Template:") for row in res["Value"])
+    for original in (True, False):
+        res = jobDB.getJobsJDL(jobIDs + fullJobIDs, original=original)
+        assert res["OK"], res["Message"]
+        for n, (jobID, fullJobID) in enumerate(zip(jobIDs, fullJobIDs)):
+            jobClassAd, fullJobClassAd = ClassAd(res["Value"][jobID]), ClassAd(res["Value"][fullJobID])
+            if not original:
+                assert jobClassAd.getAttributeString("JobName") == f"helloWorld_{n}_{jobID}"
+                assert jobClassAd.getAttributeInt("JobID") == jobID
+                for attribute in ("JobName", "JobID"):
+                    jobClassAd.deleteAttribute(attribute)
+                    fullJobClassAd.deleteAttribute(attribute)
+            assert jobClassAd.contents == fullJobClassAd.contents
+
+    res = jobDB._query("SELECT COUNT(*) FROM JobJDLTemplates")
+    assert res["OK"], res["Message"]
+    nTemplates = res["Value"][0][0]
+    assert jobDB.removeJobFromDB(jobIDs[0])["OK"]
+    assert jobDB._query("SELECT COUNT(*) FROM JobJDLTemplates")["Value"][0][0] == nTemplates
+    assert jobDB.removeJobFromDB(jobIDs[1])["OK"]
+    assert jobDB._query("SELECT COUNT(*) FROM JobJDLTemplates")["Value"][0][0] == nTemplates - 1
+
+
 def test_removeJobFromDB(jobDB: JobDB):
     # Arrange
     res = jobDB.insertNewJobIntoDB(jdl, "owner", "ownerGroup", vo="vo")
@@ -302,6 +373,97 @@ def test_heartBeatLogging(jobDB):
     assert not res["Value"], str(res)
 
 
+def test_setHeartBeatDataBulk(jobDB):
+    jobIDs = []
+    for _ in range(3):
+        res = jobDB.insertNewJobIntoDB(jdl, "owner", "ownerGroup", vo="vo")
+        assert res["OK"], res["Message"]
+        jobIDs.append(res["JobID"])
+
+    heartBeatTimes = {jobID: f"2024-01-01 10:00:0{i}" for i, jobID in enumerate(jobIDs)}
+    dynamicData = [(jobID, "CPU", 12.5, "2024-01-01 10:00:00") for jobID in jobIDs]
+    # The data of a job removed meanwhile is ignored
+    dynamicData.append((max(jobIDs) + 1000, "CPU", 1.0, "2024-01-01 10:00:00"))
+    res = jobDB.setHeartBeatDataBulk(heartBeatTimes, dynamicData, chunkSize=2)
+    assert res["OK"], res["Message"]
+
+    for i, jobID in enumerate(jobIDs):
+        res = jobDB.getJobAttribute(jobID, "HeartBeatTime")
+        assert res["OK"], res["Message"]
+        assert str(res["Value"]) == f"2024-01-01 10:00:0{i}"
+        res = jobDB.getHeartBeatData(jobID)
+        assert res["OK"], res["Message"]
+        assert [(name, value) for name, value, _hbt in res["Value"]] == [("CPU", "12.5")]
+
+
+def test_getHeartBeatDataSummary(jobDB):
+    res = jobDB.insertNewJobIntoDB(jdl, "owner", "ownerGroup", vo="vo")
+    assert res["OK"], res["Message"]
+    jobID = res["JobID"]
+    dynamicData = [
+        (jobID, "CPUConsumed", 10.5, "2024-01-01 10:00:00"),
+        (jobID, "CPUConsumed", 20.5, "2024-01-01 10:30:00"),
+        (jobID, "WallClockTime", 30, "2024-01-01 10:15:00"),
+    ]
+    res = jobDB.setHeartBeatDataBulk({jobID: "2024-01-01 10:30:00"}, dynamicData)
+    assert res["OK"], res["Message"]
+
+    res = jobDB.getHeartBeatDataSummary([jobID, jobID + 1000])
+    assert res["OK"], res["Message"]
+    assert res["Value"] == {
+        jobID: {
+            "LastHeartBeatTime": datetime(2024, 1, 1, 10, 30),
+            "MaxValues": {"CPUConsumed": 20.5, "WallClockTime": 30.0},
+        }
+    }
+
+    res = jobDB.getJobsJDL([jobID], original=True)
+    assert res["OK"], res["Message"]
+    assert list(res["Value"]) == [jobID]
+
+
+def test_setJobsStatusAttributes(jobDB):
+    jobIDs = []
+    for _ in range(3):
+        res = jobDB.insertNewJobIntoDB(jdl, "owner", "ownerGroup", vo="vo")
+        assert res["OK"], res["Message"]
+        jobIDs.append(res["JobID"])
+    res = jobDB.setStartExecTime(jobIDs[2], "2024-01-01 09:00:00")
+    assert res["OK"], res["Message"]
+
+    res = jobDB.setJobsStatusAttributes(
+        {
+            jobIDs[0]: {"Status": JobStatus.MATCHED, "MinorStatus": "Assigned"},
+            jobIDs[1]: {"Status": JobStatus.RUNNING, "ApplicationStatus": "Step 1"},
+        },
+        {
+            jobIDs[1]: {"StartExecTime": "2024-01-01 10:00:00"},
+            # The start time is already set
+            jobIDs[2]: {"StartExecTime": "2024-01-01 10:00:00", "HeartBeatTime": "2024-01-01 11:00:00"},
+        },
+        chunkSize=1,
+    )
+    assert res["OK"], res["Message"]
+
+    attributes = ["Status", "MinorStatus", "ApplicationStatus", "StartExecTime", "HeartBeatTime"]
+    res = jobDB.getJobsAttributes(jobIDs, attributes)
+    assert res["OK"], res["Message"]
+    assert [[str(res["Value"][jobID][name]) for name in attributes] for jobID in jobIDs] == [
+        [JobStatus.MATCHED, "Assigned", "Unknown", "None", "None"],
+        [JobStatus.RUNNING, "Job accepted", "Step 1", "2024-01-01 10:00:00", "2024-01-01 10:00:00"],
+        [JobStatus.RECEIVED, "Job accepted", "Unknown", "2024-01-01 09:00:00", "2024-01-01 11:00:00"],
+    ]
+
+    # A job removed meanwhile is not created again
+    res = jobDB.removeJobFromDB(jobIDs[0])
+    assert res["OK"], res["Message"]
+    res = jobDB.setJobsStatusAttributes({jobIDs[0]: {"Status": JobStatus.RUNNING}})
+    assert res["OK"], res["Message"]
+    res = jobDB.getJobsAttributes([jobIDs[0]], ["Status"])
+    assert res["OK"], res["Message"]
+    assert not res["Value"]
+
+
 def test_setJobsMajorStatus(jobDB):
     res = jobDB.insertNewJobIntoDB(jdl, "owner", "ownerGroup", vo="vo")
     assert res["OK"], res["Message"]
@@ -47,3 +47,24 @@ def test_JobStatus(jobLoggingDB: JobLoggingDB):
     assert result["OK"] is True, result["Message"]
 
     jobLoggingDB.deleteJob(1)
+
+
+def test_getJobsLoggingInfo(jobLoggingDB: JobLoggingDB):
+    for jobID in (1, 2):
+        result = jobLoggingDB.addLoggingRecord(jobID, status="Running", minorStatus="Application", source="Unittest")
+        assert result["OK"] is True, result["Message"]
+    result = jobLoggingDB.addLoggingRecord(1, status="Stalled", source="Unittest")
+    assert result["OK"] is True, result["Message"]
+
+    result = jobLoggingDB.getJobsLoggingInfo([1, 2, 3])
+    assert result["OK"] is True, result["Message"]
+    assert sorted(result["Value"]) == [1, 2]
+    # The "idem" minor status is replaced by the previous one
+    assert [record[:2] for record in result["Value"][1]] == [("Running", "Application"), ("Stalled", "Application")]
+    assert result["Value"][1] == jobLoggingDB.getJobLoggingInfo(1)["Value"]
+
+    result = jobLoggingDB.getJobsWMSTimeStamps([1, 2, 3])
+    assert result["OK"] is True, result["Message"]
+    assert result["Value"] == {jobID: jobLoggingDB.getWMSTimeStamps(jobID)["Value"] for jobID in (1, 2)}
+
+    jobLoggingDB.deleteJob([1, 2])
@@ -0,0 +1,75 @@
+"""
+Benchmark of concurrent RPC calls to a service, with the threaded and the asynchronous clients
+
+The same number of independent calls is sent:
+
+  - one after the other, with a new client for each call, as the synchronous clients do
+  - from a pool of threads, with a new client for each call, as the agents do today
+  - with the asynchronous client, all the calls being gathered
+
+The wall time of each approach and the number of calls per second are printed.
+The service is either given as System/Component, the protocol being then chosen from the CS,
+or as a complete dips:// or https:// URL.
+
+Usage::
+
+  python benchmark_asyncclient.py [service] [method] [nbCalls] [concurrency]
+
+for example::
+
+  python benchmark_asyncclient.py Framework/SystemAdministrator ping 1000 20
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import DIRAC
+
+DIRAC.initialize()  # Initialize configuration
+
+import asyncio
+
+from DIRAC.Core.Tornado.Client.AsyncClient import AsyncRPCClient, gatherRPCs
+from DIRAC.Core.Tornado.Client.ClientSelector import RPCClientSelector
+
+
+def syncCall(service, method):
+    return getattr(RPCClientSelector(service), method)()
+
+
+def sequential(service, method, nbCalls, _concurrency):
+    return [syncCall(service, method) for _ in range(nbCalls)]
+
+
+def threaded(service, method, nbCalls, concurrency):
+    with ThreadPoolExecutor(concurrency) as executor:
+        return list(executor.map(lambda _: syncCall(service, method), range(nbCalls)))
+
+
+def asynchronous(service, method, nbCalls, concurrency):
+    async def main():
+        client = AsyncRPCClient(service)
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call():
+            async with semaphore:
+                return await getattr(client, method)()
+
+        return await gatherRPCs(*(call() for _ in range(nbCalls)))
+
+    return asyncio.run(main())
+
+
+def main(service="Framework/SystemAdministrator", method="ping", nbCalls=500, concurrency=20):
+    print(f"{nbCalls} calls to {service}.{method}, {concurrency} concurrent calls")
+    for name, approach in (("sequential", sequential), ("threads", threaded), ("asyncio", asynchronous)):
+        start = time.perf_counter()
+        results = approach(service, method, nbCalls, concurrency)
+        elapsed = time.perf_counter() - start
+        failed = sum(not result["OK"] for result in results)
+        print(f"{name:>12}: {elapsed:8.2f} s {nbCalls / elapsed:10.1f} calls/s {failed:6d} failed")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(*args[:2], *(int(arg) for arg in args[2:4]))
@@ -0,0 +1,99 @@
+"""
+Microbenchmark of the configuration lookups
+
+A configuration with many systems, agents and options is loaded, and random options are looked up:
+
+  - by walking the CFG tree, as the lookups were done before the configuration snapshots
+  - with gConfig.getValue, answered from the compiled snapshot of the configuration
+  - with Operations().getValue
+
+The wall time per lookup (elapsed time over the total number of lookups) is printed
+for an increasing number of threads.
+
+Usage::
+
+  python benchmark_cslookup.py [nbLookupsPerThread]
+"""
+import random
+import sys
+import threading
+import time
+
+from diraccfg import CFG
+
+from DIRAC import gConfig
+from DIRAC.ConfigurationSystem.Client.ConfigurationData import gConfigurationData
+from DIRAC.ConfigurationSystem.Client.Helpers.Operations import Operations
+
+NB_SYSTEMS = 20
+NB_AGENTS = 20
+NB_OPTIONS = 20
+THREAD_COUNTS = (1, 4, 16)
+
+
+def buildCFG():
+    lines = ["Systems", "{"]
+    for system in range(NB_SYSTEMS):
+        lines += [f"System{system}", "{", "Agents", "{"]
+        for agent in range(NB_AGENTS):
+            lines += [f"Agent{agent}", "{"]
+            lines += [f"Option{option} = value{option}, other{option}" for option in range(NB_OPTIONS)]
+            lines += ["}"]
+        lines += ["}", "}"]
+    lines += ["}", "Operations", "{", "Defaults", "{", "JobScheduling", "{"]
+    lines += [f"Option{option} = {option}" for option in range(NB_OPTIONS)]
+    lines += ["}", "}", "}"]
+    cfg = CFG()
+    cfg.loadFromBuffer("\n".join(lines))
+    return cfg
+
+
+def randomPath():
+    system, agent, option = (random.randrange(n) for n in (NB_SYSTEMS, NB_AGENTS, NB_OPTIONS))
+    return f"/Systems/System{system}/Agents/Agent{agent}/Option{option}"
+
+
+def treeWalk(path):
+    # An explicit cfg bypasses the snapshot
+    return gConfigurationData.extractOptionFromCFG(path, gConfigurationData.mergedCFG)
+
+
+def snapshotLookup(path):
+    return gConfig.getValue(path, [])
+
+
+def operationsLookup(path):
+    return Operations(vo="benchmark").getValue(f"JobScheduling/{path.rsplit('/', 1)[1]}", 0)
+
+
+def worker(lookup, nbLookups, barrier):
+    paths = [randomPath() for _ in range(nbLookups)]
+    barrier.wait()
+    for path in paths:
+        lookup(path)
+
+
+def measure(lookup, nbThreads, nbLookups):
+    """Return the wall time per lookup, in microseconds"""
+    barrier = threading.Barrier(nbThreads + 1)
+    threads = [threading.Thread(target=worker, args=(lookup, nbLookups, barrier)) for _ in range(nbThreads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return (time.perf_counter() - start) * 1e6 / (nbThreads * nbLookups)
+
+
+def main(nbLookups=20000):
+    gConfig.loadCFG(buildCFG())
+    lookups = {"CFG walk": treeWalk, "gConfig.getValue": snapshotLookup, "Operations.getValue": operationsLookup}
+    print(f"{'threads':>8}" + "".join(f"{name:>24}" for name in lookups))
+    for nbThreads in THREAD_COUNTS:
+        latencies = [measure(lookup, nbThreads, nbLookups) for lookup in lookups.values()]
+        print(f"{nbThreads:>8}" + "".join(f"{latency:>21.2f} us" for latency in latencies))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
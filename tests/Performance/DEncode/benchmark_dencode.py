@@ -0,0 +1,73 @@
+"""
+Compare the recursive and the iterative DEncode engines on realistic DISET payloads
+
+Usage::
+
+  python benchmark_dencode.py [nbRepeat]
+"""
+import datetime
+import sys
+import timeit
+
+from DIRAC.Core.Utilities import DEncode
+
+
+def buildPayloads():
+    """Build the payloads used in the benchmark
+
+    :returns: dict {payload name: payload}
+    """
+    now = datetime.datetime.utcnow()
+    lfns = [f"/lhcb/MC/2018/ALLSTREAMS.DST/00012345/0000/00012345_{i:08d}_7.AllStreams.dst" for i in range(20000)]
+    replicas = {
+        "OK": True,
+        "Value": {
+            "Successful": {
+                lfn: {
+                    "CERN-DST-EOS": f"root://eoslhcb.cern.ch//eos/lhcb/grid/prod{lfn}",
+                    "RAL-DST": f"root://xrootd.echo.stfc.ac.uk/lhcb:prod{lfn}",
+                }
+                for lfn in lfns[:5000]
+            },
+            "Failed": {},
+        },
+    }
+    jobParameters = {
+        "OK": True,
+        "Value": {
+            jobID: {
+                "JobID": jobID,
+                "Status": "Running",
+                "MinorStatus": "Application",
+                "Site": "LCG.CERN.cern",
+                "CPUTime": 1234.5,
+                "HeartBeatTime": now,
+                "SubmissionTime": now - datetime.timedelta(hours=1),
+                "JobName": f"Job_{jobID}",
+                "OwnerGroup": "lhcb_user",
+            }
+            for jobID in range(1, 5001)
+        },
+    }
+    return {
+        "longLFNList": ("getReplicas", [lfns], {}),
+        "replicaDict": replicas,
+        "jobParameters": jobParameters,
+    }
+
+
+def main(nbRepeat=5):
+    for name, payload in buildPayloads().items():
+        encoded = DEncode.recursiveEncode(payload)
+        assert DEncode.iterativeEncode(payload) == encoded
+        print(f"{name}: {len(encoded)} bytes")
+        for engine in ("recursive", "iterative"):
+            encodeFunc = getattr(DEncode, f"{engine}Encode")
+            decodeFunc = getattr(DEncode, f"{engine}Decode")
+            encTime = min(timeit.repeat(lambda: encodeFunc(payload), number=1, repeat=nbRepeat))
+            decTime = min(timeit.repeat(lambda: decodeFunc(encoded), number=1, repeat=nbRepeat))
+            print(f"  {engine:>10}: encode {encTime * 1000:8.2f} ms  decode {decTime * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
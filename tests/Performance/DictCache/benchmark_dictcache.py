@@ -0,0 +1,59 @@
+"""
+Multi-threaded microbenchmark of the DictCache and the ShardedDictCache
+
+Each thread performs a mix of get (90%) and add (10%) on random keys,
+as a DISET service handler thread would. The throughput is printed for
+an increasing number of threads.
+
+Usage::
+
+  python benchmark_dictcache.py [nbOperationsPerThread]
+"""
+import random
+import sys
+import threading
+import time
+
+from DIRAC.Core.Utilities.DictCache import DictCache, ShardedDictCache
+
+NB_KEYS = 10000
+THREAD_COUNTS = (1, 2, 4, 8, 16, 32, 50)
+
+
+def worker(cache, nbOperations, barrier):
+    keys = [f"/DC=ch/DC=cern/OU=Users/CN=user{random.randrange(NB_KEYS)}" for _ in range(nbOperations)]
+    barrier.wait()
+    for i, key in enumerate(keys):
+        if i % 10:
+            cache.get(key)
+        else:
+            cache.add(key, 300, i)
+
+
+def measure(cacheFactory, nbThreads, nbOperations):
+    """Return the number of operations per second"""
+    cache = cacheFactory()
+    barrier = threading.Barrier(nbThreads + 1)
+    threads = [threading.Thread(target=worker, args=(cache, nbOperations, barrier)) for _ in range(nbThreads)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return nbThreads * nbOperations / (time.perf_counter() - start)
+
+
+def main(nbOperations=20000):
+    factories = {
+        "DictCache": DictCache,
+        "ShardedDictCache(16)": lambda: ShardedDictCache(nbShards=16),
+    }
+    print(f"{'threads':>8}" + "".join(f"{name:>24}" for name in factories))
+    for nbThreads in THREAD_COUNTS:
+        rates = [measure(factory, nbThreads, nbOperations) for factory in factories.values()]
+        print(f"{nbThreads:>8}" + "".join(f"{rate:>20.0f} op/s" for rate in rates))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
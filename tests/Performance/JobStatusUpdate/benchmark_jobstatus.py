@@ -0,0 +1,112 @@
+"""
+Benchmark of the job status updates, job by job (setJobStatus) against in bulk (setJobsStatusBulk)
+
+It needs the JobDB and the JobLoggingDB, configured as for the integration tests.
+Fake jobs are created directly in the tables, moved from Waiting to Matched, and removed.
+The job parameters are not written to ElasticSearch, so that only the MySQL statements are measured.
+The job by job updates are measured on at most 1000 jobs.
+
+Usage::
+
+  python benchmark_jobstatus.py [nbJobs ...]
+"""
+# pylint: disable=wrong-import-position
+import sys
+import time
+
+import DIRAC
+
+DIRAC.initialize()  # Initialize configuration
+
+from DIRAC import S_OK
+from DIRAC.WorkloadManagementSystem.Client import JobStatus
+from DIRAC.WorkloadManagementSystem.DB.JobDB import JobDB
+from DIRAC.WorkloadManagementSystem.DB.JobLoggingDB import JobLoggingDB
+from DIRAC.WorkloadManagementSystem.Utilities.JobStatusUtility import JobStatusUtility
+
+# Far above the IDs of the real jobs
+FIRST_JOB_ID = 100000000
+MAX_JOBS_ONE_BY_ONE = 1000
+
+
+class NoJobParameters:
+    """Replaces the ElasticJobParametersDB"""
+
+    def setJobParameter(self, jobID, key, value):
+        return S_OK()
+
+
+def check(result):
+    if not result["OK"]:
+        raise RuntimeError(result["Message"])
+    return result["Value"]
+
+
+def createJobs(jobDB, jobLoggingDB, nbJobs):
+    """Create Waiting jobs, with their logging records"""
+    jobIDs = list(range(FIRST_JOB_ID, FIRST_JOB_ID + nbJobs))
+    check(
+        jobDB.insertManyFields(
+            "JobJDLs", ["JobID", "JDL", "JobRequirements", "OriginalJDL"], ([jobID, "", "", ""] for jobID in jobIDs)
+        )
+    )
+    check(
+        jobDB.insertManyFields(
+            "Jobs",
+            ["JobID", "Status", "MinorStatus"],
+            ([jobID, JobStatus.WAITING, "Pilot Agent Submission"] for jobID in jobIDs),
+        )
+    )
+    records = []
+    for jobID in jobIDs:
+        for status in (JobStatus.RECEIVED, JobStatus.CHECKING, JobStatus.WAITING):
+            records.append({"jobID": jobID, "status": status, "source": "Benchmark"})
+    check(jobLoggingDB.addLoggingRecords(records))
+    return jobIDs
+
+
+def removeJobs(jobDB, jobLoggingDB):
+    check(jobLoggingDB._update(f"DELETE FROM LoggingInfo WHERE JobID >= {FIRST_JOB_ID}"))
+    for table in ("Jobs", "JobJDLs"):
+        check(jobDB._update(f"DELETE FROM {table} WHERE JobID >= {FIRST_JOB_ID}"))
+
+
+def oneByOne(jsu, jobIDs):
+    for jobID in jobIDs:
+        check(jsu.setJobStatus(jobID, status=JobStatus.MATCHED, minorStatus="Assigned", source="Benchmark"))
+
+
+def bulk(jsu, jobIDs):
+    updates = {jobID: [(JobStatus.MATCHED, "Assigned", "", "Benchmark", None)] for jobID in jobIDs}
+    result = check(jsu.setJobsStatusBulk(updates))
+    if result["Failed"]:
+        raise RuntimeError(f"{len(result['Failed'])} jobs failed")
+
+
+def measure(jobDB, jobLoggingDB, jsu, nbJobs, function):
+    """Return the number of jobs updated per second"""
+    jobIDs = createJobs(jobDB, jobLoggingDB, nbJobs)
+    try:
+        start = time.perf_counter()
+        function(jsu, jobIDs)
+        return nbJobs / (time.perf_counter() - start)
+    finally:
+        removeJobs(jobDB, jobLoggingDB)
+
+
+def main(sizes):
+    jobDB = JobDB()
+    jobLoggingDB = JobLoggingDB()
+    jsu = JobStatusUtility(jobDB, jobLoggingDB, NoJobParameters())
+    # Left over by an interrupted run
+    removeJobs(jobDB, jobLoggingDB)
+
+    print(f"{'jobs':>8}{'setJobStatus jobs/s':>24}{'setJobsStatusBulk jobs/s':>28}")
+    for nbJobs in sizes:
+        rateOneByOne = measure(jobDB, jobLoggingDB, jsu, min(nbJobs, MAX_JOBS_ONE_BY_ONE), oneByOne)
+        rateBulk = measure(jobDB, jobLoggingDB, jsu, nbJobs, bulk)
+        print(f"{nbJobs:>8}{rateOneByOne:>24.0f}{rateBulk:>28.0f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,95 @@
+"""
+Benchmark of row-by-row inserts (insertFields) against bulk inserts (insertManyFields)
+
+It needs a MySQL/MariaDB server, for example a local container::
+
+  docker run -d --rm -p 3306:3306 -e MYSQL_ROOT_PASSWORD=password -e MYSQL_DATABASE=BenchDB mariadb
+
+The connection parameters are taken from the environment
+(MYSQL_HOST, MYSQL_PORT, MYSQL_USER, MYSQL_PASSWORD, MYSQL_DB).
+A LoggingInfo-like table is created, filled and dropped.
+
+Usage::
+
+  python benchmark_insert.py [nbRows]
+"""
+import datetime
+import os
+import sys
+import time
+
+from DIRAC.Core.Utilities.MySQL import MySQL
+
+TABLE = "BenchLoggingInfo"
+FIELDS = ["JobId", "Status", "MinorStatus", "ApplicationStatus", "StatusTime", "StatusTimeOrder", "StatusSource"]
+TABLE_DEFINITION = {
+    TABLE: {
+        "Fields": {
+            "SeqID": "INT NOT NULL AUTO_INCREMENT",
+            "JobId": "INT NOT NULL",
+            "Status": "VARCHAR(32) NOT NULL DEFAULT ''",
+            "MinorStatus": "VARCHAR(128) NOT NULL DEFAULT ''",
+            "ApplicationStatus": "VARCHAR(255) NOT NULL DEFAULT ''",
+            "StatusTime": "DATETIME NOT NULL",
+            "StatusTimeOrder": "DOUBLE(12,3) NOT NULL",
+            "StatusSource": "VARCHAR(32) NOT NULL DEFAULT 'Unknown'",
+        },
+        "PrimaryKey": ["JobId", "SeqID"],
+        "Engine": "InnoDB",
+    }
+}
+
+
+def makeRows(nbRows):
+    now = datetime.datetime.utcnow()
+    return [
+        [i // 10, "Running", f"Step {i % 10}", "Executing 'payload'", str(now), float(i), "JobWrapper"]
+        for i in range(nbRows)
+    ]
+
+
+def rowByRow(db, rows):
+    for row in rows:
+        result = db.insertFields(TABLE, FIELDS, row)
+        if not result["OK"]:
+            raise RuntimeError(result["Message"])
+
+
+def bulk(db, rows, chunkSize):
+    result = db.insertManyFields(TABLE, FIELDS, rows, chunkSize=chunkSize)
+    if not result["OK"]:
+        raise RuntimeError(result["Message"])
+
+
+def measure(db, nbRows, function, *args):
+    """Return the number of rows inserted per second"""
+    rows = makeRows(nbRows)
+    db._update(f"TRUNCATE TABLE `{TABLE}`")
+    start = time.perf_counter()
+    function(db, rows, *args)
+    return nbRows / (time.perf_counter() - start)
+
+
+def main(nbRows=20000):
+    db = MySQL(
+        hostName=os.environ.get("MYSQL_HOST", "127.0.0.1"),
+        userName=os.environ.get("MYSQL_USER", "root"),
+        passwd=os.environ.get("MYSQL_PASSWORD", "password"),
+        dbName=os.environ.get("MYSQL_DB", "BenchDB"),
+        port=int(os.environ.get("MYSQL_PORT", 3306)),
+    )
+    result = db._createTables(TABLE_DEFINITION, force=True)
+    if not result["OK"]:
+        raise RuntimeError(result["Message"])
+    try:
+        print(f"{'method':>32}{'rows/s':>12}")
+        print(f"{'insertFields':>32}{measure(db, nbRows, rowByRow):>12.0f}")
+        for chunkSize in (100, 1000, 10000):
+            rate = measure(db, nbRows, bulk, chunkSize)
+            print(f"{f'insertManyFields({chunkSize})':>32}{rate:>12.0f}")
+    finally:
+        db._update(f"DROP TABLE `{TABLE}`")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)